@@ -67,15 +67,19 @@ from fastlane_bot.helpers import (
     split_carbon_trades,
     submit_transaction_tenderly
 )
+from fastlane_bot.helpers.poolandtokens import PoolAndTokens
 from fastlane_bot.helpers.routehandler import maximize_last_trade_per_tkn
 from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer, T
 from fastlane_bot.tools.optimizer import CPCArbOptimizer
 from .config.constants import FLASHLOAN_FEE_MAP
+from .events.curve_cache import CurveCache
 from .events.interface import QueryInterface
+from .events.pipeline import SnapshotChannel
 from .modes.pairwise_multi import FindArbitrageMultiPairwise
 from .modes.pairwise_multi_all import FindArbitrageMultiPairwiseAll
 from .modes.pairwise_multi_pol import FindArbitrageMultiPairwisePol
 from .modes.pairwise_single import FindArbitrageSinglePairwise
+from .modes.search_cache import PairSearchCache, WarmStartCache
 from .modes.triangle_multi import ArbitrageFinderTriangleMulti
 from .modes.triangle_single import ArbitrageFinderTriangleSingle
 from .modes.triangle_bancor_v3_two_hop import ArbitrageFinderTriangleBancor3TwoHop
@@ -93,8 +97,19 @@ class CarbonBotBase:
         the database manager.
     TxRouteHandlerClass
         ditto (default: TxRouteHandler).
-    TxHelpersClass: class derived from TxHelpersBase
-        ditto (default: TxHelpers).
+    TxHelpersClass: instance of a class derived from TxHelpersBase
+        the tx helpers, which may be kept across bot instances to reuse their transaction context (default: TxHelpers).
+    curve_cache: CurveCache
+        the long-lived curve cache used by get_curves (default: None, i.e. rebuild all curves).
+    search_cache: PairSearchCache
+        the long-lived pair search cache used by the arb finders (default: None, i.e. optimize all pairs).
+    warm_start: WarmStartCache
+        the long-lived cache of optimal prices seeding the arb finders' optimizations (default: None, i.e. cold starts).
+    n_jobs: int
+        the number of worker processes used by the arb finders (default: 1; -1 uses all CPUs).
+    snapshots: SnapshotChannel
+        the channel of the pipelined main loop, through which the stale pools found when validating an
+        opportunity are reported to the ingestion stage (default: None, i.e. they are updated in the pool data).
 
     """
 
@@ -108,6 +123,11 @@ class CarbonBotBase:
     usd_gas_limit: int = 150
     min_profit: int = 60
     polling_interval: int = None
+    curve_cache: CurveCache = None
+    search_cache: PairSearchCache = None
+    warm_start: WarmStartCache = None
+    n_jobs: int = 1
+    snapshots: SnapshotChannel = None
 
     def __post_init__(self):
         """
@@ -159,11 +179,17 @@ class CarbonBotBase:
         """
         Gets the curves from the database.
 
+        If a curve cache is set, only the curves of the pools which changed since the previous call
+        are rebuilt and the cached container is returned; otherwise all curves are rebuilt.
+
         Returns
         -------
         CPCContainer
             The container of curves.
         """
+        if self.curve_cache is not None:
+            return self.curve_cache.update(self.db, self.pool_to_curves)
+
         self.db.refresh_pool_data()
         pools_and_tokens = self.db.get_pool_data_with_tokens()
         curves = []
@@ -171,44 +197,61 @@ class CarbonBotBase:
         ADDRDEC = {t.address: (t.address, int(t.decimals)) for t in tokens}
 
         for p in pools_and_tokens:
-            try:
-                p.ADDRDEC = ADDRDEC
-                curves += p.to_cpc()
-            except NotImplementedError as e:
-                # Currently not supporting Solidly V2 Stable pools. This will be removed when support is added, but for now the error message is suppressed.
-                if "Stable Solidly V2" in str(e):
-                    continue
-                else:
-                    self.ConfigObj.logger.error(
-                        f"[bot.get_curves] Pool type not yet supported, error: {e}\n"
-                    )
-            except ZeroDivisionError as e:
-                self.ConfigObj.logger.error(
-                    f"[bot.get_curves] MUST FIX INVALID CURVE {p} [{e}]\n"
-                )
-            except CPC.CPCValidationError as e:
-                self.ConfigObj.logger.error(
-                    f"[bot.get_curves] MUST FIX INVALID CURVE {p} [{e}]\n"
-                )
-            except TypeError as e:
-                if fastlane_bot.__version__ not in ["3.0.31", "3.0.32"]:
-                    self.ConfigObj.logger.error(
-                        f"[bot.get_curves] MUST FIX DECIMAL ERROR CURVE {p} [{e}]\n"
-                    )
-            except p.DoubleInvalidCurveError as e:
-                self.ConfigObj.logger.error(
-                    f"[bot.get_curves] MUST FIX DOUBLE INVALID CURVE {p} [{e}]\n"
-                )
-            except Univ3Calculator.DecimalsMissingError as e:
+            curves += self.pool_to_curves(p, ADDRDEC)
+
+        return CPCContainer(curves)
+
+    def pool_to_curves(self, p: PoolAndTokens, ADDRDEC: Dict[str, Tuple[str, int]]) -> List[CPC]:
+        """
+        Converts a pool into its curves, logging (and skipping) pools which cannot be converted.
+
+        Parameters
+        ----------
+        p: PoolAndTokens
+            The pool.
+        ADDRDEC: Dict[str, Tuple[str, int]]
+            The (address, decimals) of the tokens by address.
+
+        Returns
+        -------
+        List[CPC]
+            The curves, or an empty list if the pool could not be converted.
+        """
+        try:
+            p.ADDRDEC = ADDRDEC
+            return p.to_cpc()
+        except NotImplementedError as e:
+            # Currently not supporting Solidly V2 Stable pools. This will be removed when support is added, but for now the error message is suppressed.
+            if "Stable Solidly V2" not in str(e):
                 self.ConfigObj.logger.error(
-                    f"[bot.get_curves] MUST FIX DECIMALS MISSING [{e}]\n"
+                    f"[bot.get_curves] Pool type not yet supported, error: {e}\n"
                 )
-            except Exception as e:
+        except ZeroDivisionError as e:
+            self.ConfigObj.logger.error(
+                f"[bot.get_curves] MUST FIX INVALID CURVE {p} [{e}]\n"
+            )
+        except CPC.CPCValidationError as e:
+            self.ConfigObj.logger.error(
+                f"[bot.get_curves] MUST FIX INVALID CURVE {p} [{e}]\n"
+            )
+        except TypeError as e:
+            if fastlane_bot.__version__ not in ["3.0.31", "3.0.32"]:
                 self.ConfigObj.logger.error(
-                    f"[bot.get_curves] error converting pool to curve {p}\n[ERR={e}]\n\n"
+                    f"[bot.get_curves] MUST FIX DECIMAL ERROR CURVE {p} [{e}]\n"
                 )
-
-        return CPCContainer(curves)
+        except p.DoubleInvalidCurveError as e:
+            self.ConfigObj.logger.error(
+                f"[bot.get_curves] MUST FIX DOUBLE INVALID CURVE {p} [{e}]\n"
+            )
+        except Univ3Calculator.DecimalsMissingError as e:
+            self.ConfigObj.logger.error(
+                f"[bot.get_curves] MUST FIX DECIMALS MISSING [{e}]\n"
+            )
+        except Exception as e:
+            self.ConfigObj.logger.error(
+                f"[bot.get_curves] error converting pool to curve {p}\n[ERR={e}]\n\n"
+            )
+        return []
 
 
 @dataclass
@@ -324,7 +367,7 @@ class CarbonBot(CarbonBotBase):
         result = (
             {
                 **ti,
-                "raw_txs": "[]",
+                "raw_txs": [],
                 "pair_sorting": "",
                 "ConfigObj": self.ConfigObj,
                 "db": self.db,
@@ -440,8 +483,17 @@ class CarbonBot(CarbonBotBase):
             mode="bothin",
             result=random_mode,
             ConfigObj=self.ConfigObj,
+            search_cache=self.search_cache,
+            n_jobs=self.n_jobs,
+            warm_start=self.warm_start,
         )
-        return {"finder": finder, "r": finder.find_arbitrage()}
+        r = finder.find_arbitrage()
+        if self.warm_start is not None:
+            self.warm_start.retain()
+            self.ConfigObj.logger.debug(
+                f"[bot._find_arbitrage] warm start cache: {self.warm_start.hits} hits, {self.warm_start.misses} misses"
+            )
+        return {"finder": finder, "r": r}
 
     def _run(
         self,
@@ -592,6 +644,10 @@ class CarbonBot(CarbonBotBase):
         """
         Validates that the data for each pool in the arbitrage opportunity is fresh.
 
+        The state of all pools in the route is read in a single multicall, pinned to one block. The pools
+        whose stored state differs from the on-chain state are updated in the pool data, or, in pipelined mode
+        (where the bot searches a snapshot), reported to the ingestion stage which owns the pool data.
+
         Parameters
         ----------
         arb_opp: tuple
@@ -600,6 +656,7 @@ class CarbonBot(CarbonBotBase):
         Returns
         -------
         bool
+            True if all pools are up to date.
         """
         self.ConfigObj.logger.info("[bot.validate_pool_data] Validating pool data...")
         (
@@ -609,74 +666,33 @@ class CarbonBot(CarbonBotBase):
             best_src_token,
             best_trade_instructions,
         ) = arb_opp
+        mgr = self.db.mgr
+        pool_data = mgr.pool_data if self.snapshots is None else self.db.state
+        pool_infos = {}
         for pool in best_trade_instructions_dic:
             pool_cid = pool["cid"].split("-")[0]
-            strategy_id = pool["strategy_id"]
-            current_pool = self.db.get_pool(cid=pool_cid)
-            pool_info = {
-                "cid": pool_cid,
-                "strategy_id": strategy_id,
-                "id": current_pool.id,
-                "address": current_pool.address,
-                "pair_name": current_pool.pair_name,
-                "exchange_name": current_pool.exchange_name,
-                "tkn0_address": current_pool.tkn0_address,
-                "tkn1_address": current_pool.tkn1_address,
-                "tkn0_symbol": current_pool.tkn0_symbol,
-                "tkn1_symbol": current_pool.tkn1_symbol,
-                "tkn0_decimals" : current_pool.tkn0_decimals,
-                "tkn1_decimals": current_pool.tkn1_decimals,
-            }
-
-            fetched_pool = self.db.mgr.update_from_pool_info(pool_info=pool_info)
-            if fetched_pool is None:
+            pool_info = pool_data.get(pool_cid)
+            if pool_info is None:
                 self.ConfigObj.logger.error(
                     f"[bot.validate_pool_data] Could not fetch pool data for {pool_cid}"
                 )
+                return False
+            pool_infos[pool_cid] = pool_info
 
-            ex_name = fetched_pool["exchange_name"]
-            self._validate_pool_data_logging(pool_cid, fetched_pool)
-
-            if ex_name == "bancor_v3":
-                self._validate_pool_data_logging(pool_cid, fetched_pool)
+        block_number, diffs = mgr.validate_pool_states(list(pool_infos.values()), apply=self.snapshots is None)
+        if self.snapshots is not None:
+            self.snapshots.report_stale(block_number, diffs)
+        for pool_cid, diff in diffs.items():
+            self._validate_pool_data_logging(pool_cid, pool_infos[pool_cid], diff)
 
-            if current_pool.exchange_name in self.ConfigObj.CARBON_V1_FORKS:
-                if (
-                    current_pool.y_0 != fetched_pool["y_0"]
-                    or current_pool.y_1 != fetched_pool["y_1"]
-                ):
-                    self.ConfigObj.logger.debug(
-                        "[bot.validate_pool_data] Carbon pool not up to date, updating and restarting."
-                    )
-                    return False
-            elif current_pool.exchange_name in [
-                "balancer",
-            ]:
-                for idx, balance in enumerate(current_pool.token_balances):
-                    if balance != fetched_pool[f"tkn{idx}_balance"]:
-                        self.ConfigObj.logger.debug(
-                            "[bot.validate_pool_data] Balancer pool not up to date, updating and restarting."
-                        )
-                        return False
-            elif current_pool.exchange_name in self.ConfigObj.UNI_V3_FORKS:
-                if (
-                    current_pool.liquidity != fetched_pool["liquidity"]
-                    or current_pool.sqrt_price_q96 != fetched_pool["sqrt_price_q96"]
-                    or current_pool.tick != fetched_pool["tick"]
-                ):
-                    self.ConfigObj.logger.debug(
-                        "[bot.validate_pool_data] UniV3 pool not up to date, updating and restarting."
-                    )
-                    return False
-
-            elif (
-                current_pool.tkn0_balance != fetched_pool["tkn0_balance"]
-                or current_pool.tkn1_balance != fetched_pool["tkn1_balance"]
-            ):
+        stale_cids = [pool_cid for pool_cid, diff in diffs.items() if diff]
+        if stale_cids:
+            for pool_cid in stale_cids:
                 self.ConfigObj.logger.debug(
-                    f"[bot.validate_pool_data] {ex_name} pool not up to date, updating and restarting."
+                    f"[bot.validate_pool_data] {pool_infos[pool_cid]['exchange_name']} pool {pool_cid} not up to date "
+                    f"at block {block_number}, updating and restarting."
                 )
-                return False
+            return False
 
         return True
 
@@ -704,7 +720,7 @@ class CarbonBot(CarbonBotBase):
             return None
 
     def _validate_pool_data_logging(
-        self, pool_cid: str, fetched_pool: Dict[str, Any]
+        self, pool_cid: str, pool_info: Dict[str, Any], diff: Dict[str, Any]
     ) -> None:
         """
         Logs the pool data validation.
@@ -713,15 +729,17 @@ class CarbonBot(CarbonBotBase):
         ----------
         pool_cid: str
             The pool CID.
-        fetched_pool: dict
-            The fetched pool data.
+        pool_info: dict
+            The stored pool data.
+        diff: dict
+            The (stored, on-chain) values of the keys which differ.
 
         """
         self.ConfigObj.logger.debug(f"[bot.py validate] pool_cid: {pool_cid}")
         self.ConfigObj.logger.debug(
-            f"[bot.py validate] fetched_pool: {fetched_pool['exchange_name']}"
+            f"[bot.py validate] pool: {pool_info['exchange_name']}"
         )
-        self.ConfigObj.logger.debug(f"[bot.py validate] fetched_pool: {fetched_pool}")
+        self.ConfigObj.logger.debug(f"[bot.py validate] diff: {diff}")
 
     @staticmethod
     def _carbon_in_trade_route(trade_instructions: List[TradeInstruction]) -> bool:
@@ -1063,11 +1081,8 @@ class CarbonBot(CarbonBotBase):
             best_trade_instructions_dic=best_trade_instructions_dic,
         )
 
-        # Get the tx helpers class
-        tx_helpers = TxHelpers(ConfigObj=self.ConfigObj)
-
         # Return the validate and submit transaction
-        return tx_helpers.validate_and_submit_transaction(
+        return self.TxHelpersClass.validate_and_submit_transaction(
             route_struct=route_struct_maximized,
             src_amt=flashloan_amount_wei,
             src_address=flashloan_token_address,
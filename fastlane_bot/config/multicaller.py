@@ -5,12 +5,16 @@ This is the multicaller module.
 (c) Copyright Bprotocol foundation 2023.
 Licensed under MIT
 """
+import time
 from functools import partial
-from typing import List, Callable, ContextManager, Any, Dict
+from typing import List, Callable, ContextManager, Any, Dict, Optional, Tuple
 
 import web3
 from eth_abi import decode
+from eth_abi.exceptions import DecodingError
+from joblib import Parallel, delayed
 from web3 import Web3
+from web3.exceptions import ContractLogicError
 
 from fastlane_bot.config.multiprovider import MultiProviderContractWrapper
 from fastlane_bot.data.abi import MULTICALL_ABI
@@ -27,6 +31,28 @@ def cast(typ, val):
     return val
 
 
+def is_execution_error(error: Exception) -> bool:
+    """
+    Tells whether an error of an `aggregate` call was raised by the execution of the calls (a revert,
+    or running out of gas), as opposed to the transport (a timeout, a connection error, a rate limit).
+
+    Parameters
+    ----------
+    error : Exception
+        The error.
+
+    Returns
+    -------
+    bool
+        True if the error is an execution error.
+    """
+    if isinstance(error, ContractLogicError):
+        return True
+    return isinstance(error, ValueError) and any(
+        message in str(error) for message in ("execution reverted", "out of gas")
+    )
+
+
 def collapse_if_tuple(abi: Dict[str, Any]) -> str:
     """
     Converts a tuple from a dict to a parenthesized list of its types.
@@ -104,19 +130,33 @@ class ContractMethodWrapper:
 class MultiCaller(ContextManager):
     """
     Context manager for multicalls.
+
+    The calls are sent in `aggregate` batches of at most `batch_size` calls, which are executed
+    concurrently on up to `max_workers` threads. A batch which reverts is split in two halves which are
+    retried separately, down to single calls (whose failure is raised). The number of calls and the
+    latency of every successful batch are recorded in `batch_latencies`.
+
+    Calls on different contracts can be executed together, in a single `aggregate` call, with
+    `aggregate_calls`, or in batches which tolerate failing calls, with `try_aggregate_calls`.
     """
-    __DATE__ = "2022-09-26"
-    __VERSION__ = "0.0.2"
+    __DATE__ = "2024-03-28"
+    __VERSION__ = "0.0.5"
 
+    BATCH_SIZE = 500
+    MAX_WORKERS = 4
 
     def __init__(self, contract: MultiProviderContractWrapper or web3.contract.Contract,
                  web3: Web3,
-                 block_identifier: Any = 'latest', multicall_address = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696"):
+                 block_identifier: Any = 'latest', multicall_address = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696",
+                 batch_size: int = None, max_workers: int = None):
         self._contract_calls: List[Callable] = []
         self.contract = contract
         self.block_identifier = block_identifier
         self.web3 = web3
         self.MULTICALL_CONTRACT_ADDRESS = self.web3.to_checksum_address(multicall_address)
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.batch_latencies: List[Tuple[int, float]] = []
 
     def __enter__(self) -> 'MultiCaller':
         return self
@@ -152,27 +192,20 @@ class MultiCaller(ContextManager):
             calls_for_aggregate += (_calls_for_aggregate[fn_list])
             output_types_list += (_output_types_list[fn_list])
 
-        _encoded_data = []
-
         function_keys = _calls_for_aggregate.keys()
-        for fn_list in function_keys:
-            _encoded_data.append(self.web3.eth.contract(
-                abi=MULTICALL_ABI,
-                address=self.MULTICALL_CONTRACT_ADDRESS
-            ).functions.aggregate(_calls_for_aggregate[fn_list]).call(block_identifier=self.block_identifier))
-
-        if not isinstance(_encoded_data[0], list):
-            raise TypeError(f"Expected encoded_data to be a list, got {type(_encoded_data[0])} instead.")
-
-        encoded_data = self.web3.eth.contract(
-            abi=MULTICALL_ABI,
-            address=self.MULTICALL_CONTRACT_ADDRESS
-        ).functions.aggregate(calls_for_aggregate).call(block_identifier=self.block_identifier)
 
-        if not isinstance(encoded_data, list):
-            raise TypeError(f"Expected encoded_data to be a list, got {type(encoded_data)} instead.")
+        batches = [
+            calls_for_aggregate[i:i + self.batch_size]
+            for i in range(0, len(calls_for_aggregate), self.batch_size)
+        ]
+        if len(batches) > 1 and self.max_workers > 1:
+            batch_results = Parallel(n_jobs=min(self.max_workers, len(batches)), backend="threading")(
+                delayed(self._aggregate)(batch) for batch in batches
+            )
+        else:
+            batch_results = [self._aggregate(batch) for batch in batches]
+        encoded_data = [data for batch_result in batch_results for data in batch_result]
 
-        encoded_data = encoded_data[1]
         decoded_data_list = []
         for output_types, encoded_output in zip(output_types_list, encoded_data):
             decoded_data = decode(output_types, encoded_output)
@@ -194,3 +227,122 @@ class MultiCaller(ContextManager):
             return_data = new_return
 
         return return_data
+
+    def aggregate_calls(self, calls: List[Any]) -> Tuple[int, List[Tuple]]:
+        """
+        Execute contract function calls, which may target different contracts, in a single `aggregate` call.
+
+        Unlike `multicall`, the calls are neither batched nor retried, so all of them are executed in the
+        same block, and each result is decoded with the output types of its own function.
+
+        Parameters
+        ----------
+        calls : List[Any]
+            The contract function calls, e.g. `contract.functions.slot0()`.
+
+        Returns
+        -------
+        Tuple[int, List[Tuple]]
+            The number of the block in which the calls were executed, and the decoded outputs of the
+            calls, in order.
+        """
+        start_time = time.time()
+        block_number, encoded_data = self.web3.eth.contract(
+            abi=MULTICALL_ABI,
+            address=self.MULTICALL_CONTRACT_ADDRESS
+        ).functions.aggregate(
+            [{'target': call.address, 'callData': call._encode_transaction_data()} for call in calls]
+        ).call(block_identifier=self.block_identifier)
+        self.batch_latencies.append((len(calls), time.time() - start_time))
+
+        return block_number, [
+            decode([collapse_if_tuple(output) for output in call.abi['outputs']], data)
+            for call, data in zip(calls, encoded_data)
+        ]
+
+    def try_aggregate_calls(self, calls: List[Any]) -> List[Optional[Tuple]]:
+        """
+        Execute contract function calls, which may target different contracts, tolerating failing calls.
+
+        The calls are sent in `aggregate` batches of at most `batch_size` calls, which are executed
+        concurrently as in `multicall`. A batch which reverts is split in two halves which are retried
+        separately, and a call which fails (or cannot be decoded) on its own has a None result.
+
+        Parameters
+        ----------
+        calls : List[Any]
+            The contract function calls, e.g. `contract.functions.token0()`.
+
+        Returns
+        -------
+        List[Optional[Tuple]]
+            The decoded outputs of the calls (None for the failed calls), in order.
+        """
+        batches = [calls[i:i + self.batch_size] for i in range(0, len(calls), self.batch_size)]
+        if len(batches) > 1 and self.max_workers > 1:
+            batch_results = Parallel(n_jobs=min(self.max_workers, len(batches)), backend="threading")(
+                delayed(self._try_aggregate)(batch) for batch in batches
+            )
+        else:
+            batch_results = [self._try_aggregate(batch) for batch in batches]
+        return [result for batch_result in batch_results for result in batch_result]
+
+    def _try_aggregate(self, calls: List[Any]) -> List[Optional[Tuple]]:
+        """
+        Execute a batch of calls with `aggregate_calls`, bisecting the batch when it reverts or cannot be decoded.
+
+        Any other error, eg a timeout or a rate limit (see `is_execution_error`), is raised without bisecting.
+
+        Parameters
+        ----------
+        calls : List[Any]
+            The contract function calls.
+
+        Returns
+        -------
+        List[Optional[Tuple]]
+            The decoded outputs of the calls (None for the failed calls), in order.
+        """
+        try:
+            return self.aggregate_calls(calls)[1]
+        except Exception as e:
+            if not isinstance(e, DecodingError) and not is_execution_error(e):
+                raise
+            if len(calls) <= 1:
+                return [None] * len(calls)
+            mid = len(calls) // 2
+            return self._try_aggregate(calls[:mid]) + self._try_aggregate(calls[mid:])
+
+    def _aggregate(self, calls: List[Dict[str, Any]]) -> List[bytes]:
+        """
+        Execute a batch of calls in a single `aggregate` call, bisecting the batch when it reverts.
+
+        Any other error, eg a timeout or a rate limit (see `is_execution_error`), is raised without bisecting.
+
+        Parameters
+        ----------
+        calls : List[Dict[str, Any]]
+            The calls (target and callData).
+
+        Returns
+        -------
+        List[bytes]
+            The encoded return data of the calls, in order.
+        """
+        start_time = time.time()
+        try:
+            encoded_data = self.web3.eth.contract(
+                abi=MULTICALL_ABI,
+                address=self.MULTICALL_CONTRACT_ADDRESS
+            ).functions.aggregate(calls).call(block_identifier=self.block_identifier)
+        except Exception as e:
+            if len(calls) <= 1 or not is_execution_error(e):
+                raise
+            mid = len(calls) // 2
+            return self._aggregate(calls[:mid]) + self._aggregate(calls[mid:])
+
+        if not isinstance(encoded_data, list):
+            raise TypeError(f"Expected encoded_data to be a list, got {type(encoded_data)} instead.")
+
+        self.batch_latencies.append((len(calls), time.time() - start_time))
+        return encoded_data[1]
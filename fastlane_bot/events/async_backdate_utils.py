@@ -1,78 +1,40 @@
-import asyncio
 import time
-from typing import Any, Dict, Tuple, List
-from web3 import AsyncWeb3
+from typing import Any, List
 
-from fastlane_bot.events.async_utils import (
-    get_abis_and_exchanges,
-    get_contract_chunks,
-)
+from fastlane_bot.events.multicall_utils import get_pool_states, update_pool_for_multicall
 from fastlane_bot.events.utils import parse_non_multicall_rows_to_update
 
 
-async def async_main_backdate_from_contracts(c: List[Dict[str, Any]], w3_async: AsyncWeb3) -> Tuple[Any]:
-    return await asyncio.wait_for(
-        asyncio.gather(
-            *[async_handle_main_backdate_from_contracts(**args, w3_async=w3_async) for args in c]
-        ),
-        timeout=20 * 60,
-    )
+def multicall_backdate_from_contracts(mgr: Any, rows: List[int], block_number: int) -> int:
+    """
+    Update the state of the given pools from the chain, as of a fixed block.
 
+    The reserves (or slot0 and liquidity) of all pools are read in chunked multicalls pinned to
+    `block_number` (see `multicall_utils.get_pool_states`), so the pools form a consistent snapshot.
 
-def async_backdate_from_contracts(mgr: Any, rows: List[int]):
-    abis = get_abis_and_exchanges(mgr)
-    contracts = get_backdate_contracts(abis, mgr, rows)
-    chunks = get_contract_chunks(contracts)
-    for chunk in chunks:
-        loop = asyncio.get_event_loop()
-        vals = loop.run_until_complete(async_main_backdate_from_contracts(chunk, w3_async=mgr.w3_async))
-        idxes = [val[0] for val in vals]
-        updated_pool_info = [val[1] for val in vals]
-        for i, idx in enumerate(idxes):
-            updated_pool_data = updated_pool_info[i]
-            mgr.pool_data[idx] = updated_pool_data
+    Args:
+        mgr(Any): The manager object
+        rows(List[int]): The rows of the pools in `mgr.pool_data`
+        block_number(int): The block at which the state is read
 
+    Returns:
+        int: The number of pools updated
+    """
+    pool_infos = [mgr.pool_data[idx] for idx in rows]
+    states = get_pool_states(mgr, pool_infos, block_identifier=block_number)
 
-def get_backdate_contracts(
-    abis: Dict, mgr: Any, rows: List[int]
-) -> List[Dict[str, Any]]:
-    contracts = []
-    for idx in rows:
-        pool_info = mgr.pool_data[idx]
-        contracts.append(
-            {
-                "idx": idx,
-                "pool": mgr.get_or_init_pool(pool_info),
-                "w3_tenderly": mgr.w3_tenderly,
-                "tenderly_fork_id": mgr.tenderly_fork_id,
-                "pool_info": pool_info,
-                "contract": mgr.w3_async.eth.contract(
-                    address=mgr.pool_data[idx]["address"],
-                    abi=abis[mgr.pool_data[idx]["exchange_name"]],
-                ),
-            }
-        )
-    return contracts
-
-
-async def async_handle_main_backdate_from_contracts(
-    idx: int,
-    pool: Any,
-    w3_tenderly: Any,
-    w3_async: AsyncWeb3,
-    tenderly_fork_id: str,
-    pool_info: Dict,
-    contract: Any,
-) -> Tuple[int, Dict[str, Any]]:
-    params = await pool.async_update_from_contract(
-        contract,
-        tenderly_fork_id=tenderly_fork_id,
-        w3_tenderly=w3_tenderly,
-        w3=w3_async,
-    )
-    for key, value in params.items():
-        pool_info[key] = value
-    return idx, pool_info
+    updated = 0
+    for idx, pool_info, state in zip(rows, pool_infos, states):
+        if state is None:
+            mgr.cfg.logger.info(
+                f"[async_backdate_utils] Failed to read the state of {pool_info['exchange_name']} pool {pool_info['address']}"
+            )
+            continue
+        _, pool_info = update_pool_for_multicall(state, pool_info, mgr.get_or_init_pool(pool_info))
+        pool_info["last_updated_block"] = block_number
+        mgr.pool_data[idx] = pool_info
+        updated += 1
+    return updated
 
 
 def async_handle_initial_iteration(
@@ -98,10 +60,11 @@ def async_handle_initial_iteration(
                 f"Backdating {len(other_pool_rows)} pools from {start_block} to {current_block}"
             )
             start_time = time.time()
-            async_backdate_from_contracts(
+            updated = multicall_backdate_from_contracts(
                 mgr=mgr,
                 rows=other_pool_rows,
+                block_number=current_block,
             )
             mgr.cfg.logger.info(
-                f"Backdating {len(other_pool_rows)} pools took {(time.time() - start_time):0.4f} seconds"
+                f"Backdating {updated} of {len(other_pool_rows)} pools took {(time.time() - start_time):0.4f} seconds"
             )
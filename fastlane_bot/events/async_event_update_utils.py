@@ -1,189 +1,110 @@
-import asyncio
 import os
 import time
-from dataclasses import dataclass
 from glob import glob
-from typing import Any, List, Dict, Tuple, Type, Callable
+from typing import Any, List, Dict
 
-import nest_asyncio
 import numpy as np
 import pandas as pd
-from pandas import DataFrame
-from web3 import Web3
-from web3.contract import AsyncContract
 
-from fastlane_bot.config.constants import CARBON_V1_NAME
-from fastlane_bot.data.abi import ERC20_ABI
-from fastlane_bot.events.async_utils import get_contract_chunks
+from fastlane_bot.events.multicall_utils import (
+    extract_token_and_fee,
+    get_token_and_fee_reads,
+    get_token_metadata_reads,
+    resolve_reads,
+)
+from fastlane_bot.events.token_cache import TokenCache
 from fastlane_bot.events.utils import update_pools_from_events
 from fastlane_bot.events.pools.utils import get_pool_cid
 
-nest_asyncio.apply()
 
-
-async def get_missing_tkn(contract: AsyncContract, tkn: str) -> pd.DataFrame:
+def get_tokens_and_fee(mgr: Any, current_block: int) -> List[Dict[str, Any]]:
     """
-    This function uses the contract object to get the token info for a given token.
+    This function gets the tokens and fee of the new pools in `mgr.pools_to_add_from_contracts`.
+
+    The values which are not known from the events are read for all pools at once, with one multicall per
+    round of dependent reads (see `multicall_utils.resolve_reads`).
 
     Args:
-        contract(AsyncContract): The contract object
-        tkn(str): The token address
+        mgr(Any): The manager object
+        current_block(int): The block at which the values are read
 
     Returns:
-        pd.DataFrame: The token info
-
+        List[Dict[str, Any]]: The exchange name, address, tokens, fee, cid, strategy id and anchor of each pool
     """
-    try:
-        symbol = await contract.functions.symbol().call()
-    except Exception:
-        symbol = None
-    try:
-        decimals = await contract.functions.decimals().call()
-    except Exception:
-        decimals = None
-    try:
-        df = pd.DataFrame(
-            [
-                {
-                    "address": tkn,
-                    "symbol": symbol,
-                    "decimals": decimals,
-                }
-            ]
-        )
-    except Exception as e:
-        cfg.logger.error(f"Failed to get token info for {tkn} {e}")
-        df = pd.DataFrame(
-            [
-                {
-                    "address": tkn,
-                    "symbol": None,
-                    "decimals": decimals,
-                }
-            ]
-        )
-    return df
+    reads = []
+    for address, exchange_name, event, key, value in mgr.pools_to_add_from_contracts:
+        exchange_name = mgr.exchange_name_from_event(event)
+        try:
+            reads.append(get_token_and_fee_reads(mgr, mgr.exchanges[exchange_name], event))
+        except Exception as e:
+            mgr.cfg.logger.info(f"Failed to get tokens and fee for {address} {exchange_name} {e}")
+
+    tokens_and_fee = {}
+    for values in resolve_reads(mgr, reads, block_identifier=current_block):
+        pool = extract_token_and_fee(mgr, values)
+        if pool["tkn0_address"] is None or pool["tkn1_address"] is None or pool["fee"] is None:
+            mgr.cfg.logger.info(f"Failed to get tokens and fee for {pool['address']} {pool['exchange_name']}")
+            continue
+        exchange = mgr.exchanges[pool["exchange_name"]]
+        carbon_v1_forks = [pool["exchange_name"]] if exchange.is_carbon_v1_fork else []
+        pool["cid"] = get_pool_cid({**pool, "pair_name": f"{pool['tkn0_address']}/{pool['tkn1_address']}"}, carbon_v1_forks=carbon_v1_forks)
+        key = (pool["address"], pool["cid"], pool["strategy_id"], pool["tkn0_address"], pool["tkn1_address"])
+        tokens_and_fee.setdefault(key, pool)
+    return list(tokens_and_fee.values())
 
 
-async def main_get_missing_tkn(c: List[Dict[str, Any]]) -> pd.DataFrame:
+def get_token_cache(mgr: Any) -> TokenCache:
     """
-    This function uses the contract object to get the token info for a given token.
+    This function returns the token cache of the manager, loading it from the tokens CSV file on the first call.
+
+    The token detail files which were written since the last call (by `ContractsManager.get_token_info_from_contract`,
+    until `handle_tokens_csv` merges them into the tokens CSV file) are loaded as well, so that their tokens are not
+    read again.
 
     Args:
-        c(List[Dict[str, Any]]): The contract object and token address
+        mgr(Any): The manager object
 
     Returns:
-        pd.DataFrame: The token info
-    """
-    vals = await asyncio.wait_for(
-        asyncio.gather(*[get_missing_tkn(**args) for args in c]), timeout=20 * 60
-    )
-    return pd.concat(vals)
-
-
-@dataclass
-class TokenFeeResponse:
-    """
-    This dataclass is used to store the response from the get_token_and_fee function.
+        TokenCache: The token cache
     """
-    exchange_name: str
-    address: str
-    tkn0: str
-    tkn1: str
-    fee: float
-    cid: str
-    strategy_id: int
-    anchor: str
-
-    @property
-    def df(self) -> pd.DataFrame:
-        """
-        This property returns the response as a DataFrame.
-        """
-        return pd.DataFrame(
-            [
-                {
-                    "exchange_name": self.exchange_name,
-                    "address": self.address,
-                    "tkn0_address": self.tkn0,
-                    "tkn1_address": self.tkn1,
-                    "fee": self.fee,
-                    "cid": self.cid,
-                    "strategy_id": self.strategy_id,
-                    "anchor": self.anchor,
-                }
-            ]
+    if mgr.token_cache is None:
+        mgr.token_cache = TokenCache.from_csv(
+            os.path.normpath(f"fastlane_bot/data/blockchain_data/{mgr.blockchain}/tokens.csv"),
+            read_only=mgr.read_only,
         )
+    token_details = glob(
+        os.path.normpath(f"{mgr.prefix_path}fastlane_bot/data/blockchain_data/{mgr.blockchain}/token_detail/*.csv")
+    )
+    for path in sorted(token_details):
+        if path not in mgr.token_cache.loaded_files:
+            mgr.token_cache.load_csv(path)
+    return mgr.token_cache
 
 
-async def get_token_and_fee(
-        ex: Any, address: str, contract: AsyncContract, event: Any
-) -> TokenFeeResponse:
+def update_token_cache(mgr: Any, tokens_and_fee: List[Dict[str, Any]], current_block: int) -> TokenCache:
     """
-    This function uses the exchange object to get the tokens and fee for a given pool.
+    This function reads the decimals and symbols of the tokens of the new pools which are not in the token cache,
+    with a single multicall, and adds them to the cache.
 
     Args:
-        ex(Any): The exchange object
-        address(str): The pool address
-        contract(AsyncContract): The contract object
-        event(Any): The event object
+        mgr(Any): The manager object
+        tokens_and_fee(List[Dict[str, Any]]): The tokens and fee of the new pools (see `get_tokens_and_fee`)
+        current_block(int): The block at which the values are read
 
     Returns:
-        TokenFeeResponse: The tokens and fee for the pool
+        TokenCache: The token cache
     """
-    try:
-        anchor = None
-        tkn0 = await ex.get_tkn0(address, contract, event=event)
-        tkn1 = await ex.get_tkn1(address, contract, event=event)
-        fee = await ex.get_fee(address, contract)
-        exchange_name = ex.exchange_name
-        if exchange_name == "bancor_v2":
-            anchor = await ex.get_anchor(contract)
-            for i in [0, 1]:
-                connector_token = await ex.get_connector_tokens(contract, i)
-                if connector_token != "0x1F573D6Fb3F13d689FF844B4cE37794d79a7FF1C":
-                    break
-
-            if tkn0 == "0x1F573D6Fb3F13d689FF844B4cE37794d79a7FF1C":
-                tkn1 = connector_token
-            elif tkn1 == "0x1F573D6Fb3F13d689FF844B4cE37794d79a7FF1C":
-                tkn0 = connector_token
-
-        # bookmark
-        strategy_id = str(event["args"]["id"]) if ex.is_carbon_v1_fork else 0
-        pool_info = {
-            "exchange_name": exchange_name,
-            "address": address,
-            "tkn0_address": tkn0,
-            "tkn1_address": tkn1,
-            "pair_name": f"{tkn0}/{tkn1}",
-            "fee": fee,
-            "strategy_id": strategy_id
-        }
-        carbon_v1_forks = [exchange_name] if (ex.is_carbon_v1_fork or exchange_name == CARBON_V1_NAME) else []
-        cid = get_pool_cid(pool_info, carbon_v1_forks=carbon_v1_forks)
-        return TokenFeeResponse(
-            exchange_name=exchange_name, address=address, tkn0=tkn0, tkn1=tkn1, fee=fee, cid=cid,
-            strategy_id=strategy_id, anchor=anchor
-        )
-    except Exception as e:
-        cfg.logger.info(
-            f"Failed to get tokens and fee for {address} {exchange_name} {e}"
-        )
-        return TokenFeeResponse(
-            exchange_name=exchange_name, address=address, tkn0=None, tkn1=None, fee=None, cid=None,
-            strategy_id=None, anchor=None
-        )
-
-
-async def main_get_tokens_and_fee(c: List[Dict[str, Any]]) -> pd.DataFrame:
-    """
-    This function uses the asyncio gather function to call the get_token_and_fee function for a list of pools.
-    """
-    vals = await asyncio.wait_for(
-        asyncio.gather(*[get_token_and_fee(**args) for args in c]), timeout=20 * 60
+    token_cache = get_token_cache(mgr)
+    missing_tokens = token_cache.missing(
+        pool[key] for pool in tokens_and_fee for key in ["tkn0_address", "tkn1_address"]
     )
-    return pd.concat([val.df for val in vals])
+    if missing_tokens:
+        reads = [get_token_metadata_reads(mgr, address) for address in missing_tokens]
+        added = token_cache.add(resolve_reads(mgr, reads, block_identifier=current_block))
+        mgr.cfg.logger.debug(
+            f"[async_event_update_utils.update_token_cache] resolved {added} of {len(missing_tokens)} new tokens"
+        )
+    return token_cache
 
 
 def pair_name(
@@ -197,14 +118,14 @@ def pair_name(
 
 
 def get_pool_info(
-        pool: pd.Series,
+        pool: Dict[str, Any],
         mgr: Any,
         current_block: int,
         tkn0: Dict[str, Any],
         tkn1: Dict[str, Any],
         pool_data_keys: frozenset,
 ) -> Dict[str, Any]:
-    fee_raw = eval(str(pool["fee"]))
+    fee_raw = pool["fee"]
     pool_info = {
         "exchange_name": pool["exchange_name"],
         "address": pool["address"],
@@ -297,12 +218,9 @@ def get_new_pool_data(
         current_block: int,
         keys: List[str],
         mgr: Any,
-        tokens_and_fee_df: pd.DataFrame,
-        tokens_df: pd.DataFrame,
+        tokens_and_fee: List[Dict[str, Any]],
+        token_cache: TokenCache,
 ) -> List[Dict]:
-    # Convert tokens_df to a dictionary keyed by address for faster access
-    tokens_dict = tokens_df.set_index("address").to_dict(orient="index")
-
     # Convert pool_data_keys to a frozenset for faster containment checks
     all_keys = set()
     for pool in mgr.pool_data:
@@ -311,129 +229,20 @@ def get_new_pool_data(
         all_keys.update("last_updated_block")
     pool_data_keys: frozenset = frozenset(all_keys)
     new_pool_data: List[Dict] = []
-    for idx, pool in tokens_and_fee_df.iterrows():
-        tkn0 = tokens_dict.get(pool["tkn0_address"])
-        tkn1 = tokens_dict.get(pool["tkn1_address"])
+    for pool in tokens_and_fee:
+        tkn0 = token_cache.get(pool["tkn0_address"])
+        tkn1 = token_cache.get(pool["tkn1_address"])
         if not tkn0 or not tkn1:
             mgr.cfg.logger.info(
                 f"tkn0 or tkn1 not found: {pool['tkn0_address']}, {pool['tkn1_address']}, {pool['address']} "
             )
             continue
-        tkn0["address"] = pool["tkn0_address"]
-        tkn1["address"] = pool["tkn1_address"]
         pool_info = get_pool_info(pool, mgr, current_block, tkn0, tkn1, pool_data_keys)
         new_pool_data.append(pool_info)
     return new_pool_data
 
 
-def get_token_contracts(
-        mgr: Any, tokens_and_fee_df: pd.DataFrame
-) -> Tuple[
-    List[Dict[str, Type[AsyncContract] or AsyncContract or Any] or None or Any],
-    DataFrame,
-]:
-    # for each token in the pools, check whether we have the token info in the tokens.csv static data, and ifr not,
-    # add it
-    tokens = (
-            tokens_and_fee_df["tkn0_address"].tolist()
-            + tokens_and_fee_df["tkn1_address"].tolist()
-    )
-    tokens = list(set(tokens))
-    tokens_df = pd.read_csv(
-        f"fastlane_bot/data/blockchain_data/{mgr.blockchain}/tokens.csv"
-    )
-    missing_tokens = [tkn for tkn in tokens if tkn not in tokens_df["address"].tolist()]
-    contracts = []
-    failed_contracts = []
-    contracts.extend(
-        {
-            "contract": mgr.w3_async.eth.contract(address=tkn, abi=ERC20_ABI),
-            "tkn": tkn,
-        }
-        for tkn in missing_tokens
-        if tkn is not None and str(tkn) != "nan"
-    )
-    mgr.cfg.logger.debug(
-        f"[async_event_update_utils.get_token_contracts] successful token contracts: {len(contracts) - len(failed_contracts)} of {len(contracts)} "
-    )
-    return contracts, tokens_df
-
-
-def process_contract_chunks(
-        base_filename: str,
-        chunks: List[Any],
-        dirname: str,
-        filename: str,
-        subset: List[str],
-        func: Callable,
-        df_combined: pd.DataFrame = None,
-        read_only: bool = False,
-) -> pd.DataFrame:
-    lst = []
-    # write chunks to csv
-    for idx, chunk in enumerate(chunks):
-        loop = asyncio.get_event_loop()
-        if filename == "tokens_and_fee_df.csv":
-            df = loop.run_until_complete(func(chunk))
-            if not read_only:
-                df.to_csv(f"{dirname}/{base_filename}{idx}.csv", index=False)
-            else:
-                lst.append(df)
-
-    filepaths = glob(f"{dirname}/*.csv")
-
-    if not read_only:
-        # concatenate and deduplicate
-
-        if filepaths:
-            df_orig = df_combined.copy() if df_combined is not None else None
-            df_combined = pd.concat([pd.read_csv(filepath) for filepath in filepaths])
-            df_combined = (
-                pd.concat([df_orig, df_combined]) if df_orig is not None else df_combined
-            )
-            df_combined = df_combined.drop_duplicates(subset=subset)
-            df_combined.to_csv(filename, index=False)
-            # clear temp dir
-            for filepath in filepaths:
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    cfg.logger.error(f"Failed to remove {filepath} {e}??? This is spooky...")
-    else:
-        if lst:
-            dfs = pd.concat(lst)
-            dfs = dfs.drop_duplicates(subset=subset)
-            if df_combined is not None:
-                df_combined = pd.concat([df_combined, dfs])
-            else:
-                df_combined = dfs
-
-    return df_combined
-
-
-def get_pool_contracts(mgr: Any) -> List[Dict[str, Any]]:
-    contracts = []
-    for add, en, event, key, value in mgr.pools_to_add_from_contracts:
-        exchange_name = mgr.exchange_name_from_event(event)
-        ex = mgr.exchanges[exchange_name]
-        abi = ex.get_abi()
-        address = event["address"]
-        contracts.append(
-            {
-                "ex": ex,
-                "address": address,
-                "contract": mgr.w3_async.eth.contract(address=address, abi=abi),
-                "event": event,
-            }
-        )
-    return contracts
-
-
 def async_update_pools_from_contracts(mgr: Any, current_block: int, logging_path):
-    global cfg
-    cfg = mgr.cfg
-    carbon_v1_forks = cfg.CARBON_V1_FORKS
-    dirname = "temp"
     keys = [
         "liquidity",
         "tkn0_balance",
@@ -442,9 +251,6 @@ def async_update_pools_from_contracts(mgr: Any, current_block: int, logging_path
         "y_1",
         "liquidity",
     ]
-    if not mgr.read_only:
-        if not os.path.exists(dirname):
-            os.mkdir(dirname)
     start_time = time.time()
     # deplicate pool data
 
@@ -456,50 +262,17 @@ def async_update_pools_from_contracts(mgr: Any, current_block: int, logging_path
         for address, exchange_name, event, key, value in mgr.pools_to_add_from_contracts
     ]
 
-    # split contracts into chunks of 1000
-    contracts = get_pool_contracts(mgr)
-    chunks = get_contract_chunks(contracts)
-    tokens_and_fee_df = process_contract_chunks(
-        base_filename="tokens_and_fee_df_",
-        chunks=chunks,
-        dirname=dirname,
-        filename="tokens_and_fee_df.csv",
-        subset=["address", "cid", "strategy_id", "tkn0_address", "tkn1_address"],
-        func=main_get_tokens_and_fee,
-        read_only=mgr.read_only,
-    )
-
-    contracts, tokens_df = get_token_contracts(mgr, tokens_and_fee_df)
-    tokens_df = process_contract_chunks(
-        base_filename="missing_tokens_df_",
-        chunks=get_contract_chunks(contracts),
-        dirname=dirname,
-        filename="missing_tokens_df.csv",
-        subset=["address"],
-        func=main_get_missing_tkn,
-        df_combined=pd.read_csv(
-            f"fastlane_bot/data/blockchain_data/{mgr.blockchain}/tokens.csv"
-        ),
-        read_only=mgr.read_only,
-    )
-    tokens_df["symbol"] = (
-        tokens_df["symbol"]
-        .str.replace(" ", "_")
-        .str.replace("/", "_")
-        .str.replace("-", "_")
-    )
-    if not mgr.read_only:
-        tokens_df.to_csv(
-            f"fastlane_bot/data/blockchain_data/{mgr.blockchain}/tokens.csv", index=False
-        )
-    tokens_df["address"] = tokens_df["address"].apply(
-        lambda x: Web3.to_checksum_address(x)
-    )
-    tokens_df = tokens_df.drop_duplicates(subset=["address"])
+    # read the tokens and fee of all new pools, then the metadata of their unknown tokens, in multicalls
+    tokens_and_fee = get_tokens_and_fee(mgr, current_block)
+    token_cache = update_token_cache(mgr, tokens_and_fee, current_block)
 
     new_pool_data = get_new_pool_data(
-        current_block, keys, mgr, tokens_and_fee_df, tokens_df
+        current_block, keys, mgr, tokens_and_fee, token_cache
     )
+    if not new_pool_data:
+        mgr.cfg.logger.info("[async_event_update_utils.async_update_pools_from_contracts] no new pools resolved")
+        update_pools_from_events(-1, mgr, all_events)
+        return
 
     new_pool_data_df = pd.DataFrame(new_pool_data).sort_values(
         "last_updated_block", ascending=False
@@ -0,0 +1,110 @@
+# coding=utf-8
+"""
+Contains the curve cache, which keeps the curves built from the pool data across bot iterations.
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from fastlane_bot.helpers.poolandtokens import PoolAndTokens
+from fastlane_bot.tools.cpc import ConstantProductCurve, CPCContainer
+
+ToCurves = Callable[[PoolAndTokens, Dict[str, Tuple[str, int]]], List[ConstantProductCurve]]
+
+
+@dataclass
+class CurveCache:
+    """
+    Long-lived cache of the `PoolAndTokens` objects and curves built from the pool data.
+
+    The manager owns a single cache for its whole lifetime, while a new bot (and `QueryInterface`)
+    is created on every iteration of the main loop. On `update`, only the pools whose cids were
+    marked dirty (or which are new to the cache) are converted again, the pools which have left the
+    state are dropped, and the long-lived container `CCm` is patched in place.
+
+    Attributes
+    ----------
+    pools : Dict[str, PoolAndTokens]
+        The pool objects by cid.
+    curves : Dict[str, List[ConstantProductCurve]]
+        The curves built from each pool, by pool cid.
+    CCm : CPCContainer
+        The container holding all cached curves.
+    dirty_cids : Set[str]
+        The cids of the pools which changed since the last update.
+    """
+
+    __VERSION__ = "1.0"
+    __DATE__ = "2024-03-25"
+
+    pools: Dict[str, PoolAndTokens] = field(default_factory=dict)
+    curves: Dict[str, List[ConstantProductCurve]] = field(default_factory=dict)
+    CCm: CPCContainer = field(default_factory=CPCContainer)
+    dirty_cids: Set[str] = field(default_factory=set)
+
+    def mark_dirty(self, cids: Iterable[str]):
+        """
+        Mark pools as changed, so that their curves are rebuilt on the next update.
+
+        Parameters
+        ----------
+        cids : Iterable[str]
+            The cids of the changed pools.
+        """
+        self.dirty_cids.update(str(cid) for cid in cids)
+
+    def update(self, db: Any, to_curves: ToCurves) -> CPCContainer:
+        """
+        Bring the cache in line with the state of a `QueryInterface` and return the curves.
+
+        Parameters
+        ----------
+        db : QueryInterface
+            The query interface holding the (filtered) state. Its `pool_data_list` and `pool_data`
+            attributes are set from the cache, as `refresh_pool_data` would do.
+        to_curves : Callable[[PoolAndTokens, Dict[str, Tuple[str, int]]], List[ConstantProductCurve]]
+            Converts a pool into its curves, given the address to (address, decimals) mapping of its
+            tokens. Must return an empty list for pools which cannot be converted.
+
+        Returns
+        -------
+        CPCContainer
+            The container holding the curves of all pools in the state.
+        """
+        state = {str(record["cid"]): record for record in db.state}
+        dirty, self.dirty_cids = self.dirty_cids, set()
+
+        stale_curve_cids = []
+        for cid in [cid for cid in self.pools if cid not in state]:
+            del self.pools[cid]
+            stale_curve_cids += [curve.cid for curve in self.curves.pop(cid)]
+
+        changed = [
+            (idx, cid, record)
+            for idx, (cid, record) in enumerate(state.items())
+            if cid in dirty or cid not in self.pools
+        ]
+        tokens = db.get_tokens(records=[record for _, _, record in changed])
+        ADDRDEC = {t.address: (t.address, int(t.decimals)) for t in tokens}
+
+        new_curves = []
+        for idx, cid, record in changed:
+            pool = db.create_pool_and_tokens(idx, record)
+            curves = to_curves(pool, ADDRDEC)
+            curve_cids = {curve.cid for curve in curves}
+            stale_curve_cids += [
+                curve.cid for curve in self.curves.get(cid, []) if curve.cid not in curve_cids
+            ]
+            self.pools[cid] = pool
+            self.curves[cid] = curves
+            new_curves += curves
+
+        self.CCm.remove(stale_curve_cids)
+        for curve in new_curves:
+            self.CCm.replace(curve)
+
+        db.pool_data_list = list(self.pools.values())
+        db.pool_data = dict(self.pools)
+        return self.CCm
@@ -93,6 +93,14 @@ EXCHANGE_INFO = {
     "stratum_v2": {"decimals": 4, "factory_abi": VELOCIMETER_V2_FACTORY_ABI, "pool_abi": VELOCIMETER_V2_POOL_ABI, "fee_function": get_fee_1},
 }
 
+# The factory function read by each fee function, and whether it takes the pool's `stable` flag (used to batch the reads)
+FEE_FUNCTION_CALLS = {
+    get_fee_1: ("getFee", False),
+    get_fee_2: ("getRealFee", False),
+    get_fee_3: ("getFee", True),
+    get_fee_4: ("getPairFee", True),
+}
+
 @dataclass
 class SolidlyV2(Exchange):
     """
@@ -473,17 +473,22 @@ class QueryInterface:
         result.tkn1_address = result.pair_name.split("/")[1]
         return result
 
-    def get_tokens(self) -> List[Token]:
+    def get_tokens(self, records: List[Dict[str, Any]] = None) -> List[Token]:
         """
         Get tokens. This method returns a list of tokens that are in the state.
 
+        Parameters
+        ----------
+        records: List[Dict[str, Any]], optional
+            The records to take the tokens from, by default the whole state
+
         Returns
         -------
         List[Token]
             The list of tokens
         """
         token_set = set()
-        for record in self.state:
+        for record in self.state if records is None else records:
             for idx in range(len(record["descr"].split("/"))):
                 try:
                     token_set.add(self.create_token(record, f"tkn{str(idx)}_"))
@@ -17,9 +17,14 @@ from fastlane_bot.config.constants import PANCAKESWAP_V2_NAME, PANCAKESWAP_V3_NA
     SOLIDLY_V2_NAME
 from fastlane_bot.config.multicaller import MultiCaller
 from fastlane_bot.events.exchanges import exchange_factory
+from fastlane_bot.events.curve_cache import CurveCache
 from fastlane_bot.events.exchanges.base import Exchange
+from fastlane_bot.events.pool_log import PoolDataLog
+from fastlane_bot.events.pool_store import PoolStore
 from fastlane_bot.events.pools.utils import get_pool_cid
 from fastlane_bot.events.pools import pool_factory
+from fastlane_bot.events.token_cache import TokenCache
+from fastlane_bot.modes.search_cache import PairSearchCache, WarmStartCache
 
 
 @dataclass
@@ -34,7 +39,7 @@ class BaseManager:
     cfg : Config
         The Config instance.
     pool_data : List[Dict[str, Any]]
-        The pool data.
+        The pool data. Always held as an indexed `PoolStore` (any list assigned to it is wrapped).
     alchemy_max_block_fetch : int
         The maximum number of blocks to fetch from Alchemy.
     event_contracts : Dict[str, Contract or Type[Contract]]
@@ -57,6 +62,22 @@ class BaseManager:
         The supported exchanges.
     read_only : bool
         Whether the bot is running in read only mode.
+    curve_cache : CurveCache
+        The curve cache, which keeps the bot's curves across iterations of the main loop.
+    search_cache : PairSearchCache
+        The pair search cache, which keeps the arb finders' pair optimization results across iterations of the main loop.
+    warm_start : WarmStartCache
+        The warm start cache, which seeds the arb finders' optimizations with the optimal prices of the previous iteration.
+    bancor_pol_events : Dict[str, Dict[str, Any]]
+        The latest Bancor POL event per token, as cached on disk.
+    bancor_pol_last_block : int
+        The last block for which the Bancor POL events have been fetched (None before the first sync).
+    event_pool_types : Dict[Tuple[str, str], Any]
+        The pool type of each (address, event name) handled by the supported exchanges seen so far.
+    pool_data_log : PoolDataLog
+        The binary store to which the changed pools are written after each block (None until the first write).
+    token_cache : TokenCache
+        The token metadata, by address, used to resolve the new pools (None until the first new pool).
     """
 
     web3: Web3
@@ -108,6 +129,14 @@ class BaseManager:
 
     prefix_path: str = ""
     read_only: bool = False
+    curve_cache: CurveCache = field(default_factory=CurveCache)
+    search_cache: PairSearchCache = field(default_factory=PairSearchCache)
+    warm_start: WarmStartCache = field(default_factory=WarmStartCache)
+    bancor_pol_events: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    bancor_pol_last_block: int = None
+    event_pool_types: Dict[Tuple[str, str], Any] = field(default_factory=dict)
+    pool_data_log: PoolDataLog = None
+    token_cache: TokenCache = None
 
     def __post_init__(self):
         initialized_exchanges = []
@@ -133,6 +162,11 @@ class BaseManager:
         self.set_carbon_v1_fee_pairs()
         self.init_tenderly_event_contracts()
 
+    def __setattr__(self, name: str, value: Any):
+        if name == "pool_data" and not isinstance(value, PoolStore):
+            value = PoolStore(value)
+        super().__setattr__(name, value)
+
     def handle_solidly_exchanges(self, exchange):
         """
         Handles getting stable & volatile fees for Solidly forks
@@ -605,7 +639,7 @@ class BaseManager:
         ]
         strategies = []
         for cid in cids:
-            pool_data = [pool for pool in self.pool_data if pool["cid"] == cid][0]
+            pool_data = self.pool_data.get(cid)
             strategy_id = pool_data["strategy_id"]
 
             # Constructing the orders based on the values from the pool_data dictionary
@@ -865,7 +899,7 @@ class BaseManager:
         exchange_name = self.exchange_name_from_event(event)
         cids = [p["cid"] for p in self.pool_data if
                 p["strategy_id"] == strategy_id and p["exchange_name"] == exchange_name]
-        self.pool_data = [p for p in self.pool_data if p["cid"] not in cids]
+        self.pool_data.remove_cids(cids)
         for x in cids:
             self.exchanges[exchange_name].delete_strategy(x)
 
@@ -873,14 +907,8 @@ class BaseManager:
         """
         Deduplicate the pool data.
         """
-        self.pool_data = sorted(
-            self.pool_data, key=lambda x: x["last_updated_block"], reverse=True
-        )
-        seen = set()
-        no_duplicates = [
-            d for d in self.pool_data if d["cid"] not in seen and not seen.add(d["cid"])
-        ]
-        self.pool_data = no_duplicates
+        self.pool_data.sort(key=lambda x: x["last_updated_block"], reverse=True)
+        self.pool_data.drop_duplicate_cids()
 
     @staticmethod
     def pool_key_value_from_event(key: str, event: Dict[str, Any]) -> Any:
@@ -7,7 +7,7 @@ Licensed under MIT
 """
 import random
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from web3.contract import Contract
 
@@ -15,6 +15,7 @@ from fastlane_bot.data.abi import BANCOR_V3_NETWORK_INFO_ABI
 from fastlane_bot.events.managers.contracts import ContractsManager
 from fastlane_bot.events.managers.events import EventManager
 from fastlane_bot.events.managers.pools import PoolManager
+from fastlane_bot.events.multicall_utils import apply_pool_state_diffs, get_pool_state_diffs
 from fastlane_bot.events.pools.utils import get_pool_cid
 
 
@@ -80,30 +81,25 @@ class Manager(PoolManager, EventManager, ContractsManager):
     #             fee_pairs = self.set_carbon_v1_fee_pairs()
     #             self.fee_pairs[exchange_name].update(fee_pairs)
 
-    def update_from_pool_info(
-            self, pool_info: Optional[Dict[str, Any]] = None, current_block: int = None
-    ) -> Dict[str, Any]:
+    def get_pool_contract(self, pool_info: Dict[str, Any]) -> Contract:
         """
-        Update the pool info.
+        Get the contract from which the state of a pool is read.
+
+        This is the pool contract itself, except for the exchanges whose pools share a single contract
+        (the Bancor V3 network info contract and the Balancer vault).
 
         Parameters
         ----------
-        pool_info : Optional[Dict[str, Any]], optional
-            The pool info, by default None.
-        current_block : int, optional
-            The current block, by default None.
-        """
-        if "last_updated_block" in pool_info:
-            if (
-                    type(pool_info["last_updated_block"]) == int
-                    and pool_info["last_updated_block"] == current_block
-            ):
-                return pool_info
-        else:
-            pool_info["last_updated_block"] = current_block
+        pool_info : Dict[str, Any]
+            The pool info.
 
+        Returns
+        -------
+        Contract
+            The contract.
+        """
         if pool_info["exchange_name"] == self.cfg.BANCOR_V3_NAME:
-            contract = self.pool_contracts[pool_info["exchange_name"]].get(
+            return self.pool_contracts[pool_info["exchange_name"]].get(
                 self.cfg.BANCOR_V3_NETWORK_INFO_ADDRESS,
                 self.web3.eth.contract(
                     address=self.cfg.BANCOR_V3_NETWORK_INFO_ADDRESS,
@@ -111,7 +107,7 @@ class Manager(PoolManager, EventManager, ContractsManager):
                 ),
             )
         elif pool_info["exchange_name"] == self.cfg.BALANCER_NAME:
-            contract = self.pool_contracts[pool_info["exchange_name"]].get(
+            return self.pool_contracts[pool_info["exchange_name"]].get(
                 self.cfg.BALANCER_VAULT_ADDRESS,
                 self.web3.eth.contract(
                     address=self.cfg.BALANCER_VAULT_ADDRESS,
@@ -119,13 +115,64 @@ class Manager(PoolManager, EventManager, ContractsManager):
                 ),
             )
         else:
-            contract = self.pool_contracts[pool_info["exchange_name"]].get(
+            return self.pool_contracts[pool_info["exchange_name"]].get(
                 pool_info["address"],
                 self.web3.eth.contract(
                     address=pool_info["address"],
                     abi=self.exchanges[pool_info["exchange_name"]].get_abi(),
                 ),
             )
+
+    def validate_pool_states(
+            self, pool_infos: List[Dict[str, Any]], block_identifier: Any = "latest", apply: bool = True
+    ) -> Tuple[int, Dict[str, Dict[str, Tuple[Any, Any]]]]:
+        """
+        Check the stored state of the given pools against the chain, in a single multicall, and update the stale pools.
+
+        Parameters
+        ----------
+        pool_infos : List[Dict[str, Any]]
+            The pool infos, as stored in the pool data.
+        block_identifier : Any, optional
+            The block at which the state is read, by default "latest".
+        apply : bool, optional
+            Whether the stale pools are updated in the pool data, by default True. The pipelined search stage
+            only reads the state, and leaves the update to the ingestion stage.
+
+        Returns
+        -------
+        Tuple[int, Dict[str, Dict[str, Tuple[Any, Any]]]]
+            The number of the block at which the state was read, and for each pool cid the `(stored, on-chain)`
+            values of the keys which differed (an empty dict if the pool was up to date).
+        """
+        block_number, diffs = get_pool_state_diffs(self, pool_infos, block_identifier)
+        if apply:
+            apply_pool_state_diffs(self, diffs, block_number)
+        return block_number, diffs
+
+    def update_from_pool_info(
+            self, pool_info: Optional[Dict[str, Any]] = None, current_block: int = None
+    ) -> Dict[str, Any]:
+        """
+        Update the pool info.
+
+        Parameters
+        ----------
+        pool_info : Optional[Dict[str, Any]], optional
+            The pool info, by default None.
+        current_block : int, optional
+            The current block, by default None.
+        """
+        if "last_updated_block" in pool_info:
+            if (
+                    type(pool_info["last_updated_block"]) == int
+                    and pool_info["last_updated_block"] == current_block
+            ):
+                return pool_info
+        else:
+            pool_info["last_updated_block"] = current_block
+
+        contract = self.get_pool_contract(pool_info)
         pool = self.get_or_init_pool(pool_info)
         params = pool.update_from_contract(
             contract, self.tenderly_fork_id, self.w3_tenderly, self.web3
@@ -137,10 +184,9 @@ class Manager(PoolManager, EventManager, ContractsManager):
             pool_info["descr"] = self.pool_descr_from_info(pool_info)
 
         # update the pool_data where the cids match
-        for idx, pool in enumerate(self.pool_data):
-            if pool["cid"] == pool_info["cid"]:
-                self.pool_data[idx] = pool_info
-                break
+        pool = self.pool_data.get(pool_info["cid"])
+        if pool is not None:
+            self.pool_data.replace(pool, pool_info)
         return pool_info
 
     def update_from_contract(
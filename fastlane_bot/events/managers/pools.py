@@ -302,7 +302,7 @@ class PoolManager(BaseManager):
                 )
             )
         else:
-            self.pool_data = [p for p in self.pool_data if p["cid"] != pool_info["cid"]]
+            self.pool_data.remove_cids([pool_info["cid"]])
 
         self.pool_data.append(pool_info)
         return pool_info
@@ -360,26 +360,10 @@ class PoolManager(BaseManager):
         if ex_name == "bancor_pol":
             key = "tkn0_address"
 
-        if ex_name == "bancor_v2":
-            return next(
-                (
-                    self.validate_pool_info(key_value, event, pool, key)
-                    for pool in self.pool_data
-                    if pool[key[0]] == key_value[0]
-                    and pool[key[1]] == key_value[1]
-                    and pool["exchange_name"] == ex_name
-                ),
-                None,
-            )
-
-        return next(
-            (
-                self.validate_pool_info(key_value, event, pool, key)
-                for pool in self.pool_data
-                if pool[key] == key_value and pool["exchange_name"] == ex_name
-            ),
-            None,
-        )
+        pool = self.pool_data.find(ex_name, key, key_value)
+        if pool is None:
+            return None
+        return self.validate_pool_info(key_value, event, pool, key)
 
     def update_pool_data(self, pool_info: Dict[str, Any], data: Dict[str, Any]) -> None:
         """
@@ -392,10 +376,10 @@ class PoolManager(BaseManager):
         data : Dict[str, Any]
             The data.
         """
-        for pool in self.pool_data:
-            if pool["cid"] == pool_info["cid"]:
-                pool.update(data)
-                break
+        pool = self.pool_data.get(pool_info["cid"])
+        if pool is not None:
+            pool.update(data)
+            self.pool_data.reindex(pool)
 
     def get_or_init_pool(self, pool_info: Dict[str, Any]) -> Pool:
         """
@@ -5,14 +5,19 @@ This is the multicaller utils module.
 (c) Copyright Bprotocol foundation 2023.
 Licensed under MIT
 """
+from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict, Any
-from typing import List, Tuple
+from operator import itemgetter
+from typing import Dict, Any, Callable, Optional
+from typing import List, Set, Tuple
 
 import web3.exceptions
+from joblib import Parallel, delayed
+from web3 import Web3
 
 from fastlane_bot.config.multicaller import MultiCaller
 from fastlane_bot.data.abi import ERC20_ABI
+from fastlane_bot.events.exchanges.solidly_v2 import EXCHANGE_INFO as SOLIDLY_V2_EXCHANGE_INFO, FEE_FUNCTION_CALLS
 from fastlane_bot.events.pools import CarbonV1Pool
 from fastlane_bot.events.pools.base import Pool
 
@@ -119,7 +124,7 @@ def get_pools_for_exchange(exchange: str, mgr: Any) -> [Any]:
     ]
 
 
-def multicall_helper(exchange: str, rows_to_update: List, multicall_contract: Any, mgr: Any, current_block: int):
+def multicall_helper(exchange: str, rows_to_update: List, multicall_contract: Any, mgr: Any, current_block: int) -> Set[str]:
     """
     Helper function for multicall.
 
@@ -136,6 +141,38 @@ def multicall_helper(exchange: str, rows_to_update: List, multicall_contract: An
     current_block : int
         The current block.
 
+    Returns
+    -------
+    Set[str]
+        The cids of the pools whose state changed.
+
+    """
+    result_list = get_multicall_results(exchange, rows_to_update, multicall_contract, mgr, current_block)
+    return process_results_for_multicall(exchange, rows_to_update, result_list, mgr)
+
+
+def get_multicall_results(exchange: str, rows_to_update: List, multicall_contract: Any, mgr: Any, current_block: int) -> List[Any]:
+    """
+    Run the multicall for the given rows of an exchange, without updating the pools.
+
+    Parameters
+    ----------
+    exchange : str
+        Name of the exchange.
+    rows_to_update : List
+        List of rows to update.
+    multicall_contract : Any
+        The multicall contract.
+    mgr : Any
+        Manager object containing configuration and pool data.
+    current_block : int
+        The current block.
+
+    Returns
+    -------
+    List[Any]
+        The results, in the order of `rows_to_update`.
+
     """
     multicaller = MultiCaller(contract=multicall_contract, block_identifier=current_block, web3=mgr.web3, multicall_address=mgr.cfg.MULTICALL_CONTRACT_ADDRESS)
     with multicaller as mc:
@@ -145,7 +182,14 @@ def multicall_helper(exchange: str, rows_to_update: List, multicall_contract: An
             # Function to be defined elsewhere based on what each exchange type needs
             multicall_fn(exchange, mc, mgr, multicall_contract, pool_info)
         result_list = mc.multicall()
-    process_results_for_multicall(exchange, rows_to_update, result_list, mgr)
+
+    if multicaller.batch_latencies:
+        latencies = [latency for _, latency in multicaller.batch_latencies]
+        mgr.cfg.logger.debug(
+            f"[events.multicall_utils] {exchange}: {len(rows_to_update)} pools in {len(latencies)} batches, "
+            f"slowest batch {max(latencies):.2f}s, total batch time {sum(latencies):.2f}s"
+        )
+    return result_list
 
 
 def multicall_fn(exchange: str, mc: Any, mgr: Any, multicall_contract: Any, pool_info: Dict[str, Any]) -> None:
@@ -180,10 +224,13 @@ def multicall_fn(exchange: str, mc: Any, mgr: Any, multicall_contract: Any, pool
         raise ValueError(f"Exchange {exchange} not supported.")
 
 
-def process_results_for_multicall(exchange: str, rows_to_update: List, result_list: List, mgr: Any) -> None:
+def process_results_for_multicall(exchange: str, rows_to_update: List, result_list: List, mgr: Any) -> Set[str]:
     """
     Process the results for multicall.
 
+    Only the pools whose multicall results differ from the stored state are updated, so that the
+    unchanged pools are not marked dirty in `mgr.pool_data` and their curves are not rebuilt.
+
     Parameters
     ----------
     exchange : str
@@ -195,15 +242,44 @@ def process_results_for_multicall(exchange: str, rows_to_update: List, result_li
     mgr : Any
         Manager object containing configuration and pool data.
 
+    Returns
+    -------
+    Set[str]
+        The cids of the pools whose state changed.
 
     """
+    changed_cids = set()
     for row, result in zip(rows_to_update, result_list):
         pool_info = mgr.pool_data[row]
         params = extract_params_for_multicall(exchange, result, pool_info, mgr)
         pool = mgr.get_or_init_pool(pool_info)
+        if not multicall_params_changed(params, pool_info):
+            continue
         pool, pool_info = update_pool_for_multicall(params, pool_info, pool)
         mgr.pool_data[row] = pool_info
         update_mgr_exchanges_for_multicall(mgr, exchange, pool, pool_info)
+        changed_cids.add(pool_info["cid"])
+    return changed_cids
+
+
+def multicall_params_changed(params: Dict[str, Any], pool_info: Dict[str, Any]) -> bool:
+    """
+    Check whether the params extracted from a multicall result differ from the stored pool info.
+
+    Parameters
+    ----------
+    params : Dict
+        The parameters.
+    pool_info : Dict
+        The pool info.
+
+    Returns
+    -------
+    bool
+        True if any of the params is missing from the pool info or has a different value.
+
+    """
+    return any(key not in pool_info or pool_info[key] != value for key, value in params.items())
 
 
 def extract_params_for_multicall(exchange: str, result: Any, pool_info: Dict, mgr: Any) -> Dict[str, Any]:
@@ -355,9 +431,7 @@ def update_mgr_exchanges_for_multicall(mgr: Any, exchange: str, pool: Any, pool_
         unique_key = "tkn0_address"
 
     unique_key_value = pool_info[unique_key]
-    exchange_pool_idx = [idx for idx in range(len(mgr.exchanges[exchange].pools)) if
-                         mgr.exchanges[exchange].pools[unique_key_value].state[unique_key] == pool_info[unique_key]][0]
-    mgr.exchanges[exchange].pools[exchange_pool_idx] = pool
+    mgr.exchanges[exchange].pools[unique_key_value] = pool
 
 
 def get_multicall_contract_for_exchange(mgr: Any, exchange: str) -> str:
@@ -389,7 +463,7 @@ def get_multicall_contract_for_exchange(mgr: Any, exchange: str) -> str:
         raise ValueError(f"Exchange {exchange} not supported.")
 
 
-def multicall_every_iteration(current_block: int, mgr: Any):
+def multicall_every_iteration(current_block: int, mgr: Any) -> Set[str]:
     """
     For each exchange that supports Multicall, use multicall to update the state of the pools on every search iteration.
 
@@ -400,6 +474,11 @@ def multicall_every_iteration(current_block: int, mgr: Any):
     mgr : Any
         Manager object containing configuration and pool data.
 
+    Returns
+    -------
+    Set[str]
+        The cids of the pools whose state changed.
+
     """
     multicallable_exchanges = [exchange for exchange in mgr.cfg.MULTICALLABLE_EXCHANGES if exchange in mgr.exchanges]
     multicallable_pool_rows = [
@@ -408,7 +487,475 @@ def multicall_every_iteration(current_block: int, mgr: Any):
         if ex_name in mgr.exchanges
     ]
 
+    # Run the multicalls of all exchanges concurrently, then update the pools one exchange at a time
+    results = Parallel(n_jobs=max(len(multicallable_exchanges), 1), backend="threading")(
+        delayed(get_multicall_results)(
+            exchange,
+            multicallable_pool_rows[idx],
+            get_multicall_contract_for_exchange(mgr, exchange),
+            mgr,
+            current_block,
+        )
+        for idx, exchange in enumerate(multicallable_exchanges)
+    )
+
+    changed_cids = set()
     for idx, exchange in enumerate(multicallable_exchanges):
-        multicall_contract = get_multicall_contract_for_exchange(mgr, exchange)
-        rows_to_update = multicallable_pool_rows[idx]
-        multicall_helper(exchange, rows_to_update, multicall_contract, mgr, current_block)
+        changed_cids |= process_results_for_multicall(exchange, multicallable_pool_rows[idx], results[idx], mgr)
+
+    mgr.cfg.logger.debug(
+        f"[events.multicall_utils] {len(changed_cids)} of {sum(len(rows) for rows in multicallable_pool_rows)} "
+        f"multicalled pools changed at block {current_block}"
+    )
+    return changed_cids
+
+
+def get_pool_state_calls(mgr: Any, pool_info: Dict[str, Any]) -> List[Any]:
+    """
+    Get the contract function calls which read the state of a pool.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    pool_info : Dict
+        The pool info.
+
+    Returns
+    -------
+    List[Any]
+        The contract function calls, whose results are parsed by `extract_pool_state`.
+
+    """
+    exchange = pool_info["exchange_name"]
+    contract = mgr.get_pool_contract(pool_info)
+    if exchange in mgr.cfg.CARBON_V1_FORKS:
+        return [contract.functions.strategy(int(pool_info["strategy_id"]))]
+    elif exchange in mgr.cfg.UNI_V3_FORKS:
+        return [contract.functions.slot0(), contract.functions.liquidity()]
+    elif exchange == mgr.cfg.BALANCER_NAME:
+        return [contract.functions.getPoolTokens(pool_info["anchor"])]
+    elif exchange == mgr.cfg.BANCOR_V3_NAME:
+        return [contract.functions.tradingLiquidity(pool_info["tkn1_address"])]
+    elif exchange == mgr.cfg.BANCOR_V2_NAME:
+        return [contract.functions.reserveBalances()]
+    elif exchange == mgr.cfg.BANCOR_POL_NAME:
+        tkn0_address = pool_info["tkn0_address"]
+        if mgr.cfg.ARB_CONTRACT_VERSION >= 10:
+            balance_call = contract.functions.amountAvailableForTrading(tkn0_address)
+        else:
+            balance_call = mgr.web3.eth.contract(address=tkn0_address, abi=ERC20_ABI).functions.balanceOf(contract.address)
+        return [contract.functions.tokenPrice(tkn0_address), balance_call]
+    else:
+        # Uniswap V2 and Solidly V2 forks
+        return [contract.functions.getReserves()]
+
+
+def extract_pool_state(mgr: Any, pool_info: Dict[str, Any], results: List[Tuple]) -> Dict[str, Any]:
+    """
+    Extract the state of a pool from the results of its `get_pool_state_calls`.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    pool_info : Dict
+        The pool info.
+    results : List[Tuple]
+        The decoded outputs of the calls.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The state, with the same keys as the pool info.
+
+    """
+    exchange = pool_info["exchange_name"]
+    if exchange in mgr.cfg.CARBON_V1_FORKS:
+        (strategy,) = results[0]
+        fake_event = {
+            "args": {
+                "id": strategy[0],
+                "order0": list(strategy[3][0]),
+                "order1": list(strategy[3][1]),
+            }
+        }
+        params = CarbonV1Pool.parse_event({}, fake_event, "None")
+        del params["strategy_id"]
+        return params
+    elif exchange in mgr.cfg.UNI_V3_FORKS:
+        slot0, (liquidity,) = results
+        return {"sqrt_price_q96": slot0[0], "tick": slot0[1], "liquidity": liquidity}
+    elif exchange == mgr.cfg.BALANCER_NAME:
+        pool_balances = results[0][1]
+        return {f"tkn{idx}_balance": int(bal) for idx, bal in enumerate(pool_balances)}
+    elif exchange == mgr.cfg.BANCOR_V3_NAME:
+        (pool_balances,) = results[0]
+        return {"tkn0_balance": pool_balances[0], "tkn1_balance": pool_balances[1]}
+    elif exchange == mgr.cfg.BANCOR_POL_NAME:
+        ((p0, p1),), (tkn_balance,) = results
+        params = _extract_pol_params_for_multicall((p0, p1, tkn_balance), pool_info, mgr)
+        return {key: params[key] for key in ["y_0", "z_0", "B_0"]}
+    else:
+        return {"tkn0_balance": results[0][0], "tkn1_balance": results[0][1]}
+
+
+def get_pool_state_diffs(
+    mgr: Any, pool_infos: List[Dict[str, Any]], block_identifier: Any = "latest"
+) -> Tuple[int, Dict[str, Dict[str, Tuple[Any, Any]]]]:
+    """
+    Read the on-chain state of the given pools and compare it with their state in `mgr.pool_data`.
+
+    The state reads of all pools are sent in a single multicall, so all of them see the same block and
+    the check costs one round trip, irrespective of the number of pools.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    pool_infos : List[Dict[str, Any]]
+        The pool infos, as stored in `mgr.pool_data`.
+    block_identifier : Any
+        The block at which the state is read.
+
+    Returns
+    -------
+    Tuple[int, Dict[str, Dict[str, Tuple[Any, Any]]]]
+        The number of the block at which the state was read, and for each pool cid the `(stored, on-chain)`
+        values of the keys which differ (an empty dict if the pool is up to date).
+
+    """
+    pool_calls = [get_pool_state_calls(mgr, pool_info) for pool_info in pool_infos]
+    multicaller = MultiCaller(contract=None, block_identifier=block_identifier, web3=mgr.web3, multicall_address=mgr.cfg.MULTICALL_CONTRACT_ADDRESS)
+    block_number, results = multicaller.aggregate_calls([call for calls in pool_calls for call in calls])
+
+    diffs = {}
+    offset = 0
+    for pool_info, calls in zip(pool_infos, pool_calls):
+        state = extract_pool_state(mgr, pool_info, results[offset:offset + len(calls)])
+        offset += len(calls)
+        diffs[pool_info["cid"]] = {
+            key: (pool_info.get(key), value)
+            for key, value in state.items()
+            if pool_info.get(key) != value
+        }
+    return block_number, diffs
+
+
+def get_pool_states(
+    mgr: Any, pool_infos: List[Dict[str, Any]], block_identifier: Any, batch_size: int = None, max_workers: int = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Read the on-chain state of many pools at a fixed block.
+
+    Unlike `get_pool_state_diffs`, the state reads are sent in tolerant `aggregate` batches (see
+    `MultiCaller.try_aggregate_calls`), so any number of pools can be read with a bounded number of
+    concurrent requests, and a pool whose state cannot be read does not fail the others. All batches
+    are pinned to `block_identifier`, so the states are consistent with each other.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    pool_infos : List[Dict[str, Any]]
+        The pool infos, as stored in `mgr.pool_data`.
+    block_identifier : Any
+        The block at which the state is read (a block number, for the states to be consistent).
+    batch_size : int, optional
+        The maximum number of calls per `aggregate` call (by default `MultiCaller.BATCH_SIZE`).
+    max_workers : int, optional
+        The maximum number of concurrent `aggregate` calls (by default `MultiCaller.MAX_WORKERS`).
+
+    Returns
+    -------
+    List[Optional[Dict[str, Any]]]
+        The state of each pool (see `extract_pool_state`), or None if any of its calls failed, in order.
+
+    """
+    pool_calls = [get_pool_state_calls(mgr, pool_info) for pool_info in pool_infos]
+    multicaller = MultiCaller(
+        contract=None, block_identifier=block_identifier, web3=mgr.web3, multicall_address=mgr.cfg.MULTICALL_CONTRACT_ADDRESS,
+        batch_size=batch_size, max_workers=max_workers,
+    )
+    results = multicaller.try_aggregate_calls([call for calls in pool_calls for call in calls])
+
+    states = []
+    offset = 0
+    for pool_info, calls in zip(pool_infos, pool_calls):
+        outputs = results[offset:offset + len(calls)]
+        offset += len(calls)
+        states.append(None if any(output is None for output in outputs) else extract_pool_state(mgr, pool_info, outputs))
+
+    if multicaller.batch_latencies:
+        latencies = [latency for _, latency in multicaller.batch_latencies]
+        mgr.cfg.logger.debug(
+            f"[events.multicall_utils] read the state of {len(pool_infos)} pools at block {block_identifier} in "
+            f"{len(latencies)} batches, slowest batch {max(latencies):.2f}s, total batch time {sum(latencies):.2f}s"
+        )
+    return states
+
+
+def apply_pool_state_diffs(mgr: Any, diffs: Dict[str, Dict[str, Tuple[Any, Any]]], block_number: int) -> Set[str]:
+    """
+    Update the stale pools in `mgr.pool_data` (and the pool objects) with the on-chain values of a diff.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    diffs : Dict[str, Dict[str, Tuple[Any, Any]]]
+        The diffs returned by `get_pool_state_diffs`.
+    block_number : int
+        The number of the block at which the state was read.
+
+    Returns
+    -------
+    Set[str]
+        The cids of the pools which were updated.
+
+    """
+    updated_cids = set()
+    for cid, diff in diffs.items():
+        pool_info = mgr.pool_data.get(cid)
+        if not diff or pool_info is None:
+            continue
+        params = {key: new for key, (_, new) in diff.items()}
+        pool, pool_info = update_pool_for_multicall(params, pool_info, mgr.get_or_init_pool(pool_info))
+        pool_info["last_updated_block"] = block_number
+        mgr.pool_data.replace(pool_info, pool_info)
+        update_mgr_exchanges_for_multicall(mgr, pool_info["exchange_name"], pool, pool_info)
+        updated_cids.add(cid)
+    return updated_cids
+
+
+@dataclass
+class PendingRead:
+    """
+    A value which is read on chain by `resolve_reads`.
+
+    Attributes
+    ----------
+    call : Any
+        The contract function call, e.g. `contract.functions.token0()`.
+    then : Callable[[Tuple], Any]
+        Maps the decoded output of the call to the value, or to a further `PendingRead` if the value
+        depends on the output (by default, the first output of the call).
+    """
+
+    call: Any
+    then: Callable[[Tuple], Any] = itemgetter(0)
+
+
+def resolve_reads(mgr: Any, reads: List[Dict[str, Any]], block_identifier: Any = "latest") -> List[Dict[str, Any]]:
+    """
+    Resolve the `PendingRead` values of a list of dicts.
+
+    The reads of all dicts are sent together in tolerant multicalls (see `MultiCaller.try_aggregate_calls`),
+    one round per level of dependent reads, and a read whose call fails resolves to None.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    reads : List[Dict[str, Any]]
+        The dicts, whose values are either known or a `PendingRead`.
+    block_identifier : Any
+        The block at which the values are read.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        Copies of the dicts, with the resolved values.
+
+    """
+    values = [dict(read) for read in reads]
+    multicaller = MultiCaller(contract=None, block_identifier=block_identifier, web3=mgr.web3, multicall_address=mgr.cfg.MULTICALL_CONTRACT_ADDRESS)
+    pending = [(idx, key) for idx, read in enumerate(values) for key, value in read.items() if isinstance(value, PendingRead)]
+    while pending:
+        results = multicaller.try_aggregate_calls([values[idx][key].call for idx, key in pending])
+        for (idx, key), output in zip(pending, results):
+            values[idx][key] = None if output is None else values[idx][key].then(output)
+        pending = [(idx, key) for idx, key in pending if isinstance(values[idx][key], PendingRead)]
+    return values
+
+
+def to_checksum_address(output: Tuple) -> str:
+    """
+    Convert the first output of a call, a lowercase address as decoded by `eth_abi`, to a checksum address.
+
+    Parameters
+    ----------
+    output : Tuple
+        The decoded output.
+
+    Returns
+    -------
+    str
+        The checksum address.
+
+    """
+    return Web3.to_checksum_address(output[0])
+
+
+def get_token_and_fee_reads(mgr: Any, exchange: Any, event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the reads which resolve the tokens and fee of a new pool (see `resolve_reads`).
+
+    Unlike the `get_tkn0`, `get_tkn1` and `get_fee` methods of the exchanges, which make one RPC per value,
+    the values which are not known from the event or the exchange are returned as a `PendingRead`, so that
+    the reads of all new pools can be batched.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    exchange : Exchange
+        The exchange of the pool.
+    event : Dict[str, Any]
+        The event which revealed the pool.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The `exchange_name`, `address`, `tkn0_address`, `tkn1_address`, `fee` (as a `(fee, fee_float)` tuple),
+        `strategy_id` and `anchor` of the pool, and the `connector_token` of Bancor V2 pools (see
+        `extract_token_and_fee`).
+
+    """
+    address = event["address"]
+    contract = mgr.web3.eth.contract(address=address, abi=exchange.get_abi())
+    reads = {
+        "exchange_name": exchange.exchange_name,
+        "address": address,
+        "strategy_id": str(event["args"]["id"]) if exchange.is_carbon_v1_fork else 0,
+        "anchor": None,
+    }
+    if exchange.is_carbon_v1_fork:
+        reads["tkn0_address"] = event["args"]["token0"]
+        reads["tkn1_address"] = event["args"]["token1"]
+        reads["fee"] = PendingRead(contract.functions.tradingFeePPM(), lambda output: (f"{output[0]}", output[0] / 1e6))
+    elif exchange.base_exchange_name == "uniswap_v2":
+        reads["tkn0_address"] = PendingRead(contract.functions.token0(), to_checksum_address)
+        reads["tkn1_address"] = PendingRead(contract.functions.token1(), to_checksum_address)
+        reads["fee"] = (exchange.fee, exchange.fee_float)
+    elif exchange.base_exchange_name == "uniswap_v3":
+        reads["tkn0_address"] = PendingRead(contract.functions.token0(), to_checksum_address)
+        reads["tkn1_address"] = PendingRead(contract.functions.token1(), to_checksum_address)
+        reads["fee"] = PendingRead(contract.functions.fee(), lambda output: (output[0], float(output[0]) / 1e6))
+    elif exchange.base_exchange_name == "solidly_v2":
+        reads["tkn0_address"] = PendingRead(contract.functions.token0(), to_checksum_address)
+        reads["tkn1_address"] = PendingRead(contract.functions.token1(), to_checksum_address)
+        reads["fee"] = _get_solidly_v2_fee_read(mgr, exchange, contract)
+    elif exchange.exchange_name == mgr.cfg.BANCOR_V2_NAME:
+        reads["tkn0_address"] = event["args"]["_token1"]
+        reads["tkn1_address"] = event["args"]["_token2"]
+        pool = exchange.get_pool(address)
+        if pool:
+            reads["fee"] = (pool.state["fee"], pool.state["fee_float"])
+        else:
+            reads["fee"] = PendingRead(contract.functions.conversionFee(), lambda output: (output[0], float(output[0]) / 1e6))
+        reads["anchor"] = PendingRead(contract.functions.anchor(), to_checksum_address)
+        reads["connector_token"] = PendingRead(
+            contract.functions.connectorTokens(0),
+            lambda output: to_checksum_address(output) if to_checksum_address(output) != mgr.cfg.BNT_ADDRESS
+            else PendingRead(contract.functions.connectorTokens(1), to_checksum_address)
+        )
+    elif exchange.exchange_name == mgr.cfg.BANCOR_V3_NAME:
+        reads["tkn0_address"] = exchange.BNT_ADDRESS
+        reads["tkn1_address"] = event["args"]["pool"] if event["args"]["pool"] != exchange.BNT_ADDRESS else event["args"]["tkn_address"]
+        reads["fee"] = ("0.000", 0.000)
+    elif exchange.exchange_name == mgr.cfg.BANCOR_POL_NAME:
+        reads["tkn0_address"] = event["args"]["token"]
+        reads["tkn1_address"] = exchange.ETH_ADDRESS if event["args"]["token"] not in exchange.ETH_ADDRESS else exchange.BNT_ADDRESS
+        reads["fee"] = ("0.000", 0.000)
+    else:
+        raise ValueError(f"Exchange {exchange.exchange_name} not supported.")
+    return reads
+
+
+def extract_token_and_fee(mgr: Any, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Complete the resolved tokens and fee of a new pool (see `get_token_and_fee_reads`).
+
+    The BNT side of a Bancor V2 pool is replaced by its other connector token.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    values : Dict[str, Any]
+        The resolved reads of the pool.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The tokens and fee of the pool.
+
+    """
+    values = dict(values)
+    connector_token = values.pop("connector_token", None)
+    if values["exchange_name"] == mgr.cfg.BANCOR_V2_NAME:
+        if values["tkn0_address"] == mgr.cfg.BNT_ADDRESS:
+            values["tkn1_address"] = connector_token
+        elif values["tkn1_address"] == mgr.cfg.BNT_ADDRESS:
+            values["tkn0_address"] = connector_token
+    return values
+
+
+def _get_solidly_v2_fee_read(mgr: Any, exchange: Any, contract: Any) -> PendingRead:
+    """
+    Get the read of the fee of a Solidly V2 pool, which may depend on the `stable` flag of the pool.
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    exchange : Exchange
+        The Solidly V2 exchange.
+    contract : Contract
+        The pool contract.
+
+    Returns
+    -------
+    PendingRead
+        The read of the fee, as a `(fee, fee_float)` tuple.
+
+    """
+    exchange_info = SOLIDLY_V2_EXCHANGE_INFO[exchange.exchange_name]
+    fn_name, takes_stable = FEE_FUNCTION_CALLS[exchange_info["fee_function"]]
+    factory_function = getattr(
+        mgr.web3.eth.contract(address=exchange.factory_contract.address, abi=exchange_info["factory_abi"]).functions, fn_name
+    )
+
+    def to_fee(output: Tuple) -> Tuple[str, float]:
+        fee_float = float(output[0]) / 10 ** exchange_info["decimals"]
+        return str(fee_float), fee_float
+
+    if not takes_stable:
+        return PendingRead(factory_function(contract.address), to_fee)
+    return PendingRead(contract.functions.stable(), lambda output: PendingRead(factory_function(contract.address, output[0]), to_fee))
+
+
+def get_token_metadata_reads(mgr: Any, address: str) -> Dict[str, Any]:
+    """
+    Get the reads which resolve the decimals and symbol of a token (see `resolve_reads`).
+
+    Parameters
+    ----------
+    mgr : Any
+        Manager object containing configuration and pool data.
+    address : str
+        The checksum address of the token.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The `address`, `decimals` and `symbol` of the token.
+
+    """
+    contract = mgr.web3.eth.contract(address=address, abi=ERC20_ABI)
+    return {
+        "address": address,
+        "decimals": PendingRead(contract.functions.decimals()),
+        "symbol": PendingRead(contract.functions.symbol()),
+    }
@@ -0,0 +1,164 @@
+# coding=utf-8
+"""
+Contains the pool state snapshots which connect the two stages of the pipelined main loop.
+
+In pipelined mode, a background ingestion worker maintains the pool data of the manager (events, contract
+updates, multicalls, disk writes) and publishes a snapshot of it after every block, while the search stage
+builds a bot from the latest snapshot. A snapshot which is superseded before the search stage takes it is
+skipped, so the search always works on the newest state. The search stage never writes the pool data of the
+manager: the stale pools it finds when validating an opportunity are reported back through the channel, and the
+ingestion worker updates them before it ingests the next block.
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+import threading
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from fastlane_bot.events.pool_store import PoolStateSnapshot
+
+PoolStateDiffs = Dict[str, Dict[str, Tuple[Any, Any]]]
+
+
+@dataclass(frozen=True)
+class PoolSnapshot:
+    """
+    The pool data of the manager at the end of the ingestion of a block.
+
+    Attributes
+    ----------
+    block_number : int
+        The block up to which the events were applied.
+    pool_data : PoolStateSnapshot
+        The (immutable) version of the pool data of the block.
+    dirty_cids : FrozenSet[str]
+        The cids of the pools which changed since the previous snapshot taken by the search stage.
+    """
+
+    block_number: int
+    pool_data: PoolStateSnapshot
+    dirty_cids: FrozenSet[str]
+
+
+def take_snapshot(mgr: Any, block_number: int) -> PoolSnapshot:
+    """
+    Takes a snapshot of the pool data of the manager, and resets its changed pools.
+
+    Parameters
+    ----------
+    mgr : Any
+        The manager object.
+    block_number : int
+        The block up to which the events were applied.
+
+    Returns
+    -------
+    PoolSnapshot
+        The snapshot.
+    """
+    return PoolSnapshot(block_number, mgr.pool_data.snapshot(), frozenset(mgr.pool_data.pop_dirty_cids()))
+
+
+@dataclass
+class SnapshotChannel:
+    """
+    Hands the latest snapshot from the ingestion stage to the search stage.
+
+    The channel holds at most one snapshot: publishing a new snapshot replaces one which was not taken yet
+    (its changed pools are carried over to the new snapshot, so the curve cache of the search stage stays
+    complete). In the other direction, it queues the on-chain state of the stale pools found by the search stage,
+    until the ingestion stage applies it.
+
+    Attributes
+    ----------
+    published : int
+        The number of published snapshots.
+    skipped : int
+        The number of snapshots which were replaced before being taken.
+    closed : bool
+        Whether the ingestion stage has stopped.
+    """
+
+    __VERSION__ = "1.1"
+    __DATE__ = "2024-03-28"
+
+    published: int = 0
+    skipped: int = 0
+    closed: bool = False
+    _snapshot: Optional[PoolSnapshot] = field(default=None, repr=False)
+    _stale: List[Tuple[int, PoolStateDiffs]] = field(default_factory=list, repr=False)
+    _condition: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    def publish(self, snapshot: PoolSnapshot) -> None:
+        """
+        Publishes a snapshot, replacing the previous one if it was not taken yet.
+
+        Parameters
+        ----------
+        snapshot : PoolSnapshot
+            The snapshot.
+        """
+        with self._condition:
+            if self._snapshot is not None:
+                snapshot = replace(snapshot, dirty_cids=self._snapshot.dirty_cids | snapshot.dirty_cids)
+                self.skipped += 1
+            self._snapshot = snapshot
+            self.published += 1
+            self._condition.notify_all()
+
+    def take(self, timeout: float = None) -> Optional[PoolSnapshot]:
+        """
+        Waits for a snapshot which was not taken yet, and takes it.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            The maximum time (in seconds) to wait, by default None (no limit).
+
+        Returns
+        -------
+        Optional[PoolSnapshot]
+            The latest snapshot, or None if the channel was closed (or the timeout was hit) without a new one.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._snapshot is not None or self.closed, timeout)
+            snapshot, self._snapshot = self._snapshot, None
+            return snapshot
+
+    def report_stale(self, block_number: int, diffs: PoolStateDiffs) -> None:
+        """
+        Reports the pools found stale by the search stage, to be updated by the ingestion stage.
+
+        Parameters
+        ----------
+        block_number : int
+            The number of the block at which the on-chain state was read.
+        diffs : PoolStateDiffs
+            The diffs returned by `multicall_utils.get_pool_state_diffs` (the pools which are up to date are ignored).
+        """
+        diffs = {cid: diff for cid, diff in diffs.items() if diff}
+        if diffs:
+            with self._condition:
+                self._stale.append((block_number, diffs))
+
+    def pop_stale(self) -> List[Tuple[int, PoolStateDiffs]]:
+        """
+        Takes the stale pools reported since the last call.
+
+        Returns
+        -------
+        List[Tuple[int, PoolStateDiffs]]
+            The block number and the diffs of each report, in the order they were reported.
+        """
+        with self._condition:
+            stale, self._stale = self._stale, []
+            return stale
+
+    def close(self) -> None:
+        """
+        Closes the channel, which makes `take` return None once the last snapshot has been taken.
+        """
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
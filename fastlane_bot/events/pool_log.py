@@ -0,0 +1,248 @@
+# coding=utf-8
+"""
+Contains the append-only, block-stamped binary store of the pool data written by the main loop.
+
+The store is made of segments. Each segment starts with a compacted snapshot of all pools at a block
+(`pool_data_<block>.arrow`, an Arrow IPC file with one column per pool key) followed by a log of the pools
+which changed in each later block (`pool_data_<block>.log`, length-prefixed Arrow IPC streams, one per block).
+Only the changed pools are written per block, and a new segment is started every `compact_every` blocks with
+changes, so that loading the pool data at any block only needs one snapshot and a bounded number of log frames.
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+import os
+import pickle
+import re
+import struct
+from dataclasses import dataclass, field
+from glob import glob
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+
+from fastlane_bot.events.pool_store import PoolDiff, PoolInfo, PoolStateSnapshot
+
+CID_COLUMN = "__cid__"
+REMOVED_COLUMN = "__removed__"
+FRAME_HEADER = struct.Struct("<Q")
+INT64_BOUNDS = (-2 ** 63, 2 ** 63 - 1)
+
+
+def _encode_column(values: List[Any]) -> Tuple[pa.Array, str]:
+    """
+    Converts the values of a pool key (None where missing) to an Arrow array and the kind needed to decode it.
+
+    Ints beyond int64 (e.g. uint256 reserves) are stored as decimal strings, and columns with mixed types
+    are stored pickled, so that every value is restored with its original type.
+    """
+    types = {type(value) for value in values if value is not None}
+    if types == {bool}:
+        return pa.array(values, type=pa.bool_()), "bool"
+    if types == {int}:
+        if all(INT64_BOUNDS[0] <= value <= INT64_BOUNDS[1] for value in values if value is not None):
+            return pa.array(values, type=pa.int64()), "int"
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string()), "bigint"
+    if types == {float}:
+        return pa.array(values, type=pa.float64(), from_pandas=False), "float"
+    if types <= {str}:
+        return pa.array(values, type=pa.string()), "str"
+    return pa.array([None if value is None else pickle.dumps(value) for value in values], type=pa.binary()), "pickle"
+
+
+def _decode_column(column: pa.ChunkedArray, kind: str) -> List[Any]:
+    values = column.to_pylist()
+    if kind == "bigint":
+        return [None if value is None else int(value) for value in values]
+    if kind == "pickle":
+        return [None if value is None else pickle.loads(value) for value in values]
+    return values
+
+
+def _encode_table(pools: Dict[str, Optional[PoolInfo]], block_number: int) -> pa.Table:
+    """
+    Converts pools by cid (None for a removed pool) to a table with one column per pool key.
+    """
+    cids = list(pools)
+    records = [pools[cid] or {} for cid in cids]
+    keys = list(dict.fromkeys(key for record in records for key in record))
+    arrays = [pa.array(cids, type=pa.string()), pa.array([pools[cid] is None for cid in cids], type=pa.bool_())]
+    fields = [pa.field(CID_COLUMN, pa.string()), pa.field(REMOVED_COLUMN, pa.bool_())]
+    for key in keys:
+        array, kind = _encode_column([record.get(key) for record in records])
+        arrays.append(array)
+        fields.append(pa.field(key, array.type, metadata={"kind": kind}))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields, metadata={"block": str(block_number)}))
+
+
+def _decode_table(table: pa.Table) -> Iterator[Tuple[str, Optional[PoolInfo]]]:
+    """
+    Converts a table back to (cid, pool) pairs, the pool being None if it was removed.
+    """
+    columns = {
+        name: _decode_column(table.column(name), table.schema.field(name).metadata[b"kind"].decode())
+        for name in table.column_names
+        if name not in (CID_COLUMN, REMOVED_COLUMN)
+    }
+    removed = table.column(REMOVED_COLUMN).to_pylist()
+    for i, cid in enumerate(table.column(CID_COLUMN).to_pylist()):
+        if removed[i]:
+            yield cid, None
+        else:
+            yield cid, {key: values[i] for key, values in columns.items() if values[i] is not None}
+
+
+def _table_block(table: pa.Table) -> int:
+    return int(table.schema.metadata[b"block"])
+
+
+def _segment_blocks(path: str) -> List[int]:
+    """
+    The blocks of the snapshots (i.e. of the segments) in the store, in ascending order.
+    """
+    pattern = re.compile(r"pool_data_(\d+)\.arrow$")
+    return sorted(int(match.group(1)) for file in glob(os.path.join(path, "pool_data_*.arrow")) if (match := pattern.search(file)))
+
+
+def _read_frames(log_path: str) -> Iterator[pa.Table]:
+    if not os.path.isfile(log_path):
+        return
+    with open(log_path, "rb") as f:
+        while header := f.read(FRAME_HEADER.size):
+            if len(header) < FRAME_HEADER.size:
+                return
+            (size,) = FRAME_HEADER.unpack(header)
+            frame = f.read(size)
+            if len(frame) < size:
+                # the last frame was not completely written (e.g. the bot was stopped), skip it
+                return
+            yield pa.ipc.open_stream(frame).read_all()
+
+
+def load_pool_data(path: str, block_number: int = None) -> Tuple[int, List[PoolInfo]]:
+    """
+    Loads the pool data from the store, as it was at a given block.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the store.
+    block_number : int, optional
+        The block at which to read the pool data, by default None (the latest block in the store).
+
+    Returns
+    -------
+    Tuple[int, List[Dict[str, Any]]]
+        The last block written at or before `block_number`, and the pool data at that block.
+    """
+    segments = [block for block in _segment_blocks(path) if block_number is None or block <= block_number]
+    if not segments:
+        raise FileNotFoundError(f"No pool data at or before block {block_number} in {path}")
+
+    segment = segments[-1]
+    with pa.memory_map(os.path.join(path, f"pool_data_{segment}.arrow")) as source:
+        pools = dict(_decode_table(pa.ipc.open_file(source).read_all()))
+    last_block = segment
+    for frame in _read_frames(os.path.join(path, f"pool_data_{segment}.log")):
+        if block_number is not None and _table_block(frame) > block_number:
+            break
+        for cid, pool in _decode_table(frame):
+            if pool is None:
+                pools.pop(cid, None)
+            else:
+                pools[cid] = pool
+        last_block = _table_block(frame)
+    return last_block, list(pools.values())
+
+
+@dataclass
+class PoolDataLog:
+    """
+    Writes the pool data of each block to the store, as a log of the changed pools.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the store.
+    compact_every : int
+        The number of log frames (blocks with changes) after which a new compacted snapshot is written.
+    keep_history : bool
+        Whether to keep the superseded segments (so that the pool data can be read at any past block).
+    """
+
+    __VERSION__ = "1.1"
+    __DATE__ = "2024-03-28"
+
+    path: str
+    compact_every: int = 1000
+    keep_history: bool = True
+    segment: Optional[int] = None
+    frames: int = 0
+    _previous: Optional[PoolStateSnapshot] = field(default=None, repr=False)
+
+    def write(self, pool_data: PoolStateSnapshot, block_number: int) -> int:
+        """
+        Writes the pools which changed since the previous call (all pools on the first call, or on compaction).
+
+        Parameters
+        ----------
+        pool_data : PoolStateSnapshot
+            The pool data at the block.
+        block_number : int
+            The block number.
+
+        Returns
+        -------
+        int
+            The number of pools written.
+        """
+        if self._previous is None or self.frames >= self.compact_every:
+            self._write_snapshot(pool_data, block_number)
+            self._previous = pool_data
+            return len(pool_data)
+
+        # The baseline only moves once the frame is written, so the changes of a failed write are in the next frame
+        diff = pool_data.diff(self._previous)
+        if diff:
+            self._append_frame({cid: new for cid, (old, new) in diff.items()}, block_number)
+        self._previous = pool_data
+        return len(diff)
+
+    def _write_snapshot(self, pool_data: Iterable[PoolInfo], block_number: int):
+        os.makedirs(self.path, exist_ok=True)
+        table = _encode_table({pool["cid"]: pool for pool in pool_data}, block_number)
+        snapshot_path = os.path.join(self.path, f"pool_data_{block_number}.arrow")
+        with pa.OSFile(f"{snapshot_path}.tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(f"{snapshot_path}.tmp", snapshot_path)
+
+        # A new segment starts with an empty log (a log left over from an earlier run at the same block is stale)
+        log_path = os.path.join(self.path, f"pool_data_{block_number}.log")
+        if os.path.isfile(log_path):
+            os.remove(log_path)
+        if not self.keep_history:
+            for segment in _segment_blocks(self.path):
+                if segment != block_number:
+                    for suffix in ["arrow", "log"]:
+                        if os.path.isfile(file := os.path.join(self.path, f"pool_data_{segment}.{suffix}")):
+                            os.remove(file)
+        self.segment = block_number
+        self.frames = 0
+
+    def _append_frame(self, pools: Dict[str, Optional[PoolInfo]], block_number: int):
+        table = _encode_table(pools, block_number)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        frame = sink.getvalue().to_pybytes()
+        with open(os.path.join(self.path, f"pool_data_{self.segment}.log"), "ab") as f:
+            end = f.tell()
+            try:
+                f.write(FRAME_HEADER.pack(len(frame)) + frame)
+                f.flush()
+            except BaseException:
+                # drop a partially written frame, which would hide the frames appended after it
+                f.truncate(end)
+                raise
+        self.frames += 1
@@ -0,0 +1,592 @@
+# coding=utf-8
+"""
+Contains the indexed pool store used by the manager to hold the pool data, and the immutable
+snapshots (versions) of it handed to the readers.
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple, Union
+
+PoolInfo = Dict[str, Any]
+IndexKey = Union[str, Tuple[str, ...]]
+PoolDiff = Dict[str, Tuple[Optional[PoolInfo], Optional[PoolInfo]]]
+
+
+class FrozenPool(dict):
+    """
+    A read-only copy of a pool info dict, as held by a `PoolStateSnapshot`.
+
+    The same object is shared by all snapshots in which the pool did not change, so it must not be
+    modified; `copy()` (or `dict(pool)`) returns a regular, mutable dict.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("pool snapshots are read-only, copy the pool to modify it")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    update = pop = popitem = setdefault = clear = _readonly
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
+class PoolStateSnapshot(tuple):
+    """
+    An immutable version of the pool data (one read-only pool per cid, in store order).
+
+    Snapshots are created by `PoolStore.snapshot`, copy-on-write: a new version copies only the pools
+    which changed since the previous version and shares all other pools with it.
+
+    Attributes
+    ----------
+    version : int
+        The version number, which increases with each snapshot of the store.
+    changed_cids : FrozenSet[str]
+        The cids of the pools which were added, changed or removed since the previous version.
+    """
+
+    def __new__(
+        cls, pools: Dict[str, FrozenPool], version: int = 0, changed_cids: Iterable[str] = (), lineage: Any = None
+    ):
+        snapshot = super().__new__(cls, pools.values())
+        snapshot._by_cid = pools
+        snapshot.version = version
+        snapshot.changed_cids = frozenset(changed_cids)
+        snapshot._lineage = lineage
+        return snapshot
+
+    def __reduce__(self):
+        return self.__class__, (self._by_cid, self.version, self.changed_cids)
+
+    def get(self, cid: str) -> Optional[PoolInfo]:
+        """
+        Get the pool with the given cid (None if no pool has this cid).
+        """
+        return self._by_cid.get(cid)
+
+    def copy(self) -> List[PoolInfo]:
+        """
+        Get the pools as a plain list.
+        """
+        return list(self)
+
+    def diff(self, other: "PoolStateSnapshot") -> PoolDiff:
+        """
+        Get the pools which differ between another (usually older) version and this one.
+
+        Parameters
+        ----------
+        other : PoolStateSnapshot
+            The version to compare with.
+
+        Returns
+        -------
+        Dict[str, Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+            The pools (of the other version, of this version) by cid; None where the version has no pool with the cid.
+        """
+        if self._lineage is not None and other._lineage is self._lineage and other.version + 1 == self.version:
+            cids = self.changed_cids
+        else:
+            # unchanged pools are shared between the versions, so comparing by identity is enough
+            cids = {cid for cid, pool in self._by_cid.items() if other._by_cid.get(cid) is not pool}
+            cids.update(cid for cid in other._by_cid if cid not in self._by_cid)
+        return {
+            cid: (other.get(cid), self.get(cid))
+            for cid in cids
+            if other.get(cid) != self.get(cid)
+        }
+
+
+class PoolStore(list):
+    """
+    A list of pool info dicts which maintains hash indexes over the pools it holds.
+
+    The store behaves exactly like the list of dicts it replaces (indexing, iteration, `append`,
+    slicing, `pd.DataFrame(store)` etc.), but every mutation also updates the following indexes:
+
+    - by cid
+    - by (exchange_name, key, value) for every key in `INDEXED_KEYS`, which covers the address,
+      the anchor, tkn0_address (Bancor POL), tkn1_address (Bancor v3) and the Bancor v2 tuple key
+
+    so that looking up a pool is a dict access instead of a scan over all pools.
+
+    The store also records the cids of all pools which were added, replaced, reindexed or removed
+    since the last call to `pop_dirty_cids`, so that consumers (e.g. the curve cache of the bot) can
+    limit their work to the pools which actually changed.
+
+    Readers which must not see later changes (the bot, the search stage of the pipelined main loop)
+    get an immutable `PoolStateSnapshot` from `snapshot`, which only copies the pools changed since
+    the previous snapshot.
+
+    Notes
+    -----
+    The indexes are built from the values of the indexed keys at the time the pool is added. If
+    any of those values is changed in place on a pool dict that is already in the store, `reindex`
+    must be called for that pool (assigning the pool back via `store[idx] = pool` does the same).
+    """
+
+    __VERSION__ = "1.3"
+    __DATE__ = "2024-03-28"
+
+    INDEXED_KEYS: Tuple[IndexKey, ...] = (
+        "cid",
+        "address",
+        "anchor",
+        "tkn0_address",
+        "tkn1_address",
+        ("tkn0_address", "tkn1_address"),
+    )
+
+    def __init__(self, pools: Iterable[PoolInfo] = ()):
+        super().__init__(pools)
+        self._lock = threading.RLock()
+        self._dirty: Set[str] = set()
+        self._unsnapshotted: Set[str] = set()
+        self._snapshot: Optional[PoolStateSnapshot] = None
+        self._lineage = object()
+        self._rebuild_index()
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+    # ------------------------------------------------------------------------------------------------
+    # index maintenance
+    # ------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _key_value(pool: PoolInfo, key: IndexKey) -> Any:
+        """
+        Get the value of an index key for a pool (None if the key is missing).
+        """
+        if isinstance(key, tuple):
+            return tuple(pool.get(k) for k in key)
+        return pool.get(key)
+
+    def _index_entries(self, pool: PoolInfo) -> List[Tuple[str, IndexKey, Any]]:
+        """
+        Get the (exchange_name, key, value) index entries of a pool.
+        """
+        entries = []
+        exchange_name = pool.get("exchange_name")
+        for key in self.INDEXED_KEYS:
+            value = self._key_value(pool, key)
+            if value is None or (isinstance(value, tuple) and None in value):
+                continue
+            if not isinstance(value, Hashable):
+                continue
+            entries.append((exchange_name, key, value))
+        return entries
+
+    def _add_to_index(self, pool: PoolInfo):
+        pool_id = id(pool)
+        if pool_id in self._refs:
+            self._refs[pool_id] += 1
+            return
+        entries = self._index_entries(pool)
+        cid = pool.get("cid")
+        self._refs[pool_id] = 1
+        self._entries[pool_id] = (entries, cid)
+        for entry in entries:
+            self._index.setdefault(entry, []).append(pool)
+        if isinstance(cid, Hashable):
+            self._by_cid.setdefault(cid, []).append(pool)
+            self._mark_changed(cid)
+
+    def _remove_from_index(self, pool: PoolInfo):
+        pool_id = id(pool)
+        if pool_id not in self._refs:
+            return
+        self._refs[pool_id] -= 1
+        if self._refs[pool_id] > 0:
+            return
+        del self._refs[pool_id]
+        entries, cid = self._entries.pop(pool_id)
+        for entry in entries:
+            self._discard(self._index, entry, pool)
+        self._discard(self._by_cid, cid, pool)
+        if isinstance(cid, Hashable):
+            self._mark_changed(cid)
+
+    def _mark_changed(self, cid: str):
+        self._dirty.add(cid)
+        self._unsnapshotted.add(cid)
+
+    @staticmethod
+    def _discard(index: Dict[Any, List[PoolInfo]], entry: Any, pool: PoolInfo):
+        """
+        Remove a pool object (by identity) from an index bucket, dropping the bucket when empty.
+        """
+        bucket = index.get(entry) if isinstance(entry, Hashable) else None
+        if not bucket:
+            return
+        for i, p in enumerate(bucket):
+            if p is pool:
+                del bucket[i]
+                break
+        if not bucket:
+            del index[entry]
+
+    def _rebuild_index(self, mark_dirty: bool = True):
+        with self._lock:
+            dirty, unsnapshotted = set(self._dirty), set(self._unsnapshotted)
+            self._index: Dict[Tuple[str, IndexKey, Any], List[PoolInfo]] = {}
+            self._by_cid: Dict[str, List[PoolInfo]] = {}
+            self._entries: Dict[int, Tuple[List[Tuple[str, IndexKey, Any]], Any]] = {}
+            self._refs: Dict[int, int] = {}
+            self._positions: Optional[Dict[int, int]] = None
+            for pool in self:
+                self._add_to_index(pool)
+            if not mark_dirty:
+                self._dirty, self._unsnapshotted = dirty, unsnapshotted
+
+    def _get_positions(self) -> Dict[int, int]:
+        """
+        Get the (lazily rebuilt) mapping from pool object id to its position in the list.
+        """
+        if self._positions is None:
+            self._positions = {id(pool): idx for idx, pool in enumerate(self)}
+        return self._positions
+
+    def _in_list_order(self, bucket: List[PoolInfo]) -> List[PoolInfo]:
+        """
+        Sort the pools of an index bucket by their position in the list (buckets are kept in the order
+        in which the pools were added, which differs from the list order after e.g. `insert` or `sort`).
+        """
+        if len(bucket) <= 1:
+            return list(bucket)
+        with self._lock:
+            positions = self._get_positions()
+            return sorted(bucket, key=lambda pool: positions[id(pool)])
+
+    def reindex(self, pool: PoolInfo):
+        """
+        Refresh the index entries of a pool after its indexed values were changed in place.
+
+        Parameters
+        ----------
+        pool : Dict[str, Any]
+            The pool info, which must already be in the store.
+        """
+        with self._lock:
+            pool_id = id(pool)
+            if pool_id not in self._refs:
+                return
+            refs = self._refs[pool_id]
+            self._refs[pool_id] = 1
+            self._remove_from_index(pool)
+            self._add_to_index(pool)
+            self._refs[pool_id] = refs
+
+    # ------------------------------------------------------------------------------------------------
+    # list interface
+    # ------------------------------------------------------------------------------------------------
+    def append(self, pool: PoolInfo):
+        with self._lock:
+            super().append(pool)
+            self._add_to_index(pool)
+            if self._positions is not None:
+                self._positions[id(pool)] = len(self) - 1
+
+    def extend(self, pools: Iterable[PoolInfo]):
+        for pool in pools:
+            self.append(pool)
+
+    def __iadd__(self, pools: Iterable[PoolInfo]):
+        self.extend(pools)
+        return self
+
+    def insert(self, idx: int, pool: PoolInfo):
+        with self._lock:
+            super().insert(idx, pool)
+            self._add_to_index(pool)
+            self._positions = None
+
+    def __setitem__(self, idx, value):
+        with self._lock:
+            if isinstance(idx, slice):
+                old = super().__getitem__(idx)
+                value = list(value)
+                super().__setitem__(idx, value)
+                for pool in old:
+                    self._remove_from_index(pool)
+                for pool in value:
+                    self._add_to_index(pool)
+                self._positions = None
+                return
+            old = super().__getitem__(idx)
+            if old is value:
+                self.reindex(value)
+                return
+            super().__setitem__(idx, value)
+            self._remove_from_index(old)
+            self._add_to_index(value)
+            if self._positions is not None:
+                if id(old) in self._refs:
+                    self._positions = None
+                else:
+                    self._positions.pop(id(old), None)
+                    self._positions[id(value)] = idx if idx >= 0 else len(self) + idx
+
+    def __delitem__(self, idx):
+        with self._lock:
+            old = super().__getitem__(idx)
+            super().__delitem__(idx)
+            for pool in old if isinstance(idx, slice) else [old]:
+                self._remove_from_index(pool)
+            self._positions = None
+
+    def pop(self, idx: int = -1) -> PoolInfo:
+        with self._lock:
+            pool = super().pop(idx)
+            self._remove_from_index(pool)
+            self._positions = None
+            return pool
+
+    def remove(self, pool: PoolInfo):
+        with self._lock:
+            del self[self.index(pool)]
+
+    def clear(self):
+        with self._lock:
+            for cid in self._by_cid:
+                self._mark_changed(cid)
+            super().clear()
+            self._rebuild_index()
+
+    def sort(self, *args, **kwargs):
+        with self._lock:
+            super().sort(*args, **kwargs)
+            self._positions = None
+
+    def reverse(self):
+        with self._lock:
+            super().reverse()
+            self._positions = None
+
+    def copy(self) -> List[PoolInfo]:
+        """
+        Get a shallow copy of the pools as a plain list.
+        """
+        return list(self)
+
+    # ------------------------------------------------------------------------------------------------
+    # indexed lookups
+    # ------------------------------------------------------------------------------------------------
+    def get(self, cid: str) -> Optional[PoolInfo]:
+        """
+        Get the pool with the given cid.
+
+        Parameters
+        ----------
+        cid : str
+            The pool cid.
+
+        Returns
+        -------
+        Optional[Dict[str, Any]]
+            The pool info (the first in list order if several pools share the cid), or None if no pool has this cid.
+        """
+        bucket = self._by_cid.get(cid)
+        return self._in_list_order(bucket)[0] if bucket else None
+
+    def find(self, exchange_name: str, key: IndexKey, value: Any) -> Optional[PoolInfo]:
+        """
+        Get the first pool of an exchange whose `key` equals `value`.
+
+        Parameters
+        ----------
+        exchange_name : str
+            The exchange name.
+        key : str or Tuple[str, ...]
+            The pool info key (or tuple of keys, e.g. the Bancor v2 token pair).
+        value : Any
+            The value (or tuple of values) to match.
+
+        Returns
+        -------
+        Optional[Dict[str, Any]]
+            The pool info, or None if there is no match.
+        """
+        matches = self.find_all(exchange_name, key, value)
+        return matches[0] if matches else None
+
+    def find_all(self, exchange_name: str, key: IndexKey, value: Any) -> List[PoolInfo]:
+        """
+        Get all pools of an exchange whose `key` equals `value`. Falls back to a scan for keys which
+        are not in `INDEXED_KEYS`.
+
+        Parameters
+        ----------
+        exchange_name : str
+            The exchange name.
+        key : str or Tuple[str, ...]
+            The pool info key (or tuple of keys).
+        value : Any
+            The value (or tuple of values) to match.
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            The matching pool infos, in list order.
+        """
+        if isinstance(key, list):
+            key = tuple(key)
+        if isinstance(value, list):
+            value = tuple(value)
+        if key in self.INDEXED_KEYS and isinstance(value, Hashable):
+            return self._in_list_order(self._index.get((exchange_name, key, value), ()))
+        return [
+            pool
+            for pool in self
+            if pool.get("exchange_name") == exchange_name and self._key_value(pool, key) == value
+        ]
+
+    def position(self, pool: PoolInfo) -> Optional[int]:
+        """
+        Get the position of a pool object in the list (by identity, not equality).
+
+        Parameters
+        ----------
+        pool : Dict[str, Any]
+            The pool info.
+
+        Returns
+        -------
+        Optional[int]
+            The position, or None if the pool object is not in the store.
+        """
+        with self._lock:
+            return self._get_positions().get(id(pool))
+
+    def replace(self, old: PoolInfo, new: PoolInfo) -> bool:
+        """
+        Replace a pool object with a new one at the same position.
+
+        Parameters
+        ----------
+        old : Dict[str, Any]
+            The pool info currently in the store.
+        new : Dict[str, Any]
+            The pool info to put in its place.
+
+        Returns
+        -------
+        bool
+            True if `old` was found and replaced, False otherwise.
+        """
+        with self._lock:
+            idx = self.position(old)
+            if idx is None:
+                return False
+            self[idx] = new
+            return True
+
+    def remove_cids(self, cids: Iterable[str]) -> int:
+        """
+        Remove all pools with any of the given cids.
+
+        Parameters
+        ----------
+        cids : Iterable[str]
+            The cids to remove.
+
+        Returns
+        -------
+        int
+            The number of pools removed.
+        """
+        with self._lock:
+            positions = sorted(
+                {
+                    self._get_positions()[id(pool)]
+                    for cid in cids
+                    for pool in self._by_cid.get(cid, ())
+                },
+                reverse=True,
+            )
+            for idx in positions:
+                del self[idx]
+            return len(positions)
+
+    def has_duplicate_cids(self) -> bool:
+        """
+        Check whether more than one entry of the store shares the same cid.
+        """
+        return len(self) > len(self._by_cid)
+
+    def drop_duplicate_cids(self):
+        """
+        Remove duplicate pools in place, keeping the first occurrence of each cid in list order.
+        """
+        with self._lock:
+            if not self.has_duplicate_cids():
+                return
+            seen = set()
+            keep = []
+            for pool in self:
+                cid = pool.get("cid")
+                if cid in seen:
+                    self._mark_changed(cid)
+                    continue
+                seen.add(cid)
+                keep.append(pool)
+            super().__setitem__(slice(None), keep)
+            self._rebuild_index(mark_dirty=False)
+
+    # ------------------------------------------------------------------------------------------------
+    # change tracking
+    # ------------------------------------------------------------------------------------------------
+    def pop_dirty_cids(self) -> Set[str]:
+        """
+        Get the cids of all pools which changed since the last call, and reset the change set.
+
+        Returns
+        -------
+        Set[str]
+            The cids of the pools which were added, replaced, reindexed or removed.
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            return dirty
+
+    # ------------------------------------------------------------------------------------------------
+    # snapshots
+    # ------------------------------------------------------------------------------------------------
+    def snapshot(self) -> PoolStateSnapshot:
+        """
+        Get an immutable snapshot of the pools.
+
+        The snapshot is built from the previous one, copying only the pools which were added, replaced,
+        reindexed or removed since then; if none were, the previous snapshot is returned.
+
+        Returns
+        -------
+        PoolStateSnapshot
+            The current version of the pool data.
+        """
+        with self._lock:
+            previous = self._snapshot
+            if previous is not None and not self._unsnapshotted:
+                return previous
+            if previous is None:
+                pools = {}
+                for pool in self:
+                    cid = pool.get("cid")
+                    if isinstance(cid, Hashable) and cid not in pools:
+                        pools[cid] = FrozenPool(pool)
+                changed_cids = set(pools)
+            else:
+                pools = dict(previous._by_cid)
+                changed_cids = self._unsnapshotted
+                for cid in changed_cids:
+                    bucket = self._by_cid.get(cid)
+                    if bucket:
+                        pools[cid] = FrozenPool(self._in_list_order(bucket)[0])
+                    else:
+                        pools.pop(cid, None)
+            self._snapshot = PoolStateSnapshot(
+                pools, 0 if previous is None else previous.version + 1, changed_cids, self._lineage
+            )
+            self._unsnapshotted = set()
+            return self._snapshot
@@ -0,0 +1,229 @@
+# coding=utf-8
+"""
+Contains the websocket subscription used by the main loop to receive the new blocks and events as they are
+pushed by the node, instead of polling for them.
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import websockets
+from hexbytes import HexBytes
+from web3 import Web3
+from websockets.exceptions import ConnectionClosed
+
+from fastlane_bot.events.utils import decode_log, get_log_filters
+
+LOG_INT_KEYS = ["blockNumber", "transactionIndex", "logIndex"]
+LOG_BYTES_KEYS = ["transactionHash", "blockHash", "data"]
+
+
+def format_log(log: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts a log pushed by a `logs` subscription (JSON-RPC hex strings) to the format returned by
+    `eth_getLogs` through web3.
+
+    Parameters
+    ----------
+    log : Dict[str, Any]
+        The log, as pushed by the node.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The log, with int block number and indexes, HexBytes topics and hashes and a checksum address.
+    """
+    log = dict(log)
+    for key in LOG_INT_KEYS:
+        log[key] = int(log[key], 16)
+    for key in LOG_BYTES_KEYS:
+        log[key] = HexBytes(log[key])
+    log["topics"] = [HexBytes(topic) for topic in log["topics"]]
+    log["address"] = Web3.to_checksum_address(log["address"])
+    return log
+
+
+@dataclass
+class EventSubscription:
+    """
+    Subscribes to the `newHeads` and `logs` of a websocket endpoint and buffers the decoded events per block.
+
+    The log subscriptions use the address-scoped filters of `get_log_filters`, built from the pools known to
+    the manager when connecting. The subscription is only used for the blocks after the block at which it was
+    (re)connected: until the polled data has caught up with that block, `pop_events` returns None and the main
+    loop keeps polling. On a disconnect, a timeout, or a reorg of events which were already released, the
+    subscription falls back to polling in the same way until it has resynced.
+
+    Parameters
+    ----------
+    ws_url : str
+        The websocket endpoint of the node.
+    mgr : Any
+        The manager object.
+    reorg_delay : int
+        The number of blocks behind the head whose events are released (the same as in polling mode).
+    drain_timeout : float
+        The time (in seconds) to wait for more messages after a new head, for the logs of its block.
+    """
+
+    __VERSION__ = "1.0"
+    __DATE__ = "2024-03-28"
+
+    ws_url: str
+    mgr: Any
+    reorg_delay: int = 0
+    drain_timeout: float = 0.1
+    loop: asyncio.AbstractEventLoop = field(default_factory=asyncio.new_event_loop, repr=False)
+    connection: Any = field(default=None, repr=False)
+    events_by_topic: Dict[bytes, Any] = field(default_factory=dict, repr=False)
+    head_subscription: Optional[str] = None
+    log_subscriptions: Set[str] = field(default_factory=set)
+    head: int = 0
+    synced_block: int = 0
+    released_block: int = 0
+    pending: Dict[int, Dict[Tuple[HexBytes, int], Any]] = field(default_factory=dict, repr=False)
+    request_id: int = 0
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connection is not None
+
+    def wait_for_head(self, timeout: float = 60) -> bool:
+        """
+        Waits for the next block, (re)connecting first if needed.
+
+        Parameters
+        ----------
+        timeout : float
+            The maximum time (in seconds) to wait for the next block.
+
+        Returns
+        -------
+        bool
+            True if a new block has arrived, False if the subscription has failed (the caller should poll).
+        """
+        try:
+            return self.loop.run_until_complete(self._wait_for_head(timeout))
+        except (asyncio.TimeoutError, ConnectionClosed, OSError) as e:
+            self.mgr.cfg.logger.warning(
+                f"[events.subscription] Websocket subscription failed ({type(e).__name__}: {e}), falling back to polling"
+            )
+            self.disconnect()
+            return False
+
+    def pop_events(self, last_block: int) -> Optional[Tuple[int, List[Any]]]:
+        """
+        Releases the buffered events of the blocks after `last_block` (up to `reorg_delay` blocks behind the head).
+
+        Parameters
+        ----------
+        last_block : int
+            The last block up to which the events have already been processed.
+
+        Returns
+        -------
+        Optional[Tuple[int, List[Any]]]
+            The current block and its events in chain order, or None if the subscription cannot cover all
+            blocks after `last_block` (the caller should poll).
+        """
+        for block_number in [block_number for block_number in self.pending if block_number <= last_block]:
+            del self.pending[block_number]
+        if not self.is_connected or not last_block or self.synced_block > last_block:
+            return None
+
+        current_block = max(self.head - self.reorg_delay, last_block)
+        events = []
+        for block_number in sorted(block_number for block_number in self.pending if block_number <= current_block):
+            events += sorted(self.pending.pop(block_number).values(), key=lambda event: (event["transactionIndex"], event["logIndex"]))
+        self.released_block = current_block
+        return current_block, events
+
+    def disconnect(self) -> None:
+        """
+        Closes the connection (the next call to `wait_for_head` reconnects).
+        """
+        if self.connection is not None:
+            try:
+                self.loop.run_until_complete(self.connection.close())
+            except Exception:
+                pass
+        self.connection = None
+        self.head_subscription = None
+        self.log_subscriptions = set()
+
+    async def _wait_for_head(self, timeout: float) -> bool:
+        if self.connection is None:
+            await asyncio.wait_for(self._connect(), timeout)
+        await asyncio.wait_for(self._next_head(self.head), timeout)
+
+        # The node pushes the logs of a block right after its head
+        while True:
+            try:
+                message = await asyncio.wait_for(self.connection.recv(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                return True
+            self._dispatch(json.loads(message))
+
+    async def _next_head(self, head: int) -> None:
+        while self.head == head:
+            self._dispatch(json.loads(await self.connection.recv()))
+
+    async def _connect(self) -> None:
+        self.connection = await websockets.connect(self.ws_url, max_size=None)
+        self.head_subscription = await self._request("eth_subscribe", ["newHeads"])
+        head = int(await self._request("eth_blockNumber", []), 16)
+
+        # The Bancor POL high-water mark is at most the polled block, so the POL filter is always included
+        log_filters, self.events_by_topic = get_log_filters(self.mgr, head + 1, head + 1)
+        for log_filter in log_filters:
+            params = {key: value for key, value in log_filter.items() if key in ["address", "topics"]}
+            self.log_subscriptions.add(await self._request("eth_subscribe", ["logs", params]))
+
+        # Only the blocks after the head at the time of subscribing are fully covered by the subscription
+        self.head = self.synced_block = max(self.head, head)
+        self.mgr.cfg.logger.info(
+            f"[events.subscription] Subscribed to {self.ws_url} at block {head} ({len(log_filters)} log filters)"
+        )
+
+    async def _request(self, method: str, params: List[Any]) -> Any:
+        self.request_id += 1
+        request_id = self.request_id
+        await self.connection.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+        while True:
+            message = json.loads(await self.connection.recv())
+            if message.get("id") != request_id:
+                self._dispatch(message)
+            elif "error" in message:
+                raise OSError(f"{method} failed: {message['error']}")
+            else:
+                return message["result"]
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        if message.get("method") != "eth_subscription":
+            return
+        subscription, result = message["params"]["subscription"], message["params"]["result"]
+        if subscription == self.head_subscription:
+            self.head = max(self.head, int(result["number"], 16))
+        elif subscription in self.log_subscriptions:
+            self._add_log(format_log(result))
+
+    def _add_log(self, log: Dict[str, Any]) -> None:
+        key = (log["transactionHash"], log["logIndex"])
+        block_number = log["blockNumber"]
+        if block_number <= self.released_block:
+            # A reorged or late event of a block which has already been applied, so resync by polling
+            self.mgr.cfg.logger.warning(
+                f"[events.subscription] Event of the released block {block_number}, falling back to polling"
+            )
+            self.synced_block = max(self.synced_block, self.head + 1)
+            return
+        if log.get("removed"):
+            self.pending.get(block_number, {}).pop(key, None)
+            return
+        event = decode_log(log, self.events_by_topic)
+        if event is not None:
+            self.pending.setdefault(block_number, {})[key] = event
@@ -0,0 +1,178 @@
+# coding=utf-8
+"""
+Contains the token cache, which keeps the metadata of the tokens across bot iterations.
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Set
+
+import pandas as pd
+from web3 import Web3
+
+TOKEN_COLUMNS = ["address", "decimals", "symbol"]
+
+
+def sanitize_symbol(symbol: str) -> str:
+    """
+    Replace the characters of a token symbol which are used as separators in pair names and descriptions.
+
+    Parameters
+    ----------
+    symbol : str
+        The token symbol.
+
+    Returns
+    -------
+    str
+        The sanitized symbol.
+    """
+    return symbol.replace(" ", "_").replace("/", "_").replace("-", "_")
+
+
+@dataclass
+class TokenCache:
+    """
+    Long-lived cache of the token metadata (decimals and symbol) by checksum address.
+
+    The manager owns a single cache for its whole lifetime. It is read once from the tokens CSV file
+    of the network, and the tokens which are resolved on chain afterwards are appended to the file
+    (unless the bot runs in read only mode), so the file is never read again nor rewritten. The
+    token detail files written by the contracts manager, for the tokens it resolves one at a time,
+    are loaded as they appear (see `load_csv`).
+
+    Attributes
+    ----------
+    path : str
+        The tokens CSV file.
+    read_only : bool
+        Whether the new tokens are kept in memory only.
+    tokens : Dict[str, Dict[str, Any]]
+        The address, decimals and symbol of each token, by checksum address.
+    loaded_files : Set[str]
+        The CSV files which were loaded into the cache.
+    """
+
+    __VERSION__ = "1.1"
+    __DATE__ = "2024-03-28"
+
+    path: str = None
+    read_only: bool = False
+    tokens: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    loaded_files: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_csv(cls, path: str, read_only: bool = False) -> "TokenCache":
+        """
+        Load the cache from a tokens CSV file (an empty cache if the file does not exist).
+
+        Parameters
+        ----------
+        path : str
+            The tokens CSV file.
+        read_only : bool
+            Whether the new tokens are kept in memory only.
+
+        Returns
+        -------
+        TokenCache
+            The cache.
+        """
+        cache = cls(path=path, read_only=read_only)
+        if os.path.exists(path):
+            cache.load_csv(path)
+        return cache
+
+    def load_csv(self, path: str) -> int:
+        """
+        Load the tokens of a CSV file into the cache, without writing them to the tokens CSV file.
+
+        Parameters
+        ----------
+        path : str
+            The CSV file, with (at least) the address, decimals and symbol columns.
+
+        Returns
+        -------
+        int
+            The number of tokens added (the tokens which are already known are skipped).
+        """
+        n_tokens = len(self.tokens)
+        for record in pd.read_csv(path).to_dict(orient="records"):
+            address = Web3.to_checksum_address(record["address"])
+            if isinstance(record["symbol"], str):
+                record["symbol"] = sanitize_symbol(record["symbol"])
+            self.tokens.setdefault(address, {**record, "address": address})
+        self.loaded_files.add(path)
+        return len(self.tokens) - n_tokens
+
+    def __contains__(self, address: str) -> bool:
+        return address in self.tokens
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def get(self, address: str) -> Dict[str, Any]:
+        """
+        Get the metadata of a token.
+
+        Parameters
+        ----------
+        address : str
+            The checksum address of the token.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The address, decimals and symbol of the token (None if the token is unknown).
+        """
+        return self.tokens.get(address)
+
+    def missing(self, addresses: Iterable[str]) -> List[str]:
+        """
+        Get the tokens which are not in the cache.
+
+        Parameters
+        ----------
+        addresses : Iterable[str]
+            The checksum addresses of the tokens (None and duplicates are ignored).
+
+        Returns
+        -------
+        List[str]
+            The addresses of the unknown tokens.
+        """
+        return list(dict.fromkeys(
+            address for address in addresses if address is not None and address not in self.tokens
+        ))
+
+    def add(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Add the metadata of new tokens to the cache, and append it to the tokens CSV file.
+
+        Parameters
+        ----------
+        records : List[Dict[str, Any]]
+            The address, decimals and symbol of each token. The symbols are sanitized, and the tokens
+            which are already known, or whose decimals or symbol are missing, are skipped.
+
+        Returns
+        -------
+        int
+            The number of tokens added.
+        """
+        new_records = []
+        for record in records:
+            address = record["address"]
+            if address in self.tokens or record["decimals"] is None or not record["symbol"]:
+                continue
+            self.tokens[address] = {"address": address, "decimals": record["decimals"], "symbol": sanitize_symbol(record["symbol"])}
+            new_records.append(self.tokens[address])
+
+        if new_records and not self.read_only and self.path is not None:
+            pd.DataFrame(new_records, columns=TOKEN_COLUMNS).to_csv(
+                self.path, mode="a", header=not os.path.exists(self.path), index=False
+            )
+        return len(new_records)
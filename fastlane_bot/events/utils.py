@@ -11,8 +11,9 @@ import os
 import random
 import time
 from _decimal import Decimal
+from dataclasses import dataclass, field
 from glob import glob
-from typing import Any, Union, Dict, Set, Tuple, Hashable
+from typing import Any, Union, Dict, Set, Tuple, Hashable, Optional, Iterable, Iterator
 from typing import List
 
 import numpy as np
@@ -21,6 +22,7 @@ import requests
 from hexbytes import HexBytes
 from joblib import Parallel, delayed
 from web3 import AsyncWeb3, Web3
+from eth_utils import event_abi_to_log_topic
 from web3.datastructures import AttributeDict
 
 from fastlane_bot import Config
@@ -30,10 +32,18 @@ from fastlane_bot.data.abi import FAST_LANE_CONTRACT_ABI
 from fastlane_bot.exceptions import ReadOnlyException
 from fastlane_bot.events.interface import QueryInterface
 from fastlane_bot.events.managers.manager import Manager
+from fastlane_bot.events.multicall_utils import apply_pool_state_diffs
+from fastlane_bot.events.pipeline import PoolSnapshot, SnapshotChannel
+from fastlane_bot.events.pool_log import PoolDataLog
+from fastlane_bot.events.pool_store import PoolStateSnapshot
 
 from fastlane_bot.helpers import TxHelpers
 from fastlane_bot.utils import safe_int
 
+BANCOR_POL_EVENTS = ["TradingEnabled", "TokenTraded"]
+LOG_FILTER_ADDRESS_CHUNK_SIZE = 1000
+EVENT_RECORD_KEYS = ["event", "args", "address", "blockNumber", "transactionIndex", "logIndex", "transactionHash"]
+
 
 def filter_latest_events(
     mgr: Manager, events: List[List[AttributeDict]]
@@ -51,28 +61,64 @@ def filter_latest_events(
     Returns:
         List[AttributeDict]: A list of events, each representing the latest event for its corresponding pool.
     """
-    latest_entry_per_pool = {}
-    all_events = [event for event_list in events for event in event_list]
+    latest_events = LatestEvents(mgr)
+    for event_list in events:
+        for event in event_list:
+            latest_events.add(event)
+    return latest_events.values()
 
-    # Handles the case where multiple pools are created in the same block
-    all_events.reverse()
 
-    bancor_v2_anchor_addresses = {
-        pool["anchor"] for pool in mgr.pool_data if pool["exchange_name"] == "bancor_v2"
-    }
+@dataclass
+class LatestEvents:
+    """
+    Keeps the latest event per pool of a stream of events, in a single pass.
 
-    for event in all_events:
-        pool_type = mgr.pool_type_from_exchange_name(
-            mgr.exchange_name_from_event(event)
-        )
+    Attributes
+    ----------
+    mgr : Any
+        The manager object.
+    pool_types : Dict[Tuple[str, str], Any]
+        The pool type of each (address, event name) handled by the supported exchanges, filled on first sight
+        (pass `mgr.event_pool_types` to keep it across iterations). The events which are not handled (e.g. those
+        of the pools of a fork which are not in the static pool data) are classified every time, so that the map
+        is bounded by the pools of the exchanges rather than by all the addresses seen.
+    latest : Dict[Any, Dict[str, Any]]
+        The latest event of each pool, by the unique key of the pool.
+    """
+
+    mgr: Any
+    pool_types: Dict[Tuple[str, str], Any] = field(default_factory=dict)
+    latest: Dict[Any, Dict[str, Any]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.bancor_v2_anchor_addresses = {
+            pool["anchor"] for pool in self.mgr.pool_data if pool["exchange_name"] == "bancor_v2"
+        }
+
+    def pool_type(self, event: Dict[str, Any]) -> Any:
+        """
+        Gets the pool type of an event, which only depends on its address and event type.
+        """
+        key = (event["address"], event["event"])
+        if key in self.pool_types:
+            return self.pool_types[key]
+        pool_type = self.mgr.pool_type_from_exchange_name(self.mgr.exchange_name_from_event(event))
         if pool_type:
-            key = pool_type.unique_key()
-        else:
-            continue
+            self.pool_types[key] = pool_type
+        return pool_type
+
+    def add(self, event: Dict[str, Any]):
+        """
+        Adds an event, replacing the current event of its pool if it is not older.
+        """
+        pool_type = self.pool_type(event)
+        if not pool_type:
+            return
+        key = pool_type.unique_key()
         if key == "cid":
             key = "id"
         elif key == "tkn1_address":
-            if event["args"]["pool"] != mgr.cfg.BNT_ADDRESS:
+            if event["args"]["pool"] != self.mgr.cfg.BNT_ADDRESS:
                 key = "pool"
             else:
                 key = "tkn_address"
@@ -84,40 +130,49 @@ def filter_latest_events(
             key == "address"
             and "_token1" in event["args"]
             and (
-                event["args"]["_token1"] in bancor_v2_anchor_addresses
-                or event["args"]["_token2"] in bancor_v2_anchor_addresses
+                event["args"]["_token1"] in self.bancor_v2_anchor_addresses
+                or event["args"]["_token2"] in self.bancor_v2_anchor_addresses
             )
         ):
-            continue
+            return
 
-        if unique_key in latest_entry_per_pool:
-            if event["blockNumber"] > latest_entry_per_pool[unique_key]["blockNumber"]:
-                latest_entry_per_pool[unique_key] = event
-            elif (
-                event["blockNumber"] == latest_entry_per_pool[unique_key]["blockNumber"]
-            ):
-                if (
-                    event["transactionIndex"]
-                    == latest_entry_per_pool[unique_key]["transactionIndex"]
-                ):
-                    if (
-                        event["logIndex"]
-                        > latest_entry_per_pool[unique_key]["logIndex"]
-                    ):
-                        latest_entry_per_pool[unique_key] = event
-                elif (
-                    event["transactionIndex"]
-                    > latest_entry_per_pool[unique_key]["transactionIndex"]
-                ):
-                    latest_entry_per_pool[unique_key] = event
-                else:
-                    continue
-            else:
-                continue
-        else:
-            latest_entry_per_pool[unique_key] = event
+        # On ties, the event added last wins (e.g. multiple pools created in the same block)
+        current = self.latest.get(unique_key)
+        if current is None or _event_position(event) >= _event_position(current):
+            self.latest[unique_key] = event
+
+    def values(self) -> List[Dict[str, Any]]:
+        """
+        The latest event of each pool.
+        """
+        return list(self.latest.values())
 
-    return list(latest_entry_per_pool.values())
+
+def _event_position(event: Dict[str, Any]) -> Tuple[int, int, int]:
+    return event["blockNumber"], event["transactionIndex"], event["logIndex"]
+
+
+def iter_event_records(events: Iterable[Iterable[Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Converts fetched events, one at a time, to compact event records.
+
+    Each event is converted in a single pass to a plain dict (see `complex_handler`) which only holds
+    the `EVENT_RECORD_KEYS` used downstream.
+
+    Parameters
+    ----------
+    events : Iterable[Iterable[Any]]
+        The fetched events, per filter.
+
+    Returns
+    -------
+    Iterator[Dict[str, Any]]
+        The event records.
+    """
+    for event_list in events:
+        for event in event_list:
+            record = complex_handler(dict(event))
+            yield {key: record[key] for key in EVENT_RECORD_KEYS if key in record}
 
 
 def complex_handler(obj: Any) -> Union[Dict, str, List, Set, Any]:
@@ -692,22 +747,23 @@ def get_event_filters(
     Any
         A list of event filters.
     """
-    bancor_pol_events = ["TradingEnabled", "TokenTraded"]
-
     # Get for exchanges except POL contract
     by_block_events = Parallel(n_jobs=n_jobs, backend="threading")(
         delayed(event.create_filter)(fromBlock=start_block, toBlock=current_block)
         for event in mgr.events
-        if event.__name__ not in bancor_pol_events
+        if event.__name__ not in BANCOR_POL_EVENTS
     )
 
-    # Get all events since the beginning of time for Bancor POL contract
-    max_num_events = Parallel(n_jobs=n_jobs, backend="threading")(
-        delayed(event.create_filter)(fromBlock=0, toBlock="latest")
+    # Get the Bancor POL events which have not been fetched yet (all of them on the first sync)
+    pol_from_block = get_bancor_pol_from_block(mgr)
+    if pol_from_block > current_block:
+        return by_block_events
+    pol_events = Parallel(n_jobs=n_jobs, backend="threading")(
+        delayed(event.create_filter)(fromBlock=pol_from_block, toBlock=current_block)
         for event in mgr.events
-        if event.__name__ in bancor_pol_events
+        if event.__name__ in BANCOR_POL_EVENTS
     )
-    return by_block_events + max_num_events
+    return by_block_events + pol_events
 
 
 def get_all_events(n_jobs: int, event_filters: Any) -> List[Any]:
@@ -743,6 +799,306 @@ def get_all_events(n_jobs: int, event_filters: Any) -> List[Any]:
     )
 
 
+def get_event_emitters(mgr: Any, exchange_name: str) -> Optional[List[str]]:
+    """
+    Gets the addresses of the contracts which emit the events of an exchange.
+
+    Parameters
+    ----------
+    mgr : Any
+        The manager object.
+    exchange_name : str
+        The exchange name.
+
+    Returns
+    -------
+    Optional[List[str]]
+        The addresses, or None if they are not known ahead. This is the case for the Bancor V2 converters and
+        the Bancor V3 pool collections, whose pools are found through their events.
+    """
+    if exchange_name in mgr.forked_exchanges:
+        # Events of pools which are not in the static pools are discarded by `Pool.event_matches_format`
+        return mgr.static_pools.get(f"{exchange_name}_pools", [])
+    elif exchange_name in mgr.cfg.CARBON_V1_FORKS:
+        return [mgr.cfg.CARBON_CONTROLLER_MAPPING[exchange_name]]
+    elif exchange_name == mgr.cfg.BALANCER_NAME:
+        return [mgr.cfg.BALANCER_VAULT_ADDRESS]
+    elif exchange_name == mgr.cfg.BANCOR_POL_NAME:
+        return [mgr.cfg.BANCOR_POL_ADDRESS]
+    return None
+
+
+def get_log_filters(
+    mgr: Any, start_block: int, current_block: int
+) -> Tuple[List[Dict[str, Any]], Dict[bytes, Any]]:
+    """
+    Creates address-scoped `eth_getLogs` filters for the specified block range.
+
+    The events of all exchanges whose emitting contracts are known are fetched with filters on the addresses
+    of these contracts (in chunks of `LOG_FILTER_ADDRESS_CHUNK_SIZE`) and on the topics of all of their events,
+    so that only the logs of our pools are downloaded. The events of the other exchanges are fetched with a
+    topic-only filter.
+
+    Parameters
+    ----------
+    mgr : Any
+        The manager object.
+    start_block : int
+        The starting block number of the filters.
+    current_block : int
+        The current block number of the filters.
+
+    Returns
+    -------
+    Tuple[List[Dict[str, Any]], Dict[bytes, Any]]
+        The filter params, and the event (used to decode the logs) of each topic.
+    """
+    events_by_topic = {}
+    scoped_addresses = set()
+    scoped_topics = set()
+    unscoped_topics = set()
+    pol_topics = set()
+    for exchange in mgr.exchanges.values():
+        emitters = get_event_emitters(mgr, exchange.exchange_name)
+        for event in exchange.get_events(mgr.event_contracts[exchange.exchange_name]):
+            topic = event_abi_to_log_topic(event._get_event_abi())
+            events_by_topic[topic] = event
+            if event.__name__ in BANCOR_POL_EVENTS:
+                pol_topics.add(topic)
+            elif emitters is None:
+                unscoped_topics.add(topic)
+            else:
+                scoped_topics.add(topic)
+                scoped_addresses.update(emitters)
+
+    log_filters = []
+    scoped_addresses = sorted(scoped_addresses)
+    if scoped_topics:
+        log_filters += [
+            {
+                "fromBlock": start_block,
+                "toBlock": current_block,
+                "address": scoped_addresses[i:i + LOG_FILTER_ADDRESS_CHUNK_SIZE],
+                "topics": [[Web3.to_hex(topic) for topic in sorted(scoped_topics)]],
+            }
+            for i in range(0, len(scoped_addresses), LOG_FILTER_ADDRESS_CHUNK_SIZE)
+        ]
+    if unscoped_topics:
+        log_filters.append(
+            {"fromBlock": start_block, "toBlock": current_block, "topics": [[Web3.to_hex(topic) for topic in sorted(unscoped_topics)]]}
+        )
+
+    # Get the Bancor POL events which have not been fetched yet (all of them on the first sync)
+    pol_from_block = get_bancor_pol_from_block(mgr)
+    if pol_topics and pol_from_block <= current_block:
+        log_filters.append(
+            {
+                "fromBlock": pol_from_block,
+                "toBlock": current_block,
+                "address": [mgr.cfg.BANCOR_POL_ADDRESS],
+                "topics": [[Web3.to_hex(topic) for topic in sorted(pol_topics)]],
+            }
+        )
+    return log_filters, events_by_topic
+
+
+def decode_log(log: Any, events_by_topic: Dict[bytes, Any]) -> Optional[Any]:
+    """
+    Decodes a log with the event of its first topic.
+
+    Parameters
+    ----------
+    log : Any
+        The log, as returned by `eth_getLogs`.
+    events_by_topic : Dict[bytes, Any]
+        The event of each topic.
+
+    Returns
+    -------
+    Optional[Any]
+        The event, or None if the log is not one of the events.
+    """
+    event = events_by_topic.get(bytes(log["topics"][0])) if log["topics"] else None
+    if event is None:
+        return None
+    try:
+        return event().process_log(log)
+    except Exception:
+        # A log of another event with the same topic, but a different layout of indexed arguments
+        return None
+
+
+def get_all_logs(
+    n_jobs: int, web3: Web3, log_filters: List[Dict[str, Any]], events_by_topic: Dict[bytes, Any]
+) -> List[Any]:
+    """
+    Fetches and decodes all logs using the given `eth_getLogs` filters.
+
+    Parameters
+    ----------
+    n_jobs : int
+        The number of jobs to run in parallel.
+    web3 : Web3
+        The Web3 instance.
+    log_filters : List[Dict[str, Any]]
+        The filter params.
+    events_by_topic : Dict[bytes, Any]
+        The event of each topic.
+
+    Returns
+    -------
+    List[Any]
+        A list of all events, per filter (as returned by `get_all_events`).
+    """
+
+    def throttled_get_logs(log_filter):
+        try:
+            return web3.eth.get_logs(log_filter)
+        except Exception as e:
+            if "Too Many Requests for url" in str(e):
+                time.sleep(random.random())
+                return web3.eth.get_logs(log_filter)
+            else:
+                raise e
+
+    def get_events(log_filter):
+        events = [decode_log(log, events_by_topic) for log in throttled_get_logs(log_filter)]
+        return [event for event in events if event is not None]
+
+    return Parallel(n_jobs=n_jobs, backend="threading")(
+        delayed(get_events)(log_filter) for log_filter in log_filters
+    )
+
+
+def get_bancor_pol_events_path(mgr: Any) -> str:
+    """
+    Gets the path of the Bancor POL events cache file.
+
+    Parameters
+    ----------
+    mgr : Any
+        The manager object.
+
+    Returns
+    -------
+    str
+        The path of the cache file.
+    """
+    return os.path.normpath(
+        f"{mgr.prefix_path}fastlane_bot/data/blockchain_data/{mgr.cfg.NETWORK}/bancor_pol_events.json"
+    )
+
+
+def load_bancor_pol_events(mgr: Any, current_block: int) -> List[Any]:
+    """
+    Loads the cached Bancor POL events and their high-water mark from disk on the first call.
+
+    The cache is ignored if it is unreadable or ahead of the current block (e.g. when replaying from
+    a past block), in which case the POL events are synced from the POL start block.
+
+    Parameters
+    ----------
+    mgr : Any
+        The manager object.
+    current_block : int
+        The current block number.
+
+    Returns
+    -------
+    List[Any]
+        The cached events on the first call (they need to be applied to the pools), an empty list
+        afterwards.
+    """
+    if mgr.bancor_pol_last_block is not None or "bancor_pol" not in mgr.exchanges:
+        return []
+
+    mgr.bancor_pol_last_block = get_bancor_pol_from_block(mgr) - 1
+    path = get_bancor_pol_events_path(mgr)
+    if not os.path.isfile(path):
+        return []
+    try:
+        with open(path, "r") as f:
+            cache = json.load(f)
+        last_block, events = int(cache["last_block"]), cache["events"]
+    except Exception as e:
+        mgr.cfg.logger.warning(
+            f"[events.utils.load_bancor_pol_events] Ignoring the Bancor POL events cache {path}: {e}"
+        )
+        return []
+    if last_block > current_block:
+        return []
+
+    mgr.bancor_pol_last_block = last_block
+    mgr.bancor_pol_events = events
+    mgr.cfg.logger.info(
+        f"[events.utils.load_bancor_pol_events] Loaded {len(events)} cached Bancor POL events up to block {last_block}"
+    )
+    return list(events.values())
+
+
+def get_bancor_pol_from_block(mgr: Any) -> int:
+    """
+    Gets the block from which the Bancor POL events need to be fetched.
+
+    Parameters
+    ----------
+    mgr : Any
+        The manager object.
+
+    Returns
+    -------
+    int
+        The block after the high-water mark, or the POL start block before the first sync.
+    """
+    if mgr.bancor_pol_last_block is None:
+        return mgr.cfg.BANCOR_POL_START_BLOCK
+    return max(mgr.bancor_pol_last_block + 1, mgr.cfg.BANCOR_POL_START_BLOCK)
+
+
+def update_bancor_pol_events(mgr: Any, events: List[List[Any]], current_block: int) -> None:
+    """
+    Records the latest Bancor POL event per token from the newly fetched events, advances the
+    high-water mark to the current block and persists both to disk (unless in read-only mode).
+
+    Parameters
+    ----------
+    mgr : Any
+        The manager object.
+    events : List[List[Any]]
+        The newly fetched events (as returned by get_all_events, after complex_handler).
+    current_block : int
+        The current block number, i.e. the last block the events were fetched for.
+    """
+    if mgr.bancor_pol_last_block is None or mgr.bancor_pol_last_block >= current_block:
+        return
+
+    pol_events = [
+        event
+        for event_list in events
+        for event in event_list
+        if event.get("event") in BANCOR_POL_EVENTS
+    ]
+    for event in sorted(
+        pol_events,
+        key=lambda e: (e["blockNumber"], e["transactionIndex"], e["logIndex"]),
+    ):
+        mgr.bancor_pol_events[event["args"]["token"]] = event
+    mgr.bancor_pol_last_block = current_block
+
+    if mgr.read_only:
+        return
+    path = get_bancor_pol_events_path(mgr)
+    try:
+        with open(path, "w") as f:
+            json.dump(
+                {"last_block": current_block, "events": mgr.bancor_pol_events}, f
+            )
+    except Exception as e:
+        mgr.cfg.logger.error(
+            f"[events.utils.update_bancor_pol_events] Error saving the Bancor POL events to {path}: {e}"
+        )
+
+
 def convert_to_serializable(data: Any) -> Any:
     if isinstance(data, bytes):
         return base64.b64encode(data).decode("ascii")
@@ -829,12 +1185,15 @@ def write_pool_data_to_disk(
     cache_latest_only: bool, logging_path: str, mgr: Any, current_block: int
 ) -> None:
     """
-    Writes the pool data to disk.
+    Writes the pools which changed since the last call to the binary pool data store (see `PoolDataLog`).
+
+    The pool data at any block in the store can be read back with `load_pool_data`. When caching the latest
+    pool data only, it is also written to `latest_pool_data.json` in the logging path, as before the store.
 
     Parameters
     ----------
     cache_latest_only : bool
-        Whether to cache the latest pool data only.
+        Whether to cache the latest pool data only (the superseded segments of the store are deleted).
     logging_path : str
         The logging path.
     mgr : Any
@@ -842,24 +1201,29 @@ def write_pool_data_to_disk(
     current_block : int
         The current block number.
     """
-    if cache_latest_only:
-        path = f"{logging_path}/latest_pool_data.json"
-    else:
-        if not os.path.isdir("pool_data"):
-            os.mkdir("pool_data")
-        path = f"pool_data/{mgr.SUPPORTED_EXCHANGES}_{current_block}.json"
+    if mgr.pool_data_log is None:
+        mgr.pool_data_log = PoolDataLog(
+            path=f"{logging_path}/pool_data" if cache_latest_only else "pool_data",
+            keep_history=not cache_latest_only,
+        )
     try:
-        df = pd.DataFrame(mgr.pool_data)
-
-        def remove_nan(row):
-            return {col: val for col, val in row.items() if pd.notna(val)}
-
-        # Apply the function to each row
-        cleaned_df = df.apply(remove_nan, axis=1)
-        cleaned_df.to_json(path, orient="records")
+        mgr.pool_data_log.write(mgr.pool_data.snapshot(), current_block)
     except Exception as e:
         mgr.cfg.logger.error(f"Error writing pool data to disk: {e}")
 
+    if cache_latest_only:
+        try:
+            df = pd.DataFrame(list(mgr.pool_data))
+
+            def remove_nan(row):
+                return {col: val for col, val in row.items() if pd.notna(val)}
+
+            # Apply the function to each row
+            cleaned_df = df.apply(remove_nan, axis=1)
+            cleaned_df.to_json(f"{logging_path}/latest_pool_data.json", orient="records")
+        except Exception as e:
+            mgr.cfg.logger.error(f"Error writing pool data to disk: {e}")
+
 
 def parse_non_multicall_rows_to_update(
     mgr: Any,
@@ -889,7 +1253,13 @@ def parse_non_multicall_rows_to_update(
     return other_pool_rows
 
 
-def init_bot(mgr: Any) -> CarbonBot:
+def init_bot(
+    mgr: Any,
+    n_jobs: int = 1,
+    tx_helpers: TxHelpers = None,
+    snapshot: PoolSnapshot = None,
+    snapshots: SnapshotChannel = None,
+) -> CarbonBot:
     """
     Initializes the bot.
 
@@ -897,6 +1267,15 @@ def init_bot(mgr: Any) -> CarbonBot:
     ----------
     mgr : Base
         The manager object.
+    n_jobs : int, optional
+        The number of worker processes used to search for arbitrage opportunities, by default 1.
+    tx_helpers : TxHelpers, optional
+        The tx helpers of the previous bot, to be reused by this one, by default None (create new ones).
+    snapshot : PoolSnapshot, optional
+        The snapshot of the pool data to search (in pipelined mode), by default None (the pool data of the manager).
+    snapshots : SnapshotChannel, optional
+        The channel the snapshot was taken from, through which the bot reports the stale pools it finds, by default
+        None (the bot updates them in the pool data of the manager).
 
     Returns
     -------
@@ -906,11 +1285,20 @@ def init_bot(mgr: Any) -> CarbonBot:
     db = QueryInterface(
         mgr=mgr,
         ConfigObj=mgr.cfg,
-        state=mgr.pool_data,
+        state=mgr.pool_data.snapshot() if snapshot is None else snapshot.pool_data,
         uniswap_v2_event_mappings=mgr.uniswap_v2_event_mappings,
         exchanges=mgr.exchanges,
     )
-    bot = CarbonBot(ConfigObj=mgr.cfg)
+    mgr.curve_cache.mark_dirty(mgr.pool_data.pop_dirty_cids() if snapshot is None else snapshot.dirty_cids)
+    bot = CarbonBot(
+        ConfigObj=mgr.cfg,
+        TxHelpersClass=tx_helpers,
+        curve_cache=mgr.curve_cache,
+        search_cache=mgr.search_cache,
+        warm_start=mgr.warm_start,
+        n_jobs=n_jobs,
+        snapshots=snapshots,
+    )
     bot.db = db
 
     assert isinstance(
@@ -1067,7 +1455,7 @@ def handle_subsequent_iterations(
         )
 
 
-def verify_state_changed(bot: CarbonBot, initial_state: List[Dict[str, Any]], mgr: Any):
+def verify_state_changed(bot: CarbonBot, initial_state: PoolStateSnapshot, mgr: Any):
     """
     Verifies that the state has changed.
 
@@ -1075,22 +1463,18 @@ def verify_state_changed(bot: CarbonBot, initial_state: List[Dict[str, Any]], mg
     ----------
     bot : CarbonBot
         The bot object.
-    initial_state : Dict[str, Any]
-        The initial state.
+    initial_state : PoolStateSnapshot
+        The snapshot of the pool data at the start of the iteration.
     mgr : Any
         The manager object.
 
     """
-    # Compare the initial state to the final state, and update the state if it has changed
-    final_state = mgr.pool_data.copy()
-    final_state_bancor_pol = [
-        final_state[i]
-        for i in range(len(final_state))
-        if final_state[i]["exchange_name"] == mgr.cfg.BANCOR_POL_NAME
-    ]
-    # assert bot.db.state == final_state, "\n *** bot failed to update state *** \n"
-    if initial_state != final_state_bancor_pol:
-        mgr.cfg.logger.debug("[events.utils.verify_state_changed] State has changed...")
+    # Compare the initial state to the final state
+    changed_pools = mgr.pool_data.snapshot().diff(initial_state)
+    if changed_pools:
+        mgr.cfg.logger.debug(
+            f"[events.utils.verify_state_changed] State has changed... {len(changed_pools)} pools changed"
+        )
     else:
         mgr.cfg.logger.warning(
             "[events.utils.verify_state_changed] State has not changed... This may indicate an error"
@@ -1113,6 +1497,35 @@ def handle_duplicates(mgr: Any):
     assert len(cids) == len(set(cids)), "duplicate cid's exist in the pool data"
 
 
+def apply_stale_pools(mgr: Any, channel: SnapshotChannel) -> Set[str]:
+    """
+    Updates the pool data of the manager with the on-chain state of the stale pools reported by the search stage.
+
+    Called by the ingestion stage (the only writer of the pool data) before it ingests the next block. A pool which
+    was updated at or after the block of a report is left as it is, since its state is at least as recent.
+
+    Parameters
+    ----------
+    mgr : Any
+        The manager object.
+    channel : SnapshotChannel
+        The channel through which the stale pools were reported.
+
+    Returns
+    -------
+    Set[str]
+        The cids of the pools which were updated.
+    """
+    updated_cids = set()
+    for block_number, diffs in channel.pop_stale():
+        diffs = {
+            cid: diff for cid, diff in diffs.items()
+            if (pool_info := mgr.pool_data.get(cid)) is not None and (pool_info.get("last_updated_block") or 0) < block_number
+        }
+        updated_cids |= apply_pool_state_diffs(mgr, diffs, block_number)
+    return updated_cids
+
+
 def get_pools_for_exchange(exchange: str, mgr: Any) -> [Any]:
     """
     Handles the initial iteration of the bot.
@@ -1242,6 +1655,8 @@ def get_latest_events(
     start_block: int,
     cache_latest_only: bool,
     logging_path: str,
+    address_scoped_logs: bool = False,
+    fetched_events: Optional[List[List[Any]]] = None,
 ) -> List[Any]:
     """
     Gets the latest events.
@@ -1260,6 +1675,12 @@ def get_latest_events(
         Whether to cache the latest events only.
     logging_path : str
         The logging path.
+    address_scoped_logs : bool
+        Whether to fetch the events with address-scoped log filters (see `get_log_filters`) rather than with
+        an event filter per event type.
+    fetched_events : Optional[List[List[Any]]]
+        The events of the block range which have already been received (e.g. pushed by an `EventSubscription`),
+        in which case they are not fetched.
 
     Returns
     -------
@@ -1279,20 +1700,35 @@ def get_latest_events(
             f"[events.utils.get_latest_events] tenderly_events: {len(tenderly_events)}"
         )
 
-    # Get all event filters, events, and flatten them
-    events = [
-        complex_handler(event)
-        for event in [
-            complex_handler(event)
-            for event in get_all_events(
-                n_jobs,
-                get_event_filters(n_jobs, mgr, start_block, current_block),
-            )
-        ]
-    ]
+    # Load the Bancor POL events cached on disk (only on the first call)
+    cached_pol_events = load_bancor_pol_events(mgr, current_block)
+
+    # Get all event filters and events
+    if fetched_events is not None:
+        all_events = fetched_events
+    elif address_scoped_logs:
+        all_events = get_all_logs(
+            n_jobs, mgr.web3, *get_log_filters(mgr, start_block, current_block)
+        )
+    else:
+        all_events = get_all_events(
+            n_jobs,
+            get_event_filters(n_jobs, mgr, start_block, current_block),
+        )
 
-    # Filter out the latest events per pool, save them to disk, and update the pools
-    latest_events = filter_latest_events(mgr, events)
+    # Convert each event once, record the new Bancor POL events and keep the latest event per pool
+    latest = LatestEvents(mgr, pool_types=mgr.event_pool_types)
+    pol_events = []
+    for event in iter_event_records(all_events):
+        if event["event"] in BANCOR_POL_EVENTS:
+            pol_events.append(event)
+        latest.add(event)
+    update_bancor_pol_events(mgr, [pol_events], current_block)
+
+    # Apply the cached Bancor POL events along with the new ones
+    for event in cached_pol_events:
+        latest.add(event)
+    latest_events = latest.values()
     if mgr.tenderly_fork_id:
         if tenderly_events:
             latest_tenderly_events = filter_latest_events(mgr, tenderly_events)
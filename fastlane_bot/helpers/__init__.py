@@ -1,4 +1,4 @@
-from .tradeinstruction import TradeInstruction 
+from .tradeinstruction import TradeInstruction, RawTx
 from .routehandler import TxRouteHandler, RouteStruct
 from .submithandler import submit_transaction_tenderly
 from .txhelpers import TxHelpers
@@ -1,5 +1,4 @@
 from typing import List
-from json import loads, dumps
 from fastlane_bot.config import Config
 from fastlane_bot.helpers import TradeInstruction
 
@@ -24,8 +23,8 @@ def split_carbon_trades(cfg: Config, trade_instructions: List[TradeInstruction])
 
         carbon_exchanges = {}
 
-        for tx in loads(trade_instruction.raw_txs.replace("'", '"').replace('Decimal("', '').replace('")', '')):
-            pool = trade_instruction.db.get_pool(cid=str(tx["cid"]).split("-")[0])
+        for tx in trade_instruction.raw_txs:
+            pool = trade_instruction.db.get_pool(cid=str(tx.cid).split("-")[0])
 
             if cfg.NATIVE_GAS_TOKEN_ADDRESS in pool.get_tokens:
                 pool_type = cfg.NATIVE_GAS_TOKEN_ADDRESS
@@ -34,8 +33,10 @@ def split_carbon_trades(cfg: Config, trade_instructions: List[TradeInstruction])
             else:
                 pool_type = ''
 
-            tx["tknin"] = _get_token_address(cfg, pool_type, trade_instruction.tknin)
-            tx["tknout"] = _get_token_address(cfg, pool_type, trade_instruction.tknout)
+            tx = tx._replace(
+                tknin=_get_token_address(cfg, pool_type, trade_instruction.tknin),
+                tknout=_get_token_address(cfg, pool_type, trade_instruction.tknout),
+            )
 
             exchange_id = pool.exchange_name + pool_type
             if exchange_id in carbon_exchanges:
@@ -48,14 +49,14 @@ def split_carbon_trades(cfg: Config, trade_instructions: List[TradeInstruction])
                 TradeInstruction(
                     ConfigObj=cfg,
                     db=trade_instruction.db,
-                    cid=txs[0]["cid"],
-                    tknin=txs[0]["tknin"],
-                    tknout=txs[0]["tknout"],
-                    amtin=sum([tx["amtin"] for tx in txs]),
-                    amtout=sum([tx["amtout"] for tx in txs]),
-                    _amtin_wei=sum([tx["_amtin_wei"] for tx in txs]),
-                    _amtout_wei=sum([tx["_amtout_wei"] for tx in txs]),
-                    raw_txs=dumps(txs)
+                    cid=txs[0].cid,
+                    tknin=txs[0].tknin,
+                    tknout=txs[0].tknout,
+                    amtin=sum([tx.amtin for tx in txs]),
+                    amtout=sum([tx.amtout for tx in txs]),
+                    _amtin_wei=sum([tx.amtin_wei for tx in txs]),
+                    _amtout_wei=sum([tx.amtout_wei for tx in txs]),
+                    raw_txs=txs
                 )
             )
 
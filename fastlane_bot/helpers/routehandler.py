@@ -4,8 +4,8 @@ Route handler for the Fastlane project.
 (c) Copyright Bprotocol foundation 2023.
 Licensed under MIT
 """
-__VERSION__ = "1.1.1"
-__DATE__ = "02/May/2023"
+__VERSION__ = "1.2"
+__DATE__ = "26/Mar/2024"
 
 import decimal
 import math
@@ -16,7 +16,8 @@ from typing import List, Any, Dict, Tuple
 import eth_abi
 import pandas as pd
 
-from .tradeinstruction import TradeInstruction
+from .tradeinstruction import TradeInstruction, RawTx
+from . import weimath
 from ..events.interface import Pool
 from ..tools.cpc import T
 from fastlane_bot.config.constants import AGNI_V3_NAME, BUTTER_V3_NAME, CLEOPATRA_V3_NAME, PANCAKESWAP_V3_NAME, ETHEREUM
@@ -99,11 +100,21 @@ class TxRouteHandler:
         The trade instructions. Formatted output from the `CPCOptimizer` class.
     trade_instructions_df: pd.DataFrame
         The trade instructions as a dataframe. Formatted output from the `CPCOptimizer` class.
+    math_mode: str
+        The arithmetic used to simulate the trades: MATH_WEI (default) uses the integer swap math of the
+        contracts, MATH_DECIMAL the Decimal approximations, and MATH_CROSS_CHECK uses MATH_WEI but also
+        runs MATH_DECIMAL and logs a warning when the results differ.
     """
     __VERSION__ = __VERSION__
     __DATE__ = __DATE__
 
+    MATH_WEI = "wei"
+    MATH_DECIMAL = "decimal"
+    MATH_CROSS_CHECK = "cross_check"
+    CROSS_CHECK_RTOL = Decimal("1e-6")
+
     trade_instructions: List[TradeInstruction]
+    math_mode: str = MATH_WEI
 
     def __post_init__(self):
         self.contains_carbon = True
@@ -121,18 +132,17 @@ class TxRouteHandler:
     ) -> List[TradeInstruction]:
         for i in range(len(agg_trade_instructions)):
             instr = agg_trade_instructions[i]
-            if instr.raw_txs == "[]":
+            if not instr.raw_txs:
                 instr.custom_data = "0x"
                 agg_trade_instructions[i] = instr
             else:
-                tradeInfo = eval(instr.raw_txs)
                 tradeActions = []
-                for trade in tradeInfo:
+                for trade in instr.raw_txs:
                     tradeActions += [
                         {
-                            "strategyId": int(trade["strategy_id"]),
+                            "strategyId": int(trade.strategy_id),
                             "amount": int(
-                                trade["_amtin_wei"]
+                                trade.amtin_wei
                             ),
                         }
                     ]
@@ -557,7 +567,7 @@ class TxRouteHandler:
                                                                  amtin=trade_before.amtin, amtout=trade.amtout,
                                                                  tknin=trade_before.tknin_address,
                                                                  tknout=trade.tknout_address,
-                                                                 pair_sorting="", raw_txs="[]", db=trade.db)
+                                                                 pair_sorting="", raw_txs=[], db=trade.db)
                         new_trade_instruction.tknout_is_native = trade.tknout_is_native
                         new_trade_instruction.tknout_is_wrapped = trade.tknout_is_wrapped
                         calculated_trade_instructions[idx - 1] = new_trade_instruction
@@ -594,7 +604,6 @@ class TxRouteHandler:
 
         carbons = df[df['carbon']].copy()
         nocarbons = df[~df['carbon']].copy()
-        nocarbons["raw_txs"] = str([])
         nocarbons["ConfigObj"] = config_object
         nocarbons["db"] = db
 
@@ -615,7 +624,7 @@ class TxRouteHandler:
                 "tknout": newdf.tknout.values[0],
                 "amtout": newdf.amtout.sum(),
                 "_amtout_wei": newdf._amtout_wei.sum(),
-                "raw_txs": str(newdf.to_dict(orient="records")),
+                "raw_txs": [RawTx.from_dict(tx) for tx in newdf.to_dict(orient="records")],
                 "ConfigObj": config_object,
                 "db": db,
             }
@@ -1103,6 +1112,32 @@ class TxRouteHandler:
         )
         return amt_in, result
 
+    def _calc_carbon_output_wei(self, curve: Pool, tkn_in: str, amount_in: int) -> Tuple[int, int]:
+        """
+        Integer version of `_calc_carbon_output`, working on wei amounts.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The amount in and the amount out, in wei.
+        """
+        assert tkn_in != self.ConfigObj.NATIVE_GAS_TOKEN_ADDRESS, "[routehandler.py _calc_carbon_output_wei] Function does not expect native gas token as input."
+        tkn0_address, tkn1_address = curve.pair_name.split("/")
+        tkn0_address = self.native_gas_token_to_wrapped(tkn=tkn0_address)
+        tkn1_address = self.native_gas_token_to_wrapped(tkn=tkn1_address)
+        assert tkn_in == tkn0_address or tkn_in == tkn1_address, f"Token in: {tkn_in} does not match tokens in Carbon Curve: {tkn0_address} & {tkn1_address}"
+
+        y, z, A, B = (
+            (curve.y_0, curve.z_0, curve.A_0, curve.B_0)
+            if tkn_in == tkn1_address
+            else (curve.y_1, curve.z_1, curve.A_1, curve.B_1)
+        )
+        y, z = weimath.to_int(y), weimath.to_int(z)
+        assert y > 0, f"Trade incoming to empty Carbon curve: {curve}"
+        return weimath.carbon_output(
+            amount_in=amount_in, y=y, z=z, A=A or 0, B=B, fee=weimath.fee_ppm(curve.fee_float)
+        )
+
     @staticmethod
     def _single_trade_result_constant_product(
             tokens_in, token0_amt, token1_amt, fee
@@ -1230,6 +1265,7 @@ class TxRouteHandler:
             assert tkn0_address != tkn1_address, f"[_solve_trade_output] tkn0_address == tkn_1_address {tkn0_address}, {tkn1_address}"
 
         else:
+            tkn0_address = tkn1_address = tkn0_decimals = tkn1_decimals = None
             tokens = curve.get_tokens
             assert trade.tknin_address in tokens, f"[_solve_trade_output] trade.tknin_address {trade.tknin_address} not in Balancer curve tokens: {tokens}"
             assert trade.tknout_address in tokens, f"[_solve_trade_output] trade.tknout_address {trade.tknout_address} not in Balancer curve tokens: {tokens}"
@@ -1239,6 +1275,84 @@ class TxRouteHandler:
 
         amount_in = TradeInstruction._quantize(amount_in, tkn_in_decimals)
 
+        if curve.exchange_name in self.ConfigObj.SOLIDLY_V2_FORKS and curve.pool_type in "stable":
+            raise ExchangeNotSupportedError(
+                f"[routerhandler.py _solve_trade_output] Solidly V2 stable pools are not yet supported")
+
+        args = (curve, trade, amount_in, tkn0_address, tkn1_address, tkn0_decimals, tkn1_decimals, tkn_in_decimals, tkn_out_decimals)
+        if self.math_mode == self.MATH_DECIMAL:
+            return self._solve_trade_output_decimal(*args)
+
+        result = self._solve_trade_output_wei(*args)
+        if self.math_mode == self.MATH_CROSS_CHECK:
+            check = self._solve_trade_output_decimal(*args)
+            if any(abs(r - c) > self.CROSS_CHECK_RTOL * abs(c) for r, c in zip(result[:2], check[:2])):
+                self.ConfigObj.logger.warning(
+                    f"[routehandler.py _solve_trade_output] Wei and Decimal results differ on {curve.exchange_name} pool {curve.cid}: "
+                    f"amount_in {result[0]} vs {check[0]}, amount_out {result[1]} vs {check[1]}"
+                )
+        return result
+
+    def _solve_trade_output_wei(
+            self, curve: Pool, trade: TradeInstruction, amount_in: Decimal, tkn0_address: str, tkn1_address: str,
+            tkn0_decimals: int, tkn1_decimals: int, tkn_in_decimals: int, tkn_out_decimals: int
+    ) -> Tuple[Decimal, Decimal, int, int]:
+        """
+        Solves the trade output using the integer swap math of the contracts (see `weimath`).
+
+        Balancer trades are solved in Decimal and converted, as the weighted math (LogExpMath) is not ported.
+        """
+        amount_in_wei = TradeInstruction._convert_to_wei(amount_in, tkn_in_decimals)
+
+        if curve.exchange_name in self.ConfigObj.UNI_V3_FORKS:
+            amount_out_wei = weimath.uniswap_v3_output(
+                amount_in=amount_in_wei,
+                liquidity=weimath.to_int(curve.liquidity),
+                sqrt_price_q96=weimath.to_int(curve.sqrt_price_q96),
+                fee=weimath.fee_ppm(curve.fee_float),
+                zero_for_one=trade.tknin_address == tkn0_address,
+            )
+        elif curve.exchange_name in self.ConfigObj.CARBON_V1_FORKS or curve.exchange_name == self.ConfigObj.BANCOR_POL_NAME:
+            amount_in_wei, amount_out_wei = self._calc_carbon_output_wei(
+                curve=curve, tkn_in=trade.tknin_address, amount_in=amount_in_wei
+            )
+        elif curve.exchange_name == self.ConfigObj.BALANCER_NAME:
+            amount_out = self._calc_balancer_output(curve=curve, tkn_in=trade.tknin_address,
+                                                    tkn_out=trade.tknout_address, amount_in=amount_in)
+            amount_out_wei = TradeInstruction._convert_to_wei(
+                TradeInstruction._quantize(amount_out, tkn_out_decimals), tkn_out_decimals
+            )
+        else:
+            reserve_in, reserve_out = (
+                (curve.tkn0_balance, curve.tkn1_balance)
+                if trade.tknin_address == tkn0_address
+                else (curve.tkn1_balance, curve.tkn0_balance)
+            )
+            # Bancor takes the fee from the output, the other constant product pools from the input
+            constant_product_output = (
+                weimath.bancor_output
+                if curve.exchange_name in [self.ConfigObj.BANCOR_V2_NAME, self.ConfigObj.BANCOR_V3_NAME]
+                else weimath.constant_product_output
+            )
+            amount_out_wei = constant_product_output(
+                amount_in=amount_in_wei,
+                reserve_in=weimath.to_int(reserve_in),
+                reserve_out=weimath.to_int(reserve_out),
+                fee=weimath.fee_ppm(curve.fee_float),
+            )
+
+        amount_out_wei = amount_out_wei * 9999 // 10000
+        amount_in = Decimal(amount_in_wei).scaleb(-tkn_in_decimals)
+        amount_out = Decimal(amount_out_wei).scaleb(-tkn_out_decimals)
+        return amount_in, amount_out, amount_in_wei, amount_out_wei
+
+    def _solve_trade_output_decimal(
+            self, curve: Pool, trade: TradeInstruction, amount_in: Decimal, tkn0_address: str, tkn1_address: str,
+            tkn0_decimals: int, tkn1_decimals: int, tkn_in_decimals: int, tkn_out_decimals: int
+    ) -> Tuple[Decimal, Decimal, int, int]:
+        """
+        Solves the trade output using the Decimal approximations of the swap math.
+        """
         if curve.exchange_name in self.ConfigObj.UNI_V3_FORKS:
             amount_out = self._calc_uniswap_v3_output(
                 tkn_in=trade.tknin_address,
@@ -1260,10 +1374,6 @@ class TxRouteHandler:
         elif curve.exchange_name == self.ConfigObj.BALANCER_NAME:
             amount_out = self._calc_balancer_output(curve=curve, tkn_in=trade.tknin_address,
                                                     tkn_out=trade.tknout_address, amount_in=amount_in)
-
-        elif curve.exchange_name in self.ConfigObj.SOLIDLY_V2_FORKS and curve.pool_type in "stable":
-            raise ExchangeNotSupportedError(
-                f"[routerhandler.py _solve_trade_output] Solidly V2 stable pools are not yet supported")
         else:
             tkn0_amt, tkn1_amt = (
                 (curve.tkn0_balance, curve.tkn1_balance)
@@ -1330,8 +1440,8 @@ class TxRouteHandler:
             if trade.amtin <= 0:
                 trade_instructions.pop(idx)
                 continue
-            if trade.raw_txs != "[]":
-                data = eval(trade.raw_txs)
+            if trade.raw_txs:
+                data = trade.raw_txs
                 total_out = 0
                 total_in = 0
                 total_in_wei = 0
@@ -1340,24 +1450,24 @@ class TxRouteHandler:
 
                 remaining_tkn_in = Decimal(str(next_amount_in))
 
+                percents_in = []
                 for tx in data:
                     try:
-                        tx["percent_in"] = Decimal(str(tx["amtin"])) / Decimal(str(expected_in))
+                        percents_in.append(Decimal(str(tx.amtin)) / Decimal(str(expected_in)))
                     except decimal.InvalidOperation:
-                        tx["percent_in"] = 0
-                        # total_percent += tx["amtin"]/expected_in
+                        percents_in.append(0)
+                        # total_percent += tx.amtin/expected_in
                         self.ConfigObj.logger.warning(
-                            f"[calculate_trade_outputs] Invalid operation: {tx['amtin']}/{expected_in}")
+                            f"[calculate_trade_outputs] Invalid operation: {tx.amtin}/{expected_in}")
 
                 last_tx = len(data) - 1
 
                 for _idx, tx in enumerate(data):
-                    cid = tx["cid"].split("-")[0]
+                    cid = tx.cid.split("-")[0]
                     curve = trade_instructions[idx].db.get_pool(cid=cid)
                     strategy_id = curve.strategy_id
-                    tknin_address = tx["tknin"]
 
-                    _next_amt_in = Decimal(str(next_amount_in)) * tx["percent_in"]
+                    _next_amt_in = Decimal(str(next_amount_in)) * percents_in[_idx]
                     if _next_amt_in > remaining_tkn_in:
                         _next_amt_in = remaining_tkn_in
 
@@ -1379,25 +1489,26 @@ class TxRouteHandler:
 
                     if amount_in_wei <= 0:
                         continue
-                    raw_txs = {
-                        "cid": cid,
-                        "strategy_id": strategy_id,
-                        "tknin": tx["tknin"],
-                        "amtin": amount_in,
-                        "_amtin_wei": amount_in_wei,
-                        "tknout": tx["tknout"],
-                        "amtout": amount_out,
-                        "_amtout_wei": amount_out_wei,
-                    }
-                    raw_txs_lst.append(raw_txs)
+                    raw_txs_lst.append(
+                        RawTx(
+                            cid=cid,
+                            strategy_id=strategy_id,
+                            tknin=tx.tknin,
+                            amtin=amount_in,
+                            amtin_wei=amount_in_wei,
+                            tknout=tx.tknout,
+                            amtout=amount_out,
+                            amtout_wei=amount_out_wei,
+                        )
+                    )
 
                     remaining_tkn_in = TradeInstruction._quantize(amount=remaining_tkn_in,
                                                                   decimals=trade.tknin_decimals)
                     if _idx == last_tx and remaining_tkn_in > 0:
 
                         for __idx, _tx in enumerate(raw_txs_lst):
-                            adjusted_next_amt_in = _tx["amtin"] + remaining_tkn_in
-                            _curve = trade_instructions[idx].db.get_pool(cid=_tx["cid"])
+                            adjusted_next_amt_in = _tx.amtin + remaining_tkn_in
+                            _curve = trade_instructions[idx].db.get_pool(cid=_tx.cid)
                             (
                                 _amount_in,
                                 _amount_out,
@@ -1407,26 +1518,21 @@ class TxRouteHandler:
                                 curve=_curve, trade=trade, amount_in=adjusted_next_amt_in
                             )
 
-                            test_remaining = remaining_tkn_in - _amount_in + _tx["amtin"]
+                            test_remaining = remaining_tkn_in - _amount_in + _tx.amtin
                             remaining_tkn_in = TradeInstruction._quantize(amount=remaining_tkn_in,
                                                                           decimals=trade.tknin_decimals)
                             if test_remaining < 0:
                                 continue
 
-                            remaining_tkn_in = remaining_tkn_in + _tx["amtin"] - _amount_in
-
-                            _raw_txs = {
-                                "cid": _tx["cid"],
-                                "strategy_id": _curve.strategy_id,
-                                "tknin": _tx["tknin"],
-                                "amtin": _amount_in,
-                                "_amtin_wei": _amount_in_wei,
-                                "tknout": _tx["tknout"],
-                                "amtout": _amount_out,
-                                "_amtout_wei": _amount_out_wei,
-                            }
+                            remaining_tkn_in = remaining_tkn_in + _tx.amtin - _amount_in
 
-                            raw_txs_lst[__idx] = _raw_txs
+                            raw_txs_lst[__idx] = _tx._replace(
+                                strategy_id=_curve.strategy_id,
+                                amtin=_amount_in,
+                                amtin_wei=_amount_in_wei,
+                                amtout=_amount_out,
+                                amtout_wei=_amount_out_wei,
+                            )
 
                             if remaining_tkn_in == 0:
                                 break
@@ -1436,16 +1542,16 @@ class TxRouteHandler:
                 _total_out = 0
                 _total_out_wei = 0
                 for raw_tx in raw_txs_lst:
-                    _total_in += raw_tx["amtin"]
-                    _total_in_wei += raw_tx["_amtin_wei"]
-                    _total_out += raw_tx["amtout"]
-                    _total_out_wei += raw_tx["_amtout_wei"]
+                    _total_in += raw_tx.amtin
+                    _total_in_wei += raw_tx.amtin_wei
+                    _total_out += raw_tx.amtout
+                    _total_out_wei += raw_tx.amtout_wei
 
                 trade_instructions[idx].amtin = _total_in
                 trade_instructions[idx].amtout = _total_out
                 trade_instructions[idx]._amtin_wei = _total_in_wei
                 trade_instructions[idx]._amtout_wei = _total_out_wei
-                trade_instructions[idx].raw_txs = str(raw_txs_lst)
+                trade_instructions[idx].raw_txs = raw_txs_lst
                 amount_out = _total_out
 
             else:
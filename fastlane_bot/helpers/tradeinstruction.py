@@ -4,15 +4,87 @@ Helpers for the Fastlane project.
 (c) Copyright Bprotocol foundation 2023.
 Licensed under MIT
 """
-__VERSION__ = "1.2"
-__DATE__="02/May/2023"
+__VERSION__ = "1.3"
+__DATE__="26/Mar/2024"
 
+import json
 from dataclasses import dataclass
-from typing import Union, Any
+from typing import Union, Any, Dict, List, NamedTuple, Optional
 from _decimal import Decimal
 from fastlane_bot.events.interface import Token, Pool
 
 
+class RawTx(NamedTuple):
+    """
+    A single sub-trade of an aggregated (Carbon) trade instruction.
+
+    Parameters
+    ----------
+    cid: str
+        The pool unique ID (for Carbon curves possibly with the "-0" or "-1" suffix)
+    tknin: str
+        The input token address
+    amtin: int or Decimal or float
+        The input amount
+    tknout: str
+        The output token address
+    amtout: int or Decimal or float
+        The output amount
+    amtin_wei: int
+        The input amount in wei
+    amtout_wei: int
+        The output amount in wei
+    strategy_id: int
+        The strategy ID (None until the trade outputs are calculated)
+    """
+    cid: str
+    tknin: str
+    amtin: Union[int, Decimal, float]
+    tknout: str
+    amtout: Union[int, Decimal, float]
+    amtin_wei: int
+    amtout_wei: int
+    strategy_id: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RawTx":
+        """
+        Creates a record from a dict, accepting the `_amtin_wei` and `_amtout_wei` keys of the trade instruction
+        dicts; other keys (e.g. `pair_sorting`) are ignored.
+        """
+        return cls(
+            cid=d["cid"],
+            tknin=d["tknin"],
+            amtin=d["amtin"],
+            tknout=d["tknout"],
+            amtout=d["amtout"],
+            amtin_wei=d["amtin_wei"] if "amtin_wei" in d else d["_amtin_wei"],
+            amtout_wei=d["amtout_wei"] if "amtout_wei" in d else d["_amtout_wei"],
+            strategy_id=d.get("strategy_id"),
+        )
+
+
+def parse_raw_txs(raw_txs: Union[None, str, List[Union[RawTx, Dict[str, Any]]]]) -> List[RawTx]:
+    """
+    Converts the raw_txs argument of a TradeInstruction into a list of RawTx records.
+
+    Parameters
+    ----------
+    raw_txs: None, str or list
+        None, a JSON list of dicts, or a list of dicts and/or RawTx records
+
+    Returns
+    -------
+    List[RawTx]
+        The records.
+    """
+    if raw_txs is None:
+        return []
+    if isinstance(raw_txs, str):
+        raw_txs = json.loads(raw_txs)
+    return [tx if isinstance(tx, RawTx) else RawTx.from_dict(tx) for tx in raw_txs]
+
+
 @dataclass
 class TradeInstruction:
     """
@@ -35,7 +107,9 @@ class TradeInstruction:
     cid_tkn: str
         If the curve is a Carbon curve, the cid will have a "-1" or "-0" to denote which side of the strategy the trade is on.
         This parameter is used to remove the "-1" or "-0" from the cid.
-    raw_txs: str
+    raw_txs: List[RawTx]
+        The sub-trades of an aggregated Carbon trade (empty otherwise); a JSON string or a list of dicts is
+        converted into RawTx records
     pair_sorting: str
 
     Attributes
@@ -74,7 +148,7 @@ class TradeInstruction:
     amtout: Union[int, Decimal, float]
     strategy_id: int = None
     pair_sorting: str = None
-    raw_txs: str = None
+    raw_txs: List[RawTx] = None
     custom_data: str = ''
     db: any = None
     tknin_dec_override: int = None   # for testing to not go to the database
@@ -156,8 +230,7 @@ class TradeInstruction:
         self._amtout_quantized = self._quantize(
             self._amtout_decimals, self._tknout_decimals
         )
-        if self.raw_txs is None:
-            self.raw_txs = "[]"
+        self.raw_txs = parse_raw_txs(self.raw_txs)
         if self.pair_sorting is None:
             self.pair_sorting = ""
         if self.exchange_override is None:
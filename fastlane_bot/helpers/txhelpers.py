@@ -4,11 +4,12 @@ Transaction handlers for the Fastlane project.
 (c) Copyright Bprotocol foundation 2023.
 Licensed under MIT
 """
-__VERSION__ = "1.0"
-__DATE__ = "01/May/2023"
+__VERSION__ = "1.1"
+__DATE__ = "26/Mar/2024"
 
 import asyncio
 import nest_asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
 from _decimal import Decimal
 
 # import itertools
@@ -34,6 +35,29 @@ from fastlane_bot.utils import num_format, log_format, num_format_float, int_pre
 
 nest_asyncio.apply()
 
+
+@dataclass
+class TxContext:
+    """
+    The block-scoped data needed to build a transaction.
+
+    Attributes
+    ----------
+    block_number: int
+        the block for which the context was fetched (the latest block at the time)
+    base_fee: int
+        the base fee of the pending block
+    max_priority_fee: int
+        the priority fee to use, including the DEFAULT_GAS_PRICE_OFFSET (0 on networks without priority fees)
+    nonce: int
+        the nonce to use for the next transaction
+    """
+    block_number: int
+    base_fee: int
+    max_priority_fee: int
+    nonce: int
+
+
 @dataclass
 class TxHelpers:
     """
@@ -68,27 +92,76 @@ class TxHelpers:
         self.alchemy_api_url = self.ConfigObj.RPC_URL
         self.nonce = self.get_nonce()
 
-    def _get_transaction_info(self) -> (int, int, int, int):
-        # Get current base fee for pending block
-        current_gas_price = self.web3.eth.get_block("pending").get("baseFeePerGas")
+        # The transaction context is fetched at most once per block; see `prefetch_transaction_context`.
+        # The executor runs the context fetch and its four node calls, or the gas estimate and access list calls.
+        self._executor = ThreadPoolExecutor(max_workers=5)
+        self._tx_context_block = None
+        self._tx_context_future: Optional[Future] = None
 
+    def _get_max_priority_fee(self) -> int:
         # Get the current recommended priority fee from Alchemy, and increase it by our offset
-        current_max_priority_gas = (
-            int(
-                self.get_max_priority_fee_per_gas_alchemy()
-                * self.ConfigObj.DEFAULT_GAS_PRICE_OFFSET
-            )
-            if self.ConfigObj.NETWORK in ["ethereum", "coinbase_base"]
-            else 0
+        if self.ConfigObj.NETWORK in ["ethereum", "coinbase_base"]:
+            return int(self.get_max_priority_fee_per_gas_alchemy() * self.ConfigObj.DEFAULT_GAS_PRICE_OFFSET)
+        return 0
+
+    def fetch_transaction_context(self) -> TxContext:
+        """
+        Fetches the transaction context from the node, making all calls concurrently.
+
+        The nonce is the larger of the nonce reported by the node and the locally tracked one, which
+        is incremented whenever a transaction is submitted.
+        """
+        pending_block = self._executor.submit(self.web3.eth.get_block, "pending")
+        max_priority_fee = self._executor.submit(self._get_max_priority_fee)
+        latest_block = self._executor.submit(self.web3.eth.get_block, "latest")
+        nonce = self._executor.submit(self.get_nonce)
+        self.nonce = max(self.nonce, nonce.result())
+        return TxContext(
+            block_number=int(latest_block.result()["number"]),
+            base_fee=pending_block.result().get("baseFeePerGas"),
+            max_priority_fee=max_priority_fee.result(),
+            nonce=self.nonce,
         )
 
-        # Get current block number
-        block_number = int(self.web3.eth.get_block("latest")["number"])
+    def prefetch_transaction_context(self, block_number: int):
+        """
+        Starts fetching the transaction context in the background, unless it was already fetched for this block.
 
-        # Get current nonce for our account
-        nonce = self.get_nonce()
+        This is meant to be called by the main loop whenever it sees a new block, so that the context is
+        ready (or in flight) by the time an arbitrage opportunity is found.
 
-        return current_gas_price, current_max_priority_gas, block_number, nonce
+        Parameters
+        ----------
+        block_number: int
+            the block number seen by the caller; the context is reused until this changes
+        """
+        if block_number != self._tx_context_block or self._tx_context_future is None:
+            self._tx_context_block = block_number
+            self._tx_context_future = self._executor.submit(self.fetch_transaction_context)
+
+    def get_transaction_context(self) -> TxContext:
+        """
+        Returns the prefetched transaction context, or fetches it now if there is none (or prefetching failed).
+        """
+        future = self._tx_context_future
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                self._tx_context_future = None
+                self.ConfigObj.logger.debug(
+                    f"[helpers.txhelpers.get_transaction_context] Prefetching the transaction context failed: {e}"
+                )
+        return self.fetch_transaction_context()
+
+    def _on_transaction_submitted(self):
+        # The nonce was used; make sure that it is not used again even if the node does not reflect it yet
+        self.nonce += 1
+        self._tx_context_future = None
+
+    def _get_transaction_info(self) -> (int, int, int, int):
+        context = self.get_transaction_context()
+        return context.base_fee, context.max_priority_fee, context.block_number, context.nonce
 
     def _get_prices_info(
             self,
@@ -221,6 +294,8 @@ class TxHelpers:
                 tx_hash = self.submit_regular_transaction(signed_arb_tx)
             else:
                 tx_hash = self.submit_private_transaction(signed_arb_tx, block_number)
+            if tx_hash is not None:
+                self._on_transaction_submitted()
             self.ConfigObj.logger.info(
                 f"[helpers.txhelpers.validate_and_submit_transaction] Arbitrage executed, tx hash: {tx_hash}"
             )
@@ -234,38 +309,27 @@ class TxHelpers:
             )
             return None
 
-    def get_access_list(self, transaction_data, expected_gas, eth_input=None):
-        expected_gas = hex(expected_gas)
-        json_data = (
-            {
-                "id": 1,
-                "jsonrpc": "2.0",
-                "method": "eth_createAccessList",
-                "params": [
-                    {
-                        "from": self.wallet_address,
-                        "to": self.arb_contract.address,
-                        "gas": expected_gas,
-                        "data": transaction_data,
-                    }
-                ],
-            }
-            if eth_input is None
-            else {
-                "id": 1,
-                "jsonrpc": "2.0",
-                "method": "eth_createAccessList",
-                "params": [
-                    {
-                        "from": self.wallet_address,
-                        "to": self.arb_contract.address,
-                        "gas": expected_gas,
-                        "value": hex(eth_input),
-                        "data": transaction_data,
-                    }
-                ],
-            }
-        )
+    def get_access_list(self, transaction_data, expected_gas=None, eth_input=None):
+        """
+        Returns the access list of the transaction, or None if it cannot be created.
+
+        expected_gas: the gas limit of the call (default: None, i.e. the node's default, so that this call does not need to wait for the gas estimate)
+        """
+        tx_params = {
+            "from": self.wallet_address,
+            "to": self.arb_contract.address,
+            "data": transaction_data,
+        }
+        if expected_gas is not None:
+            tx_params["gas"] = hex(expected_gas)
+        if eth_input is not None:
+            tx_params["value"] = hex(eth_input)
+        json_data = {
+            "id": 1,
+            "jsonrpc": "2.0",
+            "method": "eth_createAccessList",
+            "params": [tx_params],
+        }
         response = requests.post(self.alchemy_api_url, json=json_data)
         if "failed to apply transaction" in response.text:
             return None
@@ -385,6 +449,13 @@ class TxHelpers:
             transaction["gas"] = self.ConfigObj.DEFAULT_GAS
             return transaction
 
+        # The access list does not depend on the gas estimate, so both are requested concurrently
+        use_access_list = access_list and self.ConfigObj.NETWORK_NAME in "ethereum"
+        if use_access_list:
+            access_list_future = self._executor.submit(
+                self.get_access_list, transaction_data=transaction["data"]
+            )
+
         try:
             estimated_gas = int(
                     self.web3.eth.estimate_gas(transaction=transaction)
@@ -398,10 +469,8 @@ class TxHelpers:
             )
             return None
         try:
-            if access_list and self.ConfigObj.NETWORK_NAME in "ethereum":
-                access_list = self.get_access_list(
-                    transaction_data=transaction["data"], expected_gas=estimated_gas
-                )
+            if use_access_list:
+                access_list = access_list_future.result()
 
                 if access_list is not None:
                     transaction_after = transaction
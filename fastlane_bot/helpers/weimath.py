@@ -0,0 +1,185 @@
+"""
+Integer (wei) implementations of the swap math used in route simulation.
+
+The functions work on token amounts in wei and mirror the integer arithmetic and rounding
+of the respective contracts, so that their results match the on-chain results exactly:
+
+- constant product pools: UniswapV2Library.getAmountOut (the fee expressed in ppm, taken from the input)
+- Bancor V2 and V3: the converter / pool collection target amount, with the fee taken from the output
+- Uniswap V3 and forks: SwapMath.computeSwapStep within the current tick (SqrtPriceMath)
+- Carbon and forks: Strategies._calculateTradeTargetAmount / _calculateTradeSourceAmount
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+__VERSION__ = "1.1"
+__DATE__ = "26/Mar/2024"
+
+from decimal import Decimal
+from typing import Any, Tuple
+
+PPM = 10 ** 6
+Q96 = 2 ** 96
+MAX_UINT256 = 2 ** 256 - 1
+CARBON_ONE = 2 ** 48
+
+
+def to_int(value: Any) -> int:
+    """
+    Converts a pool value (int, Decimal, float or numeric string) to an int.
+    """
+    if isinstance(value, int):
+        return value
+    return int(Decimal(str(value)))
+
+
+def fee_ppm(fee_float: Any) -> int:
+    """
+    Converts a fee given as a fraction (e.g. 0.003) to parts per million (e.g. 3000).
+    """
+    return int((Decimal(str(fee_float)) * PPM).to_integral_value())
+
+
+def mul_div_floor(a: int, b: int, c: int) -> int:
+    return a * b // c
+
+
+def mul_div_ceil(a: int, b: int, c: int) -> int:
+    return -(-a * b // c)
+
+
+def constant_product_output(amount_in: int, reserve_in: int, reserve_out: int, fee: int) -> int:
+    """
+    The output of a constant product trade.
+
+    :param amount_in: the input amount in wei
+    :param reserve_in: the pool balance of the source token in wei
+    :param reserve_out: the pool balance of the target token in wei
+    :param fee: the fee in ppm
+
+    returns: the output amount in wei
+    """
+    amount_in_with_fee = amount_in * (PPM - fee)
+    return amount_in_with_fee * reserve_out // (reserve_in * PPM + amount_in_with_fee)
+
+
+def bancor_output(amount_in: int, reserve_in: int, reserve_out: int, fee: int) -> int:
+    """
+    The output of a Bancor V2 or V3 trade, whose fee is taken from the output (rounded down).
+
+    :param amount_in: the input amount in wei
+    :param reserve_in: the pool balance of the source token in wei
+    :param reserve_out: the pool balance of the target token in wei
+    :param fee: the fee in ppm
+
+    returns: the output amount in wei
+    """
+    target_amount = mul_div_floor(reserve_out, amount_in, reserve_in + amount_in)
+    return target_amount - mul_div_floor(target_amount, fee, PPM)
+
+
+def uniswap_v3_output(amount_in: int, liquidity: int, sqrt_price_q96: int, fee: int, zero_for_one: bool) -> int:
+    """
+    The output of a Uniswap V3 trade which does not leave the current tick.
+
+    :param amount_in: the input amount in wei (including the fee)
+    :param liquidity: the liquidity of the current tick
+    :param sqrt_price_q96: the current sqrt price as a Q64.96 number
+    :param fee: the fee in ppm
+    :param zero_for_one: whether token0 is traded for token1
+
+    returns: the output amount in wei
+    """
+    amount_in = mul_div_floor(amount_in, PPM - fee, PPM)
+    if zero_for_one:
+        # SqrtPriceMath.getNextSqrtPriceFromAmount0RoundingUp and getAmount1Delta (rounding down)
+        numerator = liquidity << 96
+        sqrt_price_next = mul_div_ceil(numerator, sqrt_price_q96, numerator + amount_in * sqrt_price_q96)
+        return mul_div_floor(liquidity, sqrt_price_q96 - sqrt_price_next, Q96)
+    # SqrtPriceMath.getNextSqrtPriceFromAmount1RoundingDown and getAmount0Delta (rounding down)
+    sqrt_price_next = sqrt_price_q96 + (amount_in << 96) // liquidity
+    return mul_div_floor(liquidity << 96, sqrt_price_next - sqrt_price_q96, sqrt_price_next) // sqrt_price_q96
+
+
+def carbon_decode_rate(value: int) -> int:
+    """
+    Decodes a compressed Carbon rate (A or B) into a rate scaled by CARBON_ONE.
+    """
+    value = to_int(value)
+    return (value % CARBON_ONE) << (value // CARBON_ONE)
+
+
+def _min_factor(a: int, b: int) -> int:
+    # MathEx.minFactor: the smallest factor by which a * b must be divided to fit into 256 bits
+    return max(mul_div_ceil(a, b, MAX_UINT256), 1)
+
+
+def carbon_target_amount(x: int, y: int, z: int, A: int, B: int) -> int:
+    """
+    The (pre-fee) output of a Carbon order for the input x (trade by source).
+
+    :param x: the input amount in wei
+    :param y: the order liquidity in wei
+    :param z: the order capacity in wei
+    :param A: the decoded A rate
+    :param B: the decoded B rate
+
+    returns: the output amount in wei
+    """
+    if A == 0:
+        return mul_div_floor(x, B * B, CARBON_ONE * CARBON_ONE)
+    temp1 = z * CARBON_ONE
+    temp2 = y * A + z * B
+    temp3 = temp2 * x
+    factor = max(_min_factor(temp1, temp1), _min_factor(temp3, A))
+    temp4 = mul_div_ceil(temp1, temp1, factor)
+    temp5 = mul_div_ceil(temp3, A, factor)
+    return mul_div_floor(temp2, temp3 // factor, temp4 + temp5)
+
+
+def carbon_source_amount(x: int, y: int, z: int, A: int, B: int) -> int:
+    """
+    The input of a Carbon order needed for the (pre-fee) output x (trade by target).
+
+    :param x: the output amount in wei
+    :param y: the order liquidity in wei
+    :param z: the order capacity in wei
+    :param A: the decoded A rate
+    :param B: the decoded B rate
+
+    returns: the input amount in wei
+    """
+    if A == 0:
+        return mul_div_ceil(x, CARBON_ONE * CARBON_ONE, B * B)
+    temp1 = z * CARBON_ONE
+    temp2 = y * A + z * B
+    temp3 = temp2 - x * A
+    factor = max(_min_factor(temp1, temp1), _min_factor(temp2, temp3))
+    temp4 = mul_div_ceil(temp1, temp1, factor)
+    temp5 = mul_div_floor(temp2, temp3, factor)
+    return mul_div_ceil(x, temp4, temp5)
+
+
+def carbon_output(amount_in: int, y: int, z: int, A: int, B: int, fee: int) -> Tuple[int, int]:
+    """
+    The result of a Carbon trade by source, net of the fee.
+
+    If the order does not have enough liquidity for amount_in, the trade is reduced to the whole
+    order liquidity y, and the input is reduced to the input needed for y.
+
+    :param amount_in: the input amount in wei
+    :param y: the order liquidity in wei
+    :param z: the order capacity in wei
+    :param A: the compressed A rate
+    :param B: the compressed B rate
+    :param fee: the fee in ppm
+
+    returns: the tuple (amount_in, amount_out) in wei
+    """
+    A = carbon_decode_rate(A)
+    B = carbon_decode_rate(B)
+    amount_out = carbon_target_amount(amount_in, y, z, A, B)
+    if amount_out > y:
+        amount_out = y
+        amount_in = carbon_source_amount(y, y, z, A, B)
+    return amount_in, mul_div_floor(amount_out, PPM - fee, PPM)
@@ -6,10 +6,11 @@ Base class for all arbitrage finder modes
 Licensed under MIT
 """
 import abc
-from typing import Any, Tuple, Dict, List, Union
+from typing import Any, Callable, Tuple, Dict, List, Sequence, Union
 from _decimal import Decimal
 import pandas as pd
 
+from fastlane_bot.modes.parallel import run_tasks
 from fastlane_bot.tools.cpc import T
 from fastlane_bot.utils import num_format
 
@@ -36,6 +37,9 @@ class ArbitrageFinderBase:
         result=AO_CANDIDATES,
         ConfigObj: Any = None,
         arb_mode: str = None,
+        search_cache: Any = None,
+        n_jobs: int = 1,
+        warm_start: Any = None,
     ):
         self.flashloan_tokens = flashloan_tokens
         self.CCm = CCm
@@ -48,6 +52,9 @@ class ArbitrageFinderBase:
         self.best_trade_instructions_dic = None
         self.ConfigObj = ConfigObj
         self.base_exchange = "bancor_v3" if arb_mode == "bancor_v3" else "carbon_v1"
+        self.search_cache = search_cache
+        self.n_jobs = n_jobs
+        self.warm_start = warm_start
 
     @abc.abstractmethod
     def find_arbitrage(
@@ -78,6 +85,40 @@ class ArbitrageFinderBase:
         """
         pass
 
+    def run_tasks(self, fn: Callable, tasks: Sequence[Tuple]) -> List[Any]:
+        """
+        Run `fn(*task)` for each task, using `self.n_jobs` worker processes.
+
+        The results are returned in the order of the tasks, so that the candidates do not depend on
+        the number of workers.
+        """
+        return run_tasks(fn, tasks, n_jobs=self.n_jobs)
+
+    def warm_pstart(self, curves: Sequence[Any], src_token: str, pstart: Dict[str, float] = None) -> Dict[str, float]:
+        """
+        The `pstart` of a MargPOptimizer run on the curves: `pstart`, with the optimal prices of the last optimization
+        of the same curves where the finder has a warm start cache and they are available.
+        """
+        if self.warm_start is None:
+            return pstart
+        return self.warm_start.pstart(curves, src_token, pstart)
+
+    def warm_bracket(self, curves: Sequence[Any], src_token: str) -> Union[Tuple[float, float], None]:
+        """
+        The `bracket` of a PairOptimizer run on the curves, around the optimal price of their last optimization
+        (None if the finder has no warm start cache or the curves were not optimized).
+        """
+        if self.warm_start is None:
+            return None
+        return self.warm_start.bracket(curves, src_token)
+
+    def update_warm_start(self, curves: Sequence[Any], src_token: str, r: Any):
+        """
+        Store the optimal prices of an optimization result of the curves in the warm start cache, if any.
+        """
+        if self.warm_start is not None:
+            self.warm_start.update(curves, src_token, r)
+
     def _set_best_ops(
         self,
         best_profit: float,
@@ -74,15 +74,20 @@ class FindArbitrageMultiPairwise(ArbitrageFinderPairwiseBase):
                 if len(curve_combo) < 2:
                     continue
 
+                r = None
                 try:
                     (O, profit_src, r, trade_instructions_df,) = self.run_main_flow(
-                        curves=curve_combo, src_token=src_token, tkn0=tkn0, tkn1=tkn1
+                        curves=curve_combo, src_token=src_token, tkn0=tkn0, tkn1=tkn1,
+                        bracket=self.warm_bracket(curve_combo, src_token),
                     )
+                    self.update_warm_start(curve_combo, src_token, r)
 
                     trade_instructions_dic = r.trade_instructions(O.TIF_DICTS)
                     trade_instructions = r.trade_instructions()
 
                 except Exception:
+                    if r is None:
+                        self.update_warm_start(curve_combo, src_token, None)
                     continue
 
                 if trade_instructions_dic is None:
@@ -153,17 +158,17 @@ class FindArbitrageMultiPairwise(ArbitrageFinderPairwiseBase):
 
     @staticmethod
     def run_main_flow(
-        curves: List[Any], src_token: str, tkn0: str, tkn1: str
+        curves: List[Any], src_token: str, tkn0: str, tkn1: str, bracket: Tuple[float, float] = None
     ) -> Tuple[Any, float, Any, pd.DataFrame]:
         """
-        Run main flow to find arbitrage.
+        Run main flow to find arbitrage, bisecting `bracket` first if given (see `warm_bracket`).
         """
         CC_cc = CPCContainer(curves)
         O = PairOptimizer(CC_cc)
         pstart = {
             tkn0: CC_cc.bypairs(f"{tkn0}/{tkn1}")[0].p
         }  # this intentionally selects the non_carbon curve
-        r = O.optimize(src_token, params=dict(pstart=pstart))
+        r = O.optimize(src_token, params=dict(pstart=pstart, bracket=bracket))
         profit_src = -r.result
         trade_instructions_df = r.trade_instructions(O.TIF_DFAGGR)
         return O, profit_src, r, trade_instructions_df
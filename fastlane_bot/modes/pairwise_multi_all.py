@@ -40,47 +40,14 @@ class FindArbitrageMultiPairwiseAll(ArbitrageFinderPairwiseBase):
             f"\n ************ combos: {len(combos)} ************\n"
         )
 
-        for tkn0, tkn1 in combos:
-            r = None
-            CC = self.CCm.bypairs(f"{tkn0}/{tkn1}")
-            if len(CC) < 2:
-                continue
-            carbon_curves = [x for x in CC.curves if x.params.exchange in self.ConfigObj.CARBON_V1_FORKS]
-            not_carbon_curves = [
-                x for x in CC.curves if x.params.exchange not in self.ConfigObj.CARBON_V1_FORKS
-            ]
-
-            curve_combos = [[_curve0] + [_curve1] for _curve0 in not_carbon_curves for _curve1 in not_carbon_curves if (_curve0 != _curve1)]
-
-            if len(carbon_curves) > 0:
-                base_direction_pair = carbon_curves[0].pair
-                base_direction_one = [curve for curve in carbon_curves if curve.pair == base_direction_pair]
-                base_direction_two = [curve for curve in carbon_curves if curve.pair != base_direction_pair]
-                curve_combos = []
-
-                if len(base_direction_one) > 0:
-                    curve_combos += [[curve] + base_direction_one for curve in not_carbon_curves]
-
-                if len(base_direction_two) > 0:
-                    curve_combos += [[curve] + base_direction_two for curve in not_carbon_curves]
-
-            for curve_combo in curve_combos:
-                src_token = tkn1
-                if len(curve_combo) < 2:
-                    continue
-                try:
-                    (
-                        O,
-                        profit_src,
-                        r,
-                        trade_instructions_df,
-                    ) = self.run_main_flow(curves=curve_combo, src_token=src_token, tkn0=tkn0, tkn1=tkn1)
-                except ValueError:
-                    #Optimizer did not converge
-                    continue
+        pairs = [(tkn0, tkn1, self.CCm.bypairs(f"{tkn0}/{tkn1}")) for tkn0, tkn1 in combos]
+        pairs = [(tkn0, tkn1, CC) for tkn0, tkn1, CC in pairs if len(CC) >= 2]
 
+        for (tkn0, tkn1, CC), pair_results in zip(pairs, self.get_pair_results(pairs)):
+            src_token = tkn1
 
-                trade_instructions_dic = r.trade_instructions(O.TIF_DICTS)
+            for profit_src, r, trade_instructions_df in pair_results:
+                trade_instructions_dic = r.trade_instructions(PairOptimizer.TIF_DICTS)
                 trade_instructions = r.trade_instructions()
                 if trade_instructions_dic is None:
                     continue
@@ -116,8 +83,112 @@ class FindArbitrageMultiPairwiseAll(ArbitrageFinderPairwiseBase):
                     trade_instructions,
                 )
 
+        if self.search_cache is not None:
+            self.search_cache.retain(combos)
+            self.ConfigObj.logger.debug(
+                f"[modes.pairwise_multi_all] pair search cache: {self.search_cache.hits} hits, {self.search_cache.misses} misses"
+            )
+
         return candidates if self.result == self.AO_CANDIDATES else ops
 
+    def get_pair_results(self, pairs: List[Tuple[str, str, CPCContainer]]) -> List[List[Tuple[float, Any, pd.DataFrame]]]:
+        """
+        Optimize all curve combinations of the given pairs.
+
+        If the finder has a search cache, the results are taken from it as long as none of the curves
+        of the pair changed, and the optimizer only runs for the pairs with new or updated curves. The
+        pairs to be optimized are sharded across `self.n_jobs` worker processes, and their optimal prices
+        are stored in the warm start cache (if any).
+
+        Parameters
+        ----------
+        pairs : List[Tuple[str, str, CPCContainer]]
+            The (tkn0, tkn1, CC) pairs, where tkn1 is the flashloan token and CC holds the curves of the
+            pair in both directions.
+
+        Returns
+        -------
+        List[List[Tuple[float, Any, pd.DataFrame]]]
+            The results of each pair (see `optimize_pair`), in the order of `pairs`.
+        """
+        if self.search_cache is None:
+            results = self.run_tasks(self.optimize_pair, pairs)
+            for (tkn0, tkn1, CC), pair_results in zip(pairs, results):
+                for _, r, _ in pair_results:
+                    self.update_warm_start(r.curves, tkn1, r)
+            return results
+
+        results = [self.search_cache.get((tkn0, tkn1), CC) for tkn0, tkn1, CC in pairs]
+        misses = [ix for ix, pair_results in enumerate(results) if pair_results is None]
+        if self.warm_start is not None:
+            for (tkn0, tkn1, CC), pair_results in zip(pairs, results):
+                for _, r, _ in pair_results or []:
+                    self.warm_start.touch(r.curves, tkn1)
+        for ix, pair_results in zip(misses, self.run_tasks(self.optimize_pair, [pairs[ix] for ix in misses])):
+            tkn0, tkn1, CC = pairs[ix]
+            self.search_cache.set((tkn0, tkn1), CC, pair_results)
+            for _, r, _ in pair_results:
+                self.update_warm_start(r.curves, tkn1, r)
+            results[ix] = pair_results
+        return results
+
+    def optimize_pair(self, tkn0: str, tkn1: str, CC: CPCContainer) -> List[Tuple[float, Any, pd.DataFrame]]:
+        """
+        Optimize all curve combinations of a pair.
+
+        Parameters
+        ----------
+        tkn0 : str
+            The base token of the pair.
+        tkn1 : str
+            The quote token of the pair, ie the flashloan token.
+        CC : CPCContainer
+            The curves of the pair, in both directions.
+
+        Returns
+        -------
+        List[Tuple[float, Any, pd.DataFrame]]
+            The (profit_src, r, trade_instructions_df) results of the combinations for which the optimizer converged.
+        """
+        curve_combos = [curve_combo for curve_combo in self.get_curve_combos(CC) if len(curve_combo) >= 2]
+        brackets = [self.warm_bracket(curve_combo, tkn1) for curve_combo in curve_combos]
+        return self.run_main_flow_batch(curve_combos=curve_combos, src_token=tkn1, brackets=brackets)
+
+    def get_curve_combos(self, CC: CPCContainer) -> List[List[Any]]:
+        """
+        Get the curve combinations of a pair to be optimized.
+
+        Parameters
+        ----------
+        CC : CPCContainer
+            The curves of the pair, in both directions.
+
+        Returns
+        -------
+        List[List[Any]]
+            The curve combinations.
+        """
+        carbon_curves = [x for x in CC.curves if x.params.exchange in self.ConfigObj.CARBON_V1_FORKS]
+        not_carbon_curves = [
+            x for x in CC.curves if x.params.exchange not in self.ConfigObj.CARBON_V1_FORKS
+        ]
+
+        curve_combos = [[_curve0] + [_curve1] for _curve0 in not_carbon_curves for _curve1 in not_carbon_curves if (_curve0 != _curve1)]
+
+        if len(carbon_curves) > 0:
+            base_direction_pair = carbon_curves[0].pair
+            base_direction_one = [curve for curve in carbon_curves if curve.pair == base_direction_pair]
+            base_direction_two = [curve for curve in carbon_curves if curve.pair != base_direction_pair]
+            curve_combos = []
+
+            if len(base_direction_one) > 0:
+                curve_combos += [[curve] + base_direction_one for curve in not_carbon_curves]
+
+            if len(base_direction_two) > 0:
+                curve_combos += [[curve] + base_direction_two for curve in not_carbon_curves]
+
+        return curve_combos
+
     @staticmethod
     def get_wrong_direction_cids(
         tkn0_into_carbon: bool, trade_instructions_df: pd.DataFrame
@@ -148,23 +219,41 @@ class FindArbitrageMultiPairwiseAll(ArbitrageFinderPairwiseBase):
         ]
 
     @staticmethod
-    def run_main_flow(
-        curves: List[Any], src_token: str, tkn0: str, tkn1: str
-    ) -> Tuple[Any, float, Any, pd.DataFrame]:
+    def run_main_flow_batch(
+        curve_combos: List[List[Any]], src_token: str, brackets: List[Tuple[float, float]] = None
+    ) -> List[Tuple[float, Any, pd.DataFrame]]:
         """
-        Run main flow to find arbitrage.
-        """
-        CC_cc = CPCContainer(curves)
-        O = PairOptimizer(CC_cc)
-        pstart = {
-            tkn0: CC_cc.bypairs(f"{tkn0}/{tkn1}")[0].p
-        }  # this intentionally selects the non_carbon curve
+        Run the main flow for many curve combinations of a pair at once.
 
-        r = O.optimize(src_token, params=dict(pstart=pstart))
+        The combinations are optimized in a single vectorized pass of `PairOptimizer.optimize_batch`,
+        which gives the same results as running `PairOptimizer.optimize` on a container of each of them.
 
-        profit_src = -r.result
-        trade_instructions_df = r.trade_instructions(O.TIF_DFAGGR)
-        return O, profit_src, r, trade_instructions_df
+        Parameters
+        ----------
+        curve_combos : List[List[Any]]
+            The curve combinations.
+        src_token : str
+            The flashloan token.
+        brackets : List[Tuple[float, float]], optional
+            The initial bisection interval of each combination (see `warm_bracket`), by default None.
+
+        Returns
+        -------
+        List[Tuple[float, Any, pd.DataFrame]]
+            The (profit_src, r, trade_instructions_df) results of the combinations for which the optimizer converged.
+        """
+        results = []
+        containers = [CPCContainer(curves) for curves in curve_combos]
+        for r in PairOptimizer.optimize_batch(containers, [src_token] * len(containers), brackets=brackets):
+            if r.is_error:
+                #Optimizer did not converge
+                continue
+            try:
+                trade_instructions_df = r.trade_instructions(PairOptimizer.TIF_DFAGGR)
+            except ValueError:
+                continue
+            results.append((-r.result, r, trade_instructions_df))
+        return results
 
     @staticmethod
     def process_wrong_direction_pools(
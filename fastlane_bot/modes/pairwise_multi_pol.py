@@ -36,84 +36,117 @@ class FindArbitrageMultiPairwisePol(ArbitrageFinderPairwiseBase):
             f"\n ************ combos: {len(combos)} ************\n"
         )
 
+        tasks = []
         for tkn0, tkn1 in combos:
-            r = None
             CC = self.CCm.bypairs(f"{tkn0}/{tkn1}")
             if len(CC) < 2:
                 continue
-            pol_curves = [x for x in CC.curves if x.params.exchange == "bancor_pol"]
-            not_bancor_pol_curves = [
-                x for x in CC.curves if x.params.exchange not in ["bancor_pol"] + self.ConfigObj.CARBON_V1_FORKS
-            ]
-            carbon_curves = [x for x in CC.curves if x.params.exchange in self.ConfigObj.CARBON_V1_FORKS]
-            curve_combos = [[curve] + pol_curves for curve in not_bancor_pol_curves]
-
-            if len(carbon_curves) > 0:
-                base_direction_pair = carbon_curves[0].pair
-                base_direction_one = [curve for curve in carbon_curves if curve.pair == base_direction_pair]
-                base_direction_two = [curve for curve in carbon_curves if curve.pair != base_direction_pair]
-
-                if len(base_direction_one) > 0:
-                    curve_combos += [[curve] + base_direction_one for curve in pol_curves]
-
-                if len(base_direction_two) > 0:
-                    curve_combos += [[curve] + base_direction_two for curve in pol_curves]
-
-            for curve_combo in curve_combos:
-                src_token = tkn1
-                if len(curve_combo) < 2:
-                    continue
-
-                try:
-                    (
-                        O,
-                        profit_src,
-                        r,
-                        trade_instructions_df,
-                    ) = self.run_main_flow(curves=curve_combo, src_token=src_token, tkn0=tkn0, tkn1=tkn1)
-
-                    trade_instructions_dic = r.trade_instructions(O.TIF_DICTS)
-                    trade_instructions = r.trade_instructions()
-
-                except Exception:
-                    continue
-                if trade_instructions_dic is None:
-                    continue
-                if len(trade_instructions_dic) < 2:
-                    continue
-                # Get the cids
-                cids = [ti["cid"] for ti in trade_instructions_dic]
-
-                # Calculate the profit
-                profit = self.calculate_profit(src_token, profit_src, self.CCm, cids)
-
-                if str(profit) == "nan":
-                    self.ConfigObj.logger.debug("profit is nan, skipping")
-                    continue
-
-                # Handle candidates based on conditions
-                candidates += self.handle_candidates(
-                    best_profit,
-                    profit,
-                    trade_instructions_df,
-                    trade_instructions_dic,
-                    src_token,
-                    trade_instructions,
-                )
-
-                # Find the best operations
-                best_profit, ops = self.find_best_operations(
-                    best_profit,
-                    ops,
-                    profit,
-                    trade_instructions_df,
-                    trade_instructions_dic,
-                    src_token,
-                    trade_instructions,
-                )
+            tasks += [(curve_combo, tkn0, tkn1) for curve_combo in self.get_curve_combos(CC) if len(curve_combo) >= 2]
+
+        for (curve_combo, tkn0, tkn1), result in zip(tasks, self.run_tasks(self.optimize_curve_combo, tasks)):
+            src_token = tkn1
+            self.update_warm_start(curve_combo, src_token, None if result is None else result[-1])
+            if result is None:
+                continue
+            profit_src, trade_instructions_df, trade_instructions_dic, trade_instructions, _ = result
+            if trade_instructions_dic is None:
+                continue
+            if len(trade_instructions_dic) < 2:
+                continue
+            # Get the cids
+            cids = [ti["cid"] for ti in trade_instructions_dic]
+
+            # Calculate the profit
+            profit = self.calculate_profit(src_token, profit_src, self.CCm, cids)
+
+            if str(profit) == "nan":
+                self.ConfigObj.logger.debug("profit is nan, skipping")
+                continue
+
+            # Handle candidates based on conditions
+            candidates += self.handle_candidates(
+                best_profit,
+                profit,
+                trade_instructions_df,
+                trade_instructions_dic,
+                src_token,
+                trade_instructions,
+            )
+
+            # Find the best operations
+            best_profit, ops = self.find_best_operations(
+                best_profit,
+                ops,
+                profit,
+                trade_instructions_df,
+                trade_instructions_dic,
+                src_token,
+                trade_instructions,
+            )
 
         return candidates if self.result == self.AO_CANDIDATES else ops
 
+    def get_curve_combos(self, CC: CPCContainer) -> List[List[Any]]:
+        """
+        Get the curve combinations of a pair to be optimized.
+
+        Parameters
+        ----------
+        CC : CPCContainer
+            The curves of the pair, in both directions.
+
+        Returns
+        -------
+        List[List[Any]]
+            The curve combinations.
+        """
+        pol_curves = [x for x in CC.curves if x.params.exchange == "bancor_pol"]
+        not_bancor_pol_curves = [
+            x for x in CC.curves if x.params.exchange not in ["bancor_pol"] + self.ConfigObj.CARBON_V1_FORKS
+        ]
+        carbon_curves = [x for x in CC.curves if x.params.exchange in self.ConfigObj.CARBON_V1_FORKS]
+        curve_combos = [[curve] + pol_curves for curve in not_bancor_pol_curves]
+
+        if len(carbon_curves) > 0:
+            base_direction_pair = carbon_curves[0].pair
+            base_direction_one = [curve for curve in carbon_curves if curve.pair == base_direction_pair]
+            base_direction_two = [curve for curve in carbon_curves if curve.pair != base_direction_pair]
+
+            if len(base_direction_one) > 0:
+                curve_combos += [[curve] + base_direction_one for curve in pol_curves]
+
+            if len(base_direction_two) > 0:
+                curve_combos += [[curve] + base_direction_two for curve in pol_curves]
+
+        return curve_combos
+
+    def optimize_curve_combo(self, curve_combo: List[Any], tkn0: str, tkn1: str) -> Union[Tuple, None]:
+        """
+        Optimize a curve combination of the tkn0/tkn1 pair, with tkn1 as the flashloan token.
+
+        Returns
+        -------
+        Union[Tuple, None]
+            The (profit_src, trade_instructions_df, trade_instructions_dic, trade_instructions, r) result,
+            or None if the optimization failed.
+        """
+        try:
+            (
+                O,
+                profit_src,
+                r,
+                trade_instructions_df,
+            ) = self.run_main_flow(
+                curves=curve_combo, src_token=tkn1, tkn0=tkn0, tkn1=tkn1, bracket=self.warm_bracket(curve_combo, tkn1)
+            )
+
+            trade_instructions_dic = r.trade_instructions(O.TIF_DICTS)
+            trade_instructions = r.trade_instructions()
+
+        except Exception:
+            return None
+        return profit_src, trade_instructions_df, trade_instructions_dic, trade_instructions, r
+
     def get_wrong_direction_cids(
         self, tkn0_into_carbon: bool, trade_instructions_df: pd.DataFrame
     ) -> List[Hashable]:
@@ -144,17 +177,17 @@ class FindArbitrageMultiPairwisePol(ArbitrageFinderPairwiseBase):
 
     @staticmethod
     def run_main_flow(
-        curves: List[Any], src_token: str, tkn0: str, tkn1: str
+        curves: List[Any], src_token: str, tkn0: str, tkn1: str, bracket: Tuple[float, float] = None
     ) -> Tuple[Any, float, Any, pd.DataFrame]:
         """
-        Run main flow to find arbitrage.
+        Run main flow to find arbitrage, bisecting `bracket` first if given (see `warm_bracket`).
         """
         CC_cc = CPCContainer(curves)
         O = PairOptimizer(CC_cc)
         pstart = {
             tkn0: CC_cc.bypairs(f"{tkn0}/{tkn1}")[0].p
         }  # this intentionally selects the non_carbon curve
-        r = O.optimize(src_token, params=dict(pstart=pstart))
+        r = O.optimize(src_token, params=dict(pstart=pstart, bracket=bracket))
         profit_src = -r.result
         trade_instructions_df = r.trade_instructions(O.TIF_DFAGGR)
         return O, profit_src, r, trade_instructions_df
@@ -60,15 +60,20 @@ class FindArbitrageSinglePairwise(ArbitrageFinderPairwiseBase):
                 CC_cc = CPCContainer(curve_combo)
                 O = PairOptimizer(CC_cc)
                 src_token = tkn1
+                r = None
                 try:
                     pstart = {tkn0: CC_cc.bypairs(f"{tkn0}/{tkn1}")[0].p}
-                    r = O.optimize(src_token, params=dict(pstart=pstart))
+                    bracket = self.warm_bracket(curve_combo, src_token)
+                    r = O.optimize(src_token, params=dict(pstart=pstart, bracket=bracket))
+                    self.update_warm_start(curve_combo, src_token, r)
                     profit_src = -r.result
                     trade_instructions_df = r.trade_instructions(O.TIF_DFAGGR)
                     trade_instructions_dic = r.trade_instructions(O.TIF_DICTS)
                     trade_instructions = r.trade_instructions()
                 except Exception as e:
                     print("[FindArbitrageSinglePairwise] Exception: ", e)
+                    if r is None:
+                        self.update_warm_start(curve_combo, src_token, None)
                     continue
                 if trade_instructions_dic is None:
                     continue
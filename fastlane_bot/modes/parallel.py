@@ -0,0 +1,79 @@
+# coding=utf-8
+"""
+Runs the optimization tasks of the arbitrage finder modes in a pool of worker processes.
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+import multiprocessing
+import os
+from typing import Any, Callable, List, Sequence, Tuple
+
+MIN_TASKS_PER_JOB = 4
+
+# The function and the tasks of the current run. The workers are forked after these are set, so
+# they inherit the curves from the parent process and only the task indices are sent to them.
+_context: Tuple[Callable, Sequence[Tuple]] = None
+
+
+def _run_task(ix: int) -> Any:
+    fn, tasks = _context
+    return fn(*tasks[ix])
+
+
+def get_n_workers(n_jobs: int, n_tasks: int) -> int:
+    """
+    Get the number of worker processes to use for a run.
+
+    Parameters
+    ----------
+    n_jobs : int
+        The requested number of jobs; negative values count back from the number of CPUs, as in joblib
+        (-1 uses all CPUs, -2 all but one, etc.).
+    n_tasks : int
+        The number of tasks of the run.
+
+    Returns
+    -------
+    int
+        The number of workers; 1 means that the tasks are run in the current process.
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        n_jobs = max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return 1
+    return max(min(n_jobs, n_tasks // MIN_TASKS_PER_JOB), 1)
+
+
+def run_tasks(fn: Callable, tasks: Sequence[Tuple], n_jobs: int = 1) -> List[Any]:
+    """
+    Run `fn(*task)` for each task, sharding the tasks across forked worker processes.
+
+    Parameters
+    ----------
+    fn : Callable
+        The function to run. Its results must be picklable; any exceptions should be handled in `fn`.
+    tasks : Sequence[Tuple]
+        The arguments of each call.
+    n_jobs : int
+        The number of worker processes (see `get_n_workers`). Runs with fewer than `MIN_TASKS_PER_JOB`
+        tasks per worker use fewer workers, and runs with a single worker do not fork at all.
+
+    Returns
+    -------
+    List[Any]
+        The results, in the order of the tasks (irrespective of the number of workers).
+    """
+    global _context
+    n_workers = get_n_workers(n_jobs, len(tasks))
+    if n_workers == 1:
+        return [fn(*task) for task in tasks]
+
+    _context = (fn, tasks)
+    try:
+        with multiprocessing.get_context("fork").Pool(n_workers) as pool:
+            return pool.map(_run_task, range(len(tasks)))
+    finally:
+        _context = None
@@ -0,0 +1,223 @@
+# coding=utf-8
+"""
+Contains the pair search cache, which keeps the pair optimization results of the arbitrage finders across bot iterations,
+and the warm start cache, which keeps the optimal prices of the miniverses to seed the optimizers in the next iteration.
+
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from fastlane_bot.tools.cpc import ConstantProductCurve
+
+PairResults = List[Tuple[float, Any, Any]]
+
+
+@dataclass
+class PairSearchCache:
+    """
+    Long-lived cache of the optimization results of the pairwise arbitrage finders.
+
+    The results of a pair are keyed on the state of all curves of that pair, so they are reused as long
+    as none of these curves changed, and recomputed as soon as a curve of the pair is added, removed or
+    updated (by an event or by a multicall).
+
+    Attributes
+    ----------
+    results : Dict[Tuple[str, str], Tuple[Tuple, PairResults]]
+        The state key and the `(profit_src, r, trade_instructions_df)` results of each pair.
+    hits : int
+        The number of lookups which returned cached results.
+    misses : int
+        The number of lookups which did not.
+    """
+
+    __VERSION__ = "1.0"
+    __DATE__ = "2024-03-25"
+
+    results: Dict[Tuple[str, str], Tuple[Tuple, PairResults]] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+    @staticmethod
+    def curve_state(curve: ConstantProductCurve) -> Tuple:
+        """
+        The state of a curve, as far as the optimizer is concerned.
+        """
+        return curve.cid, curve.pair, curve.k, curve.x, curve.x_act, curve.y_act, curve.alpha, curve.fee
+
+    def state_key(self, curves: Iterable[ConstantProductCurve]) -> Tuple:
+        """
+        The state key of a pair, ie the states of all its curves.
+        """
+        return tuple(self.curve_state(curve) for curve in curves)
+
+    def get(self, pair: Tuple[str, str], curves: Iterable[ConstantProductCurve]) -> Optional[PairResults]:
+        """
+        Get the cached results of a pair.
+
+        Parameters
+        ----------
+        pair : Tuple[str, str]
+            The (tkn0, tkn1) pair.
+        curves : Iterable[ConstantProductCurve]
+            The current curves of the pair.
+
+        Returns
+        -------
+        Optional[PairResults]
+            The cached results, or None if the pair is not cached or any of its curves changed.
+        """
+        cached = self.results.get(pair)
+        if cached is not None and cached[0] == self.state_key(curves):
+            self.hits += 1
+            return [(profit_src, r, trade_instructions_df.copy()) for profit_src, r, trade_instructions_df in cached[1]]
+        self.misses += 1
+        return None
+
+    def set(self, pair: Tuple[str, str], curves: Iterable[ConstantProductCurve], results: PairResults):
+        """
+        Cache the results of a pair for the current state of its curves.
+        """
+        self.results[pair] = (self.state_key(curves), list(results))
+
+    def retain(self, pairs: Iterable[Tuple[str, str]]):
+        """
+        Drop the results of all pairs not in `pairs`, eg pairs which were not searched in the last iteration.
+        """
+        pairs = set(pairs)
+        for pair in [pair for pair in self.results if pair not in pairs]:
+            del self.results[pair]
+
+
+@dataclass(frozen=True)
+class WarmStart:
+    """
+    The optimal prices of a miniverse from its last converged optimization.
+
+    Attributes
+    ----------
+    prices : Dict[str, float]
+        The optimal price of every token other than the target token, in units of the target token.
+    bracket : Optional[Tuple[float, float]]
+        For a miniverse with a single other token (a pair), the bisection interval of its next optimization.
+    """
+
+    prices: Dict[str, float]
+    bracket: Optional[Tuple[float, float]] = None
+
+
+@dataclass
+class WarmStartCache:
+    """
+    Long-lived cache of the optimal prices of the miniverses, used to warm-start their next optimization.
+
+    Between blocks the optimum of a miniverse barely moves. The next optimization of the same curves (by cid)
+    and target token therefore starts from the last optimal prices: the MargPOptimizer starts its Newton
+    iterations there rather than at the price of a single curve, and the PairOptimizer bisects a narrow interval
+    around the last optimal price (its width follows the last move of the optimum) rather than the whole range
+    of the curve prices. The optimizers fall back to the default interval if the optimum moved out of it.
+
+    The cache is read when the optimizations run (possibly in worker processes) and updated from their results
+    in the arbitrage finder, so the warm starts of an iteration only come from the previous ones.
+
+    Attributes
+    ----------
+    entries : Dict[Tuple[FrozenSet[str], str], WarmStart]
+        The warm start of each (cids, target token) miniverse.
+    hits : int
+        The number of optimizations which were warm-started.
+    misses : int
+        The number of optimizations which were not.
+    """
+
+    __VERSION__ = "1.0"
+    __DATE__ = "2024-03-28"
+
+    MIN_WIDTH = 1e-4
+
+    entries: Dict[Tuple[FrozenSet[str], str], WarmStart] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+    _updated: Set[Tuple[FrozenSet[str], str]] = field(default_factory=set, repr=False)
+
+    @staticmethod
+    def key(curves: Iterable[ConstantProductCurve], targettkn: str) -> Tuple[FrozenSet[str], str]:
+        """
+        The key of a miniverse, ie the cids of its curves and the target token.
+        """
+        return frozenset(curve.cid for curve in curves), targettkn
+
+    def get(self, curves: Iterable[ConstantProductCurve], targettkn: str) -> Optional[WarmStart]:
+        """
+        Get the warm start of a miniverse, or None if it was not optimized in the previous iteration.
+        """
+        return self.entries.get(self.key(curves, targettkn))
+
+    def pstart(
+        self, curves: Iterable[ConstantProductCurve], targettkn: str, pstart: Dict[str, float] = None
+    ) -> Optional[Dict[str, float]]:
+        """
+        The MargPOptimizer `pstart` parameter of a miniverse: `pstart`, with the last optimal prices where available.
+        """
+        warm_start = self.get(curves, targettkn)
+        if warm_start is None:
+            return pstart
+        return {**(pstart or {}), **warm_start.prices, targettkn: 1}
+
+    def bracket(self, curves: Iterable[ConstantProductCurve], targettkn: str) -> Optional[Tuple[float, float]]:
+        """
+        The PairOptimizer `bracket` parameter of a pair, or None if there is none.
+        """
+        warm_start = self.get(curves, targettkn)
+        return None if warm_start is None else warm_start.bracket
+
+    def update(self, curves: Iterable[ConstantProductCurve], targettkn: str, r: Any):
+        """
+        Store the optimal prices of an optimization result (or drop them, if it did not converge).
+
+        Parameters
+        ----------
+        curves : Iterable[ConstantProductCurve]
+            The curves of the miniverse.
+        targettkn : str
+            The target token of the optimization.
+        r : Any
+            The optimizer result (a `MargpOptimizerResult`).
+        """
+        key = self.key(curves, targettkn)
+        previous = self.entries.pop(key, None)
+        if previous is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if r is None or r.is_error or r.p_optimal_t is None:
+            return
+
+        prices = dict(zip(r.tokens_t, (float(p) for p in r.p_optimal_t)))
+        if not all(math.isfinite(p) and p > 0 for p in prices.values()):
+            return
+        bracket = None
+        if len(prices) == 1:
+            (tkn, p), = prices.items()
+            width = self.MIN_WIDTH
+            if previous is not None and tkn in previous.prices:
+                width = max(width, 2 * abs(math.log(p / previous.prices[tkn])))
+            bracket = (p * math.exp(-width), p * math.exp(width))
+        self.entries[key] = WarmStart(prices=prices, bracket=bracket)
+        self._updated.add(key)
+
+    def touch(self, curves: Iterable[ConstantProductCurve], targettkn: str):
+        """
+        Keep the warm start of a miniverse whose optimization result was reused (eg from the pair search cache).
+        """
+        self._updated.add(self.key(curves, targettkn))
+
+    def retain(self):
+        """
+        Drop the warm starts of all miniverses which were not optimized since the last call, eg in the last iteration.
+        """
+        self.entries = {key: value for key, value in self.entries.items() if key in self._updated}
+        self._updated = set()
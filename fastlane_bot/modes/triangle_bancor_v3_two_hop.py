@@ -51,20 +51,18 @@ class ArbitrageFinderTriangleBancor3TwoHop(ArbitrageFinderTriangleBase):
             return None
 
         # Check each source token and miniverse combination
-        for src_token, miniverse in all_miniverses:
-            r = None
-
-            try:
-                # Run main flow with the new set of curves
-                (
-                    profit_src,
-                    trade_instructions,
-                    trade_instructions_df,
-                    trade_instructions_dic,
-                ) = self.run_main_flow(miniverse, src_token)
-
-            except Exception:
+        results = self.run_tasks(self.optimize_miniverse, [(miniverse, src_token) for src_token, miniverse in all_miniverses])
+        for (src_token, miniverse), result in zip(all_miniverses, results):
+            self.update_warm_start(miniverse, src_token, None if result is None else result[-1])
+            if result is None:
                 continue
+            (
+                profit_src,
+                trade_instructions,
+                trade_instructions_df,
+                trade_instructions_dic,
+                _,
+            ) = result
             if trade_instructions_dic is None:
                 continue
             if len(trade_instructions_dic) < 3:
@@ -102,6 +100,16 @@ class ArbitrageFinderTriangleBancor3TwoHop(ArbitrageFinderTriangleBase):
 
         return candidates if self.result == self.AO_CANDIDATES else ops
 
+    def optimize_miniverse(self, miniverse: List[Any], src_token: str) -> Union[Tuple, None]:
+        """
+        Run the main flow for a miniverse, returning None if it fails (see `run_main_flow`).
+        """
+        try:
+            # Run main flow with the new set of curves
+            return self.run_main_flow(miniverse, src_token)
+        except Exception:
+            return None
+
     def get_tkn(self, pool: Any, tkn_num: int) -> str:
         """
         Gets the token ID from a pool object
@@ -254,7 +262,7 @@ class ArbitrageFinderTriangleBancor3TwoHop(ArbitrageFinderTriangleBase):
 
     def run_main_flow(self,
         miniverse: List, src_token: str
-    ) -> Tuple[float, Any, Any, Any]:
+    ) -> Tuple[float, Any, Any, Any, Any]:
         """
         Run the main flow of the arbitrage finder.
 
@@ -268,14 +276,15 @@ class ArbitrageFinderTriangleBancor3TwoHop(ArbitrageFinderTriangleBase):
         Returns
         -------
         tuple
-            Tuple of profit, trade instructions, trade instructions dataframe and trade instructions dictionary.
+            Tuple of profit, trade instructions, trade instructions dataframe, trade instructions dictionary and
+            optimizer result.
 
         """
 
         # Instantiate the container and optimizer objects
         CC_cc = CPCContainer(miniverse)
         O = MargPOptimizer(CC_cc)
-        pstart = self.build_pstart(CC_cc, CC_cc.tokens(), src_token)
+        pstart = self.warm_pstart(miniverse, src_token, self.build_pstart(CC_cc, CC_cc.tokens(), src_token))
         # Perform the optimization
         r = O.optimize(src_token, params=dict(pstart=pstart))
 
@@ -292,6 +301,7 @@ class ArbitrageFinderTriangleBancor3TwoHop(ArbitrageFinderTriangleBase):
             trade_instructions,
             trade_instructions_df,
             trade_instructions_dic,
+            r,
         )
 
     def get_miniverse_combos(self, combos: Iterable) -> List[Tuple[str, List]]:
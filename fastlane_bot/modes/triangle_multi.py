@@ -34,24 +34,11 @@ class ArbitrageFinderTriangleMulti(ArbitrageFinderTriangleBase):
             self.flashloan_tokens, self.CCm, arb_mode=self.arb_mode
         )
 
-        for src_token, miniverse in combos:
-            try:
-                r = None
-                CC_cc = CPCContainer(miniverse)
-                O = MargPOptimizer(CC_cc)
-                #try:
-                pstart = self.build_pstart(CC_cc, CC_cc.tokens(), src_token)
-                r = O.optimize(src_token, params=dict(pstart=pstart)) #debug=True, debug2=True
-                trade_instructions_dic = r.trade_instructions(O.TIF_DICTS)
-                if len(trade_instructions_dic) < 3:
-                    # Failed to converge
-                    continue
-                trade_instructions_df = r.trade_instructions(O.TIF_DFAGGR)
-                trade_instructions = r.trade_instructions()
-
-            except Exception as e:
-                self.ConfigObj.logger.debug(f"[triangle multi] {str(e)}")
+        for (src_token, miniverse), result in zip(combos, self.run_tasks(self.optimize_miniverse, combos)):
+            self.update_warm_start(miniverse, src_token, None if result is None else result[0])
+            if result is None:
                 continue
+            r, trade_instructions_dic, trade_instructions_df, trade_instructions = result
             if trade_instructions_dic is None:
                 continue
             if len(trade_instructions_dic) < 2:
@@ -90,6 +77,39 @@ class ArbitrageFinderTriangleMulti(ArbitrageFinderTriangleBase):
 
         return candidates if self.result == self.AO_CANDIDATES else ops
     
+    def optimize_miniverse(self, src_token: str, miniverse: List[Any]) -> Union[Tuple, None]:
+        """
+        Optimize a miniverse.
+
+        Parameters
+        ----------
+        src_token : str
+            The flashloan token.
+        miniverse : List[Any]
+            The curves of the miniverse.
+
+        Returns
+        -------
+        Union[Tuple, None]
+            The (r, trade_instructions_dic, trade_instructions_df, trade_instructions) result, or None if
+            the optimizer failed to converge.
+        """
+        try:
+            CC_cc = CPCContainer(miniverse)
+            O = MargPOptimizer(CC_cc)
+            pstart = self.warm_pstart(miniverse, src_token, self.build_pstart(CC_cc, CC_cc.tokens(), src_token))
+            r = O.optimize(src_token, params=dict(pstart=pstart)) #debug=True, debug2=True
+            trade_instructions_dic = r.trade_instructions(O.TIF_DICTS)
+            if len(trade_instructions_dic) < 3:
+                # Failed to converge
+                return None
+            trade_instructions_df = r.trade_instructions(O.TIF_DFAGGR)
+            trade_instructions = r.trade_instructions()
+        except Exception as e:
+            self.ConfigObj.logger.debug(f"[triangle multi] {str(e)}")
+            return None
+        return r, trade_instructions_dic, trade_instructions_df, trade_instructions
+
     def build_pstart(self, CCm, tkn0list, tkn1):
         tkn0list = [x for x in tkn0list if x not in [tkn1]]
         pstart = {}
@@ -41,8 +41,10 @@ class ArbitrageFinderTriangleSingle(ArbitrageFinderTriangleBase):
             O = MargPOptimizer(CC_cc)
 
             try:
-                # Perform the optimization
-                r = O.margp_optimizer(src_token)
+                # Perform the optimization (from the last optimal prices of the miniverse, if available)
+                pstart = self.warm_pstart(miniverse, src_token)
+                r = O.margp_optimizer(src_token, params=None if pstart is None else dict(pstart=pstart))
+                self.update_warm_start(miniverse, src_token, r)
 
                 # Get the profit in the source token
                 profit_src = -r.result
@@ -52,6 +54,8 @@ class ArbitrageFinderTriangleSingle(ArbitrageFinderTriangleBase):
                 trade_instructions_dic = r.trade_instructions(O.TIF_DICTS)
                 trade_instructions = r.trade_instructions()
             except Exception:
+                if r is None:
+                    self.update_warm_start(miniverse, src_token, None)
                 continue
 
             if trade_instructions_dic is None:
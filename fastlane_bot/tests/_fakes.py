@@ -0,0 +1,111 @@
+'''
+Fakes of the node and of the manager shared by the tests of the multicalls and of the event ingestion
+'''
+
+import logging
+from types import SimpleNamespace
+
+from eth_abi import encode
+from web3 import Web3
+
+from fastlane_bot.config.multicaller import collapse_if_tuple
+from fastlane_bot.events.pool_store import PoolStore
+
+W3 = Web3()
+MULTICALL_ADDRESS = "0x5BA1e12693Dc8F9c48aAD8770482f4739bEeD696"
+
+
+def address(n):
+    return Web3.to_checksum_address(f"0x{n:040x}")
+
+
+class FakeAggregate:
+    def __init__(self, eth, calls):
+        self.eth = eth
+        self.calls = calls
+
+    def call(self, block_identifier):
+        self.eth.aggregates.append((self.calls, block_identifier))
+        if any((call["target"], call["callData"]) not in self.eth.outputs for call in self.calls):
+            raise ValueError("execution reverted")
+        block_number = self.eth.block_number if block_identifier == "latest" else block_identifier
+        return block_number, [self.eth.outputs[(call["target"], call["callData"])] for call in self.calls]
+
+
+class FakeEth:
+    """
+    A node which answers the multicalls of the calls registered with `respond` (a batch with any other call reverts)
+    """
+
+    def __init__(self, block_number=1234):
+        self.block_number = block_number
+        self.aggregates = []
+        self.outputs = {}
+
+    def respond(self, contract_address, abi, fn_name, values, args=()):
+        contract = W3.eth.contract(address=contract_address, abi=abi)
+        fn_abi = next(item for item in abi if item.get("name") == fn_name and len(item["inputs"]) == len(args))
+        call_data = contract.encodeABI(fn_name=fn_name, args=list(args))
+        self.outputs[(contract_address, call_data)] = encode([collapse_if_tuple(output) for output in fn_abi["outputs"]], values)
+
+    def contract(self, address, abi):
+        if address == MULTICALL_ADDRESS:
+            return SimpleNamespace(functions=SimpleNamespace(aggregate=lambda calls: FakeAggregate(self, calls)))
+        return W3.eth.contract(address=address, abi=abi)
+
+
+class FakePool:
+    def __init__(self, pool_info):
+        self.state = dict(pool_info)
+
+    def unique_key(self):
+        return "cid"
+
+
+def make_multicall_mgr(pool_data=(), **attrs):
+    """
+    A manager with the pool data (whose changes are reset) and a `FakeEth` node, plus the given attributes
+    """
+    pool_data = PoolStore(pool_data)
+    pool_data.pop_dirty_cids()
+    cfg = SimpleNamespace(
+        CARBON_V1_FORKS=["carbon_v1"],
+        UNI_V3_FORKS=["uniswap_v3"],
+        BALANCER_NAME="balancer",
+        BANCOR_V3_NAME="bancor_v3",
+        BANCOR_V2_NAME="bancor_v2",
+        BANCOR_POL_NAME="bancor_pol",
+        MULTICALLABLE_EXCHANGES=["bancor_v3", "bancor_pol", "balancer"],
+        ARB_CONTRACT_VERSION=10,
+        BNT_ADDRESS="0x1F573D6Fb3F13d689FF844B4cE37794d79a7FF1C",
+        MULTICALL_CONTRACT_ADDRESS=MULTICALL_ADDRESS,
+        logger=logging.getLogger(__name__),
+    )
+    return SimpleNamespace(
+        cfg=cfg,
+        web3=SimpleNamespace(eth=FakeEth(), to_checksum_address=Web3.to_checksum_address),
+        pool_data=pool_data,
+        get_or_init_pool=FakePool,
+        **attrs,
+    )
+
+
+def make_exchange(name, events):
+    return SimpleNamespace(exchange_name=name, get_events=lambda contract: events)
+
+
+def make_event_mgr(events_by_exchange, static_pools, forked_exchanges, **cfg):
+    """
+    A manager whose exchanges emit the given events (web3 contract events), as needed to build the log filters
+    """
+    return SimpleNamespace(
+        cfg=SimpleNamespace(
+            **{"CARBON_V1_FORKS": [], "BALANCER_NAME": "balancer", "BANCOR_POL_NAME": "bancor_pol", "BANCOR_POL_START_BLOCK": 1, **cfg},
+            logger=logging.getLogger(__name__),
+        ),
+        forked_exchanges=forked_exchanges,
+        static_pools=static_pools,
+        exchanges={name: make_exchange(name, events) for name, events in events_by_exchange.items()},
+        event_contracts={name: None for name in events_by_exchange},
+        bancor_pol_last_block=None,
+    )
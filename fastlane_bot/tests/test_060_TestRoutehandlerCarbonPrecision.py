@@ -28,6 +28,7 @@ from fastlane_bot.events.managers.manager import Manager
 from fastlane_bot.helpers import (
     TxRouteHandler,
     TradeInstruction,
+    RawTx,
 )
 from fastlane_bot.tools.cpc import ConstantProductCurve as CPC
 
@@ -213,8 +214,8 @@ def test_test_precision_using_all_tokens_in_carbon():
             if trade.amtin <=0:
                 trade_instructions.pop(idx)
                 continue
-            if trade.raw_txs != "[]":
-                data = eval(trade.raw_txs)
+            if trade.raw_txs:
+                data = trade.raw_txs
                 total_out = 0
                 total_in = 0
                 total_in_wei = 0
@@ -225,22 +226,23 @@ def test_test_precision_using_all_tokens_in_carbon():
                 tx_route_handler.ConfigObj.logger.info(f"\n\n")
     
                 tx_route_handler.ConfigObj.logger.info(f"[calculate_trade_outputs Carbon] starting Carbon trade calculations, {len(data)} trades, remaining_tkn_in = {remaining_tkn_in}")
+                percents_in = []
                 for tx in data:
                     try:
-                        tx["percent_in"] = Decimal(str(tx["amtin"]))/Decimal(str(expected_in))
+                        percents_in.append(Decimal(str(tx.amtin))/Decimal(str(expected_in)))
                     except decimal.InvalidOperation:
-                        tx["percent_in"] = 0
-                        # total_percent += tx["amtin"]/expected_in
-                        tx_route_handler.ConfigObj.logger.info(f"[calculate_trade_outputs] Invalid operation: {tx['amtin']}/{expected_in}")
+                        percents_in.append(0)
+                        # total_percent += tx.amtin/expected_in
+                        tx_route_handler.ConfigObj.logger.info(f"[calculate_trade_outputs] Invalid operation: {tx.amtin}/{expected_in}")
     
                 last_tx = len(data) - 1
     
                 for _idx, tx in enumerate(data):
-                    cid = tx["cid"]
+                    cid = tx.cid
                     cid = cid.split("-")[0]
-                    tknin_key = tx["tknin"]
+                    tknin_key = tx.tknin
     
-                    _next_amt_in = Decimal(str(next_amount_in)) * tx["percent_in"]
+                    _next_amt_in = Decimal(str(next_amount_in)) * percents_in[_idx]
                     if _next_amt_in > remaining_tkn_in:
                         _next_amt_in = remaining_tkn_in
     
@@ -264,15 +266,15 @@ def test_test_precision_using_all_tokens_in_carbon():
     
                     if amount_in_wei <= 0:
                         continue
-                    raw_txs = {
-                        "cid": cid,
-                        "tknin": tx["tknin"],
-                        "amtin": amount_in,
-                        "_amtin_wei": amount_in_wei,
-                        "tknout": tx["tknout"],
-                        "amtout": amount_out,
-                        "_amtout_wei": amount_out_wei,
-                    }
+                    raw_txs = RawTx(
+                        cid=cid,
+                        tknin=tx.tknin,
+                        amtin=amount_in,
+                        amtin_wei=amount_in_wei,
+                        tknout=tx.tknout,
+                        amtout=amount_out,
+                        amtout_wei=amount_out_wei,
+                    )
                     raw_txs_lst.append(raw_txs)
                     total_in += amount_in
                     total_out += amount_out
@@ -284,8 +286,8 @@ def test_test_precision_using_all_tokens_in_carbon():
                         tx_route_handler.ConfigObj.logger.info(f"[calculate_trade_outputs Carbon] LAST trade going into Carbon but {remaining_tkn_in} remaining. Stuffing remainder into other orders:")
     
                         for __idx, _tx in enumerate(raw_txs_lst):
-                            adjusted_next_amt_in = _tx["amtin"] + remaining_tkn_in
-                            _curve = trade_instructions[idx].db.get_pool(cid=_tx["cid"])
+                            adjusted_next_amt_in = _tx.amtin + remaining_tkn_in
+                            _curve = trade_instructions[idx].db.get_pool(cid=_tx.cid)
                             (
                                 _amount_in,
                                 _amount_out,
@@ -295,7 +297,7 @@ def test_test_precision_using_all_tokens_in_carbon():
                                 curve=_curve, trade=trade, amount_in=adjusted_next_amt_in
                             )
     
-                            test_remaining = remaining_tkn_in - _amount_in + _tx["amtin"]
+                            test_remaining = remaining_tkn_in - _amount_in + _tx.amtin
                             remaining_tkn_in = TradeInstruction._quantize(amount=remaining_tkn_in,
                                                                             decimals=trade.tknin_decimals)
                             if test_remaining < 0:
@@ -303,19 +305,14 @@ def test_test_precision_using_all_tokens_in_carbon():
                                     f"[calculate_trade_outputs Carbon] Trade overflow, trying next order.")
                                 continue
     
-                            remaining_tkn_in = remaining_tkn_in + _tx["amtin"] - _amount_in
-    
-                            _raw_txs = {
-                                "cid": _tx["cid"],
-                                "tknin": _tx["tknin"],
-                                "amtin": _amount_in,
-                                "_amtin_wei": _amount_in_wei,
-                                "tknout": _tx["tknout"],
-                                "amtout": _amount_out,
-                                "_amtout_wei": _amount_out_wei,
-                            }
+                            remaining_tkn_in = remaining_tkn_in + _tx.amtin - _amount_in
     
-                            raw_txs_lst[__idx] = _raw_txs
+                            raw_txs_lst[__idx] = _tx._replace(
+                                amtin=_amount_in,
+                                amtin_wei=_amount_in_wei,
+                                amtout=_amount_out,
+                                amtout_wei=_amount_out_wei,
+                            )
     
                             if __idx == last_tx:
                                 assert remaining_tkn_in == 0, f"Failed to use all tokens into Carbon trade after trying to put more tokens into every order, {remaining_tkn_in} remaining"
@@ -332,7 +329,7 @@ def test_test_precision_using_all_tokens_in_carbon():
                 trade_instructions[idx].amtout = amount_out
                 trade_instructions[idx]._amtin_wei = total_in_wei
                 trade_instructions[idx]._amtout_wei = total_out_wei
-                trade_instructions[idx].raw_txs = str(raw_txs_lst)
+                trade_instructions[idx].raw_txs = raw_txs_lst
     
             else:
     
@@ -0,0 +1,146 @@
+
+'''
+This module tests the indexed PoolStore used by the manager
+'''
+
+import pickle
+
+from fastlane_bot.events.pool_store import PoolStore
+
+
+def make_pools():
+    return [
+        {"cid": "0x01", "exchange_name": "uniswap_v2", "address": "0xA", "tkn0_address": "0xT0", "tkn1_address": "0xT1", "last_updated_block": 1},
+        {"cid": "0x02", "exchange_name": "uniswap_v3", "address": "0xA", "tkn0_address": "0xT0", "tkn1_address": "0xT1", "last_updated_block": 2},
+        {"cid": "0x03", "exchange_name": "bancor_v2", "address": "0xB", "anchor": "0xANC", "tkn0_address": "0xT0", "tkn1_address": "0xT2", "last_updated_block": 3},
+        {"cid": "0x04", "exchange_name": "bancor_pol", "address": "0xP", "tkn0_address": "0xT3", "tkn1_address": "0xT4", "last_updated_block": 4},
+    ]
+
+
+def test_lookups():
+    store = PoolStore(make_pools())
+    assert len(store) == 4
+    assert store.get("0x03")["exchange_name"] == "bancor_v2"
+    assert store.get("0xnope") is None
+    assert store.find("uniswap_v3", "address", "0xA")["cid"] == "0x02"
+    assert store.find("uniswap_v2", "address", "0xA")["cid"] == "0x01"
+    assert store.find("bancor_v2", "anchor", "0xANC")["cid"] == "0x03"
+    assert store.find("bancor_pol", "tkn0_address", "0xT3")["cid"] == "0x04"
+    assert store.find("bancor_v2", ("tkn0_address", "tkn1_address"), ("0xT0", "0xT2"))["cid"] == "0x03"
+    assert store.find("bancor_v2", ("tkn0_address", "tkn1_address"), ("0xT2", "0xT0")) is None
+    # non-indexed keys fall back to a scan
+    assert store.find("uniswap_v2", "last_updated_block", 1)["cid"] == "0x01"
+
+
+def test_mutations_keep_index_consistent():
+    store = PoolStore(make_pools())
+    new_pool = {"cid": "0x05", "exchange_name": "uniswap_v2", "address": "0xC"}
+    store.append(new_pool)
+    assert store.find("uniswap_v2", "address", "0xC") is new_pool
+    assert store.position(new_pool) == 4
+
+    replacement = {"cid": "0x01", "exchange_name": "uniswap_v2", "address": "0xD"}
+    store[0] = replacement
+    assert store.find("uniswap_v2", "address", "0xA") is None
+    assert store.find("uniswap_v2", "address", "0xD") is replacement
+    assert store.get("0x01") is replacement
+
+    # in-place change of an indexed value followed by a re-assignment
+    replacement["address"] = "0xE"
+    store[0] = replacement
+    assert store.find("uniswap_v2", "address", "0xE") is replacement
+    assert store.find("uniswap_v2", "address", "0xD") is None
+
+    assert store.remove_cids(["0x02", "0x03"]) == 2
+    assert [p["cid"] for p in store] == ["0x01", "0x04", "0x05"]
+    assert store.get("0x02") is None
+    assert store.position(new_pool) == 2
+
+    store.pop(0)
+    assert store.get("0x01") is None
+    del store[0]
+    assert store.get("0x04") is None
+    assert list(store) == [new_pool]
+
+
+def test_replace_and_deduplicate():
+    pools = make_pools()
+    store = PoolStore(pools)
+    updated = dict(pools[1], last_updated_block=10)
+    assert store.replace(pools[1], updated)
+    assert store[1] is updated
+    assert not store.replace({"cid": "0x99"}, updated)
+
+    store.append(dict(pools[0], last_updated_block=20))
+    assert store.has_duplicate_cids()
+    store.sort(key=lambda x: x["last_updated_block"], reverse=True)
+    store.drop_duplicate_cids()
+    assert not store.has_duplicate_cids()
+    assert [p["cid"] for p in store] == ["0x01", "0x02", "0x04", "0x03"]
+    assert store.get("0x01")["last_updated_block"] == 20
+
+
+def test_duplicate_cids_resolve_in_list_order():
+    pools = make_pools()
+    store = PoolStore(pools)
+    newer = dict(pools[0], last_updated_block=20)
+    store.append(newer)
+    assert store.get("0x01") is pools[0]
+    store.sort(key=lambda x: x["last_updated_block"], reverse=True)
+    assert store.get("0x01") is newer
+    assert store.find("uniswap_v2", "address", "0xA") is newer
+    assert store.snapshot().get("0x01") == newer
+
+
+def test_list_compatibility():
+    store = PoolStore(make_pools())
+    assert store == make_pools()
+    assert type(store.copy()) is list
+    restored = pickle.loads(pickle.dumps(store))
+    assert isinstance(restored, PoolStore)
+    assert restored.find("bancor_v2", "anchor", "0xANC")["cid"] == "0x03"
+
+
+def test_copy_on_write_snapshots():
+    store = PoolStore(make_pools())
+    first = store.snapshot()
+    assert [pool["cid"] for pool in first] == ["0x01", "0x02", "0x03", "0x04"]
+    assert store.snapshot() is first
+
+    # only the changed pools are copied, the others are shared with the previous version
+    pool = store.get("0x02")
+    pool["last_updated_block"] = 20
+    store.replace(pool, pool)
+    store.append({"cid": "0x05", "exchange_name": "uniswap_v2", "address": "0xC"})
+    store.remove_cids(["0x03"])
+    second = store.snapshot()
+    assert second.version == first.version + 1
+    assert second.changed_cids == {"0x02", "0x03", "0x05"}
+    assert second.get("0x01") is first.get("0x01")
+    assert first.get("0x02")["last_updated_block"] == 2
+    assert second.get("0x02")["last_updated_block"] == 20
+    assert [pool["cid"] for pool in second] == ["0x01", "0x02", "0x04", "0x05"]
+
+    # the snapshots are immutable, and their pools are not affected by later in-place changes
+    pool["last_updated_block"] = 30
+    assert second.get("0x02")["last_updated_block"] == 20
+    try:
+        second.get("0x01")["last_updated_block"] = 10
+        assert False, "snapshot pools must be read-only"
+    except TypeError:
+        pass
+
+    diff = second.diff(first)
+    assert set(diff) == {"0x02", "0x03", "0x05"}
+    assert diff["0x03"] == (first.get("0x03"), None)
+    assert diff["0x05"] == (None, second.get("0x05"))
+    assert set(first.diff(second)) == set(diff)
+
+    # a replacement with an equal pool is not a difference
+    store.replace(store.get("0x01"), dict(store.get("0x01")))
+    assert store.snapshot().diff(second) == {}
+    assert store.snapshot().diff(first).keys() == diff.keys()
+
+    restored = pickle.loads(pickle.dumps(second))
+    assert list(restored) == list(second)
+    assert restored.get("0x02") == second.get("0x02")
@@ -0,0 +1,110 @@
+
+'''
+This module tests the incremental curve cache and the CPCContainer in-place updates it relies on
+'''
+
+from unittest.mock import MagicMock, Mock
+
+from fastlane_bot.events.curve_cache import CurveCache
+from fastlane_bot.events.interface import QueryInterface
+from fastlane_bot.events.pool_store import PoolStore
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer
+
+
+def make_record(cid, x, y, tkn0="0xT0", tkn1="0xT1"):
+    return {
+        "cid": cid, "exchange_name": "uniswap_v2", "address": f"0xA{cid}", "descr": f"uniswap_v2 {tkn0}/{tkn1}",
+        "pair_name": f"{tkn0}/{tkn1}", "fee": "0.003", "fee_float": 0.003, "tkn0_balance": x, "tkn1_balance": y,
+        "tkn0_address": tkn0, "tkn0_symbol": "T0", "tkn0_decimals": 18, "tkn0_key": tkn0,
+        "tkn1_address": tkn1, "tkn1_symbol": "T1", "tkn1_decimals": 18, "tkn1_key": tkn1,
+        "last_updated_block": 1,
+    }
+
+
+class Converter:
+    """counts the conversions; pools with a zero balance fail to convert"""
+    def __init__(self):
+        self.converted = []
+
+    def __call__(self, p, ADDRDEC):
+        self.converted.append(p.cid)
+        if not p.tkn0_balance:
+            return []
+        pair = f"{p.tkn0_address}/{p.tkn1_address}"
+        return [CPC.from_xy(x=p.tkn0_balance, y=p.tkn1_balance, pair=pair, cid=p.cid, fee=p.fee_float)]
+
+
+def make_db(state):
+    cfg = Mock()
+    cfg.logger = MagicMock()
+    cfg.GAS_TKN_IN_FLASHLOAN_TOKENS = False
+    return QueryInterface(mgr=None, ConfigObj=cfg, state=state)
+
+
+def test_container_replace_and_remove():
+    c1 = CPC.from_xy(x=100, y=200, pair="A/B", cid="1")
+    c2 = CPC.from_xy(x=100, y=300, pair="A/B", cid="2")
+    c3 = CPC.from_xy(x=50, y=50, pair="B/C", cid="3")
+    CC = CPCContainer([c1, c2, c3])
+
+    c2b = CPC.from_xy(x=100, y=400, pair="A/B", cid="2")
+    CC.replace(c2b)
+    assert CC.curves == [c1, c2b, c3]
+    assert CC.bycid("2") is c2b
+    assert CC.curveix(c2b) == 1
+    assert c2 not in CC
+    assert CC.curves_by_primary_pair["A/B"] == [c1, c2b]
+
+    CC.remove(["1", "nope"])
+    assert CC.curves == [c2b, c3]
+    assert CC.bycid("1") is None
+    assert CC.curveix(c3) == 1
+    assert CC.curves_by_primary_pair["A/B"] == [c2b]
+
+    CC.remove("3")
+    assert "B/C" not in CC.curves_by_primary_pair
+    CC.replace(c3)
+    assert CC.curves == [c2b, c3]
+
+
+def test_curve_cache_rebuilds_only_dirty_pools():
+    store = PoolStore([make_record("1", 100, 200), make_record("2", 300, 400), make_record("3", 0, 1)])
+    cache = CurveCache()
+    convert = Converter()
+
+    cache.mark_dirty(store.pop_dirty_cids())
+    CC = cache.update(make_db(store), convert)
+    assert sorted(convert.converted) == ["1", "2", "3"]
+    assert sorted(c.cid for c in CC) == ["1", "2"]
+    assert sorted(cache.pools) == ["1", "2", "3"]
+
+    # nothing changed: nothing is converted again and the same container is returned
+    convert.converted = []
+    cache.mark_dirty(store.pop_dirty_cids())
+    db = make_db(store)
+    assert cache.update(db, convert) is CC
+    assert convert.converted == []
+    assert sorted(db.pool_data) == ["1", "2", "3"]
+
+    # an update, a new pool, a removed pool and a pool which becomes convertible
+    pool = store.get("1")
+    pool.update({"tkn0_balance": 150})
+    store.reindex(pool)
+    store.append(make_record("4", 10, 20))
+    store.remove_cids(["2"])
+    store.replace(store.get("3"), make_record("3", 5, 5))
+    cache.mark_dirty(store.pop_dirty_cids())
+    assert cache.update(make_db(store), convert) is CC
+    assert sorted(convert.converted) == ["1", "3", "4"]
+    assert sorted(c.cid for c in CC) == ["1", "3", "4"]
+    assert CC.bycid("1").x == 150
+    assert sorted(cache.pools) == ["1", "3", "4"]
+
+    # pools filtered out of the state are dropped even when they did not change
+    convert.converted = []
+    db = make_db(store)
+    db.state = [p for p in store if p["cid"] != "4"]
+    cache.update(db, convert)
+    assert convert.converted == []
+    assert sorted(c.cid for c in CC) == ["1", "3"]
+    assert db.get_pool(cid="4") is None
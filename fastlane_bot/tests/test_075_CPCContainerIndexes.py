@@ -0,0 +1,67 @@
+
+'''
+This module tests that the indexed CPCContainer queries return the same results as scanning all curves
+'''
+
+import os
+
+import pandas as pd
+
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer
+
+DATA = os.path.join(os.path.dirname(__file__), "_data", "NBTEST_002_Curves.csv.gz")
+
+
+def load_market():
+    return CPCContainer.from_df(pd.read_csv(DATA))
+
+
+def cids(curves):
+    return [c.cid for c in curves]
+
+
+def check_against_scan(CC):
+    tokens = sorted(CC.tokens())
+    for pair in sorted(CC.pairs(standardize=False)):
+        pairr = "/".join(pair.split("/")[::-1])
+        assert cids(CC.bypair(pair, directed=True)) == cids(c for c in CC if c.pair == pair)
+        assert cids(CC.bypair(pair)) == cids(
+            [c for c in CC if c.pair == pair] + [c for c in CC if c.pair == pairr]
+        )
+        assert cids(CC.bypairs({pair, pairr}, directed=True)) == cids(c for c in CC if c.pair in {pair, pairr})
+    for tkn in tokens:
+        assert cids(CC.bytknx(tkn)) == cids(c for c in CC if c.tknx == tkn)
+        assert cids(CC.bytkny(tkn)) == cids(c for c in CC if c.tkny == tkn)
+        assert cids(CC.bytknxs([tkn, "NOPE"])) == cids(c for c in CC if c.tknx == tkn)
+        onein = {c.pairo.primary for c in CC if tkn in (c.tknx, c.tkny)}
+        assert CC.filter_pairs(onein=tkn) == onein
+        assert CC.filter_pairs(contains=tkn, notin="NOPE") == onein
+    for tkn0, tkn1 in zip(tokens, tokens[1:]):
+        bothin = {c.pairo.primary for c in CC if {c.tknx, c.tkny} <= {tkn0, tkn1}}
+        assert CC.filter_pairs(bothin=f"{tkn0},{tkn1}") == bothin
+        assert set(CC.filter_pairs(onein=tkn0)) & set(CC.filter_pairs(onein=tkn1)) == bothin
+    for exchange in {c.P("exchange") for c in CC}:
+        assert cids(CC.byparams(exchange=exchange)) == cids(c for c in CC if c.P("exchange") == exchange)
+        assert cids(CC.byparams(exchange=exchange, _inv=True)) == cids(c for c in CC if c.P("exchange") != exchange)
+    assert CC.tknxs() == {c.tknx for c in CC}
+    assert CC.tknys() == {c.tkny for c in CC}
+    assert CC.pairs() == {c.pairo.primary for c in CC}
+
+
+def test_indexed_queries_match_scans():
+    CC = load_market()
+    assert len(CC) > 100
+    check_against_scan(CC)
+
+
+def test_indexes_follow_add_replace_remove():
+    CC = load_market()
+    CC.byparams(exchange="uniswap_v2")  # builds the indexes, including the exchange param index
+    c0 = CC.curves[0]
+    CC.remove([CC.curves[1].cid, CC.curves[5].cid])
+    CC.replace(CPC.from_xy(x=1, y=2, pair="NEW/TKN", cid=c0.cid, params={"exchange": "newswap"}))
+    CC.add(CPC.from_xy(x=3, y=4, pair="TKN/NEW", cid="new", params={"exchange": "uniswap_v2"}))
+    assert c0 not in CC
+    assert cids(CC.byparams(exchange="newswap")) == [c0.cid]
+    assert cids(CC.bypair("NEW/TKN")) == [c0.cid, "new"]
+    check_against_scan(CC)
@@ -0,0 +1,101 @@
+
+'''
+This module tests the incremental Bancor POL event sync and its on-disk cache
+'''
+
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from fastlane_bot.events.utils import (
+    get_bancor_pol_events_path,
+    get_bancor_pol_from_block,
+    get_event_filters,
+    load_bancor_pol_events,
+    update_bancor_pol_events,
+)
+
+START_BLOCK = 100
+
+
+def make_mgr(prefix_path, read_only=False):
+    os.makedirs(os.path.join(prefix_path, "fastlane_bot/data/blockchain_data/ethereum"), exist_ok=True)
+    cfg = SimpleNamespace(NETWORK="ethereum", BANCOR_POL_START_BLOCK=START_BLOCK, logger=MagicMock())
+    return SimpleNamespace(
+        cfg=cfg, prefix_path=prefix_path, read_only=read_only, exchanges={"bancor_pol": None},
+        bancor_pol_events={}, bancor_pol_last_block=None, events=[],
+    )
+
+
+def make_event(name, token, block, log_index=0):
+    return {"event": name, "args": {"token": token}, "blockNumber": block, "transactionIndex": 0, "logIndex": log_index}
+
+
+class FakeEvent:
+    def __init__(self, name):
+        self.__name__ = name
+        self.calls = []
+
+    def create_filter(self, **kwargs):
+        self.calls.append(kwargs)
+        return kwargs
+
+
+def test_first_sync_then_incremental(tmp_path):
+    mgr = make_mgr(f"{tmp_path}/")
+    assert load_bancor_pol_events(mgr, current_block=1000) == []
+    assert get_bancor_pol_from_block(mgr) == START_BLOCK
+
+    traded, enabled, swap = FakeEvent("TokenTraded"), FakeEvent("TradingEnabled"), FakeEvent("Swap")
+    mgr.events = [traded, enabled, swap]
+    get_event_filters(1, mgr, start_block=990, current_block=1000)
+    assert enabled.calls == [{"fromBlock": START_BLOCK, "toBlock": 1000}]
+    assert swap.calls == [{"fromBlock": 990, "toBlock": 1000}]
+
+    events = [
+        [make_event("TradingEnabled", "0xA", 200), make_event("TokenTraded", "0xA", 500)],
+        [make_event("TradingEnabled", "0xB", 300)],
+        [{"event": "Swap", "args": {}, "blockNumber": 999, "transactionIndex": 0, "logIndex": 0}],
+    ]
+    update_bancor_pol_events(mgr, events, current_block=1000)
+    assert mgr.bancor_pol_last_block == 1000
+    assert mgr.bancor_pol_events["0xA"]["blockNumber"] == 500
+    assert set(mgr.bancor_pol_events) == {"0xA", "0xB"}
+
+    # subsequent iterations only fetch the blocks after the high-water mark
+    enabled.calls = []
+    get_event_filters(1, mgr, start_block=995, current_block=1010)
+    assert enabled.calls == [{"fromBlock": 1001, "toBlock": 1010}]
+    assert load_bancor_pol_events(mgr, current_block=1010) == []
+
+    # nothing to fetch if the current block did not move
+    enabled.calls = []
+    get_event_filters(1, mgr, start_block=995, current_block=1000)
+    assert enabled.calls == []
+
+    with open(get_bancor_pol_events_path(mgr)) as f:
+        assert json.load(f)["last_block"] == 1000
+
+
+def test_cache_loaded_at_startup(tmp_path):
+    mgr = make_mgr(f"{tmp_path}/")
+    load_bancor_pol_events(mgr, current_block=1000)
+    update_bancor_pol_events(mgr, [[make_event("TradingEnabled", "0xA", 200)]], current_block=1000)
+
+    restarted = make_mgr(f"{tmp_path}/")
+    cached = load_bancor_pol_events(restarted, current_block=1200)
+    assert [e["args"]["token"] for e in cached] == ["0xA"]
+    assert get_bancor_pol_from_block(restarted) == 1001
+
+    # a cache ahead of the current block (e.g. replaying from a past block) is ignored
+    replay = make_mgr(f"{tmp_path}/")
+    assert load_bancor_pol_events(replay, current_block=900) == []
+    assert get_bancor_pol_from_block(replay) == START_BLOCK
+
+    # read-only runs do not write the cache
+    read_only = make_mgr(f"{tmp_path}/", read_only=True)
+    load_bancor_pol_events(read_only, current_block=1200)
+    update_bancor_pol_events(read_only, [[make_event("TokenTraded", "0xA", 1100)]], current_block=1200)
+    with open(get_bancor_pol_events_path(mgr)) as f:
+        assert json.load(f)["last_block"] == 1000
@@ -0,0 +1,99 @@
+
+'''
+This module tests the batching, concurrency and bisection of the MultiCaller
+'''
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+from eth_abi import decode, encode
+from web3 import Web3
+
+from fastlane_bot.config.multicaller import MultiCaller
+from fastlane_bot.data.abi import CARBON_CONTROLLER_ABI
+
+CARBON_CONTROLLER_ADDRESS = "0xC537e898CD774e2dCBa3B14Ea6f34C93d5eA45e1"
+
+
+class FakeMulticallWeb3:
+    """
+    Answers `aggregate` calls for pairTradingFeePPM(tkn0, tkn1) with the last byte of tkn1 as the fee;
+    aggregates of more than `max_calls` calls and calls for the `failing` token revert, and every aggregate
+    raises `error` if given
+    """
+    def __init__(self, max_calls=None, failing=None, error=None):
+        self.max_calls = max_calls
+        self.failing = failing
+        self.error = error
+        self.aggregates = []
+        self.lock = threading.Lock()
+        self.eth = SimpleNamespace(contract=self.contract)
+
+    @staticmethod
+    def to_checksum_address(address):
+        return Web3.to_checksum_address(address)
+
+    def contract(self, abi, address):
+        return SimpleNamespace(functions=SimpleNamespace(aggregate=self.aggregate))
+
+    def aggregate(self, calls):
+        def call(block_identifier):
+            with self.lock:
+                self.aggregates.append(len(calls))
+            if self.error is not None:
+                raise self.error
+            if self.max_calls is not None and len(calls) > self.max_calls:
+                raise ValueError("out of gas")
+            results = []
+            for c in calls:
+                tkn0, tkn1 = decode(["address", "address"], bytes.fromhex(c["callData"][10:]))
+                if tkn1 == self.failing:
+                    raise ValueError("execution reverted")
+                results.append(encode(["uint32"], [int(tkn1[-2:], 16)]))
+            return [block_identifier, results]
+        return SimpleNamespace(call=call)
+
+
+def run_multicall(fake_web3, n_calls, **kwargs):
+    contract = Web3().eth.contract(address=CARBON_CONTROLLER_ADDRESS, abi=CARBON_CONTROLLER_ABI)
+    multicaller = MultiCaller(contract=contract, web3=fake_web3, block_identifier=123, **kwargs)
+    with multicaller as mc:
+        for i in range(n_calls):
+            mc.add_call(contract.functions.pairTradingFeePPM, "0x" + "11" * 20, f"0x{'22' * 19}{i:02x}")
+    return multicaller, multicaller.multicall()
+
+
+def test_batches_keep_call_order():
+    fake_web3 = FakeMulticallWeb3()
+    multicaller, result = run_multicall(fake_web3, 10, batch_size=3, max_workers=4)
+    assert result == list(range(10))
+    assert sorted(fake_web3.aggregates) == [1, 3, 3, 3]
+    assert sorted(n for n, _ in multicaller.batch_latencies) == [1, 3, 3, 3]
+
+
+def test_failed_batches_are_bisected():
+    fake_web3 = FakeMulticallWeb3(max_calls=2)
+    multicaller, result = run_multicall(fake_web3, 7, batch_size=7)
+    assert result == list(range(7))
+    assert all(n <= 2 for n, _ in multicaller.batch_latencies)
+    assert sum(n for n, _ in multicaller.batch_latencies) == 7
+
+
+def test_failing_call_is_raised():
+    fake_web3 = FakeMulticallWeb3(failing=Web3.to_checksum_address(f"0x{'22' * 19}05"))
+    with pytest.raises(ValueError, match="execution reverted"):
+        run_multicall(fake_web3, 8, batch_size=4)
+
+
+@pytest.mark.parametrize("error", [TimeoutError("read timed out"), ValueError("429 Client Error: Too Many Requests")])
+def test_transport_errors_are_not_bisected(error):
+    fake_web3 = FakeMulticallWeb3(error=error)
+    with pytest.raises(type(error)):
+        run_multicall(fake_web3, 8, batch_size=8)
+    assert fake_web3.aggregates == [8]
+
+
+def test_no_calls():
+    _, result = run_multicall(FakeMulticallWeb3(), 0)
+    assert result == []
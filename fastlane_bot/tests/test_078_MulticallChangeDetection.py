@@ -0,0 +1,59 @@
+
+'''
+This module tests that multicall results only update the pools whose state changed
+'''
+
+from types import SimpleNamespace
+
+from fastlane_bot.events.multicall_utils import multicall_params_changed, process_results_for_multicall
+from fastlane_bot.events.pool_store import PoolStore
+
+
+class FakePool:
+    def __init__(self, pool_info):
+        self.state = dict(pool_info)
+
+    @staticmethod
+    def unique_key():
+        return "anchor"
+
+
+class FakeManager:
+    def __init__(self, pool_data):
+        self.pool_data = PoolStore(pool_data)
+        self.cfg = SimpleNamespace(CARBON_V1_FORKS=["carbon_v1"])
+        self.exchanges = {"balancer": SimpleNamespace(pools={})}
+
+    def get_or_init_pool(self, pool_info):
+        pools = self.exchanges[pool_info["exchange_name"]].pools
+        return pools.setdefault(pool_info["anchor"], FakePool(pool_info))
+
+
+def make_pool(cid, tkn0_balance, tkn1_balance):
+    return {
+        "cid": cid, "exchange_name": "balancer", "address": f"0xA{cid}", "anchor": f"0xANC{cid}",
+        "tkn0_balance": tkn0_balance, "tkn1_balance": tkn1_balance, "last_updated_block": 1,
+    }
+
+
+def test_multicall_params_changed():
+    pool_info = make_pool("1", 10, 20)
+    assert not multicall_params_changed({"tkn0_balance": 10, "tkn1_balance": 20}, pool_info)
+    assert multicall_params_changed({"tkn0_balance": 10, "tkn1_balance": 21}, pool_info)
+    assert multicall_params_changed({"tkn2_balance": 0}, pool_info)
+
+
+def test_only_changed_pools_are_updated():
+    mgr = FakeManager([make_pool("1", 10, 20), make_pool("2", 30, 40), make_pool("3", 50, 60)])
+    mgr.pool_data.pop_dirty_cids()
+
+    changed = process_results_for_multicall("balancer", [0, 1, 2], [[10, 20], [30, 41], [50, 60]], mgr)
+    assert changed == {"2"}
+    assert mgr.pool_data.pop_dirty_cids() == {"2"}
+    assert mgr.pool_data.get("2")["tkn1_balance"] == 41
+    assert mgr.exchanges["balancer"].pools["0xANC2"].state["tkn1_balance"] == 41
+    # unchanged pools are still registered with their exchange
+    assert mgr.exchanges["balancer"].pools["0xANC1"].state["tkn1_balance"] == 20
+
+    assert process_results_for_multicall("balancer", [0, 1, 2], [[10, 20], [30, 41], [50, 60]], mgr) == set()
+    assert mgr.pool_data.pop_dirty_cids() == set()
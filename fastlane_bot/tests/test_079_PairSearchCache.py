@@ -0,0 +1,69 @@
+
+'''
+This module tests that the multi_pairwise_all finder only re-optimizes the pairs whose curves changed
+'''
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from fastlane_bot.modes.pairwise_multi_all import FindArbitrageMultiPairwiseAll
+from fastlane_bot.modes.search_cache import PairSearchCache
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer
+
+WETH = "WETH-6Cc2"
+OPTIMIZE_PAIR = FindArbitrageMultiPairwiseAll.optimize_pair
+
+
+def make_config():
+    return SimpleNamespace(
+        logger=MagicMock(),
+        CARBON_V1_FORKS=["carbon_v1"],
+        DEFAULT_MIN_PROFIT_GAS_TOKEN=0.0001,
+        NATIVE_GAS_TOKEN_ADDRESS="ETH-EEeE",
+        WRAPPED_GAS_TOKEN_ADDRESS=WETH,
+    )
+
+
+def make_curves(tkn_price=2000):
+    return [
+        CPC.from_pk(p=tkn_price, k=tkn_price * 1000 ** 2, pair=f"TKN/{WETH}", cid="1", fee=0.003, params={"exchange": "uniswap_v2"}),
+        CPC.from_pk(p=2100, k=2100 * 1000 ** 2, pair=f"TKN/{WETH}", cid="2", fee=0.003, params={"exchange": "sushiswap_v2"}),
+        CPC.from_pk(p=0.5, k=0.5 * 1000 ** 2, pair=f"USD/{WETH}", cid="3", fee=0.003, params={"exchange": "uniswap_v2"}),
+        CPC.from_pk(p=0.55, k=0.55 * 1000 ** 2, pair=f"USD/{WETH}", cid="4", fee=0.003, params={"exchange": "sushiswap_v2"}),
+    ]
+
+
+def find(curves, search_cache, monkeypatch):
+    flows = []
+
+    def counting_optimize_pair(self, tkn0, tkn1, CC):
+        flows.append((tkn0, tkn1))
+        return OPTIMIZE_PAIR(self, tkn0, tkn1, CC)
+
+    monkeypatch.setattr(FindArbitrageMultiPairwiseAll, "optimize_pair", counting_optimize_pair)
+    finder = FindArbitrageMultiPairwiseAll(
+        flashloan_tokens=[WETH], CCm=CPCContainer(curves), ConfigObj=make_config(), search_cache=search_cache,
+    )
+    candidates = finder.find_arbitrage()
+    return sorted((round(c[0], 8), tuple(ti["cid"] for ti in c[2])) for c in candidates), flows
+
+
+def test_only_changed_pairs_are_optimized(monkeypatch):
+    expected, flows = find(make_curves(), None, monkeypatch)
+    assert len(expected) == 4
+    assert sorted(flows) == [("TKN", WETH), ("USD", WETH)]
+
+    search_cache = PairSearchCache()
+    assert find(make_curves(), search_cache, monkeypatch) == (expected, flows)
+    candidates, flows = find(make_curves(), search_cache, monkeypatch)
+    assert candidates == expected
+    assert flows == []
+
+    # updating a curve re-optimizes its pair only
+    candidates, flows = find(make_curves(tkn_price=1900), search_cache, monkeypatch)
+    assert flows == [("TKN", WETH)]
+    assert candidates == find(make_curves(tkn_price=1900), None, monkeypatch)[0]
+
+    # pairs which are no longer searched are dropped from the cache
+    find(make_curves()[:2], search_cache, monkeypatch)
+    assert list(search_cache.results) == [("TKN", WETH)]
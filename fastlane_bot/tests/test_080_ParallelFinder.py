@@ -0,0 +1,65 @@
+
+'''
+This module tests that the arb finders give the same candidates whether they run in one or several processes
+'''
+
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from fastlane_bot.modes.parallel import get_n_workers, run_tasks
+from fastlane_bot.modes.pairwise_multi_all import FindArbitrageMultiPairwiseAll
+from fastlane_bot.modes.search_cache import PairSearchCache
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer
+
+WETH = "WETH-6Cc2"
+
+
+def make_config():
+    return SimpleNamespace(
+        logger=MagicMock(),
+        CARBON_V1_FORKS=["carbon_v1"],
+        DEFAULT_MIN_PROFIT_GAS_TOKEN=0.0001,
+        NATIVE_GAS_TOKEN_ADDRESS="ETH-EEeE",
+        WRAPPED_GAS_TOKEN_ADDRESS=WETH,
+    )
+
+
+def make_curves(n_pairs=12):
+    curves = []
+    for i in range(n_pairs):
+        for j, exchange in enumerate(["uniswap_v2", "sushiswap_v2", "pancakeswap_v2"]):
+            p = (i + 1) * (1 + 0.03 * j)
+            curves += [CPC.from_pk(p=p, k=p * 1000 ** 2, pair=f"TKN{i}/{WETH}", cid=f"{i}-{j}", fee=0.003, params={"exchange": exchange})]
+    return curves
+
+
+def find(n_jobs, search_cache=None):
+    finder = FindArbitrageMultiPairwiseAll(
+        flashloan_tokens=[WETH], CCm=CPCContainer(make_curves()), ConfigObj=make_config(), search_cache=search_cache, n_jobs=n_jobs,
+    )
+    return [(c[0], c[3], [ti["cid"] for ti in c[2]], c[1].to_dict()) for c in finder.find_arbitrage()]
+
+
+def test_get_n_workers():
+    assert get_n_workers(None, 100) == 1
+    assert get_n_workers(1, 100) == 1
+    assert get_n_workers(4, 100) == 4
+    assert get_n_workers(4, 9) == 2
+    assert get_n_workers(4, 3) == 1
+    assert get_n_workers(-1, 10 ** 6) == os.cpu_count()
+
+
+def test_run_tasks_keeps_the_task_order():
+    tasks = [(i, i + 1) for i in range(50)]
+    assert run_tasks(pow, tasks, n_jobs=3) == [pow(*task) for task in tasks]
+
+
+def test_candidates_do_not_depend_on_the_number_of_workers():
+    expected = find(n_jobs=1)
+    assert len(expected) > 10
+    assert find(n_jobs=3) == expected
+    search_cache = PairSearchCache()
+    assert find(n_jobs=3, search_cache=search_cache) == expected
+    assert find(n_jobs=3, search_cache=search_cache) == expected
+    assert search_cache.hits == 12
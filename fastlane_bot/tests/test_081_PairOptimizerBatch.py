@@ -0,0 +1,60 @@
+
+'''
+This module tests that the batched PairOptimizer gives the same results as optimizing each pair on its own
+'''
+
+import os
+
+import pandas as pd
+
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer
+from fastlane_bot.tools.optimizer import PairOptimizer
+
+DATA = os.path.join(os.path.dirname(__file__), "_data", "NBTEST_002_Curves.csv.gz")
+
+
+def make_combos():
+    CC = CPCContainer.from_df(pd.read_csv(DATA))
+    combos = []
+    for pair in sorted(CC.pairs()):
+        tknb, tknq = pair.split("/")
+        curves = CC.bypairs(CC.filter_pairs(bothin=f"{tknb},{tknq}")).curves
+        combos += [([c0, c1], tknq) for c0 in curves for c1 in curves if c0 is not c1]
+        combos += [(curves, tknb)]
+    return combos
+
+
+def test_batch_matches_single_optimizations():
+    combos = make_combos()
+    results = PairOptimizer.optimize_batch([CPCContainer(curves) for curves, _ in combos], [tkn for _, tkn in combos])
+    assert len(results) == len(combos) > 250
+
+    n_errors = 0
+    for (curves, targettkn), rb in zip(combos, results):
+        try:
+            r = PairOptimizer(CPCContainer(curves)).optimize(targettkn)
+        except (ValueError, ZeroDivisionError):
+            n_errors += 1
+            assert rb.is_error
+            continue
+        assert not rb.is_error
+        assert rb.p_optimal_t == r.p_optimal_t
+        assert rb.result == r.result
+        assert rb.dtokens == r.dtokens
+        assert rb.trade_instructions(PairOptimizer.TIF_DICTS) == r.trade_instructions(PairOptimizer.TIF_DICTS)
+    assert n_errors < len(combos) / 10
+
+
+def test_batch_with_asymmetric_and_levered_curves():
+    curves = [
+        CPC.from_carbon(yint=1000, y=1000, pa=2100, pb=2000, pair="ETH/USDC", tkny="ETH", cid="c0", fee=0.002),
+        CPC.from_pk(p=1900, k=1900 * 100 ** 2, pair="ETH/USDC", cid="u0", fee=0.003),
+        CPC.from_xyal(x=100, y=100 * 1950 / 4, alpha=0.8, pair="ETH/USDC", cid="b0", fee=0.001),
+        CPC.from_pk(p=1 / 1980, k=100 ** 2 / 1980, pair="USDC/ETH", cid="u1", fee=0.003),
+    ]
+    combos = [(curves[:2], "USDC"), (curves[1:3], "ETH"), (curves, "USDC"), ([curves[0], curves[3]], "ETH")]
+    results = PairOptimizer.optimize_batch([CPCContainer(c) for c, _ in combos], [tkn for _, tkn in combos])
+    for (c, targettkn), rb in zip(combos, results):
+        r = PairOptimizer(CPCContainer(c)).optimize(targettkn)
+        assert abs(rb.p_optimal_t[0] / r.p_optimal_t[0] - 1) < 1e-12
+        assert abs(rb.result - r.result) <= 1e-9 * max(abs(r.result), 1)
@@ -0,0 +1,69 @@
+
+'''
+This module tests that the CurveTable arrays match the properties of the curves they represent
+'''
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer
+from fastlane_bot.tools.curvetable import CurveTable
+
+DATA = os.path.join(os.path.dirname(__file__), "_data", "NBTEST_002_Curves.csv.gz")
+
+
+def load_market():
+    CC = CPCContainer.from_df(pd.read_csv(DATA))
+    CC.add(CPC.from_xyal(x=100, y=400, alpha=0.8, pair="TKN/USDC", cid="asym", fee=0.001))
+    return CC
+
+
+def as_array(values):
+    return np.array([np.inf if v is None else v for v in values], dtype=float)
+
+
+def test_table_matches_curves():
+    CC = load_market()
+    table = CC.table
+    curves = CC.curves
+    assert len(table) == len(curves)
+    assert table.cids == tuple(c.cid for c in curves)
+    assert [table.tokens[i] for i in table.data["tknx"]] == [c.tknx for c in curves]
+    assert [table.tokens[i] for i in table.data["tkny"]] == [c.tkny for c in curves]
+    for name in ("k", "x", "x_act", "y_act", "alpha", "y", "p", "kbar"):
+        assert np.allclose(getattr(table, name), as_array(getattr(c, name) for c in curves), rtol=1e-14), name
+    levered = [c.is_levered() for c in curves]
+    assert list(~table.is_unlevered) == levered
+    for name in ("x_min", "x_max", "y_min", "y_max"):
+        expected = as_array(getattr(c, name) if c.is_levered() else [0, None][name.endswith("max")] for c in curves)
+        assert np.allclose(getattr(table, name), expected, rtol=1e-14), name
+
+    p = table.p * 1.05
+    dx, dy = table.dxdyfromp(p)
+    ix = [i for i, c in enumerate(curves) if c.p > 0]
+    expected = np.array([curves[i].dxdyfromp_f(p[i])[0:2] for i in ix])
+    assert np.allclose(dx[ix], expected[:, 0], rtol=1e-10, atol=1e-12)
+    assert np.allclose(dy[ix], expected[:, 1], rtol=1e-10, atol=1e-12)
+
+
+def test_select_and_pairmask():
+    table = load_market().table
+    mask = table.pairmask("TKN", "USDC")
+    assert table.select(mask).cids == ("asym",)
+    assert table.select(mask)[0].cid == "asym"
+    assert not table.pairmask("USDC", "NOPE").any()
+    assert isinstance(table.select([0, 1]), CurveTable) and len(table.select([0, 1])) == 2
+
+
+def test_container_table_follows_changes():
+    CC = load_market()
+    table = CC.table
+    assert CC.table is table
+    CC.remove("asym")
+    assert len(CC.table) == len(table) - 1
+    CC.replace(CPC.from_xy(x=1, y=2, pair="A/B", cid=CC.curves[0].cid))
+    assert CC.table.data["x"][0] == 1
+    CC.add(CPC.from_xy(x=3, y=4, pair="A/B", cid="new"))
+    assert CC.table.cids[-1] == "new"
@@ -0,0 +1,84 @@
+
+'''
+This module tests that the transaction context of the TxHelpers is fetched once per block and that the nonce is tracked locally
+'''
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from fastlane_bot.helpers.txhelpers import TxContext, TxHelpers
+
+
+class FakeEth:
+    def __init__(self):
+        self.calls = []
+        self.block_number = 100
+        self.nonce = 7
+        self.lock = threading.Lock()
+
+    def _record(self, call):
+        with self.lock:
+            self.calls.append(call)
+
+    def get_block(self, block):
+        self._record(block)
+        if block == "pending":
+            return {"baseFeePerGas": 10 ** 9}
+        return {"number": self.block_number}
+
+    def get_transaction_count(self, address):
+        self._record("nonce")
+        return self.nonce
+
+
+def make_tx_helpers(network="ethereum"):
+    tx_helpers = TxHelpers.__new__(TxHelpers)
+    tx_helpers.ConfigObj = SimpleNamespace(NETWORK=network, DEFAULT_GAS_PRICE_OFFSET=1.1, logger=logging.getLogger(__name__))
+    tx_helpers.web3 = SimpleNamespace(eth=FakeEth())
+    tx_helpers.wallet_address = "0xwallet"
+    tx_helpers.nonce = 0
+    tx_helpers.get_max_priority_fee_per_gas_alchemy = lambda: 100
+    tx_helpers._executor = ThreadPoolExecutor(max_workers=5)
+    tx_helpers._tx_context_block = None
+    tx_helpers._tx_context_future = None
+    return tx_helpers
+
+
+def test_context_is_fetched_once_per_block():
+    tx_helpers = make_tx_helpers()
+    eth = tx_helpers.web3.eth
+    tx_helpers.prefetch_transaction_context(100)
+    context = tx_helpers.get_transaction_context()
+    assert context == TxContext(block_number=100, base_fee=10 ** 9, max_priority_fee=110, nonce=7)
+    assert sorted(eth.calls) == ["latest", "nonce", "pending"]
+
+    tx_helpers.prefetch_transaction_context(100)
+    assert tx_helpers._get_transaction_info() == (10 ** 9, 110, 100, 7)
+    assert len(eth.calls) == 3
+
+    eth.block_number = 101
+    tx_helpers.prefetch_transaction_context(101)
+    assert tx_helpers.get_transaction_context().block_number == 101
+    assert len(eth.calls) == 6
+
+
+def test_context_without_prefetch():
+    tx_helpers = make_tx_helpers(network="polygon")
+    context = tx_helpers.get_transaction_context()
+    assert context.max_priority_fee == 0
+    assert len(tx_helpers.web3.eth.calls) == 3
+
+
+def test_nonce_is_tracked_locally():
+    tx_helpers = make_tx_helpers()
+    tx_helpers.prefetch_transaction_context(100)
+    assert tx_helpers.get_transaction_context().nonce == 7
+    tx_helpers._on_transaction_submitted()
+    tx_helpers.prefetch_transaction_context(100)
+    # the node does not reflect the submitted transaction yet
+    assert tx_helpers.get_transaction_context().nonce == 8
+    tx_helpers.web3.eth.nonce = 9
+    tx_helpers.prefetch_transaction_context(101)
+    assert tx_helpers.get_transaction_context().nonce == 9
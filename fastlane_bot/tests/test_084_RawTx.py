@@ -0,0 +1,124 @@
+
+'''
+This module tests the typed sub-trade records of the aggregated Carbon trade instructions
+'''
+
+from dataclasses import dataclass
+from decimal import Decimal
+from json import dumps
+
+import eth_abi
+
+from fastlane_bot.helpers import RawTx, TradeInstruction, TxRouteHandler
+
+CARBON_V1_NAME = 'carbon_v1'
+OTHER_NAME = 'other'
+
+WETH_ADDRESS = 'weth'
+WBTC_ADDRESS = 'wbtc'
+ETH_ADDRESS = 'eth'
+
+
+@dataclass
+class Token:
+    symbol: str
+    address: str
+    decimals: int
+
+
+@dataclass
+class Pool:
+    exchange_name: str
+    strategy_id: int = 0
+
+    @property
+    def get_token_addresses(self):
+        return [WETH_ADDRESS, WBTC_ADDRESS]
+
+
+@dataclass
+class Config:
+    CARBON_V1_FORKS = [CARBON_V1_NAME]
+    NATIVE_GAS_TOKEN_ADDRESS = ETH_ADDRESS
+    WRAPPED_GAS_TOKEN_ADDRESS = WETH_ADDRESS
+    EXCHANGE_IDS = {}
+    UNI_V2_FORKS = []
+    UNI_V3_FORKS = []
+    SOLIDLY_V2_FORKS = []
+    BALANCER_NAME = []
+
+
+class DB:
+    TOKENS = {
+        WETH_ADDRESS: Token(symbol='WETH', address=WETH_ADDRESS, decimals=18),
+        WBTC_ADDRESS: Token(symbol='WBTC', address=WBTC_ADDRESS, decimals=8),
+    }
+
+    POOLS = {
+        '1': Pool(exchange_name=CARBON_V1_NAME, strategy_id=111),
+        '2': Pool(exchange_name=CARBON_V1_NAME, strategy_id=222),
+        '3': Pool(exchange_name=OTHER_NAME),
+    }
+
+    def get_token(self, tkn_address):
+        return self.TOKENS[tkn_address]
+
+    def get_pool(self, cid):
+        return self.POOLS[cid]
+
+
+cfg = Config()
+db = DB()
+
+
+def trade_instruction(cid, tknin, tknout, amtin, amtout, **kwargs):
+    return TradeInstruction(
+        ConfigObj=cfg,
+        db=db,
+        cid=cid,
+        tknin=tknin,
+        tknout=tknout,
+        amtin=amtin,
+        amtout=amtout,
+        tknin_dec_override=18,
+        tknout_dec_override=8,
+        tknin_addr_override=tknin,
+        tknout_addr_override=tknout,
+        exchange_override=DB.POOLS[cid.split('-')[0]].exchange_name,
+        **kwargs,
+    )
+
+
+def test_raw_txs_are_parsed_into_records():
+    tx = {'cid': '1-0', 'tknin': WETH_ADDRESS, 'tknout': WBTC_ADDRESS, 'amtin': 1, 'amtout': 2,
+          '_amtin_wei': 10 ** 18, '_amtout_wei': 2 * 10 ** 8}
+    record = RawTx(cid='1-0', tknin=WETH_ADDRESS, amtin=1, tknout=WBTC_ADDRESS, amtout=2,
+                   amtin_wei=10 ** 18, amtout_wei=2 * 10 ** 8)
+    assert trade_instruction('1', WETH_ADDRESS, WBTC_ADDRESS, 1, 2).raw_txs == []
+    assert trade_instruction('1', WETH_ADDRESS, WBTC_ADDRESS, 1, 2, raw_txs=dumps([tx])).raw_txs == [record]
+    assert trade_instruction('1', WETH_ADDRESS, WBTC_ADDRESS, 1, 2, raw_txs=[tx]).raw_txs == [record]
+    assert trade_instruction('1', WETH_ADDRESS, WBTC_ADDRESS, 1, 2, raw_txs=[record]).raw_txs == [record]
+
+
+def test_aggregate_and_encode_carbon_trades():
+    trade_instructions = [
+        trade_instruction('1-0', WETH_ADDRESS, WBTC_ADDRESS, Decimal('1.5'), Decimal('0.1')),
+        trade_instruction('2-1', WETH_ADDRESS, WBTC_ADDRESS, Decimal('2.5'), Decimal('0.2')),
+        trade_instruction('3', WBTC_ADDRESS, WETH_ADDRESS, Decimal('0.3'), Decimal('4.1')),
+    ]
+    handler = TxRouteHandler(trade_instructions=trade_instructions)
+    aggregated = handler.aggregate_carbon_trades(trade_instructions)
+    assert len(aggregated) == 2
+    carbon, other = aggregated
+    assert other.raw_txs == []
+    assert [type(tx) for tx in carbon.raw_txs] == [RawTx, RawTx]
+    assert [tx.cid for tx in carbon.raw_txs] == ['1-0', '2-1']
+    assert [tx.amtin for tx in carbon.raw_txs] == [Decimal('1.5'), Decimal('2.5')]
+    assert [tx.amtin_wei for tx in carbon.raw_txs] == [15 * 10 ** 17, 25 * 10 ** 17]
+    assert carbon.amtin_wei == 4 * 10 ** 18
+
+    carbon.raw_txs = [tx._replace(strategy_id=DB.POOLS[tx.cid.split('-')[0]].strategy_id) for tx in carbon.raw_txs]
+    encoded = handler.custom_data_encoder(aggregated)
+    values = [32, 2, 111, 15 * 10 ** 17, 222, 25 * 10 ** 17]
+    assert encoded[0].custom_data == '0x' + eth_abi.encode(["uint32", "uint32"] + ["uint256", "uint128"] * 2, values).hex()
+    assert encoded[1].custom_data == '0x'
@@ -0,0 +1,154 @@
+
+'''
+This module tests the integer swap math of the route handler against the Decimal approximations
+'''
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from unittest.mock import Mock
+
+from fastlane_bot.helpers import TradeInstruction, TxRouteHandler
+from fastlane_bot.helpers import weimath
+
+WETH_ADDRESS = 'weth'
+USDC_ADDRESS = 'usdc'
+ETH_ADDRESS = 'eth'
+
+
+@dataclass
+class Token:
+    symbol: str
+    address: str
+    decimals: int
+
+
+@dataclass
+class Config:
+    NATIVE_GAS_TOKEN_ADDRESS = ETH_ADDRESS
+    WRAPPED_GAS_TOKEN_ADDRESS = WETH_ADDRESS
+    UNI_V2_FORKS = ['uniswap_v2']
+    UNI_V3_FORKS = ['uniswap_v3']
+    CARBON_V1_FORKS = ['carbon_v1']
+    SOLIDLY_V2_FORKS = []
+    BANCOR_POL_NAME = 'bancor_pol'
+    BANCOR_V2_NAME = 'bancor_v2'
+    BANCOR_V3_NAME = 'bancor_v3'
+    BALANCER_NAME = 'balancer'
+    UNISWAP_V2_NAME = 'uniswap_v2'
+    EXCHANGE_IDS = {UNISWAP_V2_NAME: 3}
+    Q96 = Decimal(2) ** 96
+    logger = logging.getLogger(__name__)
+
+
+class DB:
+    TOKENS = {
+        WETH_ADDRESS: Token(symbol='WETH', address=WETH_ADDRESS, decimals=18),
+        USDC_ADDRESS: Token(symbol='USDC', address=USDC_ADDRESS, decimals=6),
+    }
+
+    def get_token(self, tkn_address):
+        return self.TOKENS[tkn_address]
+
+    def get_pool(self, cid):
+        return Mock(exchange_name='uniswap_v2')
+
+
+cfg = Config()
+db = DB()
+
+
+def trade_instruction(tknin, tknout):
+    return TradeInstruction(
+        ConfigObj=cfg, db=db, cid='1', tknin=tknin, tknout=tknout, amtin=1, amtout=1,
+        tknin_dec_override=DB.TOKENS[tknin].decimals, tknout_dec_override=DB.TOKENS[tknout].decimals,
+        tknin_addr_override=tknin, tknout_addr_override=tknout, exchange_override='uniswap_v2',
+    )
+
+
+def route_handler(math_mode=TxRouteHandler.MATH_WEI):
+    trades = [trade_instruction(WETH_ADDRESS, USDC_ADDRESS), trade_instruction(USDC_ADDRESS, WETH_ADDRESS)]
+    return TxRouteHandler(trade_instructions=trades, math_mode=math_mode)
+
+
+def curve(exchange_name, **kwargs):
+    return Mock(exchange_name=exchange_name, pair_name=f'{WETH_ADDRESS}/{USDC_ADDRESS}', cid='1', **kwargs)
+
+
+def carbon_curve(y, z, A, B):
+    encode = lambda rate: int(rate * weimath.CARBON_ONE)  # exponent 0, exact for rates below 1
+    return curve('carbon_v1', fee_float=0.002, y_0=0, z_0=0, A_0=0, B_0=0,
+                 y_1=y, z_1=z, A_1=encode(A), B_1=encode(B))
+
+
+CURVES = [
+    curve('uniswap_v2', tkn0_balance=1000 * 10 ** 18, tkn1_balance=2_000_000 * 10 ** 6, fee_float=0.003),
+    # sqrt price of 2000 USDC/WETH in wei units
+    curve('uniswap_v3', liquidity=10 ** 18, sqrt_price_q96=int((Decimal(2000) / 10 ** 12).sqrt() * 2 ** 96),
+          fee_float=0.0005),
+    carbon_curve(y=50_000 * 10 ** 6, z=100_000 * 10 ** 6, A=Decimal('0.00000000001'), B=Decimal('0.00000004')),
+]
+
+
+def test_constant_product_matches_uniswap_v2():
+    for amount_in, reserve_in, reserve_out in [(10 ** 18, 10 ** 21, 2 * 10 ** 12), (12345, 678910, 111213)]:
+        amount_in_with_fee = amount_in * 997
+        expected = amount_in_with_fee * reserve_out // (reserve_in * 1000 + amount_in_with_fee)
+        assert weimath.constant_product_output(amount_in, reserve_in, reserve_out, weimath.fee_ppm(0.003)) == expected
+
+
+def test_bancor_takes_the_fee_from_the_output():
+    # BancorConverter.targetAmountAndFee / PoolCollection._tradeAmountAndFeeBySourceAmount
+    amount_in, reserve_in, reserve_out = 10 ** 18, 10 ** 21, 2 * 10 ** 12
+    target_amount = reserve_out * amount_in // (reserve_in + amount_in)
+    expected = target_amount - target_amount * 2000 // 10 ** 6
+    assert weimath.bancor_output(amount_in, reserve_in, reserve_out, weimath.fee_ppm(0.002)) == expected
+    assert expected < weimath.constant_product_output(amount_in, reserve_in, reserve_out, weimath.fee_ppm(0.002))
+
+    # the route handler dispatches the Bancor pools to it, in agreement with the Decimal formula
+    trade = trade_instruction(WETH_ADDRESS, USDC_ADDRESS)
+    for exchange_name in ['bancor_v2', 'bancor_v3']:
+        c = curve(exchange_name, tkn0_balance=reserve_in, tkn1_balance=reserve_out, fee_float=0.002)
+        amt_out_wei = route_handler()._solve_trade_output(c, trade, Decimal(1))[3]
+        assert amt_out_wei == expected * 9999 // 10000
+        check = route_handler(TxRouteHandler.MATH_DECIMAL)._solve_trade_output(c, trade, Decimal(1))[3]
+        assert abs(amt_out_wei - check) <= 1
+
+
+def test_carbon_clamps_to_order_liquidity():
+    A, B = 2 ** 40, 2 ** 44
+    amount_in, amount_out = weimath.carbon_output(10 ** 30, y=10 ** 9, z=2 * 10 ** 9, A=A, B=B, fee=0)
+    assert amount_out == 10 ** 9
+    assert weimath.carbon_target_amount(amount_in, 10 ** 9, 2 * 10 ** 9, A, B) >= 10 ** 9
+    assert weimath.carbon_target_amount(amount_in - 1, 10 ** 9, 2 * 10 ** 9, A, B) < 10 ** 9
+
+
+def test_wei_and_decimal_results_agree():
+    wei_handler = route_handler()
+    decimal_handler = route_handler(TxRouteHandler.MATH_DECIMAL)
+    trade = trade_instruction(WETH_ADDRESS, USDC_ADDRESS)
+    # the Decimal constant product formula takes the fee from the output rather than the input, see below
+    for c in CURVES[1:]:
+        for amount_in in [Decimal('0.001'), Decimal('1.5'), Decimal('1000')]:
+            amt_in, amt_out, amt_in_wei, amt_out_wei = wei_handler._solve_trade_output(c, trade, amount_in)
+            check = decimal_handler._solve_trade_output(c, trade, amount_in)
+            assert amt_in_wei == int(amt_in * 10 ** 18) and amt_out_wei == int(amt_out * 10 ** 6)
+            assert isinstance(amt_in, Decimal) and isinstance(amt_out, Decimal)
+            assert abs(amt_in - check[0]) <= Decimal('1e-9') * check[0], (c.exchange_name, amount_in)
+            assert abs(amt_out - check[1]) <= Decimal('1e-6') * check[1] + Decimal('1e-6'), (c.exchange_name, amount_in)
+
+    c = CURVES[0]
+    for amount_in in [Decimal('0.001'), Decimal('1.5'), Decimal('1000')]:
+        amount_in_less_fee = amount_in * Decimal('0.997')
+        expected = amount_in_less_fee * 2_000_000 / (1000 + amount_in_less_fee) * Decimal('0.9999')
+        amt_out = wei_handler._solve_trade_output(c, trade, amount_in)[1]
+        assert expected - Decimal('2e-6') <= amt_out <= expected
+
+
+def test_cross_check_mode(caplog):
+    handler = route_handler(TxRouteHandler.MATH_CROSS_CHECK)
+    trade = trade_instruction(WETH_ADDRESS, USDC_ADDRESS)
+    assert handler._solve_trade_output(CURVES[1], trade, Decimal('1.5')) == route_handler()._solve_trade_output(CURVES[1], trade, Decimal('1.5'))
+    assert "differ" not in caplog.text
+    assert handler._solve_trade_output(CURVES[0], trade, Decimal('100')) == route_handler()._solve_trade_output(CURVES[0], trade, Decimal('100'))
+    assert "Wei and Decimal results differ on uniswap_v2 pool" in caplog.text
@@ -0,0 +1,106 @@
+
+'''
+This module tests that the pools of a route are validated against the chain in a single multicall
+'''
+
+from types import SimpleNamespace
+
+from fastlane_bot.bot import CarbonBot
+from fastlane_bot.data.abi import CARBON_CONTROLLER_ABI, UNISWAP_V2_POOL_ABI, UNISWAP_V3_POOL_ABI
+from fastlane_bot.events.managers.manager import Manager
+from fastlane_bot.events.multicall_utils import apply_pool_state_diffs, get_pool_state_diffs
+from fastlane_bot.events.pipeline import SnapshotChannel
+from fastlane_bot.events.utils import apply_stale_pools
+from fastlane_bot.tests._fakes import W3, make_multicall_mgr
+
+UNI_V3_ADDRESS = "0x88e6A0c2dDD26FEEb64F039a2c41296FcB3f5640"
+UNI_V2_ADDRESS = "0xB4e16d0168e52d35CaCD2c6185b44281Ec28C9Dc"
+CARBON_ADDRESS = "0xC537e898CD774e2dCBa3B14Ea6f34C93d5eA45e1"
+CONTRACTS = {
+    UNI_V3_ADDRESS: W3.eth.contract(address=UNI_V3_ADDRESS, abi=UNISWAP_V3_POOL_ABI),
+    UNI_V2_ADDRESS: W3.eth.contract(address=UNI_V2_ADDRESS, abi=UNISWAP_V2_POOL_ABI),
+    CARBON_ADDRESS: W3.eth.contract(address=CARBON_ADDRESS, abi=CARBON_CONTROLLER_ABI),
+}
+STRATEGY_ID = 3 << 128
+
+
+def make_mgr():
+    mgr = make_multicall_mgr(
+        [
+            {"cid": "v3", "exchange_name": "uniswap_v3", "address": UNI_V3_ADDRESS, "sqrt_price_q96": 2 ** 96, "tick": 10, "liquidity": 1000},
+            {"cid": "v2", "exchange_name": "uniswap_v2", "address": UNI_V2_ADDRESS, "tkn0_balance": 100, "tkn1_balance": 200},
+            {"cid": str(STRATEGY_ID), "exchange_name": "carbon_v1", "address": CARBON_ADDRESS, "strategy_id": str(STRATEGY_ID),
+             "y_0": 5, "z_0": 10, "A_0": 1, "B_0": 2, "y_1": 6, "z_1": 8, "A_1": 3, "B_1": 4},
+        ],
+        exchanges={ex: SimpleNamespace(pools={}) for ex in ["uniswap_v3", "uniswap_v2", "carbon_v1"]},
+        get_pool_contract=lambda pool_info: CONTRACTS[pool_info["address"]],
+    )
+    eth = mgr.web3.eth
+    eth.respond(UNI_V3_ADDRESS, UNISWAP_V3_POOL_ABI, "slot0", (2 ** 96, 10, 0, 1, 1, 0, True))
+    eth.respond(UNI_V3_ADDRESS, UNISWAP_V3_POOL_ABI, "liquidity", [2000])
+    eth.respond(UNI_V2_ADDRESS, UNISWAP_V2_POOL_ABI, "getReserves", [100, 200, 0])
+    eth.respond(
+        CARBON_ADDRESS, CARBON_CONTROLLER_ABI, "strategy",
+        [(STRATEGY_ID, UNI_V2_ADDRESS, [UNI_V2_ADDRESS, UNI_V3_ADDRESS], [(5, 10, 1, 2), (7, 8, 3, 4)])], args=[STRATEGY_ID],
+    )
+    return mgr
+
+
+def test_pool_state_diffs_use_a_single_multicall():
+    mgr = make_mgr()
+    block_number, diffs = get_pool_state_diffs(mgr, list(mgr.pool_data), block_identifier=1234)
+
+    assert block_number == 1234
+    assert len(mgr.web3.eth.aggregates) == 1
+    calls, block_identifier = mgr.web3.eth.aggregates[0]
+    assert block_identifier == 1234
+    assert [call["target"] for call in calls] == [UNI_V3_ADDRESS, UNI_V3_ADDRESS, UNI_V2_ADDRESS, CARBON_ADDRESS]
+    assert diffs == {
+        "v3": {"liquidity": (1000, 2000)},
+        "v2": {},
+        str(STRATEGY_ID): {"y_1": (6, 7)},
+    }
+
+
+def test_apply_pool_state_diffs_updates_the_stale_pools():
+    mgr = make_mgr()
+    block_number, diffs = get_pool_state_diffs(mgr, list(mgr.pool_data))
+
+    assert apply_pool_state_diffs(mgr, diffs, block_number) == {"v3", str(STRATEGY_ID)}
+    assert mgr.pool_data.get("v3")["liquidity"] == 2000
+    assert mgr.pool_data.get("v3")["last_updated_block"] == 1234
+    assert mgr.pool_data.get(str(STRATEGY_ID))["y_1"] == 7
+    assert "last_updated_block" not in mgr.pool_data.get("v2")
+    assert mgr.pool_data.pop_dirty_cids() == {"v3", str(STRATEGY_ID)}
+    assert mgr.exchanges["uniswap_v3"].pools["v3"].state["liquidity"] == 2000
+
+    _, diffs = get_pool_state_diffs(mgr, list(mgr.pool_data))
+    assert all(not diff for diff in diffs.values())
+
+
+def test_pipelined_validation_leaves_the_update_to_the_ingestion_stage():
+    mgr = make_mgr()
+    mgr.validate_pool_states = lambda pool_infos, apply=True: Manager.validate_pool_states(mgr, pool_infos, apply=apply)
+    snapshots = SnapshotChannel()
+    bot = SimpleNamespace(
+        ConfigObj=mgr.cfg,
+        db=SimpleNamespace(mgr=mgr, state=mgr.pool_data.snapshot()),
+        snapshots=snapshots,
+        _validate_pool_data_logging=lambda *args: None,
+    )
+    arb_opp = (None, None, [{"cid": "v3"}, {"cid": "v2"}, {"cid": f"{STRATEGY_ID}-0"}], None, None)
+
+    # the search stage only reads the snapshot, and reports the stale pools
+    assert not CarbonBot.validate_pool_data(bot, arb_opp)
+    assert mgr.pool_data.get("v3")["liquidity"] == 1000
+    assert mgr.pool_data.pop_dirty_cids() == set()
+
+    # the ingestion stage applies the report, except to the pools it updated since
+    carbon = mgr.pool_data.get(str(STRATEGY_ID))
+    carbon["last_updated_block"] = 1300
+    mgr.pool_data.replace(carbon, carbon)
+    assert apply_stale_pools(mgr, snapshots) == {"v3"}
+    assert mgr.pool_data.get("v3")["liquidity"] == 2000
+    assert mgr.pool_data.get(str(STRATEGY_ID))["y_1"] == 6
+    assert bot.db.state.get("v3")["liquidity"] == 1000
+    assert snapshots.pop_stale() == []
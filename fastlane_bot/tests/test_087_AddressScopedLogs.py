@@ -0,0 +1,89 @@
+
+'''
+This module tests the address-scoped eth_getLogs filters of the event ingestion
+'''
+
+from types import SimpleNamespace
+
+from eth_abi import encode
+from eth_utils import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3 import Web3
+
+from fastlane_bot.data.abi import BANCOR_POL_ABI, BANCOR_V3_POOL_COLLECTION_ABI, UNISWAP_V2_POOL_ABI, UNISWAP_V3_POOL_ABI
+from fastlane_bot.events import utils
+from fastlane_bot.events.utils import get_all_logs, get_log_filters
+from fastlane_bot.tests._fakes import make_event_mgr
+
+W3 = Web3()
+UNI_V2 = W3.eth.contract(abi=UNISWAP_V2_POOL_ABI)
+UNI_V3 = W3.eth.contract(abi=UNISWAP_V3_POOL_ABI)
+BANCOR_V3 = W3.eth.contract(abi=BANCOR_V3_POOL_COLLECTION_ABI)
+BANCOR_POL = W3.eth.contract(abi=BANCOR_POL_ABI)
+POL_ADDRESS = "0xD06146D292F9651C1D7cf54A3162791DFc2bEf46"
+V2_POOLS = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(1, 6)]
+V3_POOLS = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(100, 103)]
+
+
+def topic(event):
+    return Web3.to_hex(event_abi_to_log_topic(event._get_event_abi()))
+
+
+def make_mgr():
+    return make_event_mgr(
+        {
+            "uniswap_v2": [UNI_V2.events.Sync],
+            "sushiswap_v2": [UNI_V2.events.Sync],
+            "uniswap_v3": [UNI_V3.events.Swap],
+            "bancor_v3": [BANCOR_V3.events.TradingLiquidityUpdated],
+            "bancor_pol": [BANCOR_POL.events.TokenTraded, BANCOR_POL.events.TradingEnabled],
+        },
+        static_pools={"uniswap_v2_pools": V2_POOLS[:3], "sushiswap_v2_pools": V2_POOLS[3:], "uniswap_v3_pools": V3_POOLS},
+        forked_exchanges=["uniswap_v2", "sushiswap_v2", "uniswap_v3"],
+        CARBON_V1_FORKS=["carbon_v1"],
+        BANCOR_POL_ADDRESS=POL_ADDRESS,
+        BANCOR_POL_START_BLOCK=10,
+    )
+
+
+def test_log_filters_are_scoped_to_the_known_pools(monkeypatch):
+    monkeypatch.setattr(utils, "LOG_FILTER_ADDRESS_CHUNK_SIZE", 5)
+    mgr = make_mgr()
+    log_filters, events_by_topic = get_log_filters(mgr, start_block=990, current_block=1000)
+
+    scoped_topics = sorted([topic(UNI_V2.events.Sync), topic(UNI_V3.events.Swap)])
+    assert log_filters[0] == {"fromBlock": 990, "toBlock": 1000, "address": sorted(V2_POOLS + V3_POOLS)[:5], "topics": [scoped_topics]}
+    assert log_filters[1] == {"fromBlock": 990, "toBlock": 1000, "address": sorted(V2_POOLS + V3_POOLS)[5:], "topics": [scoped_topics]}
+
+    # the Bancor V3 pool collections are not known ahead, so their events keep a topic-only filter
+    assert log_filters[2] == {"fromBlock": 990, "toBlock": 1000, "topics": [[topic(BANCOR_V3.events.TradingLiquidityUpdated)]]}
+
+    # the Bancor POL events are fetched from their own high-water mark
+    assert log_filters[3]["fromBlock"] == 10
+    assert log_filters[3]["address"] == [POL_ADDRESS]
+    assert len(log_filters) == 4
+    assert len(events_by_topic) == 5
+
+
+def test_all_logs_are_decoded():
+    mgr = make_mgr()
+    log_filters, events_by_topic = get_log_filters(mgr, start_block=990, current_block=1000)
+    sync_log = {
+        "address": V2_POOLS[0],
+        "topics": [HexBytes(topic(UNI_V2.events.Sync))],
+        "data": HexBytes(encode(["uint112", "uint112"], [100, 200])),
+        "blockNumber": 995,
+        "transactionIndex": 1,
+        "logIndex": 2,
+        "transactionHash": HexBytes("0x" + "11" * 32),
+        "blockHash": HexBytes("0x" + "22" * 32),
+    }
+    unknown_log = dict(sync_log, topics=[HexBytes("0x" + "33" * 32)])
+    web3 = SimpleNamespace(eth=SimpleNamespace(get_logs=lambda log_filter: [sync_log, unknown_log] if "address" in log_filter else []))
+
+    events = get_all_logs(1, web3, log_filters[:1], events_by_topic)
+    assert len(events) == 1
+    (event,) = events[0]
+    assert event["event"] == "Sync"
+    assert event["args"]["reserve0"] == 100 and event["args"]["reserve1"] == 200
+    assert event["address"] == V2_POOLS[0]
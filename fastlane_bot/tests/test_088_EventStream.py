@@ -0,0 +1,78 @@
+
+'''
+This module tests the single-pass conversion of the fetched events and the latest-per-pool reduction
+'''
+
+from types import SimpleNamespace
+
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from fastlane_bot.events.utils import LatestEvents, complex_handler, filter_latest_events, iter_event_records
+
+
+def make_event(address, block, tx_index=0, log_index=0, reserve=0):
+    return AttributeDict({
+        "args": AttributeDict({"reserve0": reserve, "reserve1": reserve}),
+        "event": "Sync",
+        "address": address,
+        "blockNumber": block,
+        "transactionIndex": tx_index,
+        "logIndex": log_index,
+        "transactionHash": HexBytes("0x" + "11" * 32),
+        "blockHash": HexBytes("0x" + "22" * 32),
+    })
+
+
+class FakeManager:
+    def __init__(self):
+        self.pool_data = [{"anchor": "0xanchor", "exchange_name": "bancor_v2"}]
+        self.classified = []
+
+    def exchange_name_from_event(self, event):
+        self.classified.append(event["address"])
+        return None if event["address"] == "0xunknown" else "uniswap_v2"
+
+    def pool_type_from_exchange_name(self, exchange_name):
+        return SimpleNamespace(unique_key=lambda: "address") if exchange_name else None
+
+
+def test_event_records_match_the_double_pass():
+    events = [[make_event("0xabc", 5), make_event("0xdef", 6)]]
+    double_pass = [complex_handler(event) for event in [complex_handler(event) for event in events]]
+
+    records = list(iter_event_records(events))
+    assert records == [{key: value for key, value in event.items() if key != "blockHash"} for event in double_pass[0]]
+    assert records[0]["transactionHash"] == HexBytes("0x" + "11" * 32).hex()
+    assert isinstance(records[0]["args"], dict)
+
+
+def test_latest_event_per_pool():
+    mgr = FakeManager()
+    events = [
+        make_event("0xabc", 5, reserve=1),
+        make_event("0xabc", 10, tx_index=1, log_index=1, reserve=2),
+        make_event("0xabc", 10, tx_index=0, log_index=7, reserve=3),
+        make_event("0xdef", 7, reserve=4),
+        make_event("0xdef", 7, reserve=5),
+        make_event("0xunknown", 20, reserve=6),
+    ]
+    latest = LatestEvents(mgr)
+    for event in iter_event_records([events]):
+        latest.add(event)
+
+    assert {event["address"]: event["args"]["reserve0"] for event in latest.values()} == {"0xabc": 2, "0xdef": 5}
+    assert filter_latest_events(mgr, [events]) == [events[1], events[4]]
+
+
+def test_pool_types_are_resolved_once_per_address_and_event():
+    mgr = FakeManager()
+    pool_types = {}
+    for block in range(3):
+        latest = LatestEvents(mgr, pool_types=pool_types)
+        for address in ["0xabc", "0xdef", "0xunknown", "0xabc"]:
+            latest.add(complex_handler(dict(make_event(address, block))))
+
+    # the events which are not handled are classified every time, so they do not grow the map
+    assert sorted(mgr.classified) == ["0xabc", "0xdef"] + ["0xunknown"] * 3
+    assert set(pool_types) == {("0xabc", "Sync"), ("0xdef", "Sync")}
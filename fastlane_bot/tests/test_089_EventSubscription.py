@@ -0,0 +1,136 @@
+
+'''
+This module tests the websocket subscription of the main loop against a local websocket node stand-in
+'''
+
+import asyncio
+import json
+import threading
+
+import websockets
+from eth_abi import encode
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+
+from fastlane_bot.data.abi import UNISWAP_V2_POOL_ABI
+from fastlane_bot.events.subscription import EventSubscription
+from fastlane_bot.tests._fakes import make_event_mgr
+
+UNI_V2 = Web3().eth.contract(abi=UNISWAP_V2_POOL_ABI)
+SYNC_TOPIC = Web3.to_hex(event_abi_to_log_topic(UNI_V2.events.Sync._get_event_abi()))
+POOL = Web3.to_checksum_address(f"0x{1:040x}")
+
+
+class FakeNode:
+    """
+    A websocket server which answers eth_subscribe and eth_blockNumber, and pushes the queued notifications
+    """
+
+    def __init__(self, block_number):
+        self.block_number = block_number
+        self.log_filters = []
+        self.connections = []
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(self._serve())
+        self.url = f"ws://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        ready.set()
+        self.loop.run_forever()
+
+    async def _serve(self):
+        return await websockets.serve(self._handle, "127.0.0.1", 0)
+
+    async def _handle(self, connection):
+        self.connections.append(connection)
+        async for message in connection:
+            request = json.loads(message)
+            if request["method"] == "eth_blockNumber":
+                result = hex(self.block_number)
+            else:
+                result = f"0x{len(self.log_filters):x}"
+                self.log_filters.append(request["params"])
+            await connection.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}))
+
+    def push(self, subscription, result):
+        message = json.dumps({"jsonrpc": "2.0", "method": "eth_subscription", "params": {"subscription": subscription, "result": result}})
+        asyncio.run_coroutine_threadsafe(self.connections[-1].send(message), self.loop).result()
+
+    def push_head(self, block_number):
+        self.block_number = block_number
+        self.push("0x0", {"number": hex(block_number)})
+
+    def push_sync(self, block_number, log_index, reserve, removed=False):
+        self.push("0x1", {
+            "address": POOL.lower(),
+            "topics": [SYNC_TOPIC],
+            "data": Web3.to_hex(encode(["uint112", "uint112"], [reserve, reserve])),
+            "blockNumber": hex(block_number),
+            "transactionIndex": "0x0",
+            "logIndex": hex(log_index),
+            "transactionHash": "0x" + f"{block_number:064x}",
+            "blockHash": "0x" + "22" * 32,
+            "removed": removed,
+        })
+
+    def disconnect(self):
+        # the closing handshake completes once the client reads the close frame
+        return asyncio.run_coroutine_threadsafe(self.connections[-1].close(), self.loop)
+
+
+def make_mgr():
+    return make_event_mgr({"uniswap_v2": [UNI_V2.events.Sync]}, static_pools={"uniswap_v2_pools": [POOL]}, forked_exchanges=["uniswap_v2"])
+
+
+def test_pushed_events_are_released_per_block():
+    node = FakeNode(block_number=100)
+    subscription = EventSubscription(node.url, make_mgr(), reorg_delay=1)
+
+    # connecting subscribes to the heads and to the address-scoped logs of the pools
+    node_thread = threading.Timer(0.2, node.push_head, args=(101,))
+    node_thread.start()
+    assert subscription.wait_for_head(timeout=5)
+    assert node.log_filters[0] == ["newHeads"]
+    assert node.log_filters[1] == ["logs", {"address": [POOL], "topics": [[SYNC_TOPIC]]}]
+    assert subscription.synced_block == 100 and subscription.head == 101
+
+    # the subscription only takes over once the polled data covers the block it was subscribed at
+    assert subscription.pop_events(last_block=99) is None
+
+    node.push_sync(101, log_index=1, reserve=10)
+    node.push_sync(102, log_index=0, reserve=20)
+    node.push_sync(102, log_index=1, reserve=30)
+    node.push_sync(102, log_index=1, reserve=30, removed=True)
+    node.push_head(102)
+    assert subscription.wait_for_head(timeout=5)
+
+    current_block, events = subscription.pop_events(last_block=100)
+    assert current_block == 101
+    assert [(event["blockNumber"], event["args"]["reserve0"]) for event in events] == [(101, 10)]
+    assert events[0]["address"] == POOL
+
+    node.push_head(103)
+    assert subscription.wait_for_head(timeout=5)
+    current_block, events = subscription.pop_events(last_block=101)
+    assert current_block == 102
+    assert [(event["blockNumber"], event["args"]["reserve0"]) for event in events] == [(102, 20)]
+
+    # a reorg of a released block makes the subscription fall back to polling until it is past the reorg
+    node.push_sync(102, log_index=0, reserve=20, removed=True)
+    node.push_head(104)
+    assert subscription.wait_for_head(timeout=5)
+    assert subscription.pop_events(last_block=102) is None
+    assert subscription.pop_events(last_block=104) == (104, [])
+
+    # on a disconnect, the subscription falls back to polling
+    closed = node.disconnect()
+    assert not subscription.wait_for_head(timeout=5)
+    closed.result()
+    assert subscription.pop_events(last_block=104) is None
+
+    subscription.disconnect()
+    subscription.loop.close()
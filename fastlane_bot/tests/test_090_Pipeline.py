@@ -0,0 +1,66 @@
+
+'''
+This module tests the pool data snapshots handed from the ingestion stage to the search stage of the pipelined main loop
+'''
+
+import threading
+from types import SimpleNamespace
+
+from fastlane_bot.events.pipeline import PoolSnapshot, SnapshotChannel, take_snapshot
+from fastlane_bot.events.pool_store import PoolStore
+
+
+def make_mgr():
+    pool_data = PoolStore([
+        {"cid": "a", "exchange_name": "uniswap_v2", "tkn0_balance": 1},
+        {"cid": "b", "exchange_name": "uniswap_v2", "tkn0_balance": 2},
+    ])
+    return SimpleNamespace(pool_data=pool_data)
+
+
+def test_snapshot_is_not_affected_by_later_blocks():
+    mgr = make_mgr()
+    snapshot = take_snapshot(mgr, 100)
+    assert snapshot.block_number == 100
+    assert snapshot.dirty_cids == {"a", "b"}
+    assert mgr.pool_data.pop_dirty_cids() == set()
+
+    pool_info = mgr.pool_data.get("a")
+    pool_info["tkn0_balance"] = 10
+    mgr.pool_data.replace(pool_info, pool_info)
+    mgr.pool_data.append({"cid": "c", "exchange_name": "uniswap_v2", "tkn0_balance": 3})
+
+    assert snapshot.pool_data.get("a")["tkn0_balance"] == 1
+    assert snapshot.pool_data.get("c") is None
+    assert take_snapshot(mgr, 101).dirty_cids == {"a", "c"}
+
+
+def test_search_stage_takes_the_latest_snapshot():
+    channel = SnapshotChannel()
+    channel.publish(PoolSnapshot(100, PoolStore(), frozenset({"a"})))
+    channel.publish(PoolSnapshot(101, PoolStore(), frozenset({"b"})))
+
+    # the stale snapshot is skipped, but its changed pools are carried over
+    snapshot = channel.take()
+    assert snapshot.block_number == 101
+    assert snapshot.dirty_cids == {"a", "b"}
+    assert (channel.published, channel.skipped) == (2, 1)
+    assert channel.take(timeout=0.01) is None
+
+
+def test_search_stage_stops_when_the_ingestion_stops():
+    channel = SnapshotChannel()
+    taken = []
+
+    def search():
+        while (snapshot := channel.take()) is not None:
+            taken.append(snapshot.block_number)
+
+    searcher = threading.Thread(target=search)
+    searcher.start()
+    channel.publish(PoolSnapshot(100, PoolStore(), frozenset()))
+    channel.close()
+    searcher.join(timeout=5)
+
+    assert not searcher.is_alive()
+    assert taken == [100]
@@ -0,0 +1,131 @@
+
+'''
+This module tests the append-only binary store of the pool data written after each block
+'''
+
+import json
+import logging
+import math
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from fastlane_bot.events import pool_log
+from fastlane_bot.events.pool_log import PoolDataLog, load_pool_data
+from fastlane_bot.events.pool_store import PoolStore
+from fastlane_bot.events.utils import write_pool_data_to_disk
+
+
+def make_store():
+    return PoolStore([
+        {"cid": "0x01", "exchange_name": "uniswap_v2", "tkn0_balance": 100, "fee": "0.003", "fee_float": 0.003, "anchor": float("nan")},
+        {"cid": "0x02", "exchange_name": "uniswap_v3", "liquidity": 2 ** 120, "sqrt_price_q96": 2 ** 96, "tick": -5},
+        {"cid": "0x03", "exchange_name": "carbon_v1", "y_0": 5, "z_0": 10, "strategy_id": "3", "last_updated_block": None},
+    ])
+
+
+def update(store, cid, **values):
+    pool = store.get(cid)
+    pool.update(values)
+    store.replace(pool, pool)
+
+
+def test_only_the_changed_pools_are_written(tmp_path):
+    store = make_store()
+    log = PoolDataLog(path=str(tmp_path), compact_every=10)
+    assert log.write(store.snapshot(), 100) == 3
+
+    update(store, "0x01", tkn0_balance=150)
+    assert log.write(store.snapshot(), 101) == 1
+    assert log.write(store.snapshot(), 102) == 0
+
+    store.remove_cids(["0x03"])
+    store.append({"cid": "0x04", "exchange_name": "uniswap_v2", "tkn0_balance": 1})
+    assert log.write(store.snapshot(), 103) == 2
+    assert sorted(os.listdir(tmp_path)) == ["pool_data_100.arrow", "pool_data_100.log"]
+
+    block, pools = load_pool_data(str(tmp_path))
+    assert block == 103
+    assert {pool["cid"]: pool for pool in pools}["0x01"]["tkn0_balance"] == 150
+    assert sorted(pool["cid"] for pool in pools) == ["0x01", "0x02", "0x04"]
+
+
+def test_pool_data_at_any_past_block(tmp_path):
+    store = make_store()
+    log = PoolDataLog(path=str(tmp_path), compact_every=2)
+    for block in range(100, 106):
+        update(store, "0x02", tick=block)
+        log.write(store.snapshot(), block)
+
+    # a new segment is started every 2 blocks with changes, the old ones are kept
+    assert sorted(os.listdir(tmp_path)) == [
+        "pool_data_100.arrow", "pool_data_100.log", "pool_data_103.arrow", "pool_data_103.log",
+    ]
+    for block in range(100, 106):
+        last_block, pools = load_pool_data(str(tmp_path), block)
+        assert last_block == block
+        assert {pool["cid"]: pool for pool in pools}["0x02"]["tick"] == block
+
+    with pytest.raises(FileNotFoundError):
+        load_pool_data(str(tmp_path), 99)
+
+
+def test_values_keep_their_types(tmp_path):
+    store = make_store()
+    PoolDataLog(path=str(tmp_path)).write(store.snapshot(), 100)
+    _, pools = load_pool_data(str(tmp_path))
+    pools = {pool["cid"]: pool for pool in pools}
+
+    assert pools["0x02"]["liquidity"] == 2 ** 120
+    assert pools["0x02"]["tick"] == -5
+    assert pools["0x01"]["fee"] == "0.003" and pools["0x01"]["fee_float"] == 0.003
+    assert math.isnan(pools["0x01"]["anchor"])
+    assert "last_updated_block" not in pools["0x03"]
+    assert pools["0x03"] == {key: value for key, value in store.get("0x03").items() if value is not None}
+
+
+def test_latest_only_keeps_the_last_segment(tmp_path):
+    store = make_store()
+    log = PoolDataLog(path=str(tmp_path), compact_every=1, keep_history=False)
+    for block in range(100, 104):
+        update(store, "0x01", tkn0_balance=block)
+        log.write(store.snapshot(), block)
+
+    assert sorted(os.listdir(tmp_path)) == ["pool_data_102.arrow", "pool_data_102.log"]
+    block, pools = load_pool_data(str(tmp_path))
+    assert block == 103
+    assert {pool["cid"]: pool for pool in pools}["0x01"]["tkn0_balance"] == 103
+
+
+def test_changes_of_a_failed_write_are_written_with_the_next_block(tmp_path, monkeypatch):
+    store = make_store()
+    log = PoolDataLog(path=str(tmp_path))
+    log.write(store.snapshot(), 100)
+    update(store, "0x01", tkn0_balance=150)
+
+    def fail(pools, block_number):
+        raise OSError("No space left on device")
+
+    with monkeypatch.context() as m:
+        m.setattr(pool_log, "_encode_table", fail)
+        with pytest.raises(OSError):
+            log.write(store.snapshot(), 101)
+
+    update(store, "0x02", tick=7)
+    assert log.write(store.snapshot(), 102) == 2
+    block, pools = load_pool_data(str(tmp_path))
+    pools = {pool["cid"]: pool for pool in pools}
+    assert block == 102 and log.frames == 1
+    assert pools["0x01"]["tkn0_balance"] == 150 and pools["0x02"]["tick"] == 7
+
+
+def test_latest_pool_data_is_also_written_as_json(tmp_path):
+    mgr = SimpleNamespace(pool_data=make_store(), pool_data_log=None, cfg=SimpleNamespace(logger=logging.getLogger(__name__)))
+    write_pool_data_to_disk(cache_latest_only=True, logging_path=str(tmp_path), mgr=mgr, current_block=100)
+
+    assert sorted(os.listdir(tmp_path)) == ["latest_pool_data.json", "pool_data"]
+    with open(os.path.join(tmp_path, "latest_pool_data.json")) as f:
+        pools = {pool["cid"]: pool for pool in json.load(f)}
+    assert pools["0x03"] == {"cid": "0x03", "exchange_name": "carbon_v1", "y_0": 5, "z_0": 10, "strategy_id": "3"}
+    assert "anchor" not in pools["0x01"]
@@ -0,0 +1,85 @@
+
+'''
+This module tests the analytic price derivatives of the curves, and the MargPOptimizer Jacobian assembled from them
+'''
+
+import math
+
+import numpy as np
+import pytest
+
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer, CPCInverter
+from fastlane_bot.tools.optimizer import MargPOptimizer
+
+
+def make_curves():
+    return [
+        CPC.from_pk(pair="WETH/USDC", p=2000, k=2000 * 10 ** 6, cid="cp"),
+        CPC.from_univ3(pair="WETH/USDC", Pmarg=1900, uniPa=1800, uniPb=2100, uniL=10 ** 4, cid="univ3", fee=0, descr=""),
+        CPC.from_carbon(pair="WETH/USDC", tkny="USDC", yint=5000, y=3000, pa=2100, pb=1950, isdydx=True, cid="carbon"),
+        CPC.from_xyal(x=50, y=200000, alpha=0.2, pair="WETH/USDC", cid="weighted"),
+    ]
+
+
+def numeric_derivative(curve, p, eps=1e-6):
+    x0, y0, _ = curve.xyfromp_f(p)
+    x1, y1, _ = curve.xyfromp_f(p * math.exp(eps))
+    return (x1 - x0) / eps, (y1 - y0) / eps
+
+
+@pytest.mark.parametrize("p", [1700, 1900, 2000, 2050, 2300])
+def test_curve_derivatives_match_finite_differences(p):
+    curves = make_curves()
+    curves += [CPCInverter(c) for c in curves]
+    for c in curves:
+        pc = p if c.tknx == "WETH" else 1 / p
+        analytic = c.xyderivfromp_f(pc)
+        numeric = numeric_derivative(c, pc)
+        for a, n in zip(analytic, numeric):
+            assert a == pytest.approx(n, rel=1e-4, abs=1e-6), f"{c.cid} at {pc}"
+
+
+def test_derivatives_are_zero_outside_the_range():
+    c = CPC.from_univ3(pair="WETH/USDC", Pmarg=1900, uniPa=1800, uniPb=2100, uniL=10 ** 4, cid="univ3", fee=0, descr="")
+    assert c.xyderivfromp_f(2500) == (0, 0)
+    assert c.xyderivfromp_f(1500) == (0, 0)
+    assert c.xyderivfromp_f(2500, ignorebounds=True) != (0, 0)
+
+
+def make_triangle():
+    return CPCContainer([
+        *make_curves(),
+        CPC.from_pk(pair="WBTC/USDC", p=40000, k=40000 * 10 ** 4, cid="btcusdc"),
+        CPC.from_pk(pair="WBTC/WETH", p=21, k=21 * 10 ** 2, cid="btceth"),
+        CPC.from_xyal(x=30, y=600, alpha=0.6, pair="WBTC/WETH", cid="btcethweighted"),
+    ])
+
+
+@pytest.mark.parametrize("targettkn", ["USDC", "WETH"])
+def test_jacobian_matches_the_finite_difference_oracle(targettkn):
+    O = MargPOptimizer(make_triangle())
+    dtknfromp_f = O.optimize(targettkn, result=O.MO_DTKNFROMPF)
+    jacobian_f = O.optimize(targettkn, result=O.MO_JACOBIANF)
+    pstart = O.optimize(targettkn, result=O.MO_PSTART)[targettkn]
+
+    for shift in [1, 0.9, 1.05]:
+        plog10 = np.log10(np.array(pstart, dtype=float) * shift)
+        analytic = jacobian_f(plog10)
+        numeric = O.jacobian(dtknfromp_f, plog10, eps=1e-7)
+        assert analytic.shape == (2, 2)
+        assert np.allclose(analytic, numeric, rtol=1e-4, atol=1e-3 * np.abs(numeric).max())
+
+        p = 10 ** plog10
+        assert np.allclose(jacobian_f(p, islog10=False) * p * np.log(10), analytic)
+
+
+@pytest.mark.parametrize("targettkn", ["USDC", "WETH", "WBTC"])
+def test_optimize_matches_the_finite_difference_result(targettkn):
+    O = MargPOptimizer(make_triangle())
+    r = O.optimize(targettkn)
+    r_fd = O.optimize(targettkn, params=dict(fdjacobian=True))
+    assert not r.is_error and not r_fd.is_error
+    assert r.result == pytest.approx(r_fd.result, rel=1e-6)
+    assert r.result < 0
+    for dtkn, dtkn_fd in zip(r.dxvalues, r_fd.dxvalues):
+        assert dtkn == pytest.approx(dtkn_fd, rel=1e-4, abs=1e-6)
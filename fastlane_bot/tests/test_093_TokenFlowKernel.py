@@ -0,0 +1,81 @@
+
+'''
+This module tests that the vectorized token flow kernel of MargPOptimizer matches the curve by curve calculation
+'''
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer, CPCInverter
+from fastlane_bot.tools.curvetable import TokenFlowKernel
+from fastlane_bot.tools.optimizer import MargPOptimizer
+
+DATA = os.path.join(os.path.dirname(__file__), "_data", "NBTEST_002_Curves.csv.gz")
+
+
+def load_market():
+    CC = CPCContainer.from_df(pd.read_csv(DATA))
+    CC.add(CPC.from_xyal(x=100, y=400, alpha=0.8, pair="WETH/USDC", cid="asym"))
+    CC.add(CPC.from_carbon(pair="WETH/USDC", tkny="USDC", yint=5000, y=3000, pa=2100, pb=1950, isdydx=True, cid="carbon"))
+    return CC
+
+
+def test_kernel_matches_the_curves():
+    curves = load_market().curves
+    kernel = TokenFlowKernel.from_curves(curves)
+    assert len(kernel) == len(curves)
+
+    rng = np.random.default_rng(0)
+    prices = {c.tknx: c.p for c in curves if c.tkny == "USDC"} | {"USDC": 1}
+    pvec = np.array([prices.get(tkn, 1) for tkn in kernel.tokens]) * rng.uniform(0.8, 1.2, len(kernel.tokens))
+    pdct = dict(zip(kernel.tokens, pvec))
+
+    expected = dict.fromkeys(kernel.tokens, 0)
+    for c in curves:
+        for tkn, dtkn in c.dxvecfrompvec_f(pdct).items():
+            expected[tkn] += dtkn
+    assert np.allclose(kernel.dtknfrompvec(pvec), [expected[tkn] for tkn in kernel.tokens], rtol=1e-9, atol=1e-9)
+
+    ix = {tkn: i for i, tkn in enumerate(kernel.tokens)}
+    expected = np.zeros((len(ix), len(ix)))
+    for c in curves:
+        dxdlogp, dydlogp = c.xyderivfromp_f(pdct[c.tknx] / pdct[c.tkny])
+        for i, d in ((ix[c.tknx], dxdlogp), (ix[c.tkny], dydlogp)):
+            expected[i, ix[c.tknx]] += d
+            expected[i, ix[c.tkny]] -= d
+    assert np.allclose(kernel.jacobian(pvec), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_inverted_curves_have_the_same_token_flows():
+    c = CPC.from_univ3(pair="WETH/USDC", Pmarg=1900, uniPa=1800, uniPb=2100, uniL=10 ** 4, cid="univ3", fee=0, descr="")
+    kernel = TokenFlowKernel.from_curves(CPCInverter.unwrap([CPCInverter(c)]), ("USDC", "WETH"))
+    dx, dy, _ = CPCInverter(c).dxdyfromp_f(1 / 2000)
+    assert np.allclose(kernel.dtknfrompvec([1, 2000]), [dx, dy])
+
+
+def test_invalid_curves_only_affect_their_own_tokens():
+    curves = [
+        CPC.from_pk(pair="WETH/USDC", p=2000, k=2000 * 10 ** 6, cid="good"),
+        CPC.from_pk(pair="WBTC/DAI", p=40000, k=40000 * 10 ** 4, cid="bad"),
+    ]
+    kernel = TokenFlowKernel.from_curves(curves, ("WETH", "WBTC", "DAI", "USDC"))
+    dtkn = kernel.dtknfrompvec([2100, np.nan, 1, 1])
+    assert np.isfinite(dtkn[[0, 3]]).all() and np.isnan(dtkn[[1, 2]]).all()
+
+
+@pytest.mark.parametrize("targettkn", ["USDC", "WETH"])
+def test_optimize_matches_the_python_token_flows(targettkn):
+    O = MargPOptimizer(load_market().bytknys({"USDC", "WETH", "WBTC"}).bytknxs({"USDC", "WETH", "WBTC"}))
+    dtknfromp_f = O.optimize(targettkn, result=O.MO_DTKNFROMPF)
+    dtknfromp_py_f = O.optimize(targettkn, result=O.MO_DTKNFROMPF, params=dict(pykernel=True))
+    plog10 = np.log10(O.optimize(targettkn, result=O.MO_PSTART)[targettkn])
+    assert np.allclose(dtknfromp_f(plog10), dtknfromp_py_f(plog10), rtol=1e-9, atol=1e-9)
+
+    r = O.optimize(targettkn)
+    r_py = O.optimize(targettkn, params=dict(pykernel=True))
+    assert not r.is_error and not r_py.is_error
+    assert r.result == pytest.approx(r_py.result, rel=1e-9)
+    assert r.dtokens == pytest.approx(r_py.dtokens, rel=1e-6, abs=1e-9)
@@ -0,0 +1,156 @@
+
+'''
+This module tests that the optimizations are warm-started from the optimal prices of the previous iteration
+'''
+
+import math
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from fastlane_bot.modes.pairwise_multi_all import FindArbitrageMultiPairwiseAll
+from fastlane_bot.modes.search_cache import PairSearchCache, WarmStartCache
+from fastlane_bot.tools.cpc import ConstantProductCurve as CPC, CPCContainer
+from fastlane_bot.tools.optimizer import MargPOptimizer, PairOptimizer
+
+WETH = "WETH-6Cc2"
+
+
+def make_config():
+    return SimpleNamespace(
+        logger=MagicMock(),
+        CARBON_V1_FORKS=["carbon_v1"],
+        DEFAULT_MIN_PROFIT_GAS_TOKEN=0.0001,
+        NATIVE_GAS_TOKEN_ADDRESS="ETH-EEeE",
+        WRAPPED_GAS_TOKEN_ADDRESS=WETH,
+    )
+
+
+def make_pair(tkn_price=2000):
+    return [
+        CPC.from_pk(p=tkn_price, k=tkn_price * 1000 ** 2, pair=f"TKN/{WETH}", cid="1", fee=0.003, params={"exchange": "uniswap_v2"}),
+        CPC.from_pk(p=2100, k=2100 * 1000 ** 2, pair=f"TKN/{WETH}", cid="2", fee=0.003, params={"exchange": "sushiswap_v2"}),
+        CPC.from_pk(p=1 / 2050, k=1000 ** 2 / 2050, pair=f"{WETH}/TKN", cid="3", fee=0.003, params={"exchange": "sushiswap_v2"}),
+    ]
+
+
+def make_triangle(usdc_price=2000):
+    return [
+        CPC.from_pk(pair="WETH/USDC", p=usdc_price, k=usdc_price * 10 ** 6, cid="ethusdc"),
+        CPC.from_pk(pair="WBTC/USDC", p=42000, k=42000 * 10 ** 4, cid="btcusdc"),
+        CPC.from_pk(pair="WBTC/WETH", p=20, k=20 * 10 ** 2, cid="btceth"),
+    ]
+
+
+@pytest.fixture
+def evaluations(monkeypatch):
+    counter = []
+    goalseek = PairOptimizer.goalseek.__func__
+
+    def counting_goalseek(cls, func, a, b, *, eps=None):
+        def counting_func(p):
+            counter.append(p)
+            return func(p)
+        return goalseek(cls, counting_func, a, b, eps=eps)
+
+    monkeypatch.setattr(PairOptimizer, "goalseek", classmethod(counting_goalseek))
+    return counter
+
+
+@pytest.mark.parametrize("targettkn", [WETH, "TKN"])
+def test_pair_bisection_starts_from_the_bracket(targettkn, evaluations):
+    O = PairOptimizer(CPCContainer(make_pair()))
+    r = O.optimize(targettkn)
+    cold = len(evaluations)
+    (p,) = r.p_optimal_t
+
+    evaluations.clear()
+    r_warm = O.optimize(targettkn, params=dict(bracket=(p * 0.9999, p * 1.0001)))
+    assert len(evaluations) < cold
+    assert r_warm.p_optimal_t[0] == pytest.approx(p, rel=1e-12)
+    assert r_warm.result == pytest.approx(r.result, rel=1e-9)
+
+    # if the optimum is outside the bracket, the default interval is used
+    r_moved = O.optimize(targettkn, params=dict(bracket=(p * 1.01, p * 1.02)))
+    assert r_moved.p_optimal_t[0] == pytest.approx(p, rel=1e-12)
+
+
+def test_batch_uses_the_brackets():
+    containers = [CPCContainer(make_pair()), CPCContainer(make_pair(1950)), CPCContainer(make_pair(2050))]
+    cold = PairOptimizer.optimize_batch(containers, [WETH] * 3)
+    p = [r.p_optimal_t[0] for r in cold]
+    brackets = [(p[0] * 0.999, p[0] * 1.001), None, (p[2] * 1.1, p[2] * 1.2)]
+    warm = PairOptimizer.optimize_batch(containers, [WETH] * 3, brackets=brackets)
+    for r, r_warm in zip(cold, warm):
+        assert not r_warm.is_error
+        assert r_warm.p_optimal_t[0] == pytest.approx(r.p_optimal_t[0], rel=1e-12)
+
+
+def test_cache_follows_the_optimum():
+    cache = WarmStartCache()
+    curves = make_pair()
+    r = PairOptimizer(CPCContainer(curves)).optimize(WETH)
+    (p,) = r.p_optimal_t
+    cache.update(curves, WETH, r)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert cache.get(curves, WETH).prices == {"TKN": p}
+    assert cache.bracket(reversed(curves), WETH) == pytest.approx((p * math.exp(-1e-4), p * math.exp(1e-4)))
+    assert cache.bracket(curves, "TKN") is None and cache.bracket(curves[:2], WETH) is None
+
+    # the bracket widens with the move of the optimum
+    r_moved = PairOptimizer(CPCContainer(make_pair(1990))).optimize(WETH)
+    cache.update(make_pair(1990), WETH, r_moved)
+    (p_moved,) = r_moved.p_optimal_t
+    width = 2 * abs(math.log(p_moved / p))
+    assert cache.bracket(curves, WETH) == pytest.approx((p_moved * math.exp(-width), p_moved * math.exp(width)))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # failed optimizations and miniverses which are no longer optimized are dropped
+    cache.update(curves[:2], WETH, PairOptimizer(CPCContainer(curves[:2])).optimize(WETH))
+    cache.retain()
+    cache.update(curves, WETH, None)
+    cache.retain()
+    assert cache.entries == {}
+
+
+def test_margp_newton_starts_from_the_last_optimum():
+    cache = WarmStartCache()
+    curves = make_triangle()
+    r = MargPOptimizer(CPCContainer(curves)).optimize("USDC")
+    assert not r.is_error
+    cache.update(curves, "USDC", r)
+
+    moved = make_triangle(usdc_price=2001)
+    pstart = {"WETH": 2001, "WBTC": 42000, "USDC": 1}
+    r_cold = MargPOptimizer(CPCContainer(moved)).optimize("USDC", params=dict(pstart=pstart))
+    warm_pstart = cache.pstart(moved, "USDC", pstart)
+    assert warm_pstart == {**dict(zip(r.tokens_t, r.p_optimal_t)), "USDC": 1}
+    r_warm = MargPOptimizer(CPCContainer(moved)).optimize("USDC", params=dict(pstart=warm_pstart))
+    assert r_warm.n_iterations < r_cold.n_iterations
+    assert r_warm.result == pytest.approx(r_cold.result, rel=1e-6)
+
+
+def test_finder_warm_starts_the_next_iteration():
+    def find(curves, warm_start, search_cache=None):
+        finder = FindArbitrageMultiPairwiseAll(
+            flashloan_tokens=[WETH], CCm=CPCContainer(curves), ConfigObj=make_config(),
+            search_cache=search_cache, warm_start=warm_start,
+        )
+        candidates = finder.find_arbitrage()
+        warm_start.retain()
+        return sorted((round(c[0], 8), tuple(ti["cid"] for ti in c[2])) for c in candidates)
+
+    expected = find(make_pair(1990), WarmStartCache())
+    warm_start = WarmStartCache()
+    find(make_pair(), warm_start)
+    assert len(warm_start.entries) == warm_start.misses == 3
+    assert find(make_pair(1990), warm_start) == expected
+    assert warm_start.misses == 3
+
+    # the warm starts of the pairs taken from the search cache are kept
+    entries = set(warm_start.entries)
+    search_cache = PairSearchCache()
+    find(make_pair(), warm_start, search_cache)
+    find(make_pair(), warm_start, search_cache)
+    assert search_cache.hits == 1 and set(warm_start.entries) == entries
@@ -0,0 +1,147 @@
+
+'''
+This module tests that the tokens, fees and token metadata of new pools are resolved with multicalls
+'''
+
+import os
+
+import pandas as pd
+
+from fastlane_bot.data.abi import ERC20_ABI, SOLIDLY_V2_FACTORY_ABI, SOLIDLY_V2_POOL_ABI, UNISWAP_V2_POOL_ABI, UNISWAP_V3_POOL_ABI
+from fastlane_bot.events.async_event_update_utils import get_tokens_and_fee, update_token_cache
+from fastlane_bot.events.exchanges.carbon_v1 import CarbonV1
+from fastlane_bot.events.exchanges.solidly_v2 import SolidlyV2
+from fastlane_bot.events.exchanges.uniswap_v2 import UniswapV2
+from fastlane_bot.events.exchanges.uniswap_v3 import UniswapV3
+from fastlane_bot.events.token_cache import TokenCache
+from fastlane_bot.tests._fakes import W3, address, make_multicall_mgr
+
+WETH, USDC, DAI, NEW = address(1), address(2), address(3), address(4)
+UNI_V2, UNI_V3, SOLIDLY, BROKEN, CARBON, FACTORY = (address(n) for n in range(100, 106))
+
+
+def targets(calls):
+    return [call["target"] for call in calls]
+
+
+def make_mgr():
+    exchanges = {
+        "uniswap_v2": UniswapV2(exchange_name="uniswap_v2", fee="0.003"),
+        "uniswap_v3": UniswapV3(exchange_name="uniswap_v3"),
+        "velodrome_v2": SolidlyV2(exchange_name="velodrome_v2", factory_contract=W3.eth.contract(address=FACTORY, abi=SOLIDLY_V2_FACTORY_ABI)),
+        "carbon_v1": CarbonV1(exchange_name="carbon_v1"),
+    }
+    pools = [
+        (UNI_V2, "uniswap_v2", {}),
+        (UNI_V3, "uniswap_v3", {}),
+        (SOLIDLY, "velodrome_v2", {}),
+        (BROKEN, "uniswap_v2", {}),
+        (CARBON, "carbon_v1", {"id": 7, "token0": WETH, "token1": DAI}),
+        (UNI_V2, "uniswap_v2", {}),
+    ]
+    mgr = make_multicall_mgr(
+        exchanges=exchanges,
+        pools_to_add_from_contracts=[
+            (addr, ex_name, {"address": addr, "exchange": ex_name, "args": args}, None, None) for addr, ex_name, args in pools
+        ],
+        exchange_name_from_event=lambda event: event["exchange"],
+        token_cache=None,
+        blockchain="ethereum",
+        prefix_path="",
+        read_only=False,
+    )
+    eth = mgr.web3.eth
+    eth.respond(UNI_V2, UNISWAP_V2_POOL_ABI, "token0", [WETH])
+    eth.respond(UNI_V2, UNISWAP_V2_POOL_ABI, "token1", [USDC])
+    eth.respond(UNI_V3, UNISWAP_V3_POOL_ABI, "token0", [USDC])
+    eth.respond(UNI_V3, UNISWAP_V3_POOL_ABI, "token1", [NEW])
+    eth.respond(UNI_V3, UNISWAP_V3_POOL_ABI, "fee", [500])
+    eth.respond(SOLIDLY, SOLIDLY_V2_POOL_ABI, "token0", [DAI])
+    eth.respond(SOLIDLY, SOLIDLY_V2_POOL_ABI, "token1", [USDC])
+    eth.respond(SOLIDLY, SOLIDLY_V2_POOL_ABI, "stable", [True])
+    eth.respond(FACTORY, SOLIDLY_V2_FACTORY_ABI, "getFee", [5], args=[SOLIDLY, True])
+    eth.respond(BROKEN, UNISWAP_V2_POOL_ABI, "token1", [USDC])
+    eth.respond(CARBON, CarbonV1(exchange_name="carbon_v1").get_abi(), "tradingFeePPM", [2000])
+    eth.respond(DAI, ERC20_ABI, "decimals", [18])
+    eth.respond(DAI, ERC20_ABI, "symbol", ["DAI"])
+    eth.respond(NEW, ERC20_ABI, "decimals", [9])
+    eth.respond(NEW, ERC20_ABI, "symbol", ["NEW-TKN"])
+    return mgr
+
+
+def test_tokens_and_fees_are_read_in_one_multicall_per_round():
+    mgr = make_mgr()
+    pools = {pool["address"]: pool for pool in get_tokens_and_fee(mgr, 1234)}
+
+    # the stable flag of the Solidly pool is read before its fee
+    assert len(mgr.web3.eth.aggregates) > 1 and {block for _, block in mgr.web3.eth.aggregates} == {1234}
+    assert [len(calls) for calls, _ in mgr.web3.eth.aggregates if FACTORY in targets(calls)] == [1]
+    assert sorted(pools) == sorted([UNI_V2, UNI_V3, SOLIDLY, CARBON])
+
+    assert pools[UNI_V2]["tkn0_address"] == WETH and pools[UNI_V2]["tkn1_address"] == USDC
+    assert pools[UNI_V2]["fee"] == ("0.003", 0.003)
+    assert pools[UNI_V3]["fee"] == (500, 0.0005)
+    assert pools[SOLIDLY]["fee"] == ("0.0005", 0.0005)
+    assert pools[CARBON]["fee"] == ("2000", 0.002)
+    assert pools[CARBON]["strategy_id"] == "7" and pools[CARBON]["tkn1_address"] == DAI
+    assert all(pool["cid"] for pool in pools.values())
+
+
+def test_only_unknown_tokens_are_read_and_persisted(tmp_path):
+    path = os.path.join(tmp_path, "tokens.csv")
+    pd.DataFrame([
+        {"address": WETH.lower(), "decimals": 18, "symbol": "WETH"},
+        {"address": USDC, "decimals": 6, "symbol": "USDC"},
+    ]).to_csv(path, index=False)
+
+    mgr = make_mgr()
+    mgr.prefix_path = f"{tmp_path}/"
+    mgr.token_cache = TokenCache.from_csv(path)
+    pools = get_tokens_and_fee(mgr, 1234)
+    mgr.web3.eth.aggregates.clear()
+
+    token_cache = update_token_cache(mgr, pools, 1234)
+    assert [sorted(targets(calls)) for calls, _ in mgr.web3.eth.aggregates] == [sorted([DAI, DAI, NEW, NEW])]
+    assert token_cache.get(NEW) == {"address": NEW, "decimals": 9, "symbol": "NEW_TKN"}
+    assert token_cache.get(WETH)["symbol"] == "WETH"
+
+    mgr.web3.eth.aggregates.clear()
+    update_token_cache(mgr, pools, 1235)
+    assert mgr.web3.eth.aggregates == []
+
+    reloaded = TokenCache.from_csv(path)
+    assert len(reloaded) == 4 and reloaded.get(DAI)["decimals"] == 18
+
+
+def test_tokens_which_cannot_be_read_are_not_cached(tmp_path):
+    cache = TokenCache(path=os.path.join(tmp_path, "tokens.csv"))
+    added = cache.add([
+        {"address": DAI, "decimals": 18, "symbol": "DAI"},
+        {"address": NEW, "decimals": None, "symbol": "NEW"},
+        {"address": WETH, "decimals": 18, "symbol": None},
+    ])
+    assert added == 1 and cache.missing([DAI, NEW, WETH, None, NEW]) == [NEW, WETH]
+
+    cache = TokenCache(path=os.path.join(tmp_path, "read_only.csv"), read_only=True)
+    cache.add([{"address": DAI, "decimals": 18, "symbol": "DAI"}])
+    assert DAI in cache and not os.path.exists(cache.path)
+
+
+def test_tokens_resolved_by_the_contracts_manager_are_not_read_again(tmp_path):
+    token_detail = os.path.join(tmp_path, "fastlane_bot", "data", "blockchain_data", "ethereum", "token_detail")
+    os.makedirs(token_detail)
+    pd.DataFrame([{"address": NEW, "decimals": 9, "symbol": "NEW-TKN"}]).to_csv(os.path.join(token_detail, "1.csv"), index=False)
+
+    mgr = make_mgr()
+    mgr.prefix_path = f"{tmp_path}/"
+    mgr.token_cache = TokenCache.from_csv(os.path.join(tmp_path, "tokens.csv"))
+    pools = get_tokens_and_fee(mgr, 1234)
+    mgr.web3.eth.aggregates.clear()
+
+    token_cache = update_token_cache(mgr, pools, 1234)
+    assert all(NEW not in targets(calls) for calls, _ in mgr.web3.eth.aggregates)
+    assert token_cache.get(NEW)["symbol"] == "NEW_TKN"
+
+    # the token detail files are only loaded once, and are not copied to the tokens CSV file
+    assert token_cache.loaded_files == {os.path.join(token_detail, "1.csv")}
+    assert NEW not in TokenCache.from_csv(token_cache.path)
@@ -0,0 +1,65 @@
+
+'''
+This module tests that the pools are backdated on the first iteration with chunked multicalls pinned to one block
+'''
+
+from fastlane_bot.config.multicaller import MultiCaller
+from fastlane_bot.data.abi import BANCOR_V2_CONVERTER_ABI, SOLIDLY_V2_POOL_ABI, UNISWAP_V2_POOL_ABI, UNISWAP_V3_POOL_ABI
+from fastlane_bot.events.async_backdate_utils import async_handle_initial_iteration, multicall_backdate_from_contracts
+from fastlane_bot.tests._fakes import W3, address, make_multicall_mgr
+
+UNI_V2, UNI_V3, SOLIDLY, BANCOR_V2, BROKEN = (address(n) for n in range(100, 105))
+ABIS = {
+    "uniswap_v2": UNISWAP_V2_POOL_ABI,
+    "uniswap_v3": UNISWAP_V3_POOL_ABI,
+    "velodrome_v2": SOLIDLY_V2_POOL_ABI,
+    "bancor_v2": BANCOR_V2_CONVERTER_ABI,
+}
+
+
+def make_mgr():
+    mgr = make_multicall_mgr(
+        [
+            {"cid": "v2", "exchange_name": "uniswap_v2", "address": UNI_V2, "tkn0_balance": 1, "tkn1_balance": 2, "last_updated_block": 0},
+            {"cid": "v3", "exchange_name": "uniswap_v3", "address": UNI_V3, "sqrt_price_q96": 1, "tick": 0, "liquidity": 1, "last_updated_block": 0},
+            {"cid": "solidly", "exchange_name": "velodrome_v2", "address": SOLIDLY, "tkn0_balance": 1, "tkn1_balance": 2, "last_updated_block": 0},
+            {"cid": "broken", "exchange_name": "uniswap_v2", "address": BROKEN, "tkn0_balance": 1, "tkn1_balance": 2, "last_updated_block": 0},
+            {"cid": "bancor", "exchange_name": "bancor_v2", "address": BANCOR_V2, "tkn0_balance": 1, "tkn1_balance": 2, "last_updated_block": 0},
+        ],
+        get_pool_contract=lambda pool_info: W3.eth.contract(address=pool_info["address"], abi=ABIS[pool_info["exchange_name"]]),
+        get_rows_to_update=lambda start_block: [0, 1, 2, 3, 4, 4],
+    )
+    eth = mgr.web3.eth
+    eth.respond(UNI_V2, UNISWAP_V2_POOL_ABI, "getReserves", [100, 200, 0])
+    eth.respond(UNI_V3, UNISWAP_V3_POOL_ABI, "slot0", [2 ** 96, 10, 0, 1, 1, 0, True])
+    eth.respond(UNI_V3, UNISWAP_V3_POOL_ABI, "liquidity", [2000])
+    eth.respond(SOLIDLY, SOLIDLY_V2_POOL_ABI, "getReserves", [300, 400, 0])
+    eth.respond(BANCOR_V2, BANCOR_V2_CONVERTER_ABI, "reserveBalances", [500, 600])
+    return mgr
+
+
+def test_pools_are_read_at_one_block_in_chunks(monkeypatch):
+    monkeypatch.setattr(MultiCaller, "BATCH_SIZE", 2)
+    mgr = make_mgr()
+    assert multicall_backdate_from_contracts(mgr, [0, 1, 2, 4], 1234) == 4
+
+    assert {block for _, block in mgr.web3.eth.aggregates} == {1234}
+    assert sorted(len(calls) for calls, _ in mgr.web3.eth.aggregates) == [1, 2, 2]
+    assert mgr.pool_data.get("v2")["tkn0_balance"] == 100
+    assert mgr.pool_data.get("v3")["liquidity"] == 2000 and mgr.pool_data.get("v3")["tick"] == 10
+    assert mgr.pool_data.get("solidly")["tkn1_balance"] == 400
+    assert mgr.pool_data.get("bancor")["tkn0_balance"] == 500
+    assert all(mgr.pool_data.get(cid)["last_updated_block"] == 1234 for cid in ["v2", "v3", "solidly", "bancor"])
+
+
+def test_pools_which_cannot_be_read_are_left_unchanged():
+    mgr = make_mgr()
+    async_handle_initial_iteration(backdate_pools=True, last_block=0, mgr=mgr, start_block=1000, current_block=1234)
+
+    broken = mgr.pool_data.get("broken")
+    assert broken["tkn0_balance"] == 1 and broken["last_updated_block"] == 0
+    assert mgr.pool_data.get("bancor")["tkn1_balance"] == 600
+
+    # the failed batch is bisected, so the other pools are still read in the same block
+    assert {block for _, block in mgr.web3.eth.aggregates} == {1234}
+    assert len(mgr.web3.eth.aggregates) > 1
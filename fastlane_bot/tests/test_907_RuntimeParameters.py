@@ -52,6 +52,9 @@ def mock_args():
             self.self_fund = 'False'
             self.read_only = 'True'
             self.is_args_test = 'True'
+            self.address_scoped_logs = 'False'
+            self.ws_url = None
+            self.pipeline = 'False'
             self.rpc_url = None
 
     return Args()
@@ -8,8 +8,8 @@ Licensed under MIT
 NOTE: this class is not part of the API of the Carbon protocol, and you must expect breaking
 changes even in minor version updates. Use at your own risk.
 """
-__VERSION__ = "3.4"
-__DATE__ = "23/Jan/2024"
+__VERSION__ = "3.7"
+__DATE__ = "28/Mar/2024"
 
 from dataclasses import dataclass, field, asdict, InitVar
 from .simplepair import SimplePair as Pair
@@ -27,6 +27,7 @@ from sys import float_info
 from hashlib import md5 as digest
 import time
 from .cpcbase import CurveBase, AttrDict, DAttrDict, dataclass_
+from .curvetable import CurveTable
 
 
 AD = DAttrDict
@@ -1610,6 +1611,41 @@ class ConstantProductCurve(CurveBase):
         dx, dy, _ = self.dxdyfromp_f(p, ignorebounds=ignorebounds)
         return {self.tknx: dx, self.tkny: dy}
 
+    def xyderivfromp_f(self, p=None, *, ignorebounds=False):
+        r"""
+        returns the price derivatives dx/dlog p, dy/dlog p of xyfromp_f (and dxdyfromp_f) at p
+
+        :p:                 marginal price (in dy/dx)
+        :ignorebounds:      if True, ignore x_act and y_act; if False, the derivative of a token
+                            amount that is stuck at its boundary is zero
+        :returns:           dx/dlog p, dy/dlog p (natural log)
+
+
+        $$
+        \frac{dx}{d\log p} = -(1-\alpha)\, x(p)
+        \frac{dy}{d\log p} = \alpha\, y(p)
+        $$
+        """
+        if p is None:
+            p = self.p
+
+        x, y, _ = self.xyfromp_f(p, ignorebounds=True)
+        alpha = self.alpha
+        dxdlogp = -(1-alpha) * x
+        dydlogp = alpha * y
+
+        if not ignorebounds:
+            if not self.x_min is None and x < self.x_min:
+                dxdlogp = 0
+            if not self.x_max is None and x > self.x_max:
+                dxdlogp = 0
+            if not self.y_min is None and y < self.y_min:
+                dydlogp = 0
+            if not self.y_max is None and y > self.y_max:
+                dydlogp = 0
+
+        return dxdlogp, dydlogp
+
     def yfromx_f(self, x, *, ignorebounds=False):
         "y value for given x value (if in range; None otherwise)"
         if self.is_constant_product():
@@ -1797,6 +1833,11 @@ class CPCContainer:
             except KeyError:
                 self.curves_by_primary_pair[c.pairo.primary] = [c]
 
+        # secondary indexes (by pair, token and params); built on first use, see _index
+        self._ix = None
+        # columnar representation of the curves; built on first use, see table
+        self._table = None
+
     TOKENSCALE = ts.TokenScale1Data
     # default token scale object is the trivial scale (everything one)
     # change this to a different scale object be creating a derived class
@@ -1870,8 +1911,170 @@ class CPCContainer:
             self.curves_by_primary_pair[item.pairo.primary].append(item)
         except KeyError:
             self.curves_by_primary_pair[item.pairo.primary] = [item]
+        self._ix_add(item)
+        self._table = None
+        return self
+
+    def replace(self, item):
+        """
+        replaces the curve with the same cid as item in place (adds item if there is no such curve)
+
+        :item:      a ConstantProductCurve object (or a CPCInverter) with a cid
+        """
+        if isinstance(item, CPCInverter):
+            item = item.curve
+        assert isinstance(
+            item, ConstantProductCurve
+        ), f"item must be a ConstantProductCurve object {item}"
+
+        old = self.curves_by_cid.get(item.cid, None)
+        if old is None:
+            return self.add(item)
+        ix = self.curveix_by_curve.pop(old)
+        self._drop_from_pair(old)
+        self._ix_drop(old)
+        item.set_tokenscale(self.tokenscale)
+        self.curves[ix] = item
+        self.curves_by_cid[item.cid] = item
+        self.curveix_by_curve[item] = ix
+        try:
+            self.curves_by_primary_pair[item.pairo.primary].append(item)
+        except KeyError:
+            self.curves_by_primary_pair[item.pairo.primary] = [item]
+        self._ix_add(item)
+        self._table = None
         return self
 
+    def remove(self, cids):
+        """
+        removes all curves with the given cids
+
+        :cids:      a single cid or an iterable of cids; unknown cids are ignored
+        """
+        if isinstance(cids, (str, int)):
+            cids = [cids]
+        cids = {cid for cid in cids if cid in self.curves_by_cid}
+        if not cids:
+            return self
+        for cid in cids:
+            curve = self.curves_by_cid.pop(cid)
+            self._drop_from_pair(curve)
+            self._ix_drop(curve)
+        self.curves = [c for c in self.curves if not c.cid in cids]
+        self.curveix_by_curve = {c: i for i, c in enumerate(self.curves)}
+        self._table = None
+        return self
+
+    @property
+    def table(self):
+        """
+        the curves as CurveTable, ie as NumPy arrays (built on first use, and rebuilt after changes)
+        """
+        if self._table is None:
+            self._table = CurveTable.from_curves(self.curves)
+        return self._table
+
+    @staticmethod
+    def _ix_discard(index, key, curve):
+        """removes curve (by identity) from index[key], dropping the key if it becomes empty"""
+        curves = index.get(key, [])
+        curves[:] = [c for c in curves if c is not curve]
+        if not curves:
+            index.pop(key, None)
+
+    def _drop_from_pair(self, curve):
+        """removes curve (by identity) from curves_by_primary_pair"""
+        self._ix_discard(self.curves_by_primary_pair, curve.pairo.primary, curve)
+
+    IX_PAIR = "pair"            # directed pair -> curves
+    IX_TKNX = "tknx"            # tknx -> curves
+    IX_TKNY = "tkny"            # tkny -> curves
+    IX_TKN = "tkn"              # token -> curves containing the token
+    IX_PRIMARIES = "primaries"  # token -> {primary pair -> number of curves}
+    IX_PARAMS = "params"        # param name -> {param value -> curves} (None if not indexable)
+
+    def _index(self):
+        """
+        returns the secondary indexes of the container (built on first use)
+
+        the indexes are dicts of lists of curves, keyed by directed pair, tknx, tkny and token; the
+        params indexes are only built for the param names which have been queried via byparams;
+        they are maintained by add, replace and remove
+        """
+        if self._ix is None:
+            self._ix = {
+                self.IX_PAIR: {},
+                self.IX_TKNX: {},
+                self.IX_TKNY: {},
+                self.IX_TKN: {},
+                self.IX_PRIMARIES: {},
+                self.IX_PARAMS: {},
+            }
+            for c in self.curves:
+                self._ix_add(c)
+        return self._ix
+
+    def _ix_add(self, curve):
+        """adds a curve to the secondary indexes (if they have been built)"""
+        ix = self._ix
+        if ix is None:
+            return
+        tknx, tkny, primary = curve.tknx, curve.tkny, curve.pairo.primary
+        ix[self.IX_PAIR].setdefault(curve.pair, []).append(curve)
+        ix[self.IX_TKNX].setdefault(tknx, []).append(curve)
+        ix[self.IX_TKNY].setdefault(tkny, []).append(curve)
+        for tkn in {tknx, tkny}:
+            ix[self.IX_TKN].setdefault(tkn, []).append(curve)
+            primaries = ix[self.IX_PRIMARIES].setdefault(tkn, {})
+            primaries[primary] = primaries.get(primary, 0) + 1
+        for pname, curves_by_value in ix[self.IX_PARAMS].items():
+            if curves_by_value is None:
+                continue
+            try:
+                curves_by_value.setdefault(curve.P(pname), []).append(curve)
+            except TypeError:
+                # unhashable param value; byparams falls back to scanning for this param
+                ix[self.IX_PARAMS][pname] = None
+
+    def _ix_drop(self, curve):
+        """removes a curve from the secondary indexes (if they have been built)"""
+        ix = self._ix
+        if ix is None:
+            return
+        tknx, tkny, primary = curve.tknx, curve.tkny, curve.pairo.primary
+        self._ix_discard(ix[self.IX_PAIR], curve.pair, curve)
+        self._ix_discard(ix[self.IX_TKNX], tknx, curve)
+        self._ix_discard(ix[self.IX_TKNY], tkny, curve)
+        for tkn in {tknx, tkny}:
+            self._ix_discard(ix[self.IX_TKN], tkn, curve)
+            primaries = ix[self.IX_PRIMARIES].get(tkn, {})
+            primaries[primary] = primaries.get(primary, 0) - 1
+            if primaries[primary] <= 0:
+                del primaries[primary]
+            if not primaries:
+                ix[self.IX_PRIMARIES].pop(tkn, None)
+        for pname, curves_by_value in ix[self.IX_PARAMS].items():
+            if curves_by_value is not None:
+                self._ix_discard(curves_by_value, curve.P(pname), curve)
+
+    def _param_index(self, pname):
+        """returns the index param value -> curves for pname (None if the values are not hashable)"""
+        params_ix = self._index()[self.IX_PARAMS]
+        if not pname in params_ix:
+            curves_by_value = {}
+            try:
+                for c in self.curves:
+                    curves_by_value.setdefault(c.P(pname), []).append(c)
+            except TypeError:
+                curves_by_value = None
+            params_ix[pname] = curves_by_value
+        return params_ix[pname]
+
+    def _ordered(self, curves):
+        """returns the curves (taken from the indexes) as a list in container order"""
+        curveix = self.curveix_by_curve
+        return sorted(curves, key=lambda c: curveix.get(c, -1))
+
     def price(self, tknb, tknq):
         """returns price of tknb in tknq (tknb per tknq)"""
         pairo = Pair.from_tokens(tknb, tknq)
@@ -1939,7 +2142,7 @@ class CPCContainer:
     def tknys(self, curves=None):
         """returns set of all base tokens (tkny) used by the curves"""
         if curves is None:
-            curves = self.curves
+            return set(self._index()[self.IX_TKNY])
         return {c.tkny for c in curves}
 
     def tknyl(self, curves=None):
@@ -1951,7 +2154,7 @@ class CPCContainer:
     def tknxs(self, curves=None):
         """returns set of all quote tokens (tknx) used by the curves"""
         if curves is None:
-            curves = self.curves
+            return set(self._index()[self.IX_TKNX])
         return {c.tknx for c in curves}
 
     def tknxl(self, curves=None):
@@ -1992,9 +2195,9 @@ class CPCContainer:
                         canonical pair will be returned
         """
         if standardize:
-            return {c.pairo.primary for c in self}
+            return set(self.curves_by_primary_pair)
         else:
-            return {c.pair for c in self}
+            return set(self._index()[self.IX_PAIR])
 
     def cids(self, *, asset=False):
         """returns list of all curve ids (as tuple, or set if asset=True)"""
@@ -2020,6 +2223,7 @@ class CPCContainer:
 
     FP_ANY = "any"
     FP_ALL = "all"
+    FP_INDEXED = {"bothin", "contains", "onein"}
 
     def filter_pairs(self, pairs=None, *, anyall=FP_ALL, **conditions):
         """
@@ -2050,16 +2254,28 @@ class CPCContainer:
         =========   ========================================
         
         """
+        indexed = pairs is None
         if pairs is None:
             pairs = self.pairs()
         if not conditions:
             return pairs
-        pairs = self.Pair.wrap(pairs)
+        allpairs = pairs
+        wrapped = None
         results = []
         for condition in conditions:
             cpairs = self.pairset(conditions[condition])
             condition0 = condition.split("_")[0]
             # print(f"condition: {condition} | {condition0} [{conditions[condition]}]")
+            if indexed and condition0 in self.FP_INDEXED:
+                # only the pairs containing at least one of the tokens can match
+                primaries_by_tkn = self._index()[self.IX_PRIMARIES]
+                pairs = self.Pair.wrap(
+                    {p for t in cpairs for p in primaries_by_tkn.get(t, {})}
+                )
+            else:
+                if wrapped is None:
+                    wrapped = self.Pair.wrap(allpairs)
+                pairs = wrapped
             if condition0 == "bothin":
                 results += [
                     {str(p) for p in pairs if p.tknb in cpairs and p.tknq in cpairs}
@@ -2396,11 +2612,13 @@ class CPCContainer:
     
     def bypair(self, pair, *, directed=False, asgenerator=None, ascc=None):
         """returns all curves by (possibly directed) pair (as tuple, genator or CC object)"""
-        result = (c for c in self if c.pair == pair)
+        curves_by_pair = self._index()[self.IX_PAIR]
+        result = self._ordered(curves_by_pair.get(pair, []))
         if not directed:
             pairr = "/".join(pair.split("/")[::-1])
-            result = it.chain(result, (c for c in self if c.pair == pairr))
-        return self._convert(result, asgenerator=asgenerator, ascc=ascc)
+            if pairr != pair:
+                result += self._ordered(curves_by_pair.get(pairr, []))
+        return self._convert((c for c in result), asgenerator=asgenerator, ascc=ascc)
 
     def bp(self, pair, *, directed=False, asgenerator=None, ascc=None):
         """alias for bypair by with directed=False for interactive use"""
@@ -2425,7 +2643,10 @@ class CPCContainer:
                 rpairs = set(f"{q}/{b}" for b, q in (p.split("/") for p in pairs))
                 # print("[CC] bypairs: adding reverse pairs", rpairs)
                 pairs = pairs.union(rpairs)
-            result = (c for c in self if c.pair in pairs)
+            curves_by_pair = self._index()[self.IX_PAIR]
+            result = (c for c in self._ordered(
+                curve for pair in pairs for curve in curves_by_pair.get(pair, [])
+            ))
         return self._convert(result, asgenerator=asgenerator, ascc=ascc)
 
     def byparams(self, *, _asgenerator=None, _ascc=None, _inv=False, **params):
@@ -2447,7 +2668,12 @@ class CPCContainer:
         if _inv:
             result = (c for c in self if c.P(pname) != pvalue)
         else:
-            result = (c for c in self if c.P(pname) == pvalue)
+            curves_by_value = self._param_index(pname)
+            try:
+                result = (c for c in self._ordered(curves_by_value.get(pvalue, [])))
+            except (AttributeError, TypeError):
+                # no index for pname (unhashable values) or unhashable pvalue
+                result = (c for c in self if c.P(pname) == pvalue)
         return self._convert(result, asgenerator=_asgenerator, ascc=_ascc)
 
     def copy(self):
@@ -2456,7 +2682,7 @@ class CPCContainer:
 
     def bytknx(self, tknx, *, asgenerator=None, ascc=None):
         """returns all curves by quote token tknx (tknq) (as tuple, generator or CC object)"""
-        result = (c for c in self if c.tknx == tknx)
+        result = (c for c in self._ordered(self._index()[self.IX_TKNX].get(tknx, [])))
         return self._convert(result, asgenerator=asgenerator, ascc=ascc)
 
     bytknq = bytknx
@@ -2468,14 +2694,15 @@ class CPCContainer:
         if isinstance(tknxs, str):
             tknxs = set(t.strip() for t in tknxs.split(","))
         tknxs = set(tknxs)
-        result = (c for c in self if c.tknx in tknxs)
+        curves_by_tknx = self._index()[self.IX_TKNX]
+        result = (c for c in self._ordered(curve for t in tknxs for curve in curves_by_tknx.get(t, [])))
         return self._convert(result, asgenerator=asgenerator, ascc=ascc)
 
     bytknxs = bytknxs
 
     def bytkny(self, tkny, *, asgenerator=None, ascc=None):
         """returns all curves by base token tkny (tknb) (as tuple, generator or CC object)"""
-        result = (c for c in self if c.tkny == tkny)
+        result = (c for c in self._ordered(self._index()[self.IX_TKNY].get(tkny, [])))
         return self._convert(result, asgenerator=asgenerator, ascc=ascc)
 
     bytknb = bytkny
@@ -2487,7 +2714,8 @@ class CPCContainer:
         if isinstance(tknys, str):
             tknys = set(t.strip() for t in tknys.split(","))
         tknys = set(tknys)
-        result = (c for c in self if c.tkny in tknys)
+        curves_by_tkny = self._index()[self.IX_TKNY]
+        result = (c for c in self._ordered(curve for t in tknys for curve in curves_by_tkny.get(t, [])))
         return self._convert(result, asgenerator=asgenerator, ascc=ascc)
 
     bytknys = bytknys
@@ -3078,6 +3306,12 @@ class CPCInverter:
             return (r[1], r[0], 1 / r[2], self.tknxp, self.tknyp, self.pairp)
         return (r[1], r[0], 1 / r[2])
 
+    def xyderivfromp_f(self, p=None, *, ignorebounds=False):
+        dxdlogp, dydlogp = self.curve.xyderivfromp_f(
+            1 / p if not p is None else None, ignorebounds=ignorebounds
+        )
+        return (-dydlogp, -dxdlogp)
+
     def execute(self, dx=None, dy=None, *, ignorebounds=False, verbose=False):
         """returns a new curve object that is then again wrapped in a CPCInverter"""
         curve = self.curve.execute(
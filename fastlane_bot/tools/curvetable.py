@@ -0,0 +1,342 @@
+"""
+columnar representation of ConstantProductCurve objects
+
+the CurveTable keeps the numeric state of many curves in a single NumPy structured array,
+with the tokens stored as indices into a token list, so that code working on many curves
+at once (eg the optimizers) can use vectorized operations instead of going through the
+properties of each curve; the TokenFlowKernel compiles a table into the aggregate token
+flows of its curves as a function of the token prices
+
+---
+(c) Copyright Bprotocol foundation 2023.
+Licensed under MIT
+"""
+__VERSION__ = "1.1"
+__DATE__ = "28/Mar/2024"
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+def _xyfromp(p, kbar, eta, alpha, is_symmetric):
+    """x, y of the curves at the marginal prices p, ignoring the bounds"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sqrt_p = np.sqrt(p)
+        x = np.where(is_symmetric, kbar / sqrt_p, (eta / p) ** (1 - alpha) * kbar)
+        y = np.where(is_symmetric, kbar * sqrt_p, (p / eta) ** alpha * kbar)
+    return x, y
+
+
+@dataclass
+class CurveTable:
+    """
+    columnar representation of a list of curves
+
+    :data:      structured array with one row per curve (see DTYPE); missing fees are NaN; y is
+                stored rather than derived from k and x so that it matches the curve exactly
+    :tokens:    tuple of all tokens; the tknx and tkny columns are indices into this tuple
+    :cids:      tuple of the curve ids
+    :curves:    the curve objects themselves, used as views for row access (optional)
+
+    the vectorized properties mirror those of ConstantProductCurve; for bounds that the curve
+    object reports as None, the table uses +inf
+    """
+
+    __VERSION__ = __VERSION__
+    __DATE__ = __DATE__
+
+    DTYPE = np.dtype([
+        ("k", "f8"),
+        ("x", "f8"),
+        ("y", "f8"),
+        ("x_act", "f8"),
+        ("y_act", "f8"),
+        ("alpha", "f8"),
+        ("fee", "f8"),
+        ("tknx", "i4"),
+        ("tkny", "i4"),
+    ])
+
+    data: np.ndarray
+    tokens: tuple
+    cids: tuple
+    curves: list = field(default=None, repr=False)
+
+    @classmethod
+    def from_curves(cls, curves):
+        """
+        alternative constructor: creates a table from an iterable of ConstantProductCurve objects
+
+        CPCInverter objects must be unwrapped before (the table holds the underlying curves)
+        """
+        curves = list(curves)
+        token_ix = {}
+        data = np.empty(len(curves), dtype=cls.DTYPE)
+        for i, c in enumerate(curves):
+            data[i] = (
+                c.k, c.x, c.y, c.x_act, c.y_act, c.alpha,
+                np.nan if c.fee is None else c.fee,
+                token_ix.setdefault(c.tknx, len(token_ix)),
+                token_ix.setdefault(c.tkny, len(token_ix)),
+            )
+        return cls(data=data, tokens=tuple(token_ix), cids=tuple(c.cid for c in curves), curves=curves)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, ix):
+        """the curve object of row ix"""
+        return self.curves[ix]
+
+    def select(self, ix):
+        """returns a new table with the rows ix (index array or boolean mask)"""
+        ix = np.arange(len(self))[ix]
+        return CurveTable(
+            data=self.data[ix],
+            tokens=self.tokens,
+            cids=tuple(self.cids[i] for i in ix),
+            curves=None if self.curves is None else [self.curves[i] for i in ix],
+        )
+
+    @property
+    def token_ix(self):
+        """dict token -> index into tokens"""
+        return {tkn: i for i, tkn in enumerate(self.tokens)}
+
+    def pairmask(self, tknx, tkny):
+        """boolean mask of the curves with the given tknx and tkny"""
+        token_ix = self.token_ix
+        if not tknx in token_ix or not tkny in token_ix:
+            return np.zeros(len(self), dtype=bool)
+        return (self.data["tknx"] == token_ix[tknx]) & (self.data["tkny"] == token_ix[tkny])
+
+    @property
+    def k(self):
+        return self.data["k"]
+
+    @property
+    def x(self):
+        return self.data["x"]
+
+    @property
+    def x_act(self):
+        return self.data["x_act"]
+
+    @property
+    def y_act(self):
+        return self.data["y_act"]
+
+    @property
+    def alpha(self):
+        return self.data["alpha"]
+
+    @property
+    def fee(self):
+        return self.data["fee"]
+
+    @property
+    def is_symmetric(self):
+        "True iff alpha == 0.5"
+        return self.alpha == 0.5
+
+    @property
+    def eta(self):
+        "portfolio weight factor eta = alpha / (1-alpha)"
+        return self.alpha / (1 - self.alpha)
+
+    @property
+    def y(self):
+        "(virtual) pool state y"
+        return self.data["y"]
+
+    @property
+    def p(self):
+        "pool price (in dy/dx)"
+        return np.where(self.is_symmetric, self.y / self.x, self.eta * self.y / self.x)
+
+    @property
+    def kbar(self):
+        "pool invariant that scales linearly with the pool size"
+        return np.where(self.is_symmetric, np.sqrt(self.k), self.k ** self.alpha)
+
+    @property
+    def is_unlevered(self):
+        "True iff x==x_act and y==y_act"
+        return (self.x == self.x_act) & (self.y == self.y_act)
+
+    @property
+    def x_min(self):
+        "minimum (virtual) x value"
+        return np.where(self.is_unlevered, 0, self.x - self.x_act)
+
+    @property
+    def y_min(self):
+        "minimum (virtual) y value"
+        return np.where(self.is_unlevered, 0, self.y - self.y_act)
+
+    @property
+    def x_max(self):
+        "maximum (virtual) x value (inf if unbounded)"
+        y_min = self.y_min
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(~self.is_unlevered & (y_min > 0), self.k / y_min, np.inf)
+
+    @property
+    def y_max(self):
+        "maximum (virtual) y value (inf if unbounded)"
+        x_min = self.x_min
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(~self.is_unlevered & (x_min > 0), self.k / x_min, np.inf)
+
+    def xyfromp(self, p, *, ignorebounds=False):
+        """
+        vectorized ConstantProductCurve.xyfromp_f
+
+        :p:             array of marginal prices, one per curve (or a scalar)
+        :returns:       tuple of arrays x, y
+        """
+        p = np.broadcast_to(np.asarray(p, dtype=float), self.x.shape)
+        x, y = _xyfromp(p, self.kbar, self.eta, self.alpha, self.is_symmetric)
+        if not ignorebounds:
+            x = np.minimum(np.maximum(x, self.x_min), self.x_max)
+            y = np.minimum(np.maximum(y, self.y_min), self.y_max)
+        return x, y
+
+    def dxdyfromp(self, p, *, ignorebounds=False):
+        """
+        vectorized ConstantProductCurve.dxdyfromp_f
+
+        :p:             array of marginal prices, one per curve (or a scalar)
+        :returns:       tuple of arrays dx, dy
+        """
+        x, y = self.xyfromp(p, ignorebounds=ignorebounds)
+        return x - self.x, y - self.y
+
+
+@dataclass
+class TokenFlowKernel:
+    """
+    the aggregate token flows of a table of curves, as a function of the token prices
+
+    the curve x token incidence is held in sparse form (the indices of tknx and tkny of every
+    curve into tokens) and the curve parameters are evaluated once, so that the token flows and
+    their Jacobian for a price vector are calculated with a few vectorized operations over all
+    curves, without any per curve Python code
+
+    :tokens:    tuple of the tokens, in the order of the price and token flow vectors
+    :ix_x:      index of the tknx of each curve into tokens
+    :ix_y:      index of the tkny of each curve into tokens
+    :x, y:      the current (virtual) token amounts of each curve
+    :kbar, eta, alpha, is_symmetric, x_min, x_max, y_min, y_max:
+                the curve parameters, as in the CurveTable properties of the same name
+    """
+
+    __VERSION__ = __VERSION__
+    __DATE__ = __DATE__
+
+    tokens: tuple
+    ix_x: np.ndarray = field(repr=False)
+    ix_y: np.ndarray = field(repr=False)
+    x: np.ndarray = field(repr=False)
+    y: np.ndarray = field(repr=False)
+    kbar: np.ndarray = field(repr=False)
+    eta: np.ndarray = field(repr=False)
+    alpha: np.ndarray = field(repr=False)
+    is_symmetric: np.ndarray = field(repr=False)
+    x_min: np.ndarray = field(repr=False)
+    x_max: np.ndarray = field(repr=False)
+    y_min: np.ndarray = field(repr=False)
+    y_max: np.ndarray = field(repr=False)
+
+    @classmethod
+    def from_table(cls, table, tokens=None):
+        """
+        alternative constructor: compiles the kernel of a CurveTable
+
+        :table:     the CurveTable
+        :tokens:    the tokens of the price and token flow vectors, in order; they must include
+                    all tokens of the table (default: the tokens of the table)
+        """
+        tokens = table.tokens if tokens is None else tuple(tokens)
+        token_ix = {tkn: i for i, tkn in enumerate(tokens)}
+        missing = [tkn for tkn in table.tokens if not tkn in token_ix]
+        assert not missing, f"tokens must include all tokens of the table (missing {missing})"
+        table_ix = np.array([token_ix[tkn] for tkn in table.tokens], dtype=np.intp)
+        return cls(
+            tokens=tokens,
+            ix_x=table_ix[table.data["tknx"]],
+            ix_y=table_ix[table.data["tkny"]],
+            x=table.x.copy(),
+            y=table.y.copy(),
+            kbar=table.kbar,
+            eta=table.eta,
+            alpha=table.alpha.copy(),
+            is_symmetric=table.is_symmetric,
+            x_min=table.x_min,
+            x_max=table.x_max,
+            y_min=table.y_min,
+            y_max=table.y_max,
+        )
+
+    @classmethod
+    def from_curves(cls, curves, tokens=None):
+        """
+        alternative constructor: compiles the kernel of an iterable of curves
+
+        CPCInverter objects must be unwrapped before (their token flows are those of the
+        underlying curves)
+        """
+        return cls.from_table(CurveTable.from_curves(curves), tokens)
+
+    def __len__(self):
+        return len(self.x)
+
+    def pfrompvec(self, pvec):
+        """
+        the marginal price of every curve (in dy/dx)
+
+        :pvec:      array of the token prices in any numeraire, in the order of tokens
+        """
+        pvec = np.asarray(pvec, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return pvec[self.ix_x] / pvec[self.ix_y]
+
+    def dtknfrompvec(self, pvec, *, ignorebounds=False):
+        """
+        the aggregate change in token amounts over all curves (vectorized dxvecfrompvec_f)
+
+        :pvec:      array of the token prices in any numeraire, in the order of tokens
+        :returns:   array of the change in token amounts, in the order of tokens
+        """
+        x, y = _xyfromp(self.pfrompvec(pvec), self.kbar, self.eta, self.alpha, self.is_symmetric)
+        if not ignorebounds:
+            x = np.minimum(np.maximum(x, self.x_min), self.x_max)
+            y = np.minimum(np.maximum(y, self.y_min), self.y_max)
+        n = len(self.tokens)
+        return (
+            np.bincount(self.ix_x, weights=x - self.x, minlength=n)
+            + np.bincount(self.ix_y, weights=y - self.y, minlength=n)
+        )
+
+    def jacobian(self, pvec, *, ignorebounds=False):
+        """
+        the Jacobian of dtknfrompvec with respect to the (natural) log of the token prices
+
+        :pvec:      array of the token prices in any numeraire, in the order of tokens
+        :returns:   matrix d dtkn_i / d log p_j, in the order of tokens (vectorized xyderivfromp_f)
+        """
+        x, y = _xyfromp(self.pfrompvec(pvec), self.kbar, self.eta, self.alpha, self.is_symmetric)
+        dxdlogp = -(1 - self.alpha) * x
+        dydlogp = self.alpha * y
+        if not ignorebounds:
+            dxdlogp = np.where((x < self.x_min) | (x > self.x_max), 0, dxdlogp)
+            dydlogp = np.where((y < self.y_min) | (y > self.y_max), 0, dydlogp)
+        n = len(self.tokens)
+        jac = np.zeros((n, n))
+        # the curve price is p_x / p_y, so d log p = d log p_x - d log p_y
+        np.add.at(jac, (self.ix_x, self.ix_x), dxdlogp)
+        np.add.at(jac, (self.ix_x, self.ix_y), -dxdlogp)
+        np.add.at(jac, (self.ix_y, self.ix_x), dydlogp)
+        np.add.at(jac, (self.ix_y, self.ix_y), -dydlogp)
+        return jac
@@ -22,8 +22,8 @@ author is Stefan Loesch <stefan@bancor.network>
 (c) Copyright Bprotocol foundation 2023. 
 Licensed under MIT
 """
-__VERSION__ = "5.2"
-__DATE__ = "15/Sep/2023"
+__VERSION__ = "5.3"
+__DATE__ = "28/Mar/2024"
 
 from dataclasses import dataclass, field, fields, asdict, astuple, InitVar
 import pandas as pd
@@ -34,6 +34,7 @@ import time
 # import numbers
 # import pickle
 from ..cpc import ConstantProductCurve as CPC, CPCInverter, CPCContainer
+from ..curvetable import TokenFlowKernel
 #from sys import float_info
 
 from .dcbase import DCBase
@@ -78,6 +79,7 @@ class MargPOptimizer(CPCArbOptimizer):
     MO_PSTART = "pstart"
     MO_P = MO_PSTART
     MO_DTKNFROMPF = "dtknfrompf"
+    MO_JACOBIANF = "jacobianf"
     MO_MINIMAL = "minimal"
     MO_FULL = "full"
 
@@ -109,6 +111,7 @@ class MargPOptimizer(CPCArbOptimizer):
         MO_PSTART       price estimates (as dataframe)
         MO_PE           alias for MO_ESTPRICE
         MO_DTKNFROMPF   the function calculating dtokens from p
+        MO_JACOBIANF    the function calculating the (analytic) Jacobian of dtokens from p
         MO_MINIMAL      minimal result (omitting some big fields)
         MO_FULL         full result
         None            alias for MO_FULL
@@ -128,6 +131,8 @@ class MargPOptimizer(CPCArbOptimizer):
         debug2              more debug output
         raiseonerror        if True, raise an OptimizationError exception on error
         pstart              starting price for optimization (3)
+        fdjacobian          if True, calculate the Jacobian with finite differences (4)
+        pykernel            if True, calculate the token flows curve by curve in Python (5)
         ==================  =========================================================================
             
 
@@ -142,6 +147,15 @@ class MargPOptimizer(CPCArbOptimizer):
         NOTE 3: can be provided either as dict {tkn:p, ...}, or as df as price estimate as 
         returned by MO_PSTART; excess tokens can be provided but all required tokens 
         must be present
+
+        NOTE 4: by default the Jacobian is assembled in one pass from the analytic price derivatives
+        of the curves (see xyderivfromp_f); finite differences are used if this parameter is set or if
+        a curve does not provide the derivatives
+
+        NOTE 5: by default the token flows (and the analytic Jacobian) are calculated with a
+        TokenFlowKernel compiled from the curves, ie vectorized over all curves at once; the
+        per curve Python code is used if this parameter is set, for the debug2 output, or if
+        the curves cannot be compiled
         """
         # data conversion: string to SFC object; note that anything but pure arb not currently supported
         if isinstance(sfc, str):
@@ -217,6 +231,13 @@ class MargPOptimizer(CPCArbOptimizer):
                 df.index.name = "tknb"
                 return df
             
+            # compile the curves into a vectorized kernel; the token order is that of tokens_t,
+            # followed by the target token whose price is always 1
+            if P("pykernel") or not all(isinstance(c, (CPC, CPCInverter)) for c in curves_t):
+                kernel = None
+            else:
+                kernel = TokenFlowKernel.from_curves(CPCInverter.unwrap(curves_t), tokens_t + (targettkn,))
+
             ## INNER FUNCTION: CALCULATE THE TARGET FUNCTION
             def dtknfromp_f(p, *, islog10=True, asdct=False, quiet=False):
                 """
@@ -241,49 +262,53 @@ class MargPOptimizer(CPCArbOptimizer):
                     print(f"prices={p}")
                     print(f"tokens={tokens_t}")
                 
-                # pvec is dict {tkn -> (log) price} for all tokens in p
-                pvec = {tkn: p_ for tkn, p_ in zip(tokens_t, p)}
-                pvec[targettkn] = 1
-                if P("debug") and not quiet:
-                    print(f"pvec={pvec}")
+                if kernel is not None and not P("debug2"):
+                    dtkn = kernel.dtknfrompvec(np.append(p, 1))
+                    sum_by_tkn = dict(zip(kernel.tokens, dtkn))
+                else:
+                    # pvec is dict {tkn -> (log) price} for all tokens in p
+                    pvec = {tkn: p_ for tkn, p_ in zip(tokens_t, p)}
+                    pvec[targettkn] = 1
+                    if P("debug") and not quiet:
+                        print(f"pvec={pvec}")
                 
-                sum_by_tkn = {t: 0 for t in alltokens_s}
-                for pair, (tknb, tknq) in zip(pairs, pairs_t):
-                    if get(p, tokens_ix.get(tknq)) > 0:
-                        price = get(p, tokens_ix.get(tknb)) / get(p, tokens_ix.get(tknq))
-                    else:
-                        #print(f"[dtknfromp_f] warning: price for {pair} is unknown, using 1 instead")
-                        price = 1
-                    curves = curves_by_pair[pair]
-                    c0 = curves[0]
-                    #dxdy = tuple(dxdy_f(c.dxdyfromp_f(price)) for c in curves)
-                    dxvecs = (c.dxvecfrompvec_f(pvec) for c in curves)
+                    sum_by_tkn = {t: 0 for t in alltokens_s}
+                    for pair, (tknb, tknq) in zip(pairs, pairs_t):
+                        if get(p, tokens_ix.get(tknq)) > 0:
+                            price = get(p, tokens_ix.get(tknb)) / get(p, tokens_ix.get(tknq))
+                        else:
+                            #print(f"[dtknfromp_f] warning: price for {pair} is unknown, using 1 instead")
+                            price = 1
+                        curves = curves_by_pair[pair]
+                        c0 = curves[0]
+                        #dxdy = tuple(dxdy_f(c.dxdyfromp_f(price)) for c in curves)
+                        dxvecs = (c.dxvecfrompvec_f(pvec) for c in curves)
                     
-                    if P("debug2") and not quiet:
-                        dxdy = tuple(dxdy_f(c.dxdyfromp_f(price)) for c in curves)
-                            # TODO: rewrite this using the dxvec
-                            # there is no need to extract dy dx; just iterate over dict
-                            # however not urgent because this is debug code
-                        print(f"\n{c0.pairp} --->>")
-                        print(f"  price={price:,.4f}, 1/price={1/price:,.4f}")
-                        for r, c in zip(dxdy, curves):
-                            s = f"  cid={c.cid:15}"
-                            s += f" dx={float(r[0]):15,.3f} {c.tknxp:>5}"
-                            s += f" dy={float(r[1]):15,.3f} {c.tknyp:>5}"
-                            s += f" p={c.p:,.2f} 1/p={1/c.p:,.2f}"
-                            print(s)
-                        print(f"<<--- {c0.pairp}")
-
-                    # old code from dxdy = tuple(dxdy_f(c.dxdyfromp_f(price)) for c in curves)
-                    # sumdx, sumdy = sum(dxdy)
-                    # sum_by_tkn[tknq] += sumdy
-                    # sum_by_tkn[tknb] += sumdx
-                    for dxvec in dxvecs:
-                        for tkn, dx_ in dxvec.items():
-                            sum_by_tkn[tkn] += dx_
-
-                    # if P("debug") and not quiet:
-                    #     print(f"pair={c0.pairp}, {sumdy:,.4f} {tn(tknq)}, {sumdx:,.4f} {tn(tknb)}, price={price:,.4f} {tn(tknq)} per {tn(tknb)} [{len(curves)} funcs]")
+                        if P("debug2") and not quiet:
+                            dxdy = tuple(dxdy_f(c.dxdyfromp_f(price)) for c in curves)
+                                # TODO: rewrite this using the dxvec
+                                # there is no need to extract dy dx; just iterate over dict
+                                # however not urgent because this is debug code
+                            print(f"\n{c0.pairp} --->>")
+                            print(f"  price={price:,.4f}, 1/price={1/price:,.4f}")
+                            for r, c in zip(dxdy, curves):
+                                s = f"  cid={c.cid:15}"
+                                s += f" dx={float(r[0]):15,.3f} {c.tknxp:>5}"
+                                s += f" dy={float(r[1]):15,.3f} {c.tknyp:>5}"
+                                s += f" p={c.p:,.2f} 1/p={1/c.p:,.2f}"
+                                print(s)
+                            print(f"<<--- {c0.pairp}")
+
+                        # old code from dxdy = tuple(dxdy_f(c.dxdyfromp_f(price)) for c in curves)
+                        # sumdx, sumdy = sum(dxdy)
+                        # sum_by_tkn[tknq] += sumdy
+                        # sum_by_tkn[tknb] += sumdx
+                        for dxvec in dxvecs:
+                            for tkn, dx_ in dxvec.items():
+                                sum_by_tkn[tkn] += dx_
+
+                        # if P("debug") and not quiet:
+                        #     print(f"pair={c0.pairp}, {sumdy:,.4f} {tn(tknq)}, {sumdx:,.4f} {tn(tknb)}, price={price:,.4f} {tn(tknq)} per {tn(tknb)} [{len(curves)} funcs]")
 
                 result = tuple(sum_by_tkn[t] for t in tokens_t)
                 if P("debug") and not quiet:
@@ -297,10 +322,55 @@ class MargPOptimizer(CPCArbOptimizer):
                 return np.array(result)
             ## END INNER FUNCTION
 
-            # return the inner function if requested
+            ## INNER FUNCTION: CALCULATE THE JACOBIAN OF THE TARGET FUNCTION
+            def jacobian_f(p, *, islog10=True):
+                """
+                calculates the Jacobian of dtknfromp_f from the analytic price derivatives of the curves
+
+                :p:         price vector, as in dtknfromp_f
+                :islog10:   if True, p is interpreted as log10(p) and the derivatives are taken
+                            with respect to log10(p), otherwise with respect to p
+                :returns:   the Jacobian as np.array, rows and columns in the order of tokens_t
+
+                every curve only depends on the price ratio p = p_x / p_y of its own two tokens,
+                so it contributes d(dx)/dlog p and d(dy)/dlog p with a positive sign to the
+                p_x column and a negative sign to the p_y column of the dx and dy rows
+                """
+                p = np.array(p, dtype=np.float64)
+                if islog10:
+                    p = np.exp(p * np.log(10))
+                assert len(p) == len(tokens_t), f"p and tokens_t have different lengths [{p}, {tokens_t}]"
+
+                if kernel is not None:
+                    jac = kernel.jacobian(np.append(p, 1))[:-1, :-1]
+                else:
+                    pvec = {tkn: p_ for tkn, p_ in zip(tokens_t, p)}
+                    pvec[targettkn] = 1
+
+                    jac = np.zeros((len(tokens_t), len(tokens_t)))
+                    for c in curves_t:
+                        ix, iy = tokens_ix.get(c.tknx), tokens_ix.get(c.tkny)
+                        dxdlogp, dydlogp = c.xyderivfromp_f(pvec[c.tknx] / pvec[c.tkny])
+                        for i, dtkndlogp in ((ix, dxdlogp), (iy, dydlogp)):
+                            if i is None:
+                                continue
+                            if ix is not None:
+                                jac[i, ix] += dtkndlogp
+                            if iy is not None:
+                                jac[i, iy] -= dtkndlogp
+
+                if islog10:
+                    return jac * np.log(10)
+                return jac / p
+            ## END INNER FUNCTION
+
+            # return the inner functions if requested
             if result == self.MO_DTKNFROMPF:
                 return dtknfromp_f
 
+            if result == self.MO_JACOBIANF:
+                return jacobian_f
+
             # return debug info if requested
             if result == self.MO_DEBUG:
                 return dict(
@@ -314,6 +384,8 @@ class MargPOptimizer(CPCArbOptimizer):
                     targettkn=targettkn,
                     pairs_t=pairs_t,
                     dtknfromp_f=dtknfromp_f,
+                    jacobian_f=jacobian_f,
+                    kernel=kernel,
                     optimizer=self,
                 )
 
@@ -322,6 +394,7 @@ class MargPOptimizer(CPCArbOptimizer):
                 raise Exception(f"price estimates not found; try setting pstart")
             p = np.array(price_estimates_t, dtype=float)
             plog10 = np.log10(p)
+            analytic_jacobian = not P("fdjacobian") and all(hasattr(c, "xyderivfromp_f") for c in curves_t)
             if P("verbose"):
                 # dtkn_d, dtkn = dtknfromp_f(plog10, islog10=True, asdct=True)
                 print("[margp_optimizer] pe  ", p)
@@ -348,8 +421,11 @@ class MargPOptimizer(CPCArbOptimizer):
                 # calculate the Jacobian
                 # if P("debug"):
                 #     print("\n[margp_optimizer] ============= JACOBIAN =============>>>")
-                J = self.J(dtknfromp_f, plog10)  
-                    # ATTENTION: dtknfromp_f takes log10(p) as input
+                if analytic_jacobian:
+                    J = jacobian_f(plog10)
+                else:
+                    J = self.J(dtknfromp_f, plog10)  
+                        # ATTENTION: dtknfromp_f takes log10(p) as input
                 if P("debug"):
                     # print("==== J ====>")
                     print("\n============= JACOBIAN =============>>>")
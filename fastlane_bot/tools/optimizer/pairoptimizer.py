@@ -13,8 +13,8 @@ The corresponding author is Stefan Loesch <stefan@bancor.network>
 (c) Copyright Bprotocol foundation 2023. 
 Licensed under MIT
 """
-__VERSION__ = "6.0.1"
-__DATE__ = "21/Sep/2023"
+__VERSION__ = "6.2"
+__DATE__ = "28/Mar/2024"
 
 from dataclasses import dataclass, field, fields, asdict, astuple, InitVar
 #import pandas as pd
@@ -187,6 +187,7 @@ class PairOptimizer(CPCArbOptimizer):
                             depending on whether or not targettkn is None
         :params:            dict of parameters
         :eps:               accuracy parameter passed to bisection method (default: 1e-6)
+        :bracket:           initial bisection interval (p_lo, p_hi) for SO_TARGETTKN (2)
         :returns:           depending on the `result` parameter 
 
         =================   ============================================================      
@@ -205,6 +206,10 @@ class PairOptimizer(CPCArbOptimizer):
         NOTE 1: the modes SO_PMAX and SO_GLOBALMAX are deprecated and the code may or 
         may not be working properly; if every those functions are needed they need to 
         be reviewed and tests need to be added (most tests in NBTests 002 have been disabled)
+
+        NOTE 2: the `bracket` parameter is passed in `params`, in the quote convention of `p_optimal_t` (ie
+        as price of the non-target token in units of the target token), typically around the optimal
+        price of a previous run; if the optimum is not inside it the default interval is used instead
         """
         start_time = time.time()
         if params is None:
@@ -264,16 +269,17 @@ class PairOptimizer(CPCArbOptimizer):
             assert targettkn in {c0.tknx, c0.tkny,}, f"targettkn {targettkn} not in {c0.tknx}, {c0.tkny}"
             
             # we are now running a goalseek == 0 on the token that is NOT the target token
+            bounds = self._bracket_bounds(params.get("bracket"), targettkn == c0.tknx, p_min * 0.99, p_max * 1.01)
             if targettkn == c0.tknx:
                 func = lambda p: dxdyfromp_sum_f(p)[1]
-                p_optimal = self.goalseek(func, p_min * 0.99, p_max * 1.01, eps=eps)
+                p_optimal = self._goalseek_bracket(func, bounds, p_min * 0.99, p_max * 1.01, eps=eps)
                 p_optimal_t = (1/float(p_optimal),)
                 full_result = dxdyfromp_sum_f(float(p_optimal))
                 opt_result  = full_result[0]
                 
             else:
                 func = lambda p: dxdyfromp_sum_f(p)[0]
-                p_optimal = self.goalseek(func, p_min * 0.99, p_max * 1.01, eps=eps)
+                p_optimal = self._goalseek_bracket(func, bounds, p_min * 0.99, p_max * 1.01, eps=eps)
                 p_optimal_t = (float(p_optimal),)
                 full_result = dxdyfromp_sum_f(float(p_optimal))
                 opt_result = full_result[1]
@@ -283,6 +289,43 @@ class PairOptimizer(CPCArbOptimizer):
         else:
             raise ValueError(f"unknown result type {result}")
 
+        return self._margp_pair_result(method, targettkn, curves_t, p_optimal, p_optimal_t, full_result, opt_result, start_time)
+
+    @staticmethod
+    def _bracket_bounds(bracket, inverted, a, b):
+        """
+        converts a `bracket` parameter to bisection bounds within the default bounds a, b
+
+        :bracket:   the (p_lo, p_hi) interval in the quote convention of p_optimal_t, or None
+        :inverted:  if True, the bisection runs on the inverse of that price (targettkn == tknx)
+        :returns:   the bounds (lo, hi), or None if there is no bracket or it is outside a, b
+        """
+        if bracket is None:
+            return None
+        lo, hi = bracket
+        if inverted:
+            lo, hi = 1 / hi, 1 / lo
+        lo, hi = max(lo, a), min(hi, b)
+        if not lo < hi:
+            return None
+        return lo, hi
+
+    @classmethod
+    def _goalseek_bracket(cls, func, bounds, a, b, *, eps=None):
+        """
+        runs `goalseek` on bounds, and on the default bounds a, b if bounds is None or does not bracket the zero
+        """
+        if bounds is not None:
+            result = cls.goalseek(func, *bounds, eps=eps)
+            if not result.is_error:
+                return result
+        return cls.goalseek(func, a, b, eps=eps)
+
+    def _margp_pair_result(self, method, targettkn, curves_t, p_optimal, p_optimal_t, full_result, opt_result, start_time):
+        """
+        creates the result object of `optimize` (and `optimize_batch`)
+        """
+        c0 = curves_t[0]
         NOMR = lambda x: x
             # allows to mask certain long portions of the result if desired, the same way
             # the main margpoptimizer does it; however, this not currently considered necessary
@@ -315,4 +358,195 @@ class PairOptimizer(CPCArbOptimizer):
             tokens_t=(c0.tknx if targettkn==c0.tkny else c0.tkny,),
             n_iterations=None, # not available
         )
-    
\ No newline at end of file
+
+    GOALSEEKMAXITER = 200
+
+    @classmethod
+    def optimize_batch(cls, curve_containers, targettkns, *, params=None, brackets=None):
+        """
+        runs `optimize(targettkn, params=params)` for many pairs at once
+
+        :curve_containers:  iterable of CPCContainer objects, each holding the curves of one pair
+        :targettkns:        the target token for each container
+        :params:            dict of parameters (see `optimize`)
+        :brackets:          the `bracket` parameter for each container (or None, for all or some of them)
+        :returns:           list of MargpOptimizerResult objects, one per container
+
+        the bisections of all pairs are run simultaneously, with the curves of all pairs packed into
+        arrays (one row per pair), so that each bisection step is a single vectorized evaluation of
+        the token changes of all curves; the prices and results are the same as those of `optimize`,
+        except that pairs for which the bisection fails return an error result instead of raising
+        """
+        start_time = time.time()
+        if params is None:
+            params = dict()
+        eps = params.get("eps", cls.PAIROPTIMIZEREPS)
+        optimizers = [cls(CC) for CC in curve_containers]
+        targettkns = list(targettkns)
+        assert len(optimizers) == len(targettkns), f"one target token per container required [{len(optimizers)}, {len(targettkns)}]"
+        if len(optimizers) == 0:
+            return []
+
+        curves_ts = [CPCInverter.wrap(O.curve_container) for O in optimizers]
+        for curves_t, targettkn in zip(curves_ts, targettkns):
+            assert len(curves_t) > 0, "no curves found"
+            pairs = set(c.pair for c in curves_t)
+            assert (len(pairs) == 1), f"pair_optimizer only works on curves of exactly one pair [{pairs}]"
+            c0 = curves_t[0]
+            assert targettkn in {c0.tknx, c0.tkny,}, f"targettkn {targettkn} not in {c0.tknx}, {c0.tkny}"
+
+        curve_arrays = cls._curve_arrays(curves_ts, [O.curve_container.table for O in optimizers])
+        # we are running a goalseek == 0 on the token that is NOT the target token (dy if targettkn is tknx)
+        goal_dy = np.array([targettkn == curves_t[0].tknx for curves_t, targettkn in zip(curves_ts, targettkns)])
+        func = lambda p, ix: np.where(goal_dy[ix], *cls._dxdyfromp_sum_vec(curve_arrays, p, ix)[::-1])
+        p_min = np.array([np.min([c.p for c in curves_t]) for curves_t in curves_ts])
+        p_max = np.array([np.max([c.p for c in curves_t]) for curves_t in curves_ts])
+        a, b = p_min * 0.99, p_max * 1.01
+        if brackets is None:
+            p_optimals = cls.goalseek_vec(func, a, b, eps=eps)
+        else:
+            brackets = list(brackets)
+            assert len(brackets) == len(optimizers), f"one bracket per container required [{len(optimizers)}, {len(brackets)}]"
+            bounds = [
+                cls._bracket_bounds(bracket, bool(inverted), a_, b_)
+                for bracket, inverted, a_, b_ in zip(brackets, goal_dy, a, b)
+            ]
+            warm = np.array([bounds_ is not None for bounds_ in bounds])
+            a_warm = np.array([bounds_[0] if bounds_ is not None else a_ for bounds_, a_ in zip(bounds, a)])
+            b_warm = np.array([bounds_[1] if bounds_ is not None else b_ for bounds_, b_ in zip(bounds, b)])
+            p_optimals = cls.goalseek_vec(func, a_warm, b_warm, eps=eps)
+
+            # the pairs whose optimum moved out of the bracket are solved again on the default bounds
+            retry = np.array([i for i, p_optimal in enumerate(p_optimals) if warm[i] and p_optimal.is_error], dtype=int)
+            if len(retry) > 0:
+                retried = cls.goalseek_vec(lambda p, ix: func(p, retry[ix]), a[retry], b[retry], eps=eps)
+                for i, p_optimal in zip(retry, retried):
+                    p_optimals[i] = p_optimal
+
+        results = []
+        for O, curves_t, targettkn, p_optimal in zip(optimizers, curves_ts, targettkns, p_optimals):
+            c0 = curves_t[0]
+            p_optimal_t, full_result, opt_result = None, None, None
+            if not p_optimal.is_error:
+                dxdyfromp_sum_f = lambda p: sum(np.array(c.dxdyfromp_f(p)[0:2]) for c in curves_t)
+                full_result = dxdyfromp_sum_f(float(p_optimal))
+                if targettkn == c0.tknx:
+                    p_optimal_t = (1/float(p_optimal),)
+                    opt_result = full_result[0]
+                else:
+                    p_optimal_t = (float(p_optimal),)
+                    opt_result = full_result[1]
+            results += [O._margp_pair_result("margp-pair", targettkn, curves_t, p_optimal, p_optimal_t, full_result, opt_result, start_time)]
+        return results
+
+    @staticmethod
+    def _curve_arrays(curves_ts, tables):
+        """
+        packs the wrapped curves of many pairs into 2d arrays (one row per pair, padded with empty curves)
+
+        :curves_ts: the wrapped curves of each pair
+        :tables:    the CurveTable of each pair (the table of its container, whose rows are the
+                    underlying curves of curves_ts in the same order)
+
+        inverted curves are stored as their underlying curve and flagged in `inv`; missing bounds
+        are stored as -inf and +inf; `valid` is False for padding
+        """
+        n, m = len(curves_ts), max(len(curves_t) for curves_t in curves_ts)
+        rows = np.array([i for i, curves_t in enumerate(curves_ts) for _ in curves_t], dtype=int)
+        cols = np.array([j for curves_t in curves_ts for j in range(len(curves_t))], dtype=int)
+        inv = np.array([isinstance(c, CPCInverter) for curves_t in curves_ts for c in curves_t], dtype=bool)
+        column = lambda name: np.concatenate([getattr(table, name) for table in tables])
+
+        arrays = {}
+        for name, value, default in (
+            ("kbar", column("kbar"), 0), ("x", column("x"), 0), ("y", column("y"), 0), ("alpha", column("alpha"), 0.5),
+            ("eta", column("eta"), 1), ("x_min", column("x_min"), -np.inf), ("x_max", column("x_max"), np.inf),
+            ("y_min", column("y_min"), -np.inf), ("y_max", column("y_max"), np.inf),
+            ("inv", inv, False), ("sym", column("is_symmetric"), False), ("valid", True, False),
+        ):
+            arrays[name] = np.full((n, m), default, dtype=bool if isinstance(default, bool) else float)
+            arrays[name][rows, cols] = value
+        return arrays
+
+    @staticmethod
+    def _dxdyfromp_sum_vec(arrays, p, ix):
+        """
+        vectorized equivalent of `sum(c.dxdyfromp_f(p)[0:2] for c in curves_t)` for the pairs `ix`
+
+        :arrays:    the curve arrays (see `_curve_arrays`)
+        :p:         the price for each pair in `ix` (in the quote convention of the wrapped curves)
+        :ix:        the (row) indices of the pairs
+        :returns:   tuple of arrays dx, dy
+        """
+        a = {name: value[ix] for name, value in arrays.items()}
+        p = np.where(a["inv"], 1 / p[:, None], p[:, None])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sqrt_p = np.sqrt(p)
+            x = np.where(a["sym"], a["kbar"] / sqrt_p, (a["eta"] / p) ** (1 - a["alpha"]) * a["kbar"])
+            y = np.where(a["sym"], a["kbar"] * sqrt_p, (p / a["eta"]) ** a["alpha"] * a["kbar"])
+        x = np.minimum(np.maximum(x, a["x_min"]), a["x_max"])
+        y = np.minimum(np.maximum(y, a["y_min"]), a["y_max"])
+        dx = np.where(a["valid"], x - a["x"], 0)
+        dy = np.where(a["valid"], y - a["y"], 0)
+        dx, dy = np.where(a["inv"], dy, dx), np.where(a["inv"], dx, dy)
+        dx_sum, dy_sum = np.zeros(len(ix)), np.zeros(len(ix))
+        for j in range(dx.shape[1]):
+            # summed curve by curve, in the same order as the scalar method
+            dx_sum, dy_sum = dx_sum + dx[:, j], dy_sum + dy[:, j]
+        return dx_sum, dy_sum
+
+    @classmethod
+    def goalseek_vec(cls, func, a, b, *, eps=None):
+        """
+        vectorized version of `goalseek`, running many bisections simultaneously
+
+        :func:      function of (x, ix) returning the function values at x for the problems ix
+        :a:         array of lower bounds a
+        :b:         array of upper bounds b
+        :eps:       desired accuracy
+        :returns:   list of SimpleResult, one per problem
+        """
+        if eps is None:
+            eps = cls.GOALSEEKEPS
+        a, b = np.array(a, dtype=float), np.array(b, dtype=float)
+        n = len(a)
+        result = np.full(n, np.nan)
+        errormsg = [None] * n
+
+        for i in np.flatnonzero(~(a > 0)):
+            errormsg[i] = f"bounds must be positive [{a[i]}, {b[i]}]"
+        active = np.flatnonzero(a > 0)
+        fa, fb = np.full(n, np.nan), np.full(n, np.nan)
+        fa[active], fb[active] = func(a[active], active), func(b[active], active)
+        for i in active[fa[active] * fb[active] > 0]:
+            errormsg[i] = f"function must have different signs at a,b [{a[i]}, {b[i]}, {fa[i]} {fb[i]}]"
+        active = active[~(fa[active] * fb[active] > 0)]
+
+        counter = 0
+        while len(active) > 0:
+            done = ~((b[active] / a[active] - 1) > eps)
+            result[active[done]] = (a[active[done]] + b[active[done]]) / 2
+            active = active[~done]
+            if len(active) == 0:
+                break
+            c = (a[active] + b[active]) / 2
+            fc = func(c, active)
+            zero = fc == 0
+            result[active[zero]] = c[zero]
+            lower = (fa[active] * fc < 0) & ~zero
+            upper = ~lower & ~zero
+            b[active[lower]] = c[lower]
+            a[active[upper]] = c[upper]
+            fa[active[upper]] = fc[upper]
+            active = active[~zero]
+            counter += 1
+            if counter > cls.GOALSEEKMAXITER:
+                for i in active:
+                    errormsg[i] = f"goalseek did not converge; possible epsilon too small [{eps}]"
+                break
+
+        return [
+            cls.SimpleResult(result=None, errormsg=msg, method="bisection") if msg is not None
+            else cls.SimpleResult(result=float(r), method="bisection")
+            for r, msg in zip(result, errormsg)
+        ]
@@ -13,6 +13,7 @@ from fastlane_bot.tools.cpc import T
 check_version_requirements(required_version="6.11.0", package_name="web3")
 
 import os, sys
+import threading
 import time
 from traceback import format_exc
 
@@ -29,6 +30,8 @@ from fastlane_bot.events.async_event_update_utils import (
 )
 from fastlane_bot.events.managers.manager import Manager
 from fastlane_bot.events.multicall_utils import multicall_every_iteration
+from fastlane_bot.events.pipeline import SnapshotChannel, take_snapshot
+from fastlane_bot.events.subscription import EventSubscription
 from fastlane_bot.events.utils import (
     add_initial_pool_data,
     get_static_data,
@@ -44,6 +47,7 @@ from fastlane_bot.events.utils import (
     handle_subsequent_iterations,
     verify_state_changed,
     handle_duplicates,
+    apply_stale_pools,
     get_latest_events,
     get_start_block,
     set_network_to_mainnet_if_replay,
@@ -82,6 +86,7 @@ def process_arguments(args):
     transformations = {
         "backdate_pools": is_true,
         "n_jobs": int,
+        "search_n_jobs": int,
         "polling_interval": int,
         "alchemy_max_block_fetch": int,
         "reorg_delay": int,
@@ -98,6 +103,8 @@ def process_arguments(args):
         "self_fund": is_true,
         "read_only": is_true,
         "is_args_test": is_true,
+        "address_scoped_logs": is_true,
+        "pipeline": is_true,
     }
 
     # Apply the transformations
@@ -213,6 +220,7 @@ def main(args: argparse.Namespace) -> None:
             static_pool_data_filename: {args.static_pool_data_filename}
             cache_latest_only: {args.cache_latest_only}
             n_jobs: {args.n_jobs}
+            search_n_jobs: {args.search_n_jobs}
             polling_interval: {args.polling_interval}
             reorg_delay: {args.reorg_delay}
             use_cached_events: {args.use_cached_events}
@@ -230,6 +238,9 @@ def main(args: argparse.Namespace) -> None:
             version_check_frequency: {args.version_check_frequency}
             self_fund: {args.self_fund}
             read_only: {args.read_only}
+            address_scoped_logs: {args.address_scoped_logs}
+            ws_url: {args.ws_url}
+            pipeline: {args.pipeline}
 
             +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
             +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -302,19 +313,126 @@ def main(args: argparse.Namespace) -> None:
     # Add initial pool data to the manager
     add_initial_pool_data(cfg, mgr, args.n_jobs)
 
-    # Run the main loop
-    run(mgr, args)
+    # Run the main loop (a replay or a Tenderly fork runs sequentially, since it steps through the blocks itself)
+    if args.pipeline and (args.replay_from_block or args.tenderly_fork_id):
+        mgr.cfg.logger.warning(
+            "[main] --pipeline is ignored with --replay_from_block or --tenderly_fork_id, running sequentially"
+        )
+    if args.pipeline and not args.replay_from_block and not args.tenderly_fork_id:
+        run_pipelined(mgr, args)
+    else:
+        run(mgr, args)
+
+
+def run_pipelined(mgr, args) -> None:
+    """
+    Runs the main loop as a two-stage pipeline: a background ingestion worker runs the main loop up to the
+    pool data update of each block and publishes a snapshot of the pool data, while the search stage
+    searches the latest snapshot (skipping the stale ones).
+    """
+    snapshots = SnapshotChannel()
+    if args.search_n_jobs != 1:
+        mgr.cfg.logger.warning(
+            f"[main] --search_n_jobs={args.search_n_jobs} is ignored in pipelined mode, the search runs in a single process"
+        )
+
+    def ingest():
+        try:
+            run(mgr, args, snapshots=snapshots)
+        finally:
+            snapshots.close()
+
+    ingestion = threading.Thread(target=ingest, name="ingestion", daemon=True)
+    ingestion.start()
+    search_snapshots(mgr, args, snapshots)
+    ingestion.join()
+
+
+def get_target_tokens(bot, args, mgr):
+    """
+    Gets the target tokens of an iteration: the tokens of the pools of the exchange given by
+    --use_specific_exchange_for_target_tokens if any, otherwise the --target_tokens.
+    """
+    if args.use_specific_exchange_for_target_tokens is None:
+        return args.target_tokens
+    target_tokens = bot.get_tokens_in_exchange(exchange_name=args.use_specific_exchange_for_target_tokens)
+    mgr.cfg.logger.info(
+        f"[main] Using only tokens in: {args.use_specific_exchange_for_target_tokens}, found {len(target_tokens)} tokens"
+    )
+    return target_tokens
+
+
+def search_snapshots(mgr, args, snapshots: SnapshotChannel) -> None:
+    """
+    The search stage of the pipelined main loop: searches each latest snapshot until the ingestion stops.
+    """
+    loop_idx = total_search_time = 0
+    tx_helpers = None
+    while (snapshot := snapshots.take()) is not None:
+        try:
+            search_start_time = time.time()
+            if tx_helpers is not None:
+                tx_helpers.prefetch_transaction_context(snapshot.block_number)
+            loop_idx += 1
 
+            # Initialize the bot on the snapshot. The search is not sharded over worker processes here, because
+            # forking while the ingestion thread holds a lock (logging, the pool store) can deadlock the workers
+            bot = init_bot(mgr, 1, tx_helpers, snapshot, snapshots)
+            tx_helpers = bot.TxHelpersClass
+
+            # Verify that the minimum profit in BNT is respected
+            verify_min_bnt_is_respected(bot=bot, mgr=mgr)
 
-def run(mgr, args, tenderly_uri=None) -> None:
+            # Search for (and execute) arbitrage opportunities
+            handle_subsequent_iterations(
+                arb_mode=args.arb_mode,
+                bot=bot,
+                flashloan_tokens=args.flashloan_tokens,
+                polling_interval=args.polling_interval,
+                randomizer=args.randomizer,
+                run_data_validator=args.run_data_validator,
+                target_tokens=get_target_tokens(bot, args, mgr),
+                loop_idx=loop_idx,
+                logging_path=args.logging_path,
+                mgr=mgr,
+            )
+
+            total_search_time += time.time() - search_start_time
+            mgr.cfg.logger.info(
+                f"[main] Searched block {snapshot.block_number}. Average search time: {total_search_time / loop_idx}, "
+                f"stale snapshots skipped: {snapshots.skipped} of {snapshots.published}"
+            )
+
+        except Exception as e:
+            mgr.cfg.logger.error(f"Error in search stage: {format_exc()}")
+            mgr.cfg.logger.error(
+                f"[main] Error in search stage: {e}. Continuing... "
+                f"Please report this error to the Fastlane Telegram channel if it persists."
+                f"{mgr.cfg.logging_header}"
+            )
+
+
+def run(mgr, args, tenderly_uri=None, snapshots: SnapshotChannel = None) -> None:
     loop_idx = last_block = last_block_queried = total_iteration_time = 0
+    tx_helpers = None
     start_timeout = time.time()
     mainnet_uri = mgr.cfg.w3.provider.endpoint_uri
     handle_static_pools_update(mgr)
+
+    # Receive the new blocks and events from a websocket subscription (polling is used as fallback)
+    subscription = (
+        EventSubscription(args.ws_url, mgr, args.reorg_delay)
+        if args.ws_url and not args.replay_from_block and not args.tenderly_fork_id and not args.use_cached_events
+        else None
+    )
     while True:
         try:
             # Save initial state of pool data to assert whether it has changed
-            initial_state = mgr.pool_data.copy()
+            initial_state = mgr.pool_data.snapshot()
+
+            # Update the stale pools found by the search stage, which only reads the pool data in pipelined mode
+            if snapshots is not None:
+                apply_stale_pools(mgr, snapshots)
 
             # ensure 'last_updated_block' is in pool_data for all pools
             for idx, pool in enumerate(mgr.pool_data):
@@ -334,14 +452,24 @@ def run(mgr, args, tenderly_uri=None) -> None:
                 args.replay_from_block,
             )
 
-            # Get all events from the last block to the current block
-            current_block = get_current_block(
-                last_block,
-                mgr,
-                args.reorg_delay,
-                replay_from_block,
-                args.tenderly_fork_id,
-            )
+            # Get all events from the last block to the current block, from the subscription if it is in sync
+            pushed = subscription.pop_events(last_block) if subscription is not None else None
+            if pushed is not None:
+                current_block, pushed_events = pushed
+                fetched_events = [pushed_events]
+            else:
+                current_block = get_current_block(
+                    last_block,
+                    mgr,
+                    args.reorg_delay,
+                    replay_from_block,
+                    args.tenderly_fork_id,
+                )
+                fetched_events = None
+
+            # Start fetching the transaction context for the new block while the pools are being updated
+            if tx_helpers is not None:
+                tx_helpers.prefetch_transaction_context(current_block)
 
             # Log the current start, end and last block
             mgr.cfg.logger.info(
@@ -369,6 +497,8 @@ def run(mgr, args, tenderly_uri=None) -> None:
                     start_block,
                     args.cache_latest_only,
                     args.logging_path,
+                    args.address_scoped_logs,
+                    fetched_events,
                 )
             )
             iteration_start_time = time.time()
@@ -430,45 +560,50 @@ def run(mgr, args, tenderly_uri=None) -> None:
             # Handle/remove duplicates in the pool data
             handle_duplicates(mgr)
 
-            # Re-initialize the bot
-            bot = init_bot(mgr)
-
-            # Verify that the state has changed
-            verify_state_changed(bot=bot, initial_state=initial_state, mgr=mgr)
-
-            # Verify that the minimum profit in BNT is respected
-            verify_min_bnt_is_respected(bot=bot, mgr=mgr)
-
-            if args.use_specific_exchange_for_target_tokens is not None:
-                target_tokens = bot.get_tokens_in_exchange(
-                    exchange_name=args.use_specific_exchange_for_target_tokens
-                )
-                mgr.cfg.logger.info(
-                    f"[main] Using only tokens in: {args.use_specific_exchange_for_target_tokens}, found {len(target_tokens)} tokens"
+            if snapshots is not None:
+                # Verify that the state has changed
+                verify_state_changed(bot=None, initial_state=initial_state, mgr=mgr)
+
+                if not mgr.read_only:
+                    handle_tokens_csv(mgr, mgr.prefix_path)
+
+                # Hand the pool data of this block over to the search stage, which runs concurrently
+                snapshots.publish(take_snapshot(mgr, current_block))
+            else:
+                # Re-initialize the bot
+                bot = init_bot(mgr, args.search_n_jobs, tx_helpers)
+                tx_helpers = bot.TxHelpersClass
+
+                # Verify that the state has changed
+                verify_state_changed(bot=bot, initial_state=initial_state, mgr=mgr)
+
+                # Verify that the minimum profit in BNT is respected
+                verify_min_bnt_is_respected(bot=bot, mgr=mgr)
+
+                if not mgr.read_only:
+                    handle_tokens_csv(mgr, mgr.prefix_path)
+
+                # Handle subsequent iterations
+                handle_subsequent_iterations(
+                    arb_mode=args.arb_mode,
+                    bot=bot,
+                    flashloan_tokens=args.flashloan_tokens,
+                    polling_interval=args.polling_interval,
+                    randomizer=args.randomizer,
+                    run_data_validator=args.run_data_validator,
+                    target_tokens=get_target_tokens(bot, args, mgr),
+                    loop_idx=loop_idx,
+                    logging_path=args.logging_path,
+                    replay_from_block=replay_from_block,
+                    tenderly_uri=tenderly_uri,
+                    mgr=mgr,
+                    forked_from_block=forked_from_block,
                 )
 
-            if not mgr.read_only:
-                handle_tokens_csv(mgr, mgr.prefix_path)
-
-            # Handle subsequent iterations
-            handle_subsequent_iterations(
-                arb_mode=args.arb_mode,
-                bot=bot,
-                flashloan_tokens=args.flashloan_tokens,
-                polling_interval=args.polling_interval,
-                randomizer=args.randomizer,
-                run_data_validator=args.run_data_validator,
-                target_tokens=args.target_tokens,
-                loop_idx=loop_idx,
-                logging_path=args.logging_path,
-                replay_from_block=replay_from_block,
-                tenderly_uri=tenderly_uri,
-                mgr=mgr,
-                forked_from_block=forked_from_block,
-            )
-
-            # Sleep for the polling interval
-            if not replay_from_block and args.polling_interval > 0:
+            # Wait for the next block, or sleep for the polling interval if there is no subscription
+            if subscription is not None and subscription.wait_for_head():
+                mgr.cfg.logger.info(f"[main] Received block {subscription.head}")
+            elif not replay_from_block and args.polling_interval > 0:
                 mgr.cfg.logger.info(
                     f"[main] Sleeping for polling_interval={args.polling_interval} seconds..."
                 )
@@ -631,6 +766,13 @@ if __name__ == "__main__":
     parser.add_argument(
         "--n_jobs", default=-1, help="Number of parallel jobs to run"
     )
+    parser.add_argument(
+        "--search_n_jobs",
+        default=1,
+        help="Number of worker processes across which the optimizations of the arbitrage search are sharded "
+             "(negative values count back from the number of CPUs, as for --n_jobs). By default the search runs "
+             "in the main process. Ignored with --pipeline, where the search always runs in the main process.",
+    )
     parser.add_argument(
         "--exchanges",
         default="carbon_v1,bancor_v3,bancor_v2,bancor_pol,uniswap_v3,uniswap_v2,sushiswap_v2,balancer,pancakeswap_v2,pancakeswap_v3",
@@ -759,6 +901,24 @@ if __name__ == "__main__":
         help="If True, the bot will skip all operations which write to disk. Use this flag if you're "
              "running the bot in an environment with restricted write permissions.",
     )
+    parser.add_argument(
+        "--address_scoped_logs",
+        default='False',
+        help="If True, the events are fetched with eth_getLogs requests restricted to the addresses of the known "
+             "pools and exchange contracts, instead of with chain-wide filters per event type.",
+    )
+    parser.add_argument(
+        "--ws_url",
+        default=None,
+        help="Websocket RPC URL. If set, the bot subscribes to the new blocks and events and runs an iteration "
+             "on each new block, instead of polling. Polling is used as fallback whenever the subscription fails.",
+    )
+    parser.add_argument(
+        "--pipeline",
+        default='False',
+        help="If True, the events of the next block are fetched and applied in a background thread while the "
+             "arbitrage search runs on a snapshot of the pool data of the latest block.",
+    )
     parser.add_argument(
         "--is_args_test",
         default='False',